@@ -0,0 +1,182 @@
+from __future__ import annotations
+
+import json
+import os
+import re
+import threading
+import time
+from dataclasses import asdict, dataclass
+from datetime import date
+from pathlib import Path
+
+import pandas as pd
+
+# Archivos del esquema anterior: demanda_{sistema}_{md5(sistema|fecha)}.parquet
+_LEGACY_RE = re.compile(r"^demanda_(?P<system>[A-Z]+)_(?P<hash>[0-9a-f]{32})\.parquet$")
+
+
+@dataclass
+class CacheEntry:
+    system: str
+    date: str           # día de operación YYYY-MM-DD
+    file: str           # nombre del parquet dentro del directorio del cache
+    fetched_at: float   # epoch de la descarga
+    last_access: float  # epoch de la última lectura (para LRU)
+    size: int           # bytes en disco
+    legacy: bool = False  # archivo del esquema anterior (versionado): nunca se borra
+
+
+class DemandCache:
+    """
+    Cache en disco de respuestas de la API CENACE, con índice JSON.
+
+    - Un parquet por (sistema, día): demanda_{sistema}_{YYYY-MM-DD}.parquet
+    - index.json guarda system, date, fetched_at, last_access y size
+    - ttl_days: las entradas descargadas hace más de N días se eliminan
+    - max_bytes: si el total rebasa el límite se expulsa la menos usada (LRU)
+
+    Al abrirse adopta en memoria los archivos del esquema anterior (hash md5)
+    leyendo su columna `fecha`, así que los días viejos siguen siendo
+    consultables. Esos archivos están versionados: el cache no los borra
+    (expirar o expulsar uno solo lo saca del índice) y abrir el cache no
+    escribe nada. El índice se guarda solo al escribir (put / evict); las
+    lecturas actualizan `last_access` en memoria.
+    """
+
+    INDEX_NAME = "index.json"
+
+    def __init__(self, cache_dir: Path, ttl_days: float = 90.0, max_bytes: int = 50_000_000) -> None:
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.index_path = self.cache_dir / self.INDEX_NAME
+        self.ttl_days = ttl_days
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries: dict[str, CacheEntry] = self._load_index()
+        with self._lock:
+            self._adopt_legacy_files()
+
+    # ── Índice ────────────────────────────────────────────────────────────────
+    @staticmethod
+    def _key(system: str, day: date | str) -> str:
+        day_s = day.isoformat() if isinstance(day, date) else str(day)
+        return f"{system}|{day_s}"
+
+    def _load_index(self) -> dict[str, CacheEntry]:
+        if not self.index_path.exists():
+            return {}
+        try:
+            raw = json.loads(self.index_path.read_text(encoding="utf-8"))
+            return {k: CacheEntry(**v) for k, v in raw.items()}
+        except Exception:
+            return {}
+
+    def _save_index(self) -> None:
+        tmp = self.index_path.with_suffix(".json.tmp")
+        tmp.write_text(
+            json.dumps({k: asdict(e) for k, e in self._entries.items()}, indent=1),
+            encoding="utf-8",
+        )
+        os.replace(tmp, self.index_path)
+
+    def _adopt_legacy_files(self) -> None:
+        known = {e.file for e in self._entries.values()}
+        for f in sorted(self.cache_dir.glob("demanda_*.parquet")):
+            m = _LEGACY_RE.match(f.name)
+            if not m or f.name in known:
+                continue
+            try:
+                fechas = pd.read_parquet(f, columns=["fecha"])["fecha"].dropna()
+                day = str(pd.to_datetime(fechas.iloc[0]).date())
+            except Exception:
+                continue  # ilegible: se ignora, no se borra
+            key = self._key(m.group("system"), day)
+            if key in self._entries:
+                continue  # duplicado del mismo día: gana el ya indexado
+            stat = f.stat()
+            self._entries[key] = CacheEntry(
+                system=m.group("system"), date=day, file=f.name,
+                fetched_at=stat.st_mtime, last_access=stat.st_mtime, size=stat.st_size, legacy=True,
+            )
+
+    # ── API pública ───────────────────────────────────────────────────────────
+    def get(self, system: str, day: date | str) -> pd.DataFrame | None:
+        """DataFrame cacheado de (sistema, día), o None si no existe / expiró."""
+        key = self._key(system, day)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            path = self.cache_dir / entry.file
+            if self._expired(entry) or not path.exists():
+                self._drop(key)
+                return None
+            entry.last_access = time.time()
+        return pd.read_parquet(path)
+
+    def put(self, system: str, day: date | str, df: pd.DataFrame) -> None:
+        key = self._key(system, day)
+        day_s = key.split("|", 1)[1]
+        fname = f"demanda_{system}_{day_s}.parquet"
+        path = self.cache_dir / fname
+        tmp = path.with_suffix(".parquet.tmp")
+        df.to_parquet(tmp, index=False)
+        os.replace(tmp, path)
+        now = time.time()
+        with self._lock:
+            old = self._entries.get(key)
+            if old is not None and old.file != fname and not old.legacy:
+                (self.cache_dir / old.file).unlink(missing_ok=True)
+            self._entries[key] = CacheEntry(
+                system=system, date=day_s, file=fname,
+                fetched_at=now, last_access=now, size=path.stat().st_size,
+            )
+            self._evict_locked()
+            self._save_index()
+
+    def evict(self) -> list[str]:
+        """Aplica TTL y límite de tamaño. Devuelve las claves expulsadas."""
+        with self._lock:
+            evicted = self._evict_locked()
+            self._save_index()
+        return evicted
+
+    def entries(self) -> pd.DataFrame:
+        """Índice como DataFrame (system, date, fetched_at, last_access, size)."""
+        with self._lock:
+            rows = [asdict(e) for e in self._entries.values()]
+        if not rows:
+            return pd.DataFrame(columns=["system", "date", "file", "fetched_at", "last_access", "size"])
+        df = pd.DataFrame(rows)
+        for col in ["fetched_at", "last_access"]:
+            df[col] = pd.to_datetime(df[col], unit="s")
+        return df.sort_values(["date", "system"], ascending=[False, True]).reset_index(drop=True)
+
+    def total_bytes(self) -> int:
+        """Bytes de las entradas que escribió el cache (los archivos legacy no cuentan para max_bytes)."""
+        with self._lock:
+            return sum(e.size for e in self._entries.values() if not e.legacy)
+
+    # ── Internos ──────────────────────────────────────────────────────────────
+    def _expired(self, entry: CacheEntry) -> bool:
+        return self.ttl_days is not None and (time.time() - entry.fetched_at) > self.ttl_days * 86_400
+
+    def _drop(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None and not entry.legacy:
+            (self.cache_dir / entry.file).unlink(missing_ok=True)
+
+    def _evict_locked(self) -> list[str]:
+        evicted = [k for k, e in self._entries.items() if self._expired(e)]
+        for k in evicted:
+            self._drop(k)
+        owned = {k: e for k, e in self._entries.items() if not e.legacy}
+        total = sum(e.size for e in owned.values())
+        if self.max_bytes is not None and total > self.max_bytes:
+            for k, e in sorted(owned.items(), key=lambda kv: kv[1].last_access):
+                if total <= self.max_bytes:
+                    break
+                total -= e.size
+                self._drop(k)
+                evicted.append(k)
+        return evicted
@@ -0,0 +1,300 @@
+"""
+Cliente del portal CENACE de "Estimación de Demanda Real por Balance".
+
+    https://www.cenace.gob.mx/Paginas/SIM/Reportes/EstimacionDemandaReal.aspx
+
+El portal es una página ASP.NET: cada consulta es un postback que lleva el
+__VIEWSTATE de la respuesta anterior. `PortalSession` hace el GET inicial una
+sola vez y reutiliza esos campos entre fechas; `RateLimiter` reparte un
+límite de peticiones por segundo entre varias sesiones concurrentes y
+`Coverage` guarda qué fechas ya se tienen, cuáles no tienen datos todavía y
+cuáles fallaron por red, para reanudar un backfill.
+
+`PortalSession.fetch_day` distingue "sin datos para la fecha" (None) de un
+fallo transitorio (PortalError): solo lo primero se recuerda como revisado.
+"""
+from __future__ import annotations
+
+import json
+import os
+import re
+import threading
+import time
+from datetime import date, datetime
+from pathlib import Path
+from typing import Callable
+
+import requests
+from bs4 import BeautifulSoup
+
+BASE_URL = "https://www.cenace.gob.mx/Paginas/SIM/Reportes/EstimacionDemandaReal.aspx"
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "es-MX,es;q=0.9,en;q=0.8",
+    "Referer": BASE_URL,
+}
+
+
+class PortalError(RuntimeError):
+    """Fallo transitorio del portal (red, HTTP, ViewState): no dice nada de la fecha."""
+
+
+# ── Fechas de los CSVs descargados ────────────────────────────────────────────
+def csv_date(path: Path) -> date | None:
+    """Fecha de operación de un CSV de balance (línea 8 del encabezado)."""
+    try:
+        with open(path, encoding="latin-1") as fh:
+            for i, line in enumerate(fh):
+                if i == 7:
+                    m = re.search(r"(\d{2}/\d{2}/\d{4})", line.strip().strip('"'))
+                    if m:
+                        return datetime.strptime(m.group(1), "%d/%m/%Y").date()
+                    break
+    except Exception:
+        pass
+    return None
+
+
+# ── Estado de cobertura (permite reanudar un backfill interrumpido) ──────────
+class Coverage:
+    """
+    Estado persistente en `path` (JSON, fuera del directorio versionado):
+      available:   {YYYY-MM-DD: nombre del CSV en csv_dir}
+      unavailable: {YYYY-MM-DD: epoch del último intento en que el portal no tenía datos}
+      errors:      {YYYY-MM-DD: {"ts": epoch, "error": mensaje}} — fallos transitorios
+    Solo se leen encabezados de los CSVs que aún no están en el estado. Las
+    fechas con error no cuentan como revisadas: se reintentan en la siguiente
+    corrida.
+    """
+
+    def __init__(self, path: Path, csv_dir: Path) -> None:
+        self.path = Path(path)
+        self.csv_dir = Path(csv_dir)
+        self._lock = threading.Lock()
+        self.available: dict[str, str] = {}
+        self.unavailable: dict[str, float] = {}
+        self.errors: dict[str, dict] = {}
+        if self.path.exists():
+            try:
+                raw = json.loads(self.path.read_text(encoding="utf-8"))
+                self.available = dict(raw.get("available", {}))
+                self.unavailable = dict(raw.get("unavailable", {}))
+                self.errors = dict(raw.get("errors", {}))
+            except Exception:
+                pass
+        self._sync_with_disk()
+
+    def _sync_with_disk(self) -> None:
+        on_disk = {f.name for f in self.csv_dir.glob("*.csv")}
+        self.available = {d: f for d, f in self.available.items() if f in on_disk}
+        known = set(self.available.values())
+        for name in on_disk - known:
+            d = csv_date(self.csv_dir / name)
+            if d is not None:
+                self.available[d.isoformat()] = name
+        self.save()
+
+    def has(self, d: date) -> bool:
+        return d.isoformat() in self.available
+
+    def checked_recently(self, d: date, recheck_hours: float) -> bool:
+        ts = self.unavailable.get(d.isoformat())
+        return ts is not None and (time.time() - ts) < recheck_hours * 3600
+
+    def mark_available(self, d: date, fname: str) -> None:
+        with self._lock:
+            self.available[d.isoformat()] = fname
+            self.unavailable.pop(d.isoformat(), None)
+            self.errors.pop(d.isoformat(), None)
+            self.save()
+
+    def mark_unavailable(self, d: date) -> None:
+        with self._lock:
+            self.unavailable[d.isoformat()] = time.time()
+            self.errors.pop(d.isoformat(), None)
+            self.save()
+
+    def mark_error(self, d: date, error: str) -> None:
+        with self._lock:
+            self.errors[d.isoformat()] = {"ts": time.time(), "error": error}
+            self.save()
+
+    def save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".json.tmp")
+        tmp.write_text(
+            json.dumps({"available": dict(sorted(self.available.items())),
+                        "unavailable": dict(sorted(self.unavailable.items())),
+                        "errors": dict(sorted(self.errors.items()))}, indent=1),
+            encoding="utf-8",
+        )
+        os.replace(tmp, self.path)
+
+
+# ── Limitador de tasa compartido entre sesiones ───────────────────────────────
+class RateLimiter:
+    """Garantiza al menos 1/rate segundos entre peticiones de todas las sesiones."""
+
+    def __init__(
+        self,
+        rate_per_s: float,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        self.min_interval = 1.0 / rate_per_s if rate_per_s > 0 else 0.0
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._next = 0.0
+
+    def wait(self) -> None:
+        with self._lock:
+            now = self._clock()
+            slot = max(now, self._next)
+            self._next = slot + self.min_interval
+        if slot > now:
+            self._sleep(slot - now)
+
+
+# ── Campos ASP.NET ────────────────────────────────────────────────────────────
+def extract_aspnet_fields(soup: BeautifulSoup) -> dict:
+    fields = {}
+    for name in ["__VIEWSTATE", "__VIEWSTATEGENERATOR", "__EVENTVALIDATION",
+                 "__VIEWSTATEENCRYPTED"]:
+        tag = soup.find("input", {"name": name})
+        if tag:
+            fields[name] = tag.get("value", "")
+    return fields
+
+
+def _date_fields(target: date) -> dict:
+    """Campos del control de fecha Telerik (formato dd/MM/yyyy)."""
+    iso = target.strftime("%Y-%m-%d")
+    return {
+        "ctl00$MainContent$rdpFechaBalance$dateInput": target.strftime("%d/%m/%Y"),
+        "ctl00_MainContent_rdpFechaBalance_dateInput_ClientState":
+            f'{{"enabled":true,"emptyMessage":"","validationText":"{iso}-00-00-00",'
+            f'"valueAsString":"{iso}-00-00-00",'
+            f'"minDateStr":"2016-01-27-00-00-00","maxDateStr":"2030-12-31-00-00-00"}}',
+    }
+
+
+# ── Sesión del portal con reuso de ViewState ─────────────────────────────────
+class PortalSession:
+    """
+    Una sesión HTTP del portal. El GET inicial (para obtener __VIEWSTATE) se
+    hace una sola vez; cada consulta posterior es un postback que reutiliza
+    los campos ASP.NET de la última respuesta. Si el servidor rechaza el
+    ViewState, se refresca con un GET y se reintenta una vez.
+    """
+
+    def __init__(self, limiter: RateLimiter, timeout: int = 30) -> None:
+        self.http = requests.Session()
+        self.http.headers.update(HEADERS)
+        self.limiter = limiter
+        self.timeout = timeout
+        self.fields: dict = {}
+        self.gets = 0
+        self.posts = 0
+
+    def _get(self) -> requests.Response:
+        self.limiter.wait()
+        self.gets += 1
+        r = self.http.get(BASE_URL, timeout=self.timeout)
+        r.raise_for_status()
+        return r
+
+    def _post(self, data: dict) -> requests.Response:
+        self.limiter.wait()
+        self.posts += 1
+        r = self.http.post(BASE_URL, data=data, timeout=self.timeout)
+        r.raise_for_status()
+        return r
+
+    def refresh(self) -> None:
+        """GET de la página para obtener campos ASP.NET nuevos (PortalError si falla)."""
+        try:
+            r = self._get()
+        except requests.RequestException as e:
+            raise PortalError(f"GET inicial: {e}") from e
+        self.fields = extract_aspnet_fields(BeautifulSoup(r.text, "html.parser"))
+        if not self.fields.get("__VIEWSTATE"):
+            raise PortalError("No se encontró __VIEWSTATE en la página")
+
+    def _query(self, target: date) -> BeautifulSoup | None:
+        """POST de consulta por fecha. None si el ViewState fue rechazado."""
+        post_data = {
+            **self.fields,
+            "__EVENTTARGET": "",
+            "__EVENTARGUMENT": "",
+            **_date_fields(target),
+            "ctl00$MainContent$btnConsultaBalance": "Consultar",
+        }
+        try:
+            r = self._post(post_data)
+        except requests.RequestException as e:
+            raise PortalError(f"POST consulta {target}: {e}") from e
+        soup = BeautifulSoup(r.text, "html.parser")
+        fields = extract_aspnet_fields(soup)
+        if not fields.get("__VIEWSTATE"):
+            return None
+        self.fields = fields
+        return soup
+
+    def fetch_day(self, target: date) -> bytes | None:
+        """
+        Intenta descargar el CSV de balance para `target`.
+        Devuelve los bytes del CSV, o None si el portal aún no tiene datos de
+        esa fecha; lanza PortalError si la consulta no se pudo completar.
+        """
+        if not self.fields:
+            self.refresh()
+
+        soup = self._query(target)
+        if soup is None:
+            # ViewState caducado o rechazado → un GET nuevo y un reintento
+            self.refresh()
+            soup = self._query(target)
+            if soup is None:
+                self.fields = {}
+                raise PortalError(f"ViewState rechazado dos veces ({target})")
+
+        # Verificar si hay datos (buscar tabla con datos)
+        grid = soup.find("table", {"id": re.compile(r"rgBalance", re.I)})
+        if not grid:
+            # Buscar cualquier tabla con filas de datos
+            tables = soup.find_all("table", class_=re.compile(r"rgMasterTable", re.I))
+            if not tables:
+                return None  # sin datos para esta fecha
+
+        # POST para descargar CSV (botón de exportar del grid Telerik).
+        # La respuesta es el CSV, así que self.fields sigue siendo válido
+        # para la siguiente consulta.
+        csv_post = {
+            **self.fields,
+            "__EVENTTARGET": "ctl00$MainContent$rgBalance$ctl00$ctl02$ctl00$ExportToCsvButton",
+            "__EVENTARGUMENT": "",
+            **_date_fields(target),
+        }
+        try:
+            r3 = self._post(csv_post)
+        except requests.RequestException as e:
+            self.fields = {}
+            raise PortalError(f"POST descarga CSV {target}: {e}") from e
+        content_type = r3.headers.get("Content-Type", "")
+        if "text/csv" in content_type or "application/octet-stream" in content_type:
+            return r3.content
+        # Si responde HTML, el botón de descarga no funcionó con estos nombres;
+        # sus campos ASP.NET son los vigentes para el siguiente postback
+        fields = extract_aspnet_fields(BeautifulSoup(r3.text, "html.parser"))
+        self.fields = fields if fields.get("__VIEWSTATE") else {}
+        raise PortalError(f"La exportación de {target} respondió {content_type or 'sin Content-Type'}, no CSV")
+
+
+def fetch_day(target: date, session: requests.Session, timeout: int = 30) -> bytes | None:
+    """Descarga de un solo día (sin reuso de ViewState entre llamadas)."""
+    portal = PortalSession(RateLimiter(0), timeout=timeout)
+    portal.http = session
+    session.headers.update(HEADERS)
+    return portal.fetch_day(target)
@@ -1,13 +1,18 @@
 from __future__ import annotations
 
 import json
-import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from datetime import date
 from pathlib import Path
 
 import pandas as pd
 import requests
+from requests.adapters import HTTPAdapter
+
+from .api_cache import DemandCache
+from .fetch_resilience import CircuitBreaker, FetchMetrics, RetryPolicy, call_with_retries
 
 
 CENACE_URL = "https://www.cenace.gob.mx/GraficaDemanda.aspx/obtieneValoresTotal"
@@ -19,10 +24,40 @@ SISTEMA_TO_GERENCIA = {
     "BCS": "2",
 }
 
-# Cache en disco (raíz del repo /data_cache)
+# Cache en disco (raíz del repo /data_cache) — acotado por TTL y tamaño, con índice
 REPO_ROOT = Path(__file__).resolve().parents[2]
 CACHE_DIR = REPO_ROOT / "data_cache"
 CACHE_DIR.mkdir(exist_ok=True)
+CACHE = DemandCache(CACHE_DIR, ttl_days=90, max_bytes=50_000_000)
+
+HEADERS = {
+    "Content-Type": "application/json; charset=utf-8",
+    "Accept": "application/json, text/plain, */*",
+    "User-Agent": "Mozilla/5.0",
+    "Origin": "https://www.cenace.gob.mx",
+    "Referer": "https://www.cenace.gob.mx/GraficaDemanda.aspx",
+    "X-Requested-With": "XMLHttpRequest",
+}
+
+# Sesión HTTP compartida (keep-alive) — se crea una sola vez por proceso
+_SESSION: requests.Session | None = None
+_SESSION_LOCK = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    """
+    Devuelve la sesión HTTP compartida del proceso.
+    Reutiliza conexiones TCP/TLS hacia cenace.gob.mx entre llamadas y hilos.
+    """
+    global _SESSION
+    with _SESSION_LOCK:
+        if _SESSION is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=len(SISTEMA_TO_GERENCIA))
+            session.mount("https://", adapter)
+            session.headers.update(HEADERS)
+            _SESSION = session
+        return _SESSION
 
 
 @dataclass
@@ -30,12 +65,93 @@ class FetchResult:
     df: pd.DataFrame
     from_cache: bool
     batches: int
-
-
-def _cache_path(system: str) -> Path:
-    today = date.today().isoformat()
-    key = hashlib.md5(f"{system}|{today}".encode()).hexdigest()
-    return CACHE_DIR / f"demanda_{system}_{key}.parquet"
+    is_mock: bool = False
+    error: str | None = None
+
+
+def load_cached_demand(system: str, day: date) -> pd.DataFrame | None:
+    """Demanda cacheada de un día cualquiera (None si no está en el cache)."""
+    return CACHE.get(system, day)
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Capa resiliente: reintentos + circuit breaker + métricas
+# ──────────────────────────────────────────────────────────────────────────────
+ENDPOINT = "obtieneValoresTotal"
+RETRY_POLICY = RetryPolicy(max_attempts=3, base_delay_s=0.5, max_delay_s=8.0, deadline_s=45.0)
+BREAKERS: dict[str, CircuitBreaker] = {ENDPOINT: CircuitBreaker(failure_threshold=3, cooldown_s=60.0)}
+METRICS = FetchMetrics(log_path=CACHE_DIR / "fetch_metrics.jsonl")
+CONNECT_TIMEOUT_S = 5
+
+
+def api_health() -> dict[str, dict]:
+    """Resumen por endpoint: conteos, latencias p50/p95 y estado del breaker."""
+    summary = METRICS.summary()
+    for endpoint, breaker in BREAKERS.items():
+        row = summary.setdefault(endpoint, {})
+        row["breaker"] = breaker.state
+        row["reintentar_en_s"] = round(breaker.retry_after(), 1)
+    return summary
+
+
+def _download_demand(session: requests.Session, gerencia: str, timeout: int) -> pd.DataFrame:
+    """Una petición a CENACE → DataFrame en el esquema canónico (lanza en error)."""
+    r = session.post(
+        CENACE_URL,
+        headers=HEADERS,
+        data=f'{{"gerencia":"{gerencia}"}}',
+        timeout=(min(CONNECT_TIMEOUT_S, timeout), timeout),
+    )
+    r.raise_for_status()
+    data = r.json()
+
+    # La respuesta viene en data["d"] como string JSON
+    if isinstance(data, dict) and "d" in data:
+        inner = data["d"]
+        if isinstance(inner, str):
+            inner = json.loads(inner)
+        data = inner
+
+    df = pd.DataFrame(data)
+
+    # Renombrar columnas al esquema canónico
+    rename = {
+        "hora": "hora",
+        "valorDemanda": "demanda_mw",
+        "valorGeneracion": "generacion_mw",
+        "valorPronostico": "pronostico_mw",
+    }
+    df = df.rename(columns={k: v for k, v in rename.items() if k in df.columns})
+
+    # Convertir a numérico (CENACE envía strings)
+    for col in ["demanda_mw", "generacion_mw", "pronostico_mw"]:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors="coerce")
+
+    # Ordenar por hora + timestamp
+    if "hora" in df.columns:
+        df["hora"] = pd.to_numeric(df["hora"], errors="coerce")
+        df = df.dropna(subset=["hora"]).sort_values("hora").reset_index(drop=True)
+
+        # Crear timestamp del día actual + hora (para graficar / PyPSA)
+        df["fecha"] = date.today().isoformat()
+        df["timestamp"] = pd.to_datetime(df["fecha"]) + pd.to_timedelta(df["hora"] - 1, unit="h")
+    else:
+        # Por si cambia el schema de CENACE
+        df["fecha"] = date.today().isoformat()
+    return df
+
+
+def _mock_frame() -> pd.DataFrame:
+    df = pd.DataFrame({
+        "hora": range(1, 25),
+        "demanda_mw": [0.0] * 24,
+        "generacion_mw": [0.0] * 24,
+        "pronostico_mw": [0.0] * 24,
+    })
+    df["fecha"] = date.today().isoformat()
+    df["timestamp"] = pd.to_datetime(df["fecha"]) + pd.to_timedelta(df["hora"] - 1, unit="h")
+    return df
 
 
 def fetch_demand(
@@ -43,88 +159,48 @@ def fetch_demand(
     use_cache: bool = True,
     timeout: int = 30,
     allow_mock_on_error: bool = True,
+    session: requests.Session | None = None,
 ) -> FetchResult:
     """
     Descarga la demanda del día actual desde CENACE.
     La API obtieneValoresTotal solo devuelve datos del día en curso.
     - system: "SIN", "BCA" o "BCS"
+    - timeout: tiempo máximo de lectura por intento (la conexión usa ≤ 5 s)
+    - allow_mock_on_error: si todo falla, devuelve un frame en cero marcado
+      con is_mock=True (nunca se escribe en el cache)
+    - session: sesión HTTP a usar (default: la sesión compartida del proceso)
+
+    Los errores transitorios se reintentan con backoff exponencial + jitter;
+    tras fallas repetidas el circuit breaker falla rápido durante el
+    enfriamiento en lugar de esperar el timeout completo.
     """
     gerencia = SISTEMA_TO_GERENCIA.get(system, "10")
 
-    cache_file = _cache_path(system)
-    if use_cache and cache_file.exists():
-        df = pd.read_parquet(cache_file)
-        return FetchResult(df=df, from_cache=True, batches=0)
-
-    headers = {
-        "Content-Type": "application/json; charset=utf-8",
-        "Accept": "application/json, text/plain, */*",
-        "User-Agent": "Mozilla/5.0",
-        "Origin": "https://www.cenace.gob.mx",
-        "Referer": "https://www.cenace.gob.mx/GraficaDemanda.aspx",
-        "X-Requested-With": "XMLHttpRequest",
-    }
+    today = date.today()
+    if use_cache:
+        cached = CACHE.get(system, today)
+        if cached is not None:
+            return FetchResult(df=cached, from_cache=True, batches=0)
+
+    if session is None:
+        session = get_session()
 
     try:
-        r = requests.post(
-            CENACE_URL,
-            headers=headers,
-            data=f'{{"gerencia":"{gerencia}"}}',
-            timeout=timeout,
+        df = call_with_retries(
+            lambda: _download_demand(session, gerencia, timeout),
+            endpoint=ENDPOINT,
+            policy=RETRY_POLICY,
+            breaker=BREAKERS[ENDPOINT],
+            metrics=METRICS,
         )
-        r.raise_for_status()
-        data = r.json()
-
-        # La respuesta viene en data["d"] como string JSON
-        if isinstance(data, dict) and "d" in data:
-            inner = data["d"]
-            if isinstance(inner, str):
-                inner = json.loads(inner)
-            data = inner
-
-        df = pd.DataFrame(data)
-
-        # Renombrar columnas al esquema canónico
-        rename = {
-            "hora": "hora",
-            "valorDemanda": "demanda_mw",
-            "valorGeneracion": "generacion_mw",
-            "valorPronostico": "pronostico_mw",
-        }
-        df = df.rename(columns={k: v for k, v in rename.items() if k in df.columns})
-
-        # Convertir a numérico (CENACE envía strings)
-        for col in ["demanda_mw", "generacion_mw", "pronostico_mw"]:
-            if col in df.columns:
-                df[col] = pd.to_numeric(df[col], errors="coerce")
-
-        # Ordenar por hora + timestamp
-        if "hora" in df.columns:
-            df["hora"] = pd.to_numeric(df["hora"], errors="coerce")
-            df = df.dropna(subset=["hora"]).sort_values("hora").reset_index(drop=True)
-
-            # Crear timestamp del día actual + hora (para graficar / PyPSA)
-            df["fecha"] = date.today().isoformat()
-            df["timestamp"] = pd.to_datetime(df["fecha"]) + pd.to_timedelta(df["hora"] - 1, unit="h")
-        else:
-            # Por si cambia el schema de CENACE
-            df["fecha"] = date.today().isoformat()
-    except Exception:
+    except Exception as e:
         if allow_mock_on_error:
-            df = pd.DataFrame({
-                "hora": range(1, 25),
-                "demanda_mw": [0.0] * 24,
-                "generacion_mw": [0.0] * 24,
-                "pronostico_mw": [0.0] * 24,
-            })
-            df["fecha"] = date.today().isoformat()
-            df["timestamp"] = pd.to_datetime(df["fecha"]) + pd.to_timedelta(df["hora"] - 1, unit="h")
-        else:
-            raise
+            return FetchResult(df=_mock_frame(), from_cache=False, batches=0, is_mock=True, error=str(e))
+        raise
 
     if use_cache:
         try:
-            df.to_parquet(cache_file, index=False)
+            CACHE.put(system, today, df)
         except Exception:
             pass
 
@@ -139,17 +215,27 @@ def fetch_demand_batch(
 ) -> dict[str, FetchResult]:
     """
     Descarga la demanda del día actual para SIN, BCA y BCS en lote.
-    Cada sistema se descarga por separado y se cachea individualmente.
-    Devuelve un dict  {sistema: FetchResult}.
+    Las peticiones corren en paralelo (un hilo por sistema) sobre la misma
+    sesión keep-alive, así que la latencia del lote es la del sistema más
+    lento y no la suma. Cada sistema se cachea individualmente.
+    Devuelve un dict  {sistema: FetchResult}  en el orden de `systems`.
     """
     if systems is None:
         systems = ["SIN", "BCA", "BCS"]
-    return {
-        s: fetch_demand(
-            system=s,
-            use_cache=use_cache,
-            timeout=timeout,
-            allow_mock_on_error=allow_mock_on_error,
-        )
-        for s in systems
-    }
\ No newline at end of file
+    if not systems:
+        return {}
+
+    session = get_session()
+    with ThreadPoolExecutor(max_workers=len(systems)) as pool:
+        futures = {
+            s: pool.submit(
+                fetch_demand,
+                system=s,
+                use_cache=use_cache,
+                timeout=timeout,
+                allow_mock_on_error=allow_mock_on_error,
+                session=session,
+            )
+            for s in systems
+        }
+        return {s: fut.result() for s, fut in futures.items()}
\ No newline at end of file
@@ -0,0 +1,109 @@
+"""
+Nivel de detalle (LOD) para gráficas de series horarias largas.
+
+Una corrida de varios meses manda miles de puntos por traza al navegador.
+Aquí se reduce cada serie a ~MAX_POINTS puntos conservando su forma:
+
+    - LTTB (Largest-Triangle-Three-Buckets) para líneas: en cada cubeta se
+      queda el punto que forma el triángulo más grande con el anterior
+      elegido y el promedio de la cubeta siguiente (picos y valles sobreviven)
+    - mín/máx por cubeta para áreas apiladas y barras: se eligen las filas
+      del mínimo y del máximo del total, así todas las trazas comparten eje x
+
+La reducción se aplica sobre la ventana visible (`window`): al acotar la
+ventana a menos de MAX_POINTS horas se ve la resolución completa.
+Sin dependencias de Plotly; la página decide el tipo de traza con `use_webgl`.
+"""
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+# Puntos por traza tras la reducción (~2 por píxel en un gráfico ancho)
+MAX_POINTS = 2000
+
+# Por encima de esto las líneas van como Scattergl (WebGL)
+WEBGL_MIN_POINTS = 3000
+
+
+# ── Índices ───────────────────────────────────────────────────────────────────
+def lttb_indices(y: np.ndarray, n_out: int, x: np.ndarray | None = None) -> np.ndarray:
+    """Posiciones (ordenadas) de los `n_out` puntos LTTB de `y`; todas si ya caben."""
+    y = np.nan_to_num(np.asarray(y, dtype=float))
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = np.arange(n, dtype=float) if x is None else np.asarray(x, dtype=float)
+
+    # n_out − 2 cubetas entre el primer y el último punto (ambos se conservan)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    out = np.empty(n_out, dtype=np.int64)
+    out[0], out[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        nlo, nhi = (edges[i + 1], edges[i + 2]) if i + 2 < len(edges) else (n - 1, n)
+        cx, cy = x[nlo:nhi].mean(), y[nlo:nhi].mean()
+        area = np.abs((x[a] - cx) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (cy - y[a]))
+        a = lo + int(np.argmax(area))
+        out[i + 1] = a
+    return out
+
+
+def minmax_indices(envelope: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    Posiciones (ordenadas) del mínimo y el máximo de `envelope` en n_out/2
+    cubetas, más el primer y el último punto; todas si ya caben.
+    """
+    env = np.nan_to_num(np.asarray(envelope, dtype=float))
+    n = len(env)
+    if n_out >= n or n_out < 4:
+        return np.arange(n)
+    buckets = (np.arange(n) * ((n_out - 2) // 2) // n).astype(np.int64)
+    order = np.lexsort((env, buckets))                   # por cubeta, de menor a mayor
+    starts = np.flatnonzero(np.r_[True, buckets[order][1:] != buckets[order][:-1]])
+    ends = np.r_[starts[1:], n] - 1
+    return np.unique(np.r_[0, order[starts], order[ends], n - 1])
+
+
+# ── Frames ────────────────────────────────────────────────────────────────────
+def window(data: pd.DataFrame | pd.Series, start=None, end=None) -> pd.DataFrame | pd.Series:
+    """Filas dentro de [start, end] (límites opcionales, sobre el índice temporal)."""
+    if start is None and end is None:
+        return data
+    return data.loc[start:end]
+
+
+def downsample(
+    data: pd.DataFrame | pd.Series,
+    max_points: int | None = MAX_POINTS,
+    method: str = "lttb",
+) -> pd.DataFrame | pd.Series:
+    """
+    Reduce `data` a ~max_points filas (sin reducción si max_points es None).
+
+    - "lttb":   sobre la serie (o la primera columna de un DataFrame)
+    - "minmax": sobre el total por fila, para áreas apiladas / barras
+    """
+    if max_points is None or len(data) <= max_points:
+        return data
+    values = data.to_numpy(dtype=float)
+    if method == "minmax":
+        rows = minmax_indices(values.sum(axis=1) if values.ndim == 2 else values, max_points)
+    elif method == "lttb":
+        rows = lttb_indices(values[:, 0] if values.ndim == 2 else values, max_points)
+    else:
+        raise ValueError(f"Método de LOD desconocido: {method!r}")
+    return data.iloc[rows]
+
+
+def downsample_curve(values: np.ndarray, max_points: int | None = MAX_POINTS) -> tuple[np.ndarray, np.ndarray]:
+    """Curva de duración (ya ordenada) → (horas 1..T elegidas, valores) con LTTB."""
+    values = np.asarray(values)
+    rows = np.arange(len(values)) if max_points is None else lttb_indices(values, max_points)
+    return rows + 1, values[rows]
+
+
+def use_webgl(n_points: int) -> bool:
+    """True si una traza de línea con `n_points` debería ir como Scattergl."""
+    return n_points > WEBGL_MIN_POINTS
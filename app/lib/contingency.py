@@ -0,0 +1,184 @@
+"""
+Cribado de contingencias N-1: se saca una unidad grande a la vez, se vuelve
+a despachar el horizonte y se ordenan los casos por corte y por impacto en
+precio.
+
+    ranking = screen_contingencies(load_data, recipe, k=5, systems=("BCA", "BCS"), workers=4)
+
+Cada caso difiere del caso base solo en las cotas de despacho de una unidad,
+así que se reutiliza `OutageModel` (lib/outage_mc.py): un modelo linopy por
+proceso y, por caso, la cota de esa unidad en cero. El caso base guarda su
+base óptima (basis_fn) y cada contingencia parte de ella (warmstart_fn).
+Con una base de partida HiGHS no hace presolve, y sacar una unidad grande
+deja infactibles todas las horas en que despachaba, así que la ganancia
+depende de los datos: `warm_start=False` resuelve cada caso en frío y
+`scripts/screen_contingencies.py --bench` compara ambos. La columna
+"iteraciones" del ranking muestra el trabajo simplex de cada caso.
+
+El despacho no impone el criterio N-1 (no hay reserva); esto es un cribado
+ex post de qué salidas de unidad provocarían corte o picos de precio.
+"""
+from __future__ import annotations
+
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Callable, Iterable, Iterator
+
+import numpy as np
+import pandas as pd
+
+from . import outage_mc
+from .dispatch_model import SISTEMAS, DispatchData
+from .outage_mc import OutageModel, sample_row
+
+# Unidades más grandes que se criban por sistema
+TOP_K = 5
+
+# Tecnologías que no son unidades (VoLL)
+NOT_UNITS = {"shedding"}
+
+ENS = "Energía no servida (MWh)"
+COST = "Costo total ($M)"
+
+
+def major_units(generators: pd.DataFrame, k: int = TOP_K, systems: Iterable[str] = SISTEMAS) -> pd.DataFrame:
+    """Las `k` unidades de mayor p_nom de cada sistema (sin VoLL), de mayor a menor."""
+    units = generators[~generators["carrier"].isin(NOT_UNITS) & generators["bus"].isin(list(systems))]
+    return units.sort_values("p_nom", ascending=False, kind="stable").groupby("bus", sort=False).head(int(k))
+
+
+def _metrics(outcome, bus: str) -> dict | None:
+    if outcome is None:
+        return None
+    row = sample_row(outcome)
+    j = SISTEMAS.index(bus)
+    row["Precio máx. sistema ($/MWh)"] = float(outcome.price[:, j].max()) if len(outcome.price) else 0.0
+    row["iteraciones"] = outcome.iterations
+    return row
+
+
+def solve_case(
+    model: OutageModel,
+    gen_names: pd.Index,
+    unit: str,
+    bus: str,
+    warmstart: str | None = None,
+) -> tuple[dict | None, float]:
+    """Despacha sin `unit` → (métricas o None si no llegó al óptimo, segundos)."""
+    available = np.ones(len(gen_names), dtype=bool)
+    available[gen_names.get_loc(unit)] = False
+    t0 = time.perf_counter()
+    outcome = model.solve(available, **({"warmstart_fn": warmstart} if warmstart else {}))
+    return _metrics(outcome, bus), time.perf_counter() - t0
+
+
+def case_row(unit: str, info: pd.Series, metrics: dict | None, base: dict, wall_s: float) -> dict:
+    """Fila del ranking: la contingencia, su corte y su impacto frente al caso base."""
+    bus = info["bus"]
+    row = {
+        "unidad": unit,
+        "sistema": bus,
+        "tecnología": info["carrier"],
+        "p_nom (MW)": float(info["p_nom"]),
+        "ok": metrics is not None,
+        "wall_s": round(wall_s, 3),
+    }
+    if metrics is not None:
+        row["iteraciones"] = metrics["iteraciones"]
+        price = f"Precio med. {bus} ($/MWh)"
+        row.update({
+            ENS: metrics[ENS],
+            "Δ ENS (MWh)": metrics[ENS] - base[ENS],
+            "Horas con corte": metrics["Horas con corte"],
+            "Δ costo ($M)": metrics[COST] - base[COST],
+            "Δ precio sistema ($/MWh)": metrics[price] - base[price],
+            "Precio máx. sistema ($/MWh)": metrics["Precio máx. sistema ($/MWh)"],
+        })
+    return row
+
+
+def rank(rows: list[dict]) -> pd.DataFrame:
+    """
+    Ordena por corte adicional y, a igual corte, por impacto en el precio del
+    sistema y en el costo; los empates quedan por nombre de unidad (el orden
+    no depende de qué proceso terminó primero).
+    """
+    frame = pd.DataFrame(rows)
+    if frame.empty:
+        return frame
+    keys = [c for c in ("Δ ENS (MWh)", "Δ precio sistema ($/MWh)", "Δ costo ($M)") if c in frame]
+    return frame.sort_values(
+        keys + ["unidad"], ascending=[False] * len(keys) + [True], na_position="last",
+    ).reset_index(drop=True)
+
+
+# ── Ejecución ─────────────────────────────────────────────────────────────────
+# Cada proceso del pool arma su modelo con el inicializador de lib/outage_mc.py
+def _case_in_worker(gen_names: pd.Index, unit: str, bus: str, warmstart: str | None):
+    return solve_case(outage_mc._WORKER_MODEL, gen_names, unit, bus, warmstart)
+
+
+def screen_contingencies(
+    load_data: Callable[[], DispatchData],
+    recipe: dict,
+    k: int = TOP_K,
+    systems: Iterable[str] = SISTEMAS,
+    workers: int = 1,
+    solver_options: dict | None = None,
+    warm_start: bool = True,
+    on_case: Callable[[dict], None] | None = None,
+    model_factory: Callable[..., OutageModel] = OutageModel,
+) -> tuple[dict, pd.DataFrame]:
+    """
+    Resuelve el caso base y las N-1 de las `k` unidades más grandes de cada
+    sistema → (métricas del caso base, ranking).
+
+    - load_data: como en outage_mc.run_monte_carlo
+    - warm_start: cada caso parte de la base óptima del caso base; con False
+      cada caso se resuelve en frío, con presolve (ver el docstring del módulo)
+    - on_case(fila): se llama al terminar cada caso, en el orden en que terminan
+    """
+    data = load_data()
+    model = model_factory(data, recipe, solver_options)
+    units = major_units(model.gen_table, k, systems)
+    gen_names = model.gen_names
+
+    with tempfile.TemporaryDirectory(prefix="n1_") as tmp:
+        basis = Path(tmp) / "base.bas"
+        t0 = time.perf_counter()
+        base = model.solve(np.ones(len(gen_names), dtype=bool), **({"basis_fn": str(basis)} if warm_start else {}))
+        if base is None:
+            raise RuntimeError("El caso base no llegó al óptimo; no hay contra qué comparar.")
+        base_row = {**sample_row(base), "wall_s": round(time.perf_counter() - t0, 3), "iteraciones": base.iterations}
+        # Sin archivo de base (solver que no la escribe) cada caso arranca en frío
+        warmstart = str(basis) if warm_start and basis.exists() else None
+
+        rows = []
+        for unit, info, (metrics, wall) in _run_cases(
+            model, load_data, recipe, model_factory, solver_options, units, gen_names, warmstart, workers,
+        ):
+            row = case_row(unit, info, metrics, base_row, wall)
+            rows.append(row)
+            if on_case is not None:
+                on_case(row)
+    return base_row, rank(rows)
+
+
+def _run_cases(model, load_data, recipe, model_factory, solver_options, units, gen_names, warmstart, workers) -> Iterator:
+    if workers <= 1:
+        for unit, info in units.iterrows():
+            yield unit, info, solve_case(model, gen_names, unit, info["bus"], warmstart)
+        return
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=outage_mc._init_worker,
+        initargs=(load_data, recipe, model_factory, solver_options),
+    ) as pool:
+        futures = {
+            pool.submit(_case_in_worker, gen_names, unit, info["bus"], warmstart): (unit, info)
+            for unit, info in units.iterrows()
+        }
+        for fut in as_completed(futures):
+            unit, info = futures[fut]
+            yield unit, info, fut.result()
@@ -0,0 +1,75 @@
+"""
+Estimados de demanda para días sin datos oficiales: promedio del mismo día
+de la semana × hora × sistema sobre el historial de balance.
+
+El perfil (weekday × zona × hora) se calcula una sola vez, opcionalmente
+sobre una ventana móvil de los últimos N días del historial, y se difunde a
+todas las fechas faltantes con un solo merge.
+"""
+from __future__ import annotations
+
+from datetime import date
+
+import pandas as pd
+
+
+def build_profile(history: pd.DataFrame, window_days: int | None = None) -> pd.DataFrame:
+    """
+    Tabla de perfiles weekday × zona × hora con la demanda media.
+    - window_days: usar solo los últimos N días del historial (None = todo)
+    Las combinaciones sin historial toman el promedio de toda la ventana
+    (zona × hora).
+    """
+    hist = history
+    if window_days:
+        cutoff = hist["snapshot"].max().normalize() - pd.Timedelta(days=window_days - 1)
+        hist = hist[hist["snapshot"] >= cutoff]
+
+    hist = hist.assign(
+        weekday=hist["snapshot"].dt.weekday,  # 0=lunes … 6=domingo
+        hora=hist["snapshot"].dt.hour,
+    )
+    by_weekday = hist.groupby(["weekday", "zona", "hora"])["demand_mw"].mean()
+    overall = hist.groupby(["zona", "hora"])["demand_mw"].mean()
+
+    # Índice completo 7 días × (zona, hora) observados; huecos → promedio global
+    full_idx = pd.MultiIndex.from_tuples(
+        [(wd, zona, hora) for wd in range(7) for zona, hora in overall.index],
+        names=["weekday", "zona", "hora"],
+    )
+    profile = by_weekday.reindex(full_idx)
+    fallback = overall.reindex(full_idx.droplevel("weekday")).to_numpy()
+    profile = profile.where(profile.notna(), fallback)
+
+    return profile.dropna().rename("demand_mw").reset_index()
+
+
+def estimate_days(
+    targets: list[date],
+    history: pd.DataFrame,
+    window_days: int | None = None,
+) -> pd.DataFrame:
+    """
+    Estima todas las fechas `targets` de una vez: el perfil se calcula una
+    sola vez y se difunde (merge por weekday) a todas las fechas faltantes.
+    """
+    if not targets:
+        return pd.DataFrame(columns=["snapshot", "zona", "demand_mw"])
+    profile = build_profile(history, window_days=window_days)
+
+    days = pd.DatetimeIndex(pd.to_datetime(targets))
+    frame = pd.DataFrame({"op_date": days, "weekday": days.weekday})
+    out = frame.merge(profile, on="weekday", how="inner")
+    out["snapshot"] = out["op_date"] + pd.to_timedelta(out["hora"], unit="h")
+    out["demand_mw"] = out["demand_mw"].round(2)
+    return (
+        out[["snapshot", "zona", "demand_mw"]]
+        .sort_values(["snapshot", "zona"])
+        .reset_index(drop=True)
+    )
+
+
+def estimate_day(target: date, history: pd.DataFrame, window_days: int | None = None) -> pd.DataFrame:
+    """Promedia horas del mismo día de la semana del historial (una sola fecha)."""
+    df = estimate_days([target], history, window_days=window_days)
+    return df.sort_values(["zona", "snapshot"]).reset_index(drop=True)
@@ -0,0 +1,317 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+from datetime import date
+from pathlib import Path
+
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parents[2]
+STORE_DIR = ROOT / "data_clean" / "demand" / "store"
+MANIFEST_PATH = STORE_DIR / "_ingested.json"
+BALANCE_DIR = ROOT / "data_raw" / "demand" / "balance_2026"
+DAILY_API_DIR = ROOT / "data_raw" / "demand" / "daily_api"   # CSVs heredados (congelado)
+AUDIT_DIR = ROOT / "data_raw" / "demand" / "audit"           # copias opcionales {source}_{fecha}.csv
+
+# Prioridad de fuentes: una fila de mayor prioridad reemplaza a una de menor.
+# A igual prioridad gana la ingerida más recientemente.
+SOURCE_PRIORITY: dict[str, int] = {"estimate": 0, "api": 1, "balance": 2}
+
+COLUMNS = ["snapshot", "zona", "demand_mw", "source", "ingested_at"]
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Partición mensual: store/YYYY/YYYY-MM.parquet
+# ──────────────────────────────────────────────────────────────────────────────
+def _partition_path(period: pd.Period) -> Path:
+    return STORE_DIR / f"{period.year:04d}" / f"{period.year:04d}-{period.month:02d}.parquet"
+
+
+def _tmp_path(path: Path) -> Path:
+    """Temporal por proceso: dos escritores nunca comparten el archivo a medio escribir."""
+    return path.with_name(f"{path.name}.{os.getpid()}.tmp")
+
+
+def _partitions(start: date | None = None, end: date | None = None) -> list[Path]:
+    files = sorted(STORE_DIR.glob("[0-9][0-9][0-9][0-9]/*.parquet"))
+    if start is None and end is None:
+        return files
+    lo = pd.Period(start, freq="M") if start is not None else None
+    hi = pd.Period(end, freq="M") if end is not None else None
+    keep = []
+    for f in files:
+        p = pd.Period(f.stem, freq="M")
+        if (lo is None or p >= lo) and (hi is None or p <= hi):
+            keep.append(f)
+    return keep
+
+
+def _resolve(df: pd.DataFrame) -> pd.DataFrame:
+    """Una fila por (snapshot, zona): mayor prioridad de fuente, luego la más reciente."""
+    prio = df["source"].map(SOURCE_PRIORITY).fillna(-1)
+    return (
+        df.assign(_prio=prio)
+        .sort_values(["_prio", "ingested_at"], kind="stable")
+        .drop_duplicates(subset=["snapshot", "zona"], keep="last")
+        .drop(columns="_prio")
+        .sort_values(["snapshot", "zona"])
+        .reset_index(drop=True)
+    )
+
+
+def upsert(df: pd.DataFrame, source: str) -> int:
+    """
+    Inserta/actualiza filas (snapshot, zona, demand_mw) etiquetadas con `source`.
+    Solo se reescriben las particiones mensuales tocadas. Devuelve filas recibidas.
+    """
+    if source not in SOURCE_PRIORITY:
+        raise ValueError(f"Fuente desconocida: {source!r} (usa {list(SOURCE_PRIORITY)})")
+    if df.empty:
+        return 0
+
+    new = df[["snapshot", "zona", "demand_mw"]].copy()
+    new["snapshot"] = pd.to_datetime(new["snapshot"])
+    new["zona"] = new["zona"].astype(str).str.strip().str.upper().replace({"BSA": "BCA"})
+    new["demand_mw"] = pd.to_numeric(new["demand_mw"], errors="coerce")
+    new = new.dropna(subset=["snapshot", "demand_mw"])
+    new["source"] = source
+    new["ingested_at"] = pd.Timestamp.now()
+
+    for period, chunk in new.groupby(new["snapshot"].dt.to_period("M")):
+        path = _partition_path(period)
+        if path.exists():
+            chunk = pd.concat([pd.read_parquet(path), chunk], ignore_index=True)
+        merged = _resolve(chunk)[COLUMNS]
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = _tmp_path(path)
+        merged.to_parquet(tmp, index=False)
+        os.replace(tmp, path)
+    return len(new)
+
+
+def load(
+    start: date | None = None,
+    end: date | None = None,
+    sources: list[str] | None = None,
+) -> pd.DataFrame:
+    """Demanda consolidada (snapshot, zona, demand_mw, source) en [start, end]."""
+    files = _partitions(start, end)
+    if not files:
+        return pd.DataFrame(columns=["snapshot", "zona", "demand_mw", "source"])
+    df = pd.concat([pd.read_parquet(f, columns=COLUMNS[:4]) for f in files], ignore_index=True)
+    if start is not None:
+        df = df[df["snapshot"] >= pd.Timestamp(start)]
+    if end is not None:
+        df = df[df["snapshot"] < pd.Timestamp(end) + pd.Timedelta(days=1)]
+    if sources is not None:
+        df = df[df["source"].isin(sources)]
+    return df.sort_values(["snapshot", "zona"]).reset_index(drop=True)
+
+
+def version() -> str:
+    """
+    Huella del store (nombre, tamaño y mtime de cada partición): cambia con
+    cada upsert. Sirve de clave para cachés de lecturas.
+    """
+    h = hashlib.sha1()
+    for f in _partitions():
+        st = f.stat()
+        h.update(f"{f.relative_to(STORE_DIR)}:{st.st_size}:{st.st_mtime_ns};".encode())
+    return h.hexdigest()[:16]
+
+
+def relabel(df: pd.DataFrame, old: str, new: str) -> int:
+    """
+    Cambia a `new` la fuente de las filas del store etiquetadas `old` que
+    coinciden con `df` en (snapshot, zona, demand_mw). Solo reescribe las
+    particiones tocadas. Devuelve filas reetiquetadas.
+    """
+    if new not in SOURCE_PRIORITY:
+        raise ValueError(f"Fuente desconocida: {new!r} (usa {list(SOURCE_PRIORITY)})")
+    if df.empty:
+        return 0
+    keys = df[["snapshot", "zona", "demand_mw"]].assign(_hit=True)
+    keys["snapshot"] = pd.to_datetime(keys["snapshot"])
+    n = 0
+    for period in keys["snapshot"].dt.to_period("M").unique():
+        path = _partition_path(period)
+        if not path.exists():
+            continue
+        part = pd.read_parquet(path)
+        hit = part.merge(keys, on=["snapshot", "zona", "demand_mw"], how="left")["_hit"].fillna(False).to_numpy(bool)
+        hit &= (part["source"] == old).to_numpy()
+        if not hit.any():
+            continue
+        part.loc[hit, "source"] = new
+        merged = _resolve(part)[COLUMNS]
+        tmp = _tmp_path(path)
+        merged.to_parquet(tmp, index=False)
+        os.replace(tmp, path)
+        n += int(hit.sum())
+    return n
+
+
+def coverage() -> pd.DataFrame:
+    """Por día: horas por zona y mejor fuente presente (index=fecha)."""
+    df = load()
+    if df.empty:
+        return pd.DataFrame(columns=["horas_min", "source"])
+    df["fecha"] = df["snapshot"].dt.date
+    df["_prio"] = df["source"].map(SOURCE_PRIORITY)
+    hours = df.groupby(["fecha", "zona"])["snapshot"].nunique().groupby("fecha").min()
+    best = df.groupby("fecha")["_prio"].max().map({v: k for k, v in SOURCE_PRIORITY.items()})
+    return pd.DataFrame({"horas_min": hours, "source": best})
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Parsers de archivos crudos
+# ──────────────────────────────────────────────────────────────────────────────
+def parse_balance_csv(path: Path) -> pd.DataFrame | None:
+    """CSV oficial 'Demanda Real Balance' → (snapshot, zona, demand_mw), o None."""
+    with open(path, encoding="latin-1") as fh:
+        header_lines = [fh.readline() for _ in range(8)]
+    m = re.search(r"(\d{2}/\d{2}/\d{4})", header_lines[7].strip().strip('"'))
+    if not m:
+        return None
+    op_date = pd.to_datetime(m.group(1), format="%d/%m/%Y")
+    df = pd.read_csv(path, skiprows=8, header=0, encoding="latin-1")
+    df.columns = [c.strip().strip('"').strip() for c in df.columns]
+    col_s, col_h, col_d = "Sistema", "Hora", "Estimacion de Demanda por Balance (MWh)"
+    if not {col_s, col_h, col_d}.issubset(df.columns):
+        return None
+    df = df[[col_s, col_h, col_d]].copy()
+    df.columns = ["zona", "hora", "demand_mw"]
+    df["zona"] = df["zona"].astype(str).str.strip().str.strip('"').str.upper()
+    df["hora"] = pd.to_numeric(df["hora"], errors="coerce")
+    df["demand_mw"] = pd.to_numeric(
+        df["demand_mw"].astype(str).str.strip().str.replace(",", ""), errors="coerce"
+    )
+    df = df.dropna(subset=["hora", "demand_mw"])
+    df["snapshot"] = op_date + pd.to_timedelta(df["hora"].astype(int) - 1, unit="h")
+    df["zona"] = df["zona"].replace({"BSA": "BCA"})
+    # SIN is split into 7 areas in the CSV — sum areas to get system total
+    return df.groupby(["snapshot", "zona"], as_index=False)["demand_mw"].sum()
+
+
+def parse_daily_csv(path: Path) -> pd.DataFrame | None:
+    """CSV de daily_api (snapshot, zona, demand_mw)."""
+    df = pd.read_csv(path, parse_dates=["snapshot"])
+    df["zona"] = df["zona"].astype(str).str.upper()
+    df["demand_mw"] = pd.to_numeric(df["demand_mw"], errors="coerce")
+    return df.dropna(subset=["snapshot", "zona", "demand_mw"])[["snapshot", "zona", "demand_mw"]]
+
+
+def daily_csv_source(df: pd.DataFrame) -> str:
+    """
+    Fuente de un CSV heredado de daily_api. La API de CENACE publica MW
+    enteros; el fill_missing_demand anterior escribía en la misma carpeta
+    promedios redondeados a 2 decimales. Un archivo con algún valor no
+    entero es un estimado.
+    """
+    mw = df["demand_mw"].to_numpy(dtype=float)
+    return "estimate" if (mw != mw.round()).any() else "api"
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Ingesta incremental de carpetas crudas (solo archivos nuevos o modificados)
+# ──────────────────────────────────────────────────────────────────────────────
+def _load_manifest() -> dict[str, int]:
+    if not MANIFEST_PATH.exists():
+        return {}
+    try:
+        return json.loads(MANIFEST_PATH.read_text(encoding="utf-8"))
+    except Exception:
+        return {}
+
+
+def _save_manifest(manifest: dict[str, int]) -> None:
+    MANIFEST_PATH.parent.mkdir(parents=True, exist_ok=True)
+    tmp = _tmp_path(MANIFEST_PATH)
+    tmp.write_text(json.dumps(manifest, indent=1, sort_keys=True), encoding="utf-8")
+    os.replace(tmp, MANIFEST_PATH)
+
+
+def ingest_dir(folder: Path, pattern: str, source, parser, prefix: str | None = None) -> int:
+    """
+    Parsea e inserta los archivos de `folder` que no estén en el manifiesto
+    (o cuyo tamaño cambió). Se usa el tamaño y no el mtime porque un
+    checkout de git reescribe los mtimes. Devuelve archivos ingeridos.
+
+    - source: etiqueta fija, o función df → etiqueta por archivo
+    - prefix: prefijo de las claves del manifiesto (por omisión el nombre
+      de la carpeta); cambiarlo obliga a reingerir la carpeta
+    """
+    if not folder.exists():
+        return 0
+    prefix = prefix or folder.name
+    manifest = _load_manifest()
+    frames: dict[str, list[pd.DataFrame]] = {}
+    done = {}
+    for f in sorted(folder.glob(pattern)):
+        key = f"{prefix}/{f.name}"
+        size = f.stat().st_size
+        if manifest.get(key) == size:
+            continue
+        try:
+            df = parser(f)
+        except Exception:
+            continue
+        if df is not None and not df.empty:
+            frames.setdefault(source(df) if callable(source) else source, []).append(df)
+        done[key] = size
+    for src, dfs in frames.items():
+        upsert(pd.concat(dfs, ignore_index=True), src)
+    if done:
+        manifest.update(done)
+        _save_manifest(manifest)
+    return len(done)
+
+
+# Clave de manifiesto de daily_api/. Antes todos sus CSVs se ingerían como
+# "api" bajo "daily_api/…"; con la clave nueva se reingieren una vez.
+DAILY_API_PREFIX = "daily_api@source"
+
+
+def ingest_daily_api() -> int:
+    """
+    Ingresa los CSVs heredados de daily_api/ con su fuente real
+    (`daily_csv_source`). Los estimados que una ingesta anterior dejó como
+    "api" se reetiquetan, para que `fill_missing_demand --overwrite` y
+    cualquier dato real los puedan reemplazar.
+    """
+    manifest = _load_manifest()
+    if DAILY_API_DIR.exists() and any(k.startswith(f"{DAILY_API_DIR.name}/") for k in manifest):
+        for f in sorted(DAILY_API_DIR.glob("demand_*.csv")):
+            if f"{DAILY_API_PREFIX}/{f.name}" in manifest:
+                continue
+            try:
+                df = parse_daily_csv(f)
+            except Exception:
+                continue
+            if df is not None and not df.empty and daily_csv_source(df) == "estimate":
+                relabel(df, "api", "estimate")
+    return ingest_dir(DAILY_API_DIR, "demand_*.csv", daily_csv_source, parse_daily_csv, prefix=DAILY_API_PREFIX)
+
+
+def ingest_raw_dirs() -> int:
+    """
+    Sincroniza balance_2026/ (balance) y daily_api/ hacia el store. Escribe
+    en el store: se llama explícitamente (scripts, arranque de la página),
+    nunca desde una lectura.
+    daily_api/ ya no recibe archivos nuevos; sus CSVs heredados mezclan
+    snapshots de la API ("api") y estimados ("estimate").
+    """
+    n = ingest_daily_api()
+    n += ingest_dir(BALANCE_DIR, "*.csv", "balance", parse_balance_csv)
+    return n
+
+
+def write_audit_csv(df: pd.DataFrame, source: str, day: date) -> Path:
+    """Copia de auditoría opcional del lote ingerido (no se vuelve a leer)."""
+    AUDIT_DIR.mkdir(parents=True, exist_ok=True)
+    path = AUDIT_DIR / f"{source}_{day.isoformat()}.csv"
+    df.to_csv(path, index=False)
+    return path
@@ -0,0 +1,116 @@
+"""
+Carga de los datos de entrada del despacho, sin Streamlit.
+
+    data = load_dispatch_data()          # catálogo + perfiles + demanda por sistema
+    res  = run_dispatch(data, recipe)    # lib/dispatch_model.py
+
+La página envuelve cada loader en `st.cache_data`; los scripts los llaman
+directamente. Los loaders no escriben: `sync_demand_store()` ingresa los
+archivos crudos nuevos al store y se llama aparte, antes de leer.
+"""
+from __future__ import annotations
+
+from pathlib import Path
+
+import pandas as pd
+
+from . import demand_store
+from .dispatch_model import SISTEMAS, DispatchData
+
+ROOT = Path(__file__).resolve().parents[2]
+CENTRALES_CSV = ROOT / "data_clean" / "generators" / "Centrales_gen_mx.csv"
+PERFIL_CSV    = ROOT / "data_clean" / "generators" / "Perfil_Generaciom.csv"
+
+# Días con menos horas que esto en algún sistema se descartan
+MIN_HOURS_PER_DAY = 20
+
+
+def load_generators(path: Path = CENTRALES_CSV) -> pd.DataFrame:
+    """Catálogo de centrales con el bus normalizado a SIN / BCA / BCS."""
+    df = pd.read_csv(path)
+    df["bus"] = (
+        df["bus"].astype(str).str.strip().str.upper()
+        .replace({"BSA": "BCA", "MUGELE": "BCS", "MUG": "BCS"})
+    )
+    return df[df["bus"].isin(SISTEMAS)].reset_index(drop=True)
+
+
+def load_profiles(path: Path = PERFIL_CSV) -> pd.DataFrame:
+    """Matriz p_max_pu (snapshot × central)."""
+    perfil = pd.read_csv(path)
+    perfil["snapshot"] = pd.to_datetime(perfil["snapshot"])
+    return perfil.set_index("snapshot").sort_index()
+
+
+def sync_demand_store() -> int:
+    """
+    Ingresa al store los archivos crudos nuevos (balance_2026/, daily_api/
+    heredado). Es la única escritura de este módulo: se llama una vez antes
+    de leer (página, proceso padre de los scripts), no desde los loaders.
+    """
+    return demand_store.ingest_raw_dirs()
+
+
+def load_demand_raw() -> pd.DataFrame:
+    """Demanda consolidada del store (snapshot, zona, demand_mw), sin días incompletos."""
+    # Solo lectura: la prioridad balance > api > estimate ya viene resuelta en el
+    # store; los archivos crudos nuevos entran con sync_demand_store().
+    dem = demand_store.load()
+    if dem.empty:
+        raise ValueError(f"No se encontraron datos de demanda en {demand_store.STORE_DIR}")
+    dem = dem[["snapshot", "zona", "demand_mw"]].copy()
+
+    # Descartar días con datos incompletos (< 20 horas en al menos un sistema)
+    # Evita que archivos parciales de la API causen errores en la optimización
+    dem["_date"] = dem["snapshot"].dt.date
+    hours_per_day_zona = dem.groupby(["_date", "zona"])["snapshot"].nunique()
+    bad_dates = hours_per_day_zona[hours_per_day_zona < MIN_HOURS_PER_DAY].index.get_level_values("_date").unique()
+    if len(bad_dates) > 0:
+        dem = dem[~dem["_date"].isin(bad_dates)]
+    return dem.drop(columns=["_date"]).reset_index(drop=True)
+
+
+def demand_by_system(dem_raw: pd.DataFrame) -> pd.DataFrame:
+    """(snapshot, zona, demand_mw) → snapshot × SISTEMAS (MW); sistemas sin datos en 0."""
+    wide = (
+        dem_raw[dem_raw["zona"].isin(SISTEMAS)]
+        .pivot_table(index="snapshot", columns="zona", values="demand_mw", aggfunc="sum")
+        .sort_index()
+    )
+    return wide.reindex(columns=SISTEMAS, fill_value=0.0)
+
+
+def read_demand_parquet(path: Path) -> pd.DataFrame:
+    """Parquet ancho (DatetimeIndex × sistema) → snapshot × SISTEMAS sin zona horaria."""
+    demand = pd.read_parquet(path)
+    if not isinstance(demand.index, pd.DatetimeIndex):
+        raise ValueError("La demanda debe venir con DatetimeIndex.")
+    # PyPSA no acepta índices con zona horaria — eliminar tz manteniendo la hora local
+    if demand.index.tz is not None:
+        demand.index = demand.index.tz_localize(None)
+    demand = demand.reindex(columns=SISTEMAS, fill_value=0.0)
+    # Snapshots incompletos harían fallar al LP
+    demand = demand.dropna()
+    if demand.empty:
+        raise ValueError("La demanda está vacía (todo NaN).")
+    return demand
+
+
+def load_dispatch_data(
+    centrales_csv: Path = CENTRALES_CSV,
+    perfil_csv: Path = PERFIL_CSV,
+    demand: pd.DataFrame | Path | None = None,
+) -> DispatchData:
+    """
+    Datos completos para `run_dispatch`.
+
+    - demand: demanda ya armada (snapshot × sistema) o ruta a un Parquet
+      ancho (`read_demand_parquet`); sin ella se lee el store
+    """
+    if isinstance(demand, (str, Path)):
+        demand = read_demand_parquet(Path(demand))
+    return DispatchData(
+        centrales=load_generators(centrales_csv),
+        p_max_pu_raw=load_profiles(perfil_csv),
+        demand=demand if demand is not None else demand_by_system(load_demand_raw()),
+    )
@@ -1,17 +1,619 @@
 # app/lib/dispatch_model.py
+"""
+Motor de despacho económico (PyPSA + HiGHS) sin dependencias de Streamlit.
+
+El flujo está separado en etapas para poder medir e instrumentar cada una:
+
+    align_profiles → build_network → create_model → solve_model → extract_metrics
+
+`build_and_solve` compone las cuatro primeras. `run_dispatch(data, recipe)`
+es el motor completo que usan la página 2_Despacho_PyPSA.py y los scripts:
+recorta la demanda, resuelve y devuelve un `DispatchResult`
+(lib/dispatch_result.py) con sus resultados derivados; la red resuelta no
+sale de la función; con `window_days` / `time_budget_s` en la receta resuelve
+por ventanas y puede devolver un resultado parcial. Las recetas se arman con
+lib/scenarios.py y los datos con lib/dispatch_data.py. scripts/bench_dispatch.py
+llama a cada etapa por separado.
+"""
+from __future__ import annotations
+
+import time
+from contextlib import nullcontext
+from dataclasses import dataclass
+from typing import Callable
+
+import numpy as np
 import pandas as pd
+import pypsa
+
+from .dispatch_result import DispatchResult
+from .metrics import summary_metrics
+from .perf import PerfRecorder, lp_size, maybe_span
+from .post_solve import PostSolveIndex, derive_results
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Constantes del modelo
+# ──────────────────────────────────────────────────────────────────────────────
+SISTEMAS = ["SIN", "BCA", "BCS"]
+
+VOLL_DEFAULT = 3_000  # $/MWh — Value of Lost Load (carga no servida)
+
+# Default marginal costs ($/MWh) — based on CFE/CENACE reference
+DEFAULT_COSTS: dict[str, float] = {
+    "hydro":         8,
+    "nuclear":       5,
+    "solar":         0,
+    "onwind":        0,
+    "solar_thermal": 3,
+    "geothermal":    10,
+    "biogas":        15,
+    "biomass":       20,
+    "chp":           50,
+    "gas_ccgt":      50,
+    "gas_ocgt":      70,
+    "steam_other":   65,
+    "diesel_engine": 100,
+}
+
+
+def compute_effective_costs(params: dict) -> dict[str, float]:
+    """Apply marginal_cost_multiplier and marginal_cost_adder on top of DEFAULT_COSTS."""
+    costs = {c: float(v) for c, v in DEFAULT_COSTS.items()}
+    for carrier, mult in params.get("marginal_cost_multiplier", {}).items():
+        if carrier in costs:
+            costs[carrier] = round(costs[carrier] * float(mult), 4)
+    for carrier, add in params.get("marginal_cost_adder", {}).items():
+        if carrier in costs:
+            costs[carrier] = round(costs[carrier] + float(add), 4)
+    return costs
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# 2026 expected capacity growth
+# Fuente: PRODESEN 2026-2030 / CFE Plan de Expansión (valores representativos)
+# ──────────────────────────────────────────────────────────────────────────────
+GROWTH_2026: list[tuple[str, str, str, float]] = [
+    # (name,               bus,   carrier,      p_nom MW)
+    # SIN — proyectos adjudicados en subastas 2025/2026
+    ("new_solar_SIN_1",    "SIN", "solar",       1_500.0),
+    ("new_solar_SIN_2",    "SIN", "solar",         500.0),
+    ("new_onwind_SIN",     "SIN", "onwind",        500.0),
+    ("new_gas_ccgt_SIN",   "SIN", "gas_ccgt",      500.0),
+    # BCA — Mexicali y norte de Baja California
+    ("new_solar_BCA",      "BCA", "solar",          300.0),
+    ("new_onwind_BCA",     "BCA", "onwind",         200.0),
+    # BCS — La Paz y Los Cabos
+    ("new_solar_BCS",      "BCS", "solar",          200.0),
+    ("new_gas_ocgt_BCS",   "BCS", "gas_ocgt",       100.0),
+]
+GROWTH_TOTAL_MW = sum(r[3] for r in GROWTH_2026)
+
+# p_min_pu for inflexible technologies (cannot ramp down freely)
+INFLEXIBLE_PMIN: dict[str, float] = {
+    "nuclear":    0.85,
+    "geothermal": 0.80,
+    "chp":        0.40,
+}
+
+# Dispatch category — determines p_max_pu default when no profile is available
+#   vre        → profile mandatory; 0.0 if missing (no sun/wind = no generation)
+#   hydro      → availability factor P_MAX_AVAIL["hydro"] (partial reservoir constraint)
+#   inflexible → rated availability factor P_MAX_AVAIL[carrier] (forced baseload)
+#   thermal    → 1.0 (fully dispatchable on demand)
+DISPATCH_CATEGORY: dict[str, str] = {
+    "solar":         "vre",
+    "onwind":        "vre",
+    "hydro":         "hydro",
+    "nuclear":       "inflexible",
+    "geothermal":    "inflexible",
+    "chp":           "inflexible",
+    "gas_ccgt":      "thermal",
+    "gas_ocgt":      "thermal",
+    "diesel_engine": "thermal",
+    "steam_other":   "thermal",
+    "solar_thermal": "thermal",
+    "biogas":        "thermal",
+    "biomass":       "thermal",
+    "battery":       "thermal",
+}
+
+# Default p_max_pu for categories / carriers without a real-time profile
+P_MAX_AVAIL: dict[str, float] = {
+    "hydro":      0.55,   # seasonal reservoir + run-of-river constraint
+    "nuclear":    0.90,   # planned outage factor
+    "geothermal": 0.90,   # high capacity factor but not 100%
+    "chp":        0.85,   # heat-demand coupling limits full output
+}
+
+# Carrier alias map: scenario-facing names → internal carrier keys
+CARRIER_ALIAS: dict[str, str] = {
+    "wind":   "onwind",
+    "diesel": "diesel_engine",
+}
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Etapa 1 — alinear perfiles al año de la demanda
+# ──────────────────────────────────────────────────────────────────────────────
+def align_profiles(p_max_pu_raw: pd.DataFrame, snapshots: pd.DatetimeIndex) -> pd.DataFrame:
+    """Reindexa el perfil (año 2025) al año de la demanda (2026)."""
+    if p_max_pu_raw.empty:
+        return p_max_pu_raw
+    profile_year = p_max_pu_raw.index.year[0]
+    demand_year  = snapshots.year[0]
+    if profile_year == demand_year:
+        return p_max_pu_raw
+
+    def safe_replace_year(ts, new_year):
+        try:
+            return ts.replace(year=new_year)
+        except ValueError:
+            # Manejo de años bisiestos (29 feb -> 28 feb en año no bisiesto)
+            return ts.replace(year=new_year, day=28)
+
+    p_max_pu_aligned = p_max_pu_raw.copy()
+    # Usar map con función segura para evitar crash en 29 de febrero
+    p_max_pu_aligned.index = p_max_pu_raw.index.map(lambda ts: safe_replace_year(ts, demand_year))
+    return p_max_pu_aligned
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Etapa 2 — construir la red PyPSA (sin optimizar)
+# ──────────────────────────────────────────────────────────────────────────────
+def adjust_capacity(gens: pd.DataFrame, capacity_mult: dict | None = None, forced_outage: dict | None = None) -> None:
+    """Escala en su lugar el p_nom de `gens` (bus, carrier, p_nom) por capacity_mult y forced_outage."""
+    # Capacity multipliers — scale p_nom of specific carriers per bus
+    if capacity_mult:
+        for bus, carrier_mults in capacity_mult.items():
+            for carrier_alias, mult in carrier_mults.items():
+                carrier = CARRIER_ALIAS.get(carrier_alias, carrier_alias)
+                mask = (gens["bus"] == bus) & (gens["carrier"] == carrier)
+                gens.loc[mask, "p_nom"] *= float(mult)
+
+    # Forced outage — derate a specific technology in a specific system
+    fo = forced_outage or {}
+    if fo.get("enabled", False):
+        fo_bus     = fo.get("system", "")
+        fo_alias   = fo.get("technology", "")
+        fo_carrier = CARRIER_ALIAS.get(fo_alias, fo_alias)
+        fo_loss    = float(fo.get("capacity_loss_fraction", 0.0))
+        if fo_bus and fo_carrier and 0.0 < fo_loss <= 1.0:
+            mask = (gens["bus"] == fo_bus) & (gens["carrier"] == fo_carrier)
+            gens.loc[mask, "p_nom"] *= (1.0 - fo_loss)
+
+
+def build_network(
+    centrales: pd.DataFrame,
+    p_max_pu_aligned: pd.DataFrame,
+    dem_z: pd.DataFrame,
+    costs: dict[str, float],
+    use_growth: bool,
+    voll: float,
+    demand_mult: dict[str, float] | None = None,
+    capacity_mult: dict | None = None,
+    forced_outage: dict | None = None,
+    battery_config: dict | None = None,
+) -> pypsa.Network:
+    n = pypsa.Network()
+    snapshots = dem_z.index
+    n.set_snapshots(snapshots)
+
+    # Three isolated buses (no links)
+    for s in SISTEMAS:
+        n.add("Bus", s)
+
+    # Generators from CSV — apply slider marginal costs by carrier
+    for _, row in centrales.iterrows():
+        carrier = str(row["carrier"])
+        mc      = costs.get(carrier, float(row["marginal_cost"]))
+        pmin    = INFLEXIBLE_PMIN.get(carrier, 0.0)
+        n.add(
+            "Generator",
+            name=str(row["name"]),
+            bus=str(row["bus"]),
+            carrier=carrier,
+            p_nom=float(row["p_nom"]),
+            marginal_cost=float(mc),
+            efficiency=float(row.get("efficiency", 1.0)),
+            p_min_pu=float(pmin),
+        )
+
+    # 2026 expected growth generators
+    if use_growth:
+        for gname, gbus, gcarrier, gpnom in GROWTH_2026:
+            mc = costs.get(gcarrier, DEFAULT_COSTS.get(gcarrier, 0))
+            n.add(
+                "Generator",
+                name=gname, bus=gbus, carrier=gcarrier,
+                p_nom=float(gpnom), marginal_cost=float(mc),
+            )
+
+    # VoLL shedding generators (one per bus — model load shedding)
+    for s in SISTEMAS:
+        n.add(
+            "Generator",
+            name=f"VoLL_{s}", bus=s, carrier="shedding",
+            p_nom=1e6, marginal_cost=float(voll),
+        )
+
+    # Capacity multipliers and forced outage — scale p_nom per bus × carrier
+    adjust_capacity(n.generators, capacity_mult, forced_outage)
+
+    # Battery storage units (StorageUnit per bus)
+    bc = battery_config or {}
+    if bc.get("battery_enable", False):
+        eff_store    = float(bc.get("battery_efficiency_store", 0.95))
+        eff_dispatch = float(bc.get("battery_efficiency_dispatch", 0.95))
+        init_soc_frac = float(bc.get("battery_initial_soc", 0.5))
+        cyclic_soc   = bool(bc.get("battery_cyclic_state_of_charge", True))
+        power_mw     = bc.get("battery_power_mw", {})
+        energy_mwh   = bc.get("battery_energy_mwh", {})
+        for s in SISTEMAS:
+            p_nom_bat = float(power_mw.get(s, 0))
+            e_mwh_bat = float(energy_mwh.get(s, 0))
+            if p_nom_bat > 0 and e_mwh_bat > 0:
+                max_hours = e_mwh_bat / p_nom_bat
+                n.add(
+                    "StorageUnit",
+                    name=f"battery_{s}",
+                    bus=s,
+                    carrier="battery",
+                    p_nom=p_nom_bat,
+                    max_hours=max_hours,
+                    efficiency_store=eff_store,
+                    efficiency_dispatch=eff_dispatch,
+                    state_of_charge_initial=init_soc_frac * p_nom_bat * max_hours,
+                    cyclic_state_of_charge=cyclic_soc,
+                )
+
+    # ── p_max_pu: 4-category dispatch logic ──────────────────────────────────
+    # Category    | Source             | Missing-data default
+    # ------------|--------------------|-----------------------------------------
+    # vre         | Perfil CSV (real)  | 0.0  (no resource = no generation)
+    # hydro       | Perfil CSV + cap   | P_MAX_AVAIL["hydro"] (reservoir factor)
+    # inflexible  | Perfil CSV + cap   | P_MAX_AVAIL[carrier] (rated availability)
+    # thermal     | Perfil CSV or 1.0  | 1.0  (fully dispatchable)
+    all_gens        = n.generators.index.tolist()
+    carrier_map_all = n.generators["carrier"]
+    profile_gens    = [g for g in all_gens if g in p_max_pu_aligned.columns]
+
+    if profile_gens:
+        p_raw = p_max_pu_aligned[profile_gens].reindex(index=snapshots)
+        if p_raw.isna().all().all() and not p_max_pu_aligned.empty:
+            raise ValueError(
+                "Error de alineación de tiempo: Los índices de fecha del perfil de generadores y la demanda no coinciden. "
+                "Verifica si uno tiene Timezone y el otro no."
+            )
+        # Per-column fill based on dispatch category
+        for g in profile_gens:
+            if p_raw[g].isna().any():
+                cat = DISPATCH_CATEGORY.get(carrier_map_all[g], "thermal")
+                if cat == "vre":
+                    p_raw[g] = p_raw[g].fillna(0.0)
+                elif cat in ("hydro", "inflexible"):
+                    p_raw[g] = p_raw[g].fillna(P_MAX_AVAIL.get(carrier_map_all[g], 1.0))
+                else:  # thermal
+                    p_raw[g] = p_raw[g].fillna(1.0)
+        p_raw = p_raw.clip(0.0, 1.0)
+    else:
+        p_raw = pd.DataFrame(index=snapshots)
+
+    # Expand to ALL generators — those absent from Perfil CSV get category defaults
+    p_max_pu_full = p_raw.reindex(columns=all_gens)
+    for g in all_gens:
+        if p_max_pu_full[g].isna().all():
+            cat = DISPATCH_CATEGORY.get(carrier_map_all[g], "thermal")
+            if cat == "vre":
+                p_max_pu_full[g] = 0.0
+            elif cat in ("hydro", "inflexible"):
+                p_max_pu_full[g] = P_MAX_AVAIL.get(carrier_map_all[g], 1.0)
+            else:
+                p_max_pu_full[g] = 1.0
+    n.generators_t.p_max_pu = p_max_pu_full.clip(0.0, 1.0)
+
+    # Enforce availability caps for hydro and inflexibles (even if profile exists)
+    for carrier, cap in P_MAX_AVAIL.items():
+        capped_gens = n.generators.index[n.generators["carrier"] == carrier]
+        if not capped_gens.empty:
+            n.generators_t.p_max_pu.loc[:, capped_gens] = (
+                n.generators_t.p_max_pu.loc[:, capped_gens].clip(upper=cap)
+            )
+
+    # Loads
+    for s in SISTEMAS:
+        if s in dem_z.columns:
+            mult = demand_mult.get(s, 1.0) if demand_mult else 1.0
+            n.add("Load", f"load_{s}", bus=s, p_set=dem_z[s] * mult)
+
+    return n
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Etapas 3 y 4 — modelo linopy y solución con HiGHS
+# ──────────────────────────────────────────────────────────────────────────────
+def create_model(n: pypsa.Network):
+    """Construye el LP de linopy (n.model) sin resolverlo."""
+    return n.optimize.create_model(include_objective_constant=False)
+
+
+def solve_model(n: pypsa.Network, assign_all_duals: bool = True, **solver_options) -> tuple[str, str]:
+    """
+    Resuelve n.model con HiGHS y escribe solución y duales en la red.
+
+    Con assign_all_duals también quedan los duales de las cotas de despacho
+    (n.generators_t.mu_upper / mu_lower), que usa lib/marginal_unit.py.
+    """
+    return n.optimize.solve_model(solver_name="highs", assign_all_duals=assign_all_duals, **solver_options)
+
+
+def build_and_solve(
+    centrales: pd.DataFrame,
+    p_max_pu_raw: pd.DataFrame,
+    dem_z: pd.DataFrame,
+    costs: dict[str, float],
+    use_growth: bool,
+    voll: float,
+    demand_mult: dict[str, float] | None = None,
+    capacity_mult: dict | None = None,
+    forced_outage: dict | None = None,
+    battery_config: dict | None = None,
+    perf: PerfRecorder | None = None,
+    solver_options: dict | None = None,
+    deadline: float | None = None,
+    should_stop: Callable[[], bool] | None = None,
+) -> pypsa.Network:
+    """
+    Compone las etapas; con `perf` registra un span por etapa y el tamaño del LP.
+
+    - solver_options: opciones de HiGHS; el estado queda en n.model.status /
+      n.model.termination_condition
+    - deadline: instante (time.perf_counter) en que se acaba el tiempo; HiGHS
+      recibe como time_limit lo que queda ya armado el modelo
+    - should_stop: se consulta ya armado el modelo, justo antes de HiGHS
+    Si al llegar a HiGHS hay que parar, levanta SolveInterrupted sin resolver.
+    """
+    with maybe_span(perf, "perfiles"):
+        p_max_pu_aligned = align_profiles(p_max_pu_raw, dem_z.index)
+    with maybe_span(perf, "red PyPSA"):
+        n = build_network(
+            centrales, p_max_pu_aligned, dem_z, costs, use_growth, voll,
+            demand_mult=demand_mult,
+            capacity_mult=capacity_mult,
+            forced_outage=forced_outage,
+            battery_config=battery_config,
+        )
+    with maybe_span(perf, "modelo linopy") as sp:
+        create_model(n)
+        if sp is not None:
+            sp.record(**lp_size(n.model))
+    # Armar red y modelo puede tomar varios segundos: el tiempo restante se mide aquí
+    solver_options = dict(solver_options or {})
+    if should_stop is not None and should_stop():
+        raise SolveInterrupted(STOP_CANCELLED)
+    if deadline is not None:
+        left = deadline - time.perf_counter()
+        if left <= 0:
+            raise SolveInterrupted(STOP_BUDGET)
+        solver_options["time_limit"] = left
+    with maybe_span(perf, "HiGHS") as sp:
+        status, condition = solve_model(n, **solver_options)
+        if sp is not None:
+            sp.record(status=status, condition=condition)
+    return n
+
+
+@dataclass
+class DispatchData:
+    """Entradas del motor: catálogo de centrales, perfiles p_max_pu y demanda por sistema."""
+    centrales: pd.DataFrame      # esquema de Centrales_gen_mx.csv
+    p_max_pu_raw: pd.DataFrame   # snapshot × central (año del perfil)
+    demand: pd.DataFrame         # snapshot × SISTEMAS (MW)
+
+
+# Motivos por los que un solve por ventanas se detiene antes de terminar
+STOP_CANCELLED = "cancelado"
+STOP_BUDGET = "presupuesto de tiempo"
+
+
+class SolveInterrupted(RuntimeError):
+    """
+    El solve se detuvo (cancelación o presupuesto) sin ninguna ventana
+    resuelta; build_and_solve la usa también para una ventana que no llega
+    a HiGHS (run_dispatch la atrapa).
+    """
+
+    def __init__(self, reason: str) -> None:
+        super().__init__(f"Solve detenido ({reason}) antes de resolver alguna ventana")
+        self.reason = reason
+
+
+def slice_demand(demand: pd.DataFrame, start=None, end=None) -> pd.DataFrame:
+    """Filas de `demand` entre los días start y end (inclusive; None = sin límite)."""
+    days = demand.index.date
+    if start is not None:
+        demand = demand.loc[days >= start]
+        days = demand.index.date
+    if end is not None:
+        demand = demand.loc[days <= end]
+    if demand.empty:
+        raise ValueError(f"No hay demanda entre {start} y {end}.")
+    return demand
+
+
+def demand_windows(demand: pd.DataFrame, window_days: int | None = None) -> list[pd.DataFrame]:
+    """Parte la demanda en ventanas de `window_days` días consecutivos (None = una sola)."""
+    if not window_days:
+        return [demand]
+    days = pd.Index(demand.index.date)
+    uniq = days.unique()
+    return [
+        demand.loc[days.isin(uniq[i:i + int(window_days)])]
+        for i in range(0, len(uniq), int(window_days))
+    ]
+
+
+def recipe_network(data: DispatchData, recipe: dict, dem: pd.DataFrame | None = None) -> pypsa.Network:
+    """
+    Red PyPSA (sin modelo) de una receta sobre `dem` (default: la demanda de
+    la receta recortada a start / end); para quien arma el modelo una vez y
+    lo resuelve muchas veces (lib/outage_mc.py, lib/parametric.py).
+    """
+    if dem is None:
+        dem = slice_demand(data.demand, recipe.get("start"), recipe.get("end"))
+    return build_network(
+        data.centrales.copy(),
+        align_profiles(data.p_max_pu_raw, dem.index),
+        dem,
+        recipe["costs"],
+        recipe["growth"],
+        recipe["voll"],
+        demand_mult=recipe.get("demand_mult"),
+        capacity_mult=recipe.get("capacity_mult"),
+        forced_outage=recipe.get("forced_outage"),
+        battery_config=recipe.get("battery_config"),
+    )
+
+
+def recipe_generators(data: DispatchData, recipe: dict) -> pd.DataFrame:
+    """
+    Generadores de `recipe_network` (nombre → bus, carrier, p_nom, en el mismo
+    orden) leídos del catálogo, sin armar la red.
+    """
+    c = data.centrales
+    parts = [pd.DataFrame({
+        "name": c["name"].astype(str), "bus": c["bus"].astype(str),
+        "carrier": c["carrier"].astype(str), "p_nom": c["p_nom"].astype(float),
+    })]
+    if recipe["growth"]:
+        parts.append(pd.DataFrame(GROWTH_2026, columns=["name", "bus", "carrier", "p_nom"]))
+    parts.append(pd.DataFrame({"name": [f"VoLL_{s}" for s in SISTEMAS], "bus": SISTEMAS,
+                               "carrier": "shedding", "p_nom": 1e6}))
+    gens = pd.concat(parts, ignore_index=True).astype({"p_nom": float}).set_index("name")
+    adjust_capacity(gens, recipe.get("capacity_mult"), recipe.get("forced_outage"))
+    return gens
+
 
 def run_dispatch(
-    demand: pd.Series,
-    techs: pd.DataFrame,
-) -> dict:
-    """
-    Placeholder: aquí iremos armando PyPSA.
-    demand: serie de MW por hora (index 1..24 o timestamps)
-    techs: tabla de tecnologías (nombre, bus, p_nom, marginal_cost, etc.)
-    """
-    return {
-        "status": "todo",
-        "objective": None,
-        "dispatch": None,
-    }
\ No newline at end of file
+    data: DispatchData,
+    recipe: dict,
+    perf: PerfRecorder | None = None,
+    progress: Callable[[int, int], None] | None = None,
+    should_stop: Callable[[], bool] | None = None,
+) -> DispatchResult:
+    """
+    Resuelve una receta (lib/scenarios.make_recipe) y devuelve el resultado compacto.
+
+    Claves de `recipe`: start / end (días de demanda, None = todo), costs,
+    growth, voll, demand_mult, capacity_mult, forced_outage, battery_config
+    y scenario (viaja en `meta`). Claves opcionales de ejecución:
+
+    - window_days: resuelve ventanas consecutivas de N días, una tras otra (el
+      SOC cíclico de las baterías cierra en cada ventana); `progress(hechas,
+      total)` se llama al terminar cada una
+    - time_budget_s: tiempo máximo del solve, contado desde que empieza esta
+      función; HiGHS recibe lo que queda (ya armado el modelo) como
+      time_limit. Una ventana que no termina a tiempo se descarta
+
+    `should_stop()` se consulta antes de armar cada ventana y otra vez antes
+    de entregarla a HiGHS; un HiGHS ya en marcha no se interrumpe, así que
+    sin ventanas la cancelación solo surte efecto antes del solve.
+
+    Si se detiene antes del final devuelve las ventanas ya resueltas, con
+    meta["partial"] = {reason, windows_done, windows_total, solved_until};
+    sin ninguna resuelta levanta SolveInterrupted.
+    """
+
+    dem = slice_demand(data.demand, recipe.get("start"), recipe.get("end"))
+    windows = demand_windows(dem, recipe.get("window_days"))
+    budget = recipe.get("time_budget_s")
+    meta = {"scenario": recipe.get("scenario")}
+    deadline = time.perf_counter() + budget if budget else None
+
+    parts: list[DispatchResult] = []
+    stop: str | None = None
+    for k, dem_w in enumerate(windows):
+        if should_stop is not None and should_stop():
+            stop = STOP_CANCELLED
+            break
+        if deadline is not None and time.perf_counter() >= deadline:
+            stop = STOP_BUDGET
+            break
+        window_span = (
+            maybe_span(perf, f"ventana {k + 1}/{len(windows)}", snapshots=len(dem_w))
+            if len(windows) > 1 else nullcontext()
+        )
+        with window_span:
+            try:
+                n = build_and_solve(
+                    data.centrales.copy(),
+                    data.p_max_pu_raw,
+                    dem_w,
+                    recipe["costs"],
+                    recipe["growth"],
+                    recipe["voll"],
+                    demand_mult=recipe.get("demand_mult"),
+                    capacity_mult=recipe.get("capacity_mult"),
+                    forced_outage=recipe.get("forced_outage"),
+                    battery_config=recipe.get("battery_config"),
+                    perf=perf,
+                    deadline=deadline,
+                    should_stop=should_stop,
+                )
+            except SolveInterrupted as e:
+                stop = e.reason
+                break
+            # Sin tiempo, HiGHS no deja solución asignada: la ventana no cuenta
+            if getattr(n.model, "termination_condition", None) == "time_limit":
+                stop = STOP_BUDGET
+                break
+            # La red completa no sobrevive a esta función
+            with maybe_span(perf, "resultado compacto"):
+                parts.append(DispatchResult.from_network(n, demand=dem_w, meta=meta))
+            del n
+        if progress is not None:
+            progress(k + 1, len(windows))
+
+    if not parts:
+        raise SolveInterrupted(stop or STOP_CANCELLED)
+    res = parts[0] if len(parts) == 1 else DispatchResult.concat(parts)
+    if len(windows) > 1:
+        res.meta["windows"] = len(windows)
+    if len(parts) < len(windows):
+        res.meta["partial"] = {
+            "reason": stop,
+            "windows_done": len(parts),
+            "windows_total": len(windows),
+            "solved_until": str(res.index[-1]),
+        }
+    # KPIs, series por tecnología y curvas de duración: una vez por solve, viajan con el resultado
+    with maybe_span(perf, "resultados derivados"):
+        return derive_results(res, voll=recipe["voll"])
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Etapa 5 — métricas resumen
+# ──────────────────────────────────────────────────────────────────────────────
+def extract_metrics(n: pypsa.Network | DispatchResult) -> dict:
+    """
+    Return a flat dict of summary metrics for one solved network (or its DispatchResult).
+
+    A DispatchResult that already went through post_solve.derive_results
+    returns its stored metrics without touching the dispatch arrays.
+    """
+    res = n if isinstance(n, DispatchResult) else DispatchResult.from_network(n)
+    if "kpis" in res.meta:
+        return dict(res.meta["kpis"]["metrics"])
+    idx = PostSolveIndex.from_result(res)
+    gen_mwh = idx.energy(res)
+    served = ~idx.is_voll
+
+    return summary_metrics(
+        objective=res.objective,
+        generation_mwh=float(gen_mwh[served].sum()),
+        shedding_mwh=float(gen_mwh[idx.is_voll].sum()),
+        co2_t=float(gen_mwh[served] @ idx.co2_factor[served]),
+        renewable_mwh=float(gen_mwh[served & idx.is_renewable].sum()),
+        # Curtailment (VRE only)
+        curtailment_mwh=float(idx.curtailment(res, idx.vre_positions()).sum(dtype=np.float64)),
+        avg_price=float(res.price.mean(dtype=np.float64)) if res.price.size else 0.0,
+    )
@@ -0,0 +1,347 @@
+"""
+Resultado compacto de un despacho resuelto.
+
+`DispatchResult.from_network(n)` copia de la red PyPSA solo lo que leen los
+paneles de resultados (despacho, precios sombra, batería, metadatos de
+generadores, objetivo) como arreglos NumPy float32, y se descarta la red:
+sin tablas estáticas, sin el modelo linopy y sin la matriz completa de
+disponibilidad. De `p_max_pu` solo se guardan las columnas que varían en el
+tiempo (en la práctica las renovables variables); las constantes quedan como
+un escalar por generador y `p_max_pu()` las reconstruye sin pérdida.
+
+Los accesores (`dispatch()`, `marginal_price()`, …) arman DataFrames bajo
+demanda; nada se cachea dentro del objeto, así el tamaño en memoria por
+sesión es `nbytes`. La única excepción es `derived`: las tablas y series
+agregadas que `post_solve.derive_results` materializa una vez después del
+solve (los KPIs escalares van en `meta["kpis"]`). `to_bytes()` /
+`from_bytes()` serializan con `np.savez` (sin pickle) para guardarlo en
+disco o pasarlo entre procesos.
+"""
+from __future__ import annotations
+
+import io
+import json
+
+import numpy as np
+import pandas as pd
+
+_F32 = np.float32
+
+# Atributos de StorageUnit con serie temporal que leen los paneles
+STORAGE_SERIES = ("p", "p_dispatch", "p_store", "state_of_charge")
+
+# |dual| por debajo de esto ($/MWh) = cota no activa
+DUAL_TOL = 1e-4
+
+# Prefijo de los arreglos de `derived` dentro del .npz
+_DERIVED = "derived:"
+
+
+def _names(index) -> np.ndarray:
+    return np.asarray([str(x) for x in index], dtype=str)
+
+
+def _f32(values) -> np.ndarray:
+    return np.ascontiguousarray(np.asarray(values, dtype=_F32))
+
+
+class DispatchResult:
+    """Contenedor inmutable (por convención) con `__slots__` y arreglos float32."""
+
+    __slots__ = (
+        "snapshots",        # datetime64[ns] (T,)
+        "gen_names",        # str (G,)
+        "gen_bus",          # str (G,)
+        "gen_carrier",      # str (G,)
+        "gen_p_nom",        # float32 (G,)
+        "gen_marginal_cost",
+        "gen_p_min_pu",
+        "gen_p_max_pu",     # float32 (G,) — valor de las columnas constantes
+        "gen_p",            # float32 (T, G)
+        "avail_idx",        # int32 (V,) — columnas de p_max_pu que varían
+        "avail",            # float32 (T, V)
+        "gen_free",         # uint8 (T, ⌈G/8⌉) — bits: ninguna cota de p activa (duales); (0, 0) si no hay
+        "bus_names",        # str (B,)
+        "price",            # float32 (T, B) — precio sombra nodal
+        "su_names",         # str (S,)
+        "su_bus",
+        "su_p_nom",         # float32 (S,)
+        "su_max_hours",
+        "su_series",        # float32 (4, T, S) en el orden de STORAGE_SERIES
+        "load_buses",       # str (L,)
+        "load",             # float32 (T, L) — p_set de cada carga (con multiplicador)
+        "demand",           # float32 (T, L) — demanda de entrada, sin multiplicador
+        "derived",          # dict[str, ndarray] — resultados derivados ({} si no se calcularon)
+        "objective",        # float
+        "meta",             # dict JSON-serializable (escenario, estado del solver, …)
+    )
+
+    def __init__(self, **fields) -> None:
+        fields.setdefault("derived", {})
+        for name in self.__slots__:
+            setattr(self, name, fields[name])
+
+    # ── Construcción ──────────────────────────────────────────────────────────
+    @classmethod
+    def from_network(
+        cls,
+        n,
+        demand: pd.DataFrame | None = None,
+        meta: dict | None = None,
+    ) -> "DispatchResult":
+        """
+        Extrae el resultado de una red PyPSA resuelta.
+
+        - demand: demanda de entrada por bus (dem_z); si falta se usa el
+          p_set de las cargas
+        - meta: datos libres que viajan con el resultado (p. ej. escenario)
+        """
+        snaps = pd.DatetimeIndex(n.snapshots)
+        gens = n.generators
+        gen_index = gens.index
+        T, G = len(snaps), len(gen_index)
+
+        gen_p = n.generators_t.p.reindex(index=snaps, columns=gen_index, fill_value=0.0)
+
+        # Disponibilidad: columnas constantes → escalar; el resto se conserva
+        p_max_static = np.array(gens["p_max_pu"], dtype=float) if "p_max_pu" in gens else np.ones(G)
+        pmax_t = n.generators_t.p_max_pu
+        avail_idx = np.zeros(0, dtype=np.int32)
+        avail = np.zeros((T, 0), dtype=_F32)
+        if not pmax_t.empty:
+            cols = gen_index.get_indexer(pmax_t.columns)
+            vals = pmax_t.reindex(index=snaps).to_numpy(dtype=float)
+            keep = cols >= 0
+            cols, vals = cols[keep], vals[:, keep]
+            const = (vals == vals[:1]).all(axis=0) if T else np.ones(len(cols), dtype=bool)
+            if T:
+                p_max_static[cols[const]] = vals[0, const]
+            avail_idx = cols[~const].astype(np.int32)
+            avail = _f32(vals[:, ~const])
+
+        # Duales de las cotas de p (mu_upper / mu_lower, con assign_all_duals):
+        # un bit por (snapshot, generador) que dice si la unidad quedó libre
+        gen_free = np.zeros((0, 0), dtype=np.uint8)
+        mu_up = getattr(n.generators_t, "mu_upper", None)
+        mu_lo = getattr(n.generators_t, "mu_lower", None)
+        if mu_up is not None and mu_lo is not None and not mu_up.empty and not mu_lo.empty:
+            up = mu_up.reindex(index=snaps, columns=gen_index, fill_value=0.0).to_numpy()
+            lo = mu_lo.reindex(index=snaps, columns=gen_index, fill_value=0.0).to_numpy()
+            free = (np.abs(np.nan_to_num(up)) <= DUAL_TOL) & (np.abs(np.nan_to_num(lo)) <= DUAL_TOL)
+            gen_free = np.packbits(free, axis=1)
+
+        mp = n.buses_t.marginal_price.reindex(index=snaps)
+
+        su = n.storage_units
+        su_series = np.zeros((len(STORAGE_SERIES), T, len(su)), dtype=_F32)
+        for k, attr in enumerate(STORAGE_SERIES):
+            frame = getattr(n.storage_units_t, attr, None)
+            if frame is not None and not frame.empty:
+                su_series[k] = frame.reindex(index=snaps, columns=su.index, fill_value=0.0).to_numpy()
+            elif attr == "p_dispatch":
+                su_series[k] = np.clip(su_series[0], 0, None)    # derivado de la potencia neta
+            elif attr == "p_store":
+                su_series[k] = np.clip(-su_series[0], 0, None)
+
+        loads = n.loads
+        p_set = n.loads_t.p_set.reindex(index=snaps, columns=loads.index, fill_value=0.0)
+        load_buses = loads["bus"].to_numpy(dtype=str) if len(loads) else np.zeros(0, dtype=str)
+        if demand is not None:
+            dem = demand.reindex(index=snaps, columns=load_buses, fill_value=0.0).to_numpy()
+        else:
+            dem = p_set.to_numpy()
+
+        return cls(
+            snapshots=snaps.values.astype("datetime64[ns]"),
+            gen_names=_names(gen_index),
+            gen_bus=gens["bus"].to_numpy(dtype=str),
+            gen_carrier=gens["carrier"].to_numpy(dtype=str),
+            gen_p_nom=_f32(gens["p_nom"]),
+            gen_marginal_cost=_f32(gens["marginal_cost"]),
+            gen_p_min_pu=_f32(gens["p_min_pu"].fillna(0.0)),
+            gen_p_max_pu=_f32(p_max_static),
+            gen_p=_f32(gen_p),
+            avail_idx=avail_idx,
+            avail=avail,
+            gen_free=gen_free,
+            bus_names=_names(mp.columns),
+            price=_f32(mp.fillna(0.0)),
+            su_names=_names(su.index),
+            su_bus=su["bus"].to_numpy(dtype=str) if len(su) else np.zeros(0, dtype=str),
+            su_p_nom=_f32(su["p_nom"]) if len(su) else np.zeros(0, dtype=_F32),
+            su_max_hours=_f32(su["max_hours"]) if len(su) else np.zeros(0, dtype=_F32),
+            su_series=su_series,
+            load_buses=load_buses,
+            load=_f32(p_set),
+            demand=_f32(dem),
+            objective=float(n.objective) if n.objective is not None else float("nan"),
+            meta=dict(meta or {}),
+        )
+
+    @classmethod
+    def concat(cls, parts: list["DispatchResult"]) -> "DispatchResult":
+        """
+        Une resultados de ventanas consecutivas de la misma red (mismos
+        generadores, buses, baterías y cargas) en uno solo.
+
+        El objetivo es la suma; `derived` queda vacío (hay que volver a
+        derivar) y `meta` es el de la primera ventana.
+        """
+        first = parts[0]
+        for part in parts[1:]:
+            for name in ("gen_names", "bus_names", "su_names", "load_buses"):
+                if not np.array_equal(getattr(part, name), getattr(first, name)):
+                    raise ValueError(f"Las ventanas no comparten {name}; no se pueden unir")
+
+        # Columnas de disponibilidad variables en alguna ventana o con constante distinta entre ventanas
+        statics = np.stack([p.gen_p_max_pu for p in parts])
+        var_idx = np.union1d(
+            np.concatenate([p.avail_idx for p in parts]),
+            np.flatnonzero((statics != statics[:1]).any(axis=0)),
+        ).astype(np.int32)
+        var_names = first.gen_names[var_idx]
+        with_duals = all(p.has_bound_duals for p in parts)
+
+        return cls(
+            snapshots=np.concatenate([p.snapshots for p in parts]),
+            gen_names=first.gen_names,
+            gen_bus=first.gen_bus,
+            gen_carrier=first.gen_carrier,
+            gen_p_nom=first.gen_p_nom,
+            gen_marginal_cost=first.gen_marginal_cost,
+            gen_p_min_pu=first.gen_p_min_pu,
+            gen_p_max_pu=first.gen_p_max_pu,
+            gen_p=np.concatenate([p.gen_p for p in parts]),
+            avail_idx=var_idx,
+            avail=_f32(np.concatenate([p.p_max_pu(var_names).to_numpy() for p in parts])),
+            gen_free=(
+                np.concatenate([p.gen_free for p in parts]) if with_duals
+                else np.zeros((0, 0), dtype=np.uint8)
+            ),
+            bus_names=first.bus_names,
+            price=np.concatenate([p.price for p in parts]),
+            su_names=first.su_names,
+            su_bus=first.su_bus,
+            su_p_nom=first.su_p_nom,
+            su_max_hours=first.su_max_hours,
+            su_series=np.concatenate([p.su_series for p in parts], axis=1),
+            load_buses=first.load_buses,
+            load=np.concatenate([p.load for p in parts]),
+            demand=np.concatenate([p.demand for p in parts]),
+            objective=float(sum(p.objective for p in parts)),
+            meta=dict(first.meta),
+        )
+
+    # ── Accesores pandas ──────────────────────────────────────────────────────
+    @property
+    def index(self) -> pd.DatetimeIndex:
+        return pd.DatetimeIndex(self.snapshots, name="snapshot")
+
+    def generators(self) -> pd.DataFrame:
+        """Metadatos estáticos: bus, carrier, p_nom, marginal_cost, p_min_pu, p_max_pu."""
+        return pd.DataFrame(
+            {
+                "bus": self.gen_bus,
+                "carrier": self.gen_carrier,
+                "p_nom": self.gen_p_nom,
+                "marginal_cost": self.gen_marginal_cost,
+                "p_min_pu": self.gen_p_min_pu,
+                "p_max_pu": self.gen_p_max_pu,
+            },
+            index=pd.Index(self.gen_names, name="Generator"),
+        )
+
+    def dispatch(self) -> pd.DataFrame:
+        """Despacho por generador (MW), snapshots × generadores."""
+        return pd.DataFrame(self.gen_p, index=self.index, columns=self.gen_names)
+
+    def p_max_pu(self, gens=None) -> pd.DataFrame:
+        """Disponibilidad por unidad (snapshots × gens); sin `gens`, todas."""
+        names = self.gen_names if gens is None else np.asarray(list(gens), dtype=str)
+        pos = pd.Index(self.gen_names).get_indexer(names)
+        if (pos < 0).any():
+            raise KeyError(f"Generadores desconocidos: {list(names[pos < 0])}")
+        out = np.broadcast_to(self.gen_p_max_pu[pos], (len(self.snapshots), len(pos))).copy()
+        # Columnas variables: posición en `avail` de cada columna pedida (−1 si es constante)
+        slot = np.full(len(self.gen_names), -1, dtype=np.int64)
+        slot[self.avail_idx] = np.arange(self.avail_idx.size)
+        var = slot[pos] >= 0
+        if var.any():
+            out[:, var] = self.avail[:, slot[pos][var]]
+        return pd.DataFrame(out, index=self.index, columns=names)
+
+    @property
+    def has_bound_duals(self) -> bool:
+        return self.gen_free.size > 0
+
+    def free_mask(self, positions=None) -> np.ndarray | None:
+        """
+        bool (T, G) — True si ninguna cota de p de la unidad estaba activa según
+        los duales del LP (o las columnas `positions`). None si no hay duales.
+        """
+        if not self.has_bound_duals:
+            return None
+        mask = np.unpackbits(self.gen_free, axis=1, count=len(self.gen_names)).astype(bool)
+        return mask if positions is None else mask[:, positions]
+
+    def marginal_price(self) -> pd.DataFrame:
+        """Precio sombra nodal ($/MWh), snapshots × buses."""
+        return pd.DataFrame(self.price, index=self.index, columns=self.bus_names)
+
+    def price_series(self, bus: str) -> pd.Series:
+        """Precio sombra de un bus ($/MWh), sin copiar la columna."""
+        j = list(self.bus_names).index(bus)
+        return pd.Series(self.price[:, j], index=self.index, name=bus, copy=False)
+
+    def storage_units(self) -> pd.DataFrame:
+        return pd.DataFrame(
+            {"bus": self.su_bus, "p_nom": self.su_p_nom, "max_hours": self.su_max_hours},
+            index=pd.Index(self.su_names, name="StorageUnit"),
+        )
+
+    def storage_t(self, attr: str) -> pd.DataFrame:
+        """Serie de baterías: "p", "p_dispatch", "p_store" o "state_of_charge"."""
+        k = STORAGE_SERIES.index(attr)
+        return pd.DataFrame(self.su_series[k], index=self.index, columns=self.su_names)
+
+    def loads(self) -> pd.DataFrame:
+        """p_set de las cargas por bus (MW), con el multiplicador de demanda aplicado."""
+        return pd.DataFrame(self.load, index=self.index, columns=self.load_buses)
+
+    def demand_frame(self) -> pd.DataFrame:
+        """Demanda de entrada por bus (MW), antes del multiplicador del escenario."""
+        return pd.DataFrame(self.demand, index=self.index, columns=self.load_buses)
+
+    # ── Tamaño y serialización ────────────────────────────────────────────────
+    def _arrays(self) -> dict[str, np.ndarray]:
+        return {
+            name: getattr(self, name)
+            for name in self.__slots__
+            if isinstance(getattr(self, name), np.ndarray)
+        }
+
+    @property
+    def nbytes(self) -> int:
+        arrays = list(self._arrays().values()) + list(self.derived.values())
+        return int(sum(a.nbytes for a in arrays))
+
+    def to_bytes(self) -> bytes:
+        buf = io.BytesIO()
+        header = json.dumps({"objective": self.objective, "meta": self.meta}, default=str)
+        derived = {f"{_DERIVED}{k}": v for k, v in self.derived.items()}
+        np.savez(buf, _header=np.asarray(header), **self._arrays(), **derived)
+        return buf.getvalue()
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "DispatchResult":
+        with np.load(io.BytesIO(data), allow_pickle=False) as z:
+            fields = {k: z[k] for k in z.files if k != "_header" and not k.startswith(_DERIVED)}
+            derived = {k[len(_DERIVED):]: z[k] for k in z.files if k.startswith(_DERIVED)}
+            header = json.loads(str(z["_header"]))
+        return cls(objective=header["objective"], meta=header["meta"], derived=derived, **fields)
+
+    def __repr__(self) -> str:
+        return (
+            f"DispatchResult({len(self.snapshots)} snapshots × {len(self.gen_names)} generadores, "
+            f"{self.nbytes / 1024**2:.1f} MB, objetivo={self.objective:,.0f})"
+        )
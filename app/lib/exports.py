@@ -0,0 +1,123 @@
+"""
+Exportación de resultados a archivo, bajo demanda y por bloques.
+
+La página ya no arma `to_csv()` de cada tabla en cada recarga: solo cuando
+el usuario hace clic en la descarga se arma la tabla y se escribe el archivo
+aquí, por bloques de filas (CSV) o grupos de filas (Parquet), sin construir
+el texto completo en memoria. El archivo queda en EXPORT_DIR/<clave del
+resultado>/ y se reutiliza mientras ese resultado siga en pantalla:
+
+    data = deferred_export(res.dispatch, "despacho_mw", "parquet", key=res_key)
+    st.download_button(..., data=data, mime=mime_type("parquet"))
+    discard_exports(res_key)          # al cambiar de resultado
+
+`st.download_button` ejecuta el callable `data` solo al hacer clic (en otro
+hilo); entre recargas la página no guarda ni la tabla ni los bytes.
+"""
+from __future__ import annotations
+
+import atexit
+import os
+import shutil
+from pathlib import Path
+from typing import BinaryIO, Callable
+
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parents[2]
+
+# Un directorio por proceso, como los volcados del registro de resultados
+EXPORT_DIR = ROOT / "data_cache" / "exports" / f"p{os.getpid()}"
+
+# Filas por bloque al escribir (≈ un grupo de filas Parquet)
+CHUNK_ROWS = 2000
+
+FORMATS = {
+    "csv":     ("text/csv", ".csv"),
+    "parquet": ("application/vnd.apache.parquet", ".parquet"),
+}
+
+
+def mime_type(fmt: str) -> str:
+    return FORMATS[fmt][0]
+
+
+def file_name(name: str, fmt: str) -> str:
+    return f"{name}{FORMATS[fmt][1]}"
+
+
+# ── Escritura por bloques ─────────────────────────────────────────────────────
+def write_frame(frame: pd.DataFrame, fh: BinaryIO, fmt: str, chunk_rows: int = CHUNK_ROWS) -> None:
+    """Escribe `frame` (con su índice) en el archivo binario `fh`, `chunk_rows` filas a la vez."""
+    if fmt not in FORMATS:
+        raise ValueError(f"Formato de exportación desconocido: {fmt!r}")
+    starts = range(0, max(len(frame), 1), chunk_rows)
+
+    if fmt == "csv":
+        for i in starts:
+            frame.iloc[i:i + chunk_rows].to_csv(fh, header=(i == 0), encoding="utf-8")
+        return
+
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    # Nombres de columna como texto: Parquet no admite otros tipos
+    frame = frame.rename(columns=str)
+    writer = None
+    try:
+        for i in starts:
+            chunk = frame.iloc[i:i + chunk_rows]
+            table = pa.Table.from_pandas(
+                chunk, schema=writer.schema if writer is not None else None, preserve_index=True,
+            )
+            if writer is None:
+                writer = pq.ParquetWriter(fh, table.schema)
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def export_frame(frame: pd.DataFrame, name: str, fmt: str, key: str, export_dir: Path | None = None) -> Path:
+    """
+    Archivo con `frame` en `fmt`; si ya se exportó para `key`, se devuelve sin reescribir.
+
+    Se escribe a un .tmp y se renombra, así una descarga nunca ve un archivo a medias.
+    """
+    path = Path(export_dir or EXPORT_DIR) / key / file_name(name, fmt)
+    if path.exists():
+        return path
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    with tmp.open("wb") as fh:
+        write_frame(frame, fh, fmt)
+    os.replace(tmp, path)
+    return path
+
+
+def deferred_export(
+    build: Callable[[], pd.DataFrame],
+    name: str,
+    fmt: str,
+    key: str,
+    export_dir: Path | None = None,
+) -> Callable[[], bytes]:
+    """
+    Callable sin argumentos para `st.download_button(data=...)`: arma la
+    tabla con `build()` y la exporta (`export_frame`) solo cuando se llama.
+    """
+    def _export() -> bytes:
+        return export_frame(build(), name, fmt, key=key, export_dir=export_dir).read_bytes()
+
+    return _export
+
+
+def discard_exports(key: str | None, export_dir: Path | None = None) -> None:
+    """Borra los archivos exportados de un resultado."""
+    if key:
+        shutil.rmtree(Path(export_dir or EXPORT_DIR) / key, ignore_errors=True)
+
+
+@atexit.register
+def _cleanup_export_dir() -> None:
+    shutil.rmtree(EXPORT_DIR, ignore_errors=True)
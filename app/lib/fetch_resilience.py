@@ -0,0 +1,260 @@
+from __future__ import annotations
+
+import json
+import random
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, TypeVar
+
+import requests
+
+T = TypeVar("T")
+
+
+class CircuitOpenError(RuntimeError):
+    """El circuito del endpoint está abierto: se falla rápido sin tocar la red."""
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Política de reintentos
+# ──────────────────────────────────────────────────────────────────────────────
+@dataclass(frozen=True)
+class RetryPolicy:
+    """
+    Reintentos acotados con backoff exponencial y jitter completo.
+    - max_attempts: intentos totales (1 = sin reintentos)
+    - base_delay_s / max_delay_s: espera = uniform(0, min(max, base · 2^intento))
+    - deadline_s: no se inicia un intento nuevo si se rebasaría este tiempo total
+    """
+    max_attempts: int = 3
+    base_delay_s: float = 0.5
+    max_delay_s: float = 8.0
+    deadline_s: float | None = 45.0
+
+    def delay(self, attempt: int, rng: random.Random | None = None) -> float:
+        cap = min(self.max_delay_s, self.base_delay_s * (2 ** attempt))
+        return (rng or random).uniform(0.0, cap)
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """Timeouts, errores de conexión y HTTP 429/5xx se reintentan; el resto no."""
+    if isinstance(exc, (requests.Timeout, requests.ConnectionError)):
+        return True
+    if isinstance(exc, requests.HTTPError) and exc.response is not None:
+        code = exc.response.status_code
+        return code == 429 or code >= 500
+    return False
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Circuit breaker
+# ──────────────────────────────────────────────────────────────────────────────
+class CircuitBreaker:
+    """
+    Breaker por endpoint: tras `failure_threshold` fallas consecutivas se abre
+    durante `cooldown_s`; luego deja pasar una sola prueba (half-open).
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        failure_threshold: int = 3,
+        cooldown_s: float = 60.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.failure_threshold = failure_threshold
+        self.cooldown_s = cooldown_s
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at: float | None = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state_locked()
+
+    def _state_locked(self) -> str:
+        if self._opened_at is None:
+            return self.CLOSED
+        if self._clock() - self._opened_at >= self.cooldown_s:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    def allow(self) -> bool:
+        """¿Se permite una petición ahora?"""
+        with self._lock:
+            state = self._state_locked()
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._trial_in_flight or self._failures >= self.failure_threshold:
+                self._opened_at = self._clock()
+            self._trial_in_flight = False
+
+    def release(self) -> None:
+        """Termina la prueba half-open sin contarla (el endpoint respondió, pero con un error no transitorio)."""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def retry_after(self) -> float:
+        """Segundos restantes de enfriamiento (0 si no está abierto)."""
+        with self._lock:
+            if self._opened_at is None:
+                return 0.0
+            return max(0.0, self.cooldown_s - (self._clock() - self._opened_at))
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Métricas de latencia y resultado
+# ──────────────────────────────────────────────────────────────────────────────
+@dataclass
+class _EndpointStats:
+    counts: dict[str, int] = field(default_factory=dict)
+    latencies: deque = field(default_factory=lambda: deque(maxlen=500))
+
+
+class FetchMetrics:
+    """
+    Contadores de resultado y latencias por endpoint (thread-safe).
+    Si `log_path` está definido, cada petición se agrega como una línea JSON
+    para poder revisar la latencia de CENACE a lo largo del tiempo.
+    """
+
+    def __init__(self, log_path: Path | None = None, max_log_bytes: int = 1_000_000) -> None:
+        self.log_path = log_path
+        self.max_log_bytes = max_log_bytes
+        self._lock = threading.Lock()
+        self._stats: dict[str, _EndpointStats] = {}
+
+    def record(self, endpoint: str, outcome: str, latency_s: float | None = None, attempt: int = 0) -> None:
+        with self._lock:
+            st = self._stats.setdefault(endpoint, _EndpointStats())
+            st.counts[outcome] = st.counts.get(outcome, 0) + 1
+            if latency_s is not None:
+                st.latencies.append(latency_s)
+            if self.log_path is not None:
+                self._append_log({
+                    "ts": time.time(),
+                    "endpoint": endpoint,
+                    "outcome": outcome,
+                    "latency_s": None if latency_s is None else round(latency_s, 4),
+                    "attempt": attempt,
+                })
+
+    def _append_log(self, row: dict) -> None:
+        try:
+            path = self.log_path
+            if path.exists() and path.stat().st_size > self.max_log_bytes:
+                path.replace(path.with_suffix(path.suffix + ".1"))
+            with open(path, "a", encoding="utf-8") as fh:
+                fh.write(json.dumps(row) + "\n")
+        except OSError:
+            pass
+
+    def summary(self) -> dict[str, dict]:
+        """{endpoint: {conteos..., n_latencias, p50_s, p95_s, max_s}}"""
+        out: dict[str, dict] = {}
+        with self._lock:
+            for endpoint, st in self._stats.items():
+                lat = sorted(st.latencies)
+                row: dict = dict(st.counts)
+                row["n_latencias"] = len(lat)
+                if lat:
+                    row["p50_s"] = lat[len(lat) // 2]
+                    row["p95_s"] = lat[min(len(lat) - 1, int(0.95 * len(lat)))]
+                    row["max_s"] = lat[-1]
+                out[endpoint] = row
+        return out
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Llamada resiliente
+# ──────────────────────────────────────────────────────────────────────────────
+def call_with_retries(
+    fn: Callable[[], T],
+    endpoint: str,
+    policy: RetryPolicy,
+    breaker: CircuitBreaker | None = None,
+    metrics: FetchMetrics | None = None,
+    sleep: Callable[[float], None] = time.sleep,
+) -> T:
+    """
+    Ejecuta `fn` con reintentos acotados.
+    Lanza CircuitOpenError si el breaker está abierto, o la última excepción
+    si se agotan los intentos / el deadline.
+
+    El breaker cuenta llamadas, no intentos: una llamada que agota sus
+    reintentos con errores transitorios suma una sola falla; los errores no
+    transitorios (esquema, 4xx) no cuentan, el endpoint sí respondió.
+    """
+    t_start = time.monotonic()
+    last_exc: BaseException | None = None
+
+    def _give_up(retryable: bool) -> None:
+        if breaker is not None:
+            if retryable:
+                breaker.record_failure()
+            else:
+                breaker.release()
+
+    for attempt in range(max(1, policy.max_attempts)):
+        # Primer intento: pide paso al breaker (puede ser la prueba half-open);
+        # reintentos: siguen salvo que otra llamada haya abierto el circuito
+        if breaker is not None and not (breaker.allow() if attempt == 0 else breaker.state != breaker.OPEN):
+            if metrics is not None:
+                metrics.record(endpoint, "short_circuit", attempt=attempt)
+            if last_exc is not None:
+                raise last_exc
+            raise CircuitOpenError(
+                f"{endpoint}: circuito abierto, reintentar en {breaker.retry_after():.0f} s"
+            )
+
+        t0 = time.monotonic()
+        try:
+            result = fn()
+        except Exception as exc:
+            latency = time.monotonic() - t0
+            last_exc = exc
+            retryable = is_retryable(exc)
+            if metrics is not None:
+                metrics.record(endpoint, "retryable_error" if retryable else "error", latency, attempt)
+            if not retryable or attempt + 1 >= policy.max_attempts:
+                _give_up(retryable)
+                raise
+            wait = policy.delay(attempt)
+            if policy.deadline_s is not None and (time.monotonic() - t_start) + wait >= policy.deadline_s:
+                _give_up(retryable)
+                raise
+            sleep(wait)
+            continue
+
+        latency = time.monotonic() - t0
+        if breaker is not None:
+            breaker.record_success()
+        if metrics is not None:
+            metrics.record(endpoint, "ok", latency, attempt)
+        return result
+
+    assert last_exc is not None
+    raise last_exc
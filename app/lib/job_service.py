@@ -0,0 +1,542 @@
+"""
+Servicio local de despacho: cola con prioridad y pool acotado de procesos.
+
+Cada sesión de Streamlit resolvía en su propio hilo; N usuarios a la vez
+eran N HiGHS compitiendo por los núcleos. Con el servicio, los solves pasan
+por una sola cola atendida por `workers` procesos precalentados (PyPSA ya
+importado y los datos de entrada cargados una vez por proceso, y de nuevo
+solo si cambia su versión):
+
+    python scripts/job_service.py --workers 2            # 127.0.0.1:8765
+    DESPACHO_JOB_SERVICE=http://127.0.0.1:8765 streamlit run app/Home.py
+
+API HTTP (JSON, solo localhost):
+
+    POST   /jobs               {"recipe": {...}, "priority": 10, "client": "abc"}
+                               → 202 {"job_id", "state"} · 429 si la cola está llena
+    GET    /jobs/<id>          → estado: queued / running / done / error / cancelled
+    GET    /jobs/<id>/result   → DispatchResult.to_bytes() (.npz) · 409 si no terminó
+    DELETE /jobs/<id>          → cancela un trabajo en cola, o detiene uno en curso
+                               antes de su siguiente ventana / de entrar a HiGHS
+    GET    /health             → contadores del servicio
+
+Control de admisión: `max_queue` trabajos en cola en total y
+`max_per_client` pendientes (en cola o corriendo) por cliente. Mayor
+prioridad sale antes; a igual prioridad, en orden de llegada.
+
+Una receta idéntica (misma clave canónica, lib/single_flight.recipe_key) a
+un trabajo en cola, corriendo o terminado hace menos de `keep_s` sobre la
+misma versión de los datos no se encola de nuevo: recibe el mismo job_id (y
+sube su prioridad si hace falta). El presupuesto de tiempo no entra en la
+clave; solo se comparte un trabajo cuyo presupuesto no sea más corto que el
+pedido. El trabajo solo se cancela cuando todos los que lo pidieron cancelan.
+"""
+from __future__ import annotations
+
+import heapq
+import itertools
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from datetime import date
+from functools import partial
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable
+
+from .dispatch_model import DispatchData, run_dispatch
+from .dispatch_result import DispatchResult
+from .perf import PerfRecorder
+from .single_flight import recipe_key
+
+# Con la variable definida la página manda sus solves al servicio
+SERVICE_URL = os.environ.get("DESPACHO_JOB_SERVICE") or None
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+# Prioridades que usa la página (mayor = antes)
+PRIORITY_INTERACTIVE = 10     # "▶ Correr despacho" y re-solves por expulsión
+PRIORITY_COMPARISON = 5       # escenario base de comparación
+PRIORITY_BATCH = 0            # "Comparar todos los escenarios"
+
+# Trabajos terminados se conservan este tiempo para que el cliente los recoja
+KEEP_S = 600
+
+QUEUED, RUNNING, DONE, ERROR, CANCELLED = "queued", "running", "done", "error", "cancelled"
+
+
+class JobServiceError(RuntimeError):
+    """Error del servicio de despacho (o de la comunicación con él)."""
+
+
+class QueueFullError(JobServiceError):
+    """El control de admisión rechazó el trabajo: cola llena o cliente con demasiados pendientes."""
+
+
+# ── Recetas por JSON ──────────────────────────────────────────────────────────
+def recipe_to_json(recipe: dict) -> dict:
+    """Receta de make_recipe → dict serializable (fechas como ISO)."""
+    out = dict(recipe)
+    for k in ("start", "end"):
+        if isinstance(out.get(k), date):
+            out[k] = out[k].isoformat()
+    return out
+
+
+def recipe_from_json(payload: dict) -> dict:
+    out = dict(payload)
+    for k in ("start", "end"):
+        if isinstance(out.get(k), str):
+            out[k] = date.fromisoformat(out[k])
+    return out
+
+
+# ── Procesos del pool ─────────────────────────────────────────────────────────
+_WORKER_DATA: DispatchData | None = None
+_WORKER_LOAD: Callable[[], DispatchData] | None = None
+_WORKER_VERSION_FN: Callable[[], str] | None = None
+_WORKER_VERSION: str | None = None
+
+
+def _init_worker(load_data: Callable[[], DispatchData], data_version: Callable[[], str] | None = None) -> None:
+    global _WORKER_DATA, _WORKER_LOAD, _WORKER_VERSION_FN, _WORKER_VERSION
+    _WORKER_LOAD, _WORKER_VERSION_FN = load_data, data_version
+    _WORKER_VERSION = data_version() if data_version is not None else None
+    _WORKER_DATA = load_data()
+
+
+def _worker_data() -> DispatchData:
+    """Datos del proceso; se recargan si la versión de los datos cambió desde la última carga."""
+    global _WORKER_DATA, _WORKER_VERSION
+    if _WORKER_VERSION_FN is not None:
+        version = _WORKER_VERSION_FN()
+        if version != _WORKER_VERSION:
+            _WORKER_DATA, _WORKER_VERSION = _WORKER_LOAD(), version
+    return _WORKER_DATA
+
+
+def _ping() -> int:
+    return os.getpid()
+
+
+def _solve(recipe: dict, stop_path: str) -> tuple[bytes, dict]:
+    """
+    Corre en un proceso del pool: receta → (resultado .npz, tiempos por fase).
+    El servicio crea `stop_path` al cancelar; run_dispatch lo ve entre ventanas
+    y antes de HiGHS.
+    """
+    perf = PerfRecorder()
+    res = run_dispatch(_worker_data(), recipe, perf=perf, should_stop=partial(os.path.exists, stop_path))
+    return res.to_bytes(), {s.name: s.wall_s for s in perf.spans if s.depth == 0}
+
+
+# ── Servicio ──────────────────────────────────────────────────────────────────
+@dataclass
+class _Job:
+    job_id: str
+    key: str
+    recipe: dict
+    priority: int
+    client: str | None
+    submitted: float
+    version: str | None = None     # versión de los datos al encolarlo (data_version)
+    refs: int = 1                  # peticiones que comparten el trabajo
+    state: str = QUEUED
+    started: float | None = None
+    finished: float | None = None
+    result: bytes | None = field(default=None, repr=False)
+    phases: dict = field(default_factory=dict)
+    error: str | None = None
+
+
+class JobService:
+    """
+    Cola con prioridad + ProcessPoolExecutor de `workers` procesos.
+
+    - load_data: función importable que arma los `DispatchData`; corre una vez
+      por proceso al arrancar (`start` espera a que todos estén listos) y no
+      debe escribir: el store se sincroniza antes, en el proceso padre
+    - data_version: función importable → huella de los datos (p. ej.
+      demand_store.version); cada proceso la consulta antes de cada solve y
+      vuelve a llamar a load_data si cambió (días nuevos sin reiniciar)
+    - max_queue / max_per_client: control de admisión (QueueFullError)
+    - keep_s: tiempo que se guarda un resultado terminado sin recoger
+    - solve: función importable (receta, ruta de parada) → (bytes, fases) que
+      corre en el pool; debe detenerse cuando la ruta de parada exista
+    """
+
+    def __init__(
+        self,
+        load_data: Callable[[], DispatchData],
+        data_version: Callable[[], str] | None = None,
+        workers: int = 2,
+        max_queue: int = 32,
+        max_per_client: int = 8,
+        keep_s: float = KEEP_S,
+        solve: Callable[[dict, str], tuple[bytes, dict]] = _solve,
+    ) -> None:
+        self.load_data = load_data
+        self.data_version = data_version
+        self.solve = solve
+        self.workers = max(1, int(workers))
+        self.max_queue = int(max_queue)
+        self.max_per_client = int(max_per_client)
+        self.keep_s = float(keep_s)
+        self._cond = threading.Condition()
+        self._jobs: dict[str, _Job] = {}
+        self._heap: list[tuple[int, int, str]] = []      # (−prioridad, llegada, job_id)
+        self._seq = itertools.count()
+        self._running = 0
+        self._pool: ProcessPoolExecutor | None = None
+        self._pool_broken = False
+        self._stop = False
+        self._stop_dir: str | None = None                # banderas de cancelación de trabajos en curso
+        self._thread: threading.Thread | None = None
+        self._counts = {"submitted": 0, "coalesced": 0, "rejected": 0, "done": 0, "failed": 0, "cancelled": 0}
+
+    # ── Ciclo de vida ─────────────────────────────────────────────────────────
+    def _new_pool(self) -> ProcessPoolExecutor:
+        pool = ProcessPoolExecutor(
+            max_workers=self.workers, initializer=_init_worker, initargs=(self.load_data, self.data_version),
+        )
+        # Un ping por proceso obliga a crearlos (y a cargar datos) antes del primer trabajo
+        for fut in [pool.submit(_ping) for _ in range(self.workers)]:
+            fut.result()
+        return pool
+
+    def start(self) -> "JobService":
+        self._stop_dir = tempfile.mkdtemp(prefix="despacho-jobs-")
+        self._pool = self._new_pool()
+        self._thread = threading.Thread(target=self._dispatch_loop, name="job-dispatcher", daemon=True)
+        self._thread.start()
+        return self
+
+    def shutdown(self) -> None:
+        with self._cond:
+            self._stop = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+        if self._stop_dir is not None:
+            shutil.rmtree(self._stop_dir, ignore_errors=True)
+
+    def _stop_path(self, job_id: str) -> str:
+        return os.path.join(self._stop_dir or tempfile.gettempdir(), f"{job_id}.stop")
+
+    # ── API ───────────────────────────────────────────────────────────────────
+    def submit(self, recipe: dict, priority: int = 0, client: str | None = None) -> str:
+        """Encola `recipe` (o la une a un trabajo idéntico); QueueFullError si la admisión la rechaza."""
+        key = recipe_key(recipe)
+        version = self.data_version() if self.data_version is not None else None
+        with self._cond:
+            same = next((j for j in self._jobs.values() if self._shareable(j, key, version, recipe)), None)
+            if same is not None:
+                same.refs += 1
+                self._counts["coalesced"] += 1
+                if same.state == QUEUED and int(priority) > same.priority:
+                    same.priority = int(priority)
+                    heapq.heappush(self._heap, (-same.priority, next(self._seq), same.job_id))
+                    self._cond.notify_all()
+                return same.job_id
+            queued = sum(1 for j in self._jobs.values() if j.state == QUEUED)
+            if queued >= self.max_queue:
+                self._counts["rejected"] += 1
+                raise QueueFullError(f"Cola llena ({queued} trabajos en espera)")
+            if client is not None:
+                pending = sum(1 for j in self._jobs.values() if j.client == client and j.state in (QUEUED, RUNNING))
+                if pending >= self.max_per_client:
+                    self._counts["rejected"] += 1
+                    raise QueueFullError(f"El cliente {client} ya tiene {pending} trabajos pendientes")
+            job = _Job(uuid.uuid4().hex[:12], key, recipe, int(priority), client, time.time(), version)
+            self._jobs[job.job_id] = job
+            heapq.heappush(self._heap, (-job.priority, next(self._seq), job.job_id))
+            self._counts["submitted"] += 1
+            self._cond.notify_all()
+        return job.job_id
+
+    @staticmethod
+    def _shareable(job: _Job, key: str, version: str | None, recipe: dict) -> bool:
+        """
+        `job` sirve para `recipe`: misma clave y versión de datos, vigente y con
+        un presupuesto que no lo corte antes que el pedido (uno terminado con
+        presupuesto pudo quedar parcial: no se reutiliza).
+        """
+        if job.key != key or job.version != version or job.state not in (QUEUED, RUNNING, DONE):
+            return False
+        budget = job.recipe.get("time_budget_s")
+        if budget is None:
+            return True
+        return job.state != DONE and recipe.get("time_budget_s") is not None and budget >= recipe["time_budget_s"]
+
+    def status(self, job_id: str) -> dict | None:
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            out = {
+                "job_id": job.job_id, "state": job.state, "priority": job.priority,
+                "client": job.client, "refs": job.refs,
+            }
+            if job.state == QUEUED:
+                ahead = sorted(e for e in self._heap if self._jobs.get(e[2]) and self._jobs[e[2]].state == QUEUED)
+                out["position"] = next(i for i, e in enumerate(ahead) if e[2] == job_id) + 1
+            if job.started is not None:
+                out["queue_s"] = round(job.started - job.submitted, 3)
+            if job.finished is not None and job.started is not None:
+                out["solve_s"] = round(job.finished - job.started, 3)
+                out["phases"] = job.phases
+            if job.error is not None:
+                out["error"] = job.error
+            return out
+
+    def result(self, job_id: str) -> bytes | None:
+        with self._cond:
+            job = self._jobs.get(job_id)
+            return job.result if job is not None and job.state == DONE else None
+
+    def cancel(self, job_id: str) -> bool:
+        """
+        Retira una petición de un trabajo en cola o en curso; se cancela al
+        retirarse la última. Uno en curso recibe la bandera de parada y deja
+        el proceso libre antes de su siguiente ventana (o antes de HiGHS);
+        una ventana que HiGHS ya está resolviendo termina primero.
+        """
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if job is None or job.state not in (QUEUED, RUNNING):
+                return False
+            job.refs -= 1
+            if job.refs > 0:
+                return True
+            if job.state == RUNNING:
+                open(self._stop_path(job_id), "w").close()
+            job.state, job.finished = CANCELLED, time.time()
+            self._counts["cancelled"] += 1
+            return True
+
+    def stats(self) -> dict:
+        with self._cond:
+            states = [j.state for j in self._jobs.values()]
+            return {
+                "workers": self.workers,
+                "running": self._running,
+                "queued": states.count(QUEUED),
+                "max_queue": self.max_queue,
+                "max_per_client": self.max_per_client,
+                **self._counts,
+            }
+
+    # ── Despacho interno ──────────────────────────────────────────────────────
+    def _next_locked(self) -> _Job | None:
+        while self._heap:
+            _, _, job_id = heapq.heappop(self._heap)
+            job = self._jobs.get(job_id)
+            if job is not None and job.state == QUEUED:
+                return job
+        return None
+
+    def _purge_locked(self, now: float) -> None:
+        old = [k for k, j in self._jobs.items() if j.finished is not None and now - j.finished > self.keep_s]
+        for k in old:
+            del self._jobs[k]
+
+    def _dispatch_loop(self) -> None:
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._stop or (self._heap and self._running < self.workers), timeout=30)
+                self._purge_locked(time.time())
+                if self._stop:
+                    return
+                if self._running >= self.workers:
+                    continue
+                job = self._next_locked()
+                if job is None:
+                    continue
+                job.state, job.started = RUNNING, time.time()
+                self._running += 1
+                broken, self._pool_broken = self._pool_broken, False
+            try:
+                if broken:
+                    # Un proceso murió (p. ej. sin memoria): el pool entero queda inservible
+                    self._pool.shutdown(wait=False, cancel_futures=True)
+                    self._pool = self._new_pool()
+                fut = self._pool.submit(self.solve, job.recipe, self._stop_path(job.job_id))
+            except Exception as e:
+                # BrokenProcessPool al encolar, o el pool nuevo no arrancó: el trabajo
+                # falla aquí (no queda en RUNNING) y el siguiente recrea el pool
+                self._fail(job, e)
+                continue
+            fut.add_done_callback(partial(self._finish, job.job_id))
+
+    def _fail(self, job: _Job, error: BaseException) -> None:
+        with self._cond:
+            self._running -= 1
+            job.state, job.error, job.finished = ERROR, f"{type(error).__name__}: {error}", time.time()
+            self._counts["failed"] += 1
+            self._pool_broken = True
+            self._cond.notify_all()
+
+    def _finish(self, job_id: str, fut: Future) -> None:
+        with self._cond:
+            self._running -= 1
+            job = self._jobs.get(job_id)
+            if job is not None and job.state == CANCELLED:
+                # Cancelado en curso: el resultado (parcial o SolveInterrupted) se descarta
+                try:
+                    os.remove(self._stop_path(job_id))
+                except OSError:
+                    pass
+                self._pool_broken |= not fut.cancelled() and isinstance(fut.exception(), BrokenProcessPool)
+            elif job is not None:
+                job.finished = time.time()
+                try:
+                    job.result, job.phases = fut.result()
+                    job.state = DONE
+                    self._counts["done"] += 1
+                except Exception as e:
+                    job.state, job.error = ERROR, f"{type(e).__name__}: {e}"
+                    self._counts["failed"] += 1
+                    self._pool_broken |= isinstance(e, BrokenProcessPool)
+            self._cond.notify_all()
+
+
+# ── HTTP ──────────────────────────────────────────────────────────────────────
+class _Handler(BaseHTTPRequestHandler):
+    server: "JobServer"
+
+    def _send(self, code: int, payload: dict | bytes) -> None:
+        body = payload if isinstance(payload, bytes) else json.dumps(payload, default=str).encode()
+        self.send_response(code)
+        self.send_header("Content-Type", "application/octet-stream" if isinstance(payload, bytes) else "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _parts(self) -> list[str]:
+        return [p for p in self.path.split("?")[0].split("/") if p]
+
+    def do_POST(self) -> None:
+        if self._parts() != ["jobs"]:
+            return self._send(404, {"error": "ruta desconocida"})
+        try:
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            recipe = recipe_from_json(body["recipe"])
+        except (ValueError, KeyError, TypeError) as e:
+            return self._send(400, {"error": f"petición inválida: {e}"})
+        try:
+            job_id = self.server.service.submit(recipe, body.get("priority", 0), body.get("client"))
+        except QueueFullError as e:
+            return self._send(429, {"error": str(e)})
+        self._send(202, {"job_id": job_id, "state": QUEUED})
+
+    def do_GET(self) -> None:
+        parts, service = self._parts(), self.server.service
+        if parts == ["health"]:
+            return self._send(200, service.stats())
+        if len(parts) in (2, 3) and parts[0] == "jobs":
+            status = service.status(parts[1])
+            if status is None:
+                return self._send(404, {"error": "trabajo desconocido"})
+            if len(parts) == 2:
+                return self._send(200, status)
+            if parts[2] == "result":
+                data = service.result(parts[1])
+                return self._send(200, data) if data is not None else self._send(409, status)
+        self._send(404, {"error": "ruta desconocida"})
+
+    def do_DELETE(self) -> None:
+        parts = self._parts()
+        if len(parts) != 2 or parts[0] != "jobs":
+            return self._send(404, {"error": "ruta desconocida"})
+        cancelled = self.server.service.cancel(parts[1])
+        self._send(200 if cancelled else 409, {"job_id": parts[1], "cancelled": cancelled})
+
+    def log_message(self, format: str, *args) -> None:
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class JobServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, service: JobService, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT,
+                 verbose: bool = False) -> None:
+        super().__init__((host, port), _Handler)
+        self.service = service
+        self.verbose = verbose
+
+
+# ── Cliente ───────────────────────────────────────────────────────────────────
+class JobClient:
+    """Cliente HTTP mínimo (urllib) del servicio; lo usa la página."""
+
+    def __init__(self, base_url: str = f"http://{DEFAULT_HOST}:{DEFAULT_PORT}", timeout: float = 10.0) -> None:
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+
+    def _request(self, method: str, path: str, payload: dict | None = None) -> bytes:
+        data = json.dumps(payload, default=str).encode() if payload is not None else None
+        req = urllib.request.Request(
+            self.base_url + path, data=data, method=method,
+            headers={"Content-Type": "application/json"} if data is not None else {},
+        )
+        try:
+            with urllib.request.urlopen(req, timeout=self.timeout) as resp:
+                return resp.read()
+        except urllib.error.HTTPError as e:
+            detail = e.read().decode(errors="replace")
+            if e.code == 429:
+                raise QueueFullError(json.loads(detail).get("error", detail)) from None
+            raise JobServiceError(f"{method} {path} → HTTP {e.code}: {detail}") from None
+        except urllib.error.URLError as e:
+            raise JobServiceError(f"Servicio de despacho no disponible en {self.base_url}: {e.reason}") from None
+
+    def submit(self, recipe: dict, priority: int = 0, client: str | None = None) -> str:
+        body = {"recipe": recipe_to_json(recipe), "priority": priority, "client": client}
+        return json.loads(self._request("POST", "/jobs", body))["job_id"]
+
+    def status(self, job_id: str) -> dict:
+        return json.loads(self._request("GET", f"/jobs/{job_id}"))
+
+    def result(self, job_id: str) -> DispatchResult:
+        return DispatchResult.from_bytes(self._request("GET", f"/jobs/{job_id}/result"))
+
+    def cancel(self, job_id: str) -> bool:
+        try:
+            return json.loads(self._request("DELETE", f"/jobs/{job_id}"))["cancelled"]
+        except JobServiceError:
+            return False
+
+    def health(self) -> dict:
+        return json.loads(self._request("GET", "/health"))
+
+    def wait(
+        self,
+        job_id: str,
+        poll_s: float = 0.5,
+        timeout: float | None = None,
+        on_status: Callable[[dict], None] | None = None,
+    ) -> tuple[DispatchResult, dict]:
+        """Sondea hasta que el trabajo termine → (resultado, último estado)."""
+        t0 = time.monotonic()
+        while True:
+            status = self.status(job_id)
+            if on_status is not None:
+                on_status(status)
+            if status["state"] == DONE:
+                return self.result(job_id), status
+            if status["state"] in (ERROR, CANCELLED):
+                raise JobServiceError(status.get("error") or f"Trabajo {job_id}: {status['state']}")
+            if timeout is not None and time.monotonic() - t0 > timeout:
+                raise TimeoutError(f"Trabajo {job_id} sin terminar tras {timeout:.0f} s")
+            time.sleep(poll_s)
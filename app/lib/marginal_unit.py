@@ -0,0 +1,101 @@
+"""
+Unidad marginal por hora y bus, vectorizada sobre (snapshots × generadores).
+
+Una unidad fija el precio sombra cuando está despachada y ninguna de sus
+cotas está activa: por holgura complementaria su costo variable es el precio.
+Si el resultado trae los duales de las cotas (`DispatchResult.free_mask`),
+"ninguna cota activa" sale del LP directamente; si no, se infiere con
+tolerancias contra p_min / p_max como hacía la versión por hora de la página.
+
+Reglas por hora, en orden (los empates se resuelven por orden del catálogo):
+    1) interior con |CV − precio| ≤ tol_price → la de mayor CV
+    2) interior                                → la de CV más cercano al precio
+    3) fallback                                → la despachada más cara
+"""
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+from .dispatch_result import DispatchResult
+
+STATUS_CLOSE = "interior ~ precio"
+STATUS_INTERIOR = "interior cercano"
+STATUS_FALLBACK = "fallback más caro despachado"
+STATUS_NONE = "sin generación"
+
+COLUMNS = [
+    "shadow_price", "marginal_generator", "carrier", "CV ($/MWh)",
+    "dispatch_MW", "pmin_MW", "pmax_MW", "at_min", "at_max", "status",
+]
+
+
+def identify_marginal_generator(
+    res: DispatchResult,
+    bus: str,
+    tol_mw: float = 1.0,
+    tol_price: float = 1.0,
+    use_duals: bool = True,
+) -> pd.DataFrame:
+    """
+    Identifica una unidad marginal plausible por hora en un bus.
+
+    Devuelve un DataFrame indexado por snapshot con COLUMNS; en horas sin
+    generación solo quedan shadow_price y status.
+    """
+    names = res.gen_names
+    pos = np.flatnonzero((res.gen_bus == bus) & ~np.char.startswith(names, "VoLL_"))
+    bus_pos = np.flatnonzero(res.bus_names == bus)
+    if pos.size == 0 or bus_pos.size == 0:
+        return pd.DataFrame()
+
+    sp = res.price[:, bus_pos[0]].astype(float)                    # (T,)
+    p = res.gen_p[:, pos].astype(float)                            # (T, g)
+    mc = res.gen_marginal_cost[pos].astype(float)                  # (g,)
+    p_nom = res.gen_p_nom[pos].astype(float)
+    pmin = p_nom * res.gen_p_min_pu[pos].astype(float)             # (g,)
+    pmax = res.p_max_pu(names[pos]).to_numpy(dtype=float) * p_nom  # (T, g)
+
+    active = p > tol_mw
+    at_min = p <= pmin + tol_mw
+    at_max = p >= pmax - tol_mw
+    free = res.free_mask(pos) if use_duals else None
+    interior = active & (free if free is not None else (~at_min & ~at_max))
+    close = interior & (np.abs(mc - sp[:, None]) <= tol_price)
+
+    # argmax / argmin devuelven el primer empate, igual que max()/min() sobre la lista
+    pick_close = np.argmax(np.where(close, mc, -np.inf), axis=1)
+    pick_near = np.argmin(np.where(interior, np.abs(mc - sp[:, None]), np.inf), axis=1)
+    pick_top = np.argmax(np.where(active, mc, -np.inf), axis=1)
+
+    has_close, has_interior, has_active = close.any(axis=1), interior.any(axis=1), active.any(axis=1)
+    chosen = np.where(has_close, pick_close, np.where(has_interior, pick_near, pick_top))
+    status = np.select(
+        [has_close, has_interior, has_active],
+        [STATUS_CLOSE, STATUS_INTERIOR, STATUS_FALLBACK],
+        default=STATUS_NONE,
+    )
+
+    rows = np.arange(len(sp))
+    out = pd.DataFrame(
+        {
+            "shadow_price": sp,
+            "marginal_generator": names[pos][chosen].astype(object),
+            "carrier": res.gen_carrier[pos][chosen].astype(object),
+            "CV ($/MWh)": mc[chosen],
+            "dispatch_MW": p[rows, chosen],
+            "pmin_MW": pmin[chosen],
+            "pmax_MW": pmax[rows, chosen],
+            "at_min": at_min[rows, chosen],
+            "at_max": at_max[rows, chosen],
+            "status": status,
+        },
+        index=pd.Index(res.index, name="snapshot"),
+    )
+    # Horas sin generación: solo precio y estado
+    idle = ~has_active
+    if idle.any():
+        out[["at_min", "at_max"]] = out[["at_min", "at_max"]].astype(object)
+        out.loc[idle, ["marginal_generator", "carrier", "at_min", "at_max"]] = None
+        out.loc[idle, ["CV ($/MWh)", "dispatch_MW", "pmin_MW", "pmax_MW"]] = np.nan
+    return out
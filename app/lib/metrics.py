@@ -0,0 +1,47 @@
+"""
+Constantes y métricas compartidas por el motor de despacho (dispatch_model.py)
+y los resultados derivados (post_solve.py): factores de emisión, tecnologías
+renovables variables y la fila de métricas resumen de un escenario.
+"""
+from __future__ import annotations
+
+VRE_CARRIERS = {"solar", "onwind"}  # Variable renewable energy: curtailment-eligible only
+
+# CO₂ emission factors (tCO₂/MWh electrical output, IPCC AR6 median)
+CO2_FACTOR: dict[str, float] = {
+    "gas_ccgt":      0.37,
+    "gas_ocgt":      0.55,
+    "steam_other":   0.85,
+    "diesel_engine": 0.70,
+    "chp":           0.45,
+    "nuclear":       0.012,
+    "hydro":         0.024,
+    "solar":         0.0,
+    "onwind":        0.0,
+    "solar_thermal": 0.0,
+    "geothermal":    0.038,
+    "biogas":        0.0,
+    "biomass":       0.0,
+    "battery":       0.0,
+}
+
+
+def summary_metrics(
+    objective: float,
+    generation_mwh: float,
+    shedding_mwh: float,
+    co2_t: float,
+    renewable_mwh: float,
+    curtailment_mwh: float,
+    avg_price: float,
+) -> dict:
+    """Flat dict of summary metrics (the scenario-comparison row) from horizon totals."""
+    return {
+        "Costo total ($M)":   objective / 1e6,
+        "CO₂ (MtCO₂)":       co2_t / 1e6,
+        "Intensidad (gCO₂/kWh)": co2_t / generation_mwh * 1000 if generation_mwh > 0 else 0.0,
+        "% Renovable":        renewable_mwh / generation_mwh * 100 if generation_mwh > 0 else 0.0,
+        "Curtailment (GWh)":  curtailment_mwh / 1e3,
+        "Shedding (MWh)":     shedding_mwh,
+        "Precio med. ($/MWh)": avg_price,
+    }
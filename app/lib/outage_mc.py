@@ -0,0 +1,392 @@
+"""
+Monte Carlo de salidas forzadas: cientos de estados de disponibilidad
+muestreados, cada uno despachado sobre el mismo horizonte.
+
+`forced_outage` de la receta es un solo derrateo determinista; aquí cada
+central sale o no en cada muestra según su tasa de salida forzada (FOR,
+`FORCED_OUTAGE_RATE` por tecnología). Un estado dura todo el horizonte de
+la muestra (modelo de dos estados por central), así que conviene usar
+horizontes cortos (una semana típica) y muchas muestras.
+
+    stats = run_monte_carlo(load_data, recipe, n_samples=500, workers=4)
+    stats.summary()             # media / desv. / mín / máx por métrica
+    stats.price_quantiles()     # P50 / P90 / P99 del precio horario por sistema
+    stats.lolp()                # probabilidad de corte por hora y sistema
+
+- Las máscaras (muestras × centrales) se muestrean de una vez, vectorizadas
+  y reproducibles con `seed`.
+- Cada proceso del pool arma la red y el modelo linopy una sola vez
+  (`OutageModel`); por muestra solo cambia la cota de despacho de las
+  centrales fuera (RHS de Generator-fix-p-upper/lower, o la cota de la
+  variable) y se vuelve a resolver. HiGHS recibe el problema completo
+  en cada solve.
+- La agregación es incremental (Welford, histogramas y acumulados por hora
+  de tamaño fijo): la memoria no crece con el número de muestras. Las filas
+  por muestra (escalares) se entregan por bloques a `on_chunk` para
+  escribirlas en disco.
+"""
+from __future__ import annotations
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import Callable
+
+import numpy as np
+import pandas as pd
+
+from .dispatch_model import SISTEMAS, DispatchData, create_model, recipe_generators, recipe_network, slice_demand, solve_model
+
+# Tasa de salida forzada por tecnología (fracción del tiempo fuera; EFORd típico)
+FORCED_OUTAGE_RATE: dict[str, float] = {
+    "gas_ccgt":      0.05,
+    "gas_ocgt":      0.08,
+    "steam_other":   0.10,
+    "diesel_engine": 0.10,
+    "chp":           0.06,
+    "nuclear":       0.04,
+    "geothermal":    0.05,
+    "hydro":         0.03,
+    "biogas":        0.08,
+    "biomass":       0.08,
+    "solar_thermal": 0.05,
+    # solar / onwind: su variabilidad ya está en los perfiles
+}
+
+# Muestras por tarea del pool (cada tarea devuelve sus estadísticas parciales)
+CHUNK_SIZE = 8
+
+# Bins lineales del histograma de precios entre 0 y 2 × el costo marginal máximo
+PRICE_BINS = 200
+
+# Umbral (MW) para contar una hora como hora con corte
+SHED_EPS_MW = 1e-3
+
+
+# ── Muestreo ──────────────────────────────────────────────────────────────────
+def outage_rates(carriers: pd.Series, overrides: dict[str, float] | None = None) -> np.ndarray:
+    """FOR de cada generador según su tecnología (0 para VoLL y tecnologías sin tasa)."""
+    rates = {**FORCED_OUTAGE_RATE, **(overrides or {})}
+    out = carriers.map(lambda c: float(rates.get(c, 0.0))).to_numpy(dtype=np.float64)
+    if not ((out >= 0.0) & (out <= 1.0)).all():
+        raise ValueError("Las tasas de salida forzada deben estar entre 0 y 1.")
+    return out
+
+
+def sample_masks(rates: np.ndarray, n_samples: int, seed: int | None = 0) -> np.ndarray:
+    """Disponibilidad muestras × generadores (True = en servicio), en una sola llamada."""
+    rng = np.random.default_rng(seed)
+    return rng.random((int(n_samples), len(rates))) >= rates
+
+
+def mask_bound(values: np.ndarray, axis: int, available: np.ndarray) -> np.ndarray:
+    """Cota de despacho con ceros en las columnas (eje `axis`) de los generadores fuera."""
+    shape = [1] * values.ndim
+    shape[axis] = -1
+    return np.where(available.reshape(shape), values, 0.0)
+
+
+# ── Modelo reutilizable ───────────────────────────────────────────────────────
+class _Bound:
+    """Cota de despacho de los generadores dentro del modelo linopy (RHS de restricción o cota de variable)."""
+
+    def __init__(self, obj, attr: str, gen_names: pd.Index) -> None:
+        self.obj, self.attr = obj, attr
+        self.base = getattr(obj, attr).copy()
+        dim = next(d for d in self.base.dims if d != "snapshot")
+        self.axis = self.base.get_axis_num(dim)
+        self.cols = gen_names.get_indexer(self.base.coords[dim].values)
+
+    def apply(self, available: np.ndarray) -> None:
+        values = self.base.copy(data=mask_bound(self.base.values, self.axis, available[self.cols]))
+        if self.attr == "rhs":
+            self.obj.update(rhs=values)       # restricción: el setter de rhs está deprecado
+        else:
+            setattr(self.obj, self.attr, values)   # cota de variable (upper / lower)
+
+
+def _dispatch_bounds(model, gen_names: pd.Index) -> list[_Bound]:
+    bounds = []
+    for side in ("upper", "lower"):
+        try:
+            bounds.append(_Bound(model.constraints[f"Generator-fix-p-{side}"], "rhs", gen_names))
+        except KeyError:
+            # Versiones de PyPSA que fijan el despacho como cota de la variable
+            bounds.append(_Bound(model.variables["Generator-p"], side, gen_names))
+    return bounds
+
+
+@dataclass
+class SampleOutcome:
+    """Lo que se guarda de un solve: costo, corte y precio por hora × sistema."""
+    objective: float
+    shed: np.ndarray      # snapshot × sistema, MW de VoLL
+    price: np.ndarray     # snapshot × sistema, $/MWh
+    iterations: int | None = None   # iteraciones simplex de HiGHS (None si no las reporta)
+
+
+class OutageModel:
+    """Red y modelo linopy de una receta, armados una vez y resueltos con distintas máscaras."""
+
+    def __init__(self, data: DispatchData, recipe: dict, solver_options: dict | None = None) -> None:
+        self.n = recipe_network(data, recipe)
+        create_model(self.n)
+        self.gen_table = self.n.generators[["bus", "carrier", "p_nom"]]
+        self.gen_names = self.gen_table.index
+        self.solver_options = dict(solver_options or {})
+        self._bounds = _dispatch_bounds(self.n.model, self.gen_names)
+
+    @staticmethod
+    def generators(data: DispatchData, recipe: dict) -> pd.DataFrame:
+        """Lo mismo que `gen_table` sin armar la red (para quien no tiene el modelo a mano)."""
+        return recipe_generators(data, recipe)
+
+    def solve(self, available: np.ndarray, **solve_kwargs) -> SampleOutcome | None:
+        """
+        Resuelve con `available` (orden de `generators`); None si HiGHS no llega al óptimo.
+
+        - solve_kwargs: van a linopy junto con las opciones de HiGHS (p. ej.
+          basis_fn / warmstart_fn para guardar o partir de una base)
+        """
+        for bound in self._bounds:
+            bound.apply(available)
+        status, _ = solve_model(self.n, assign_all_duals=False, **self.solver_options, **solve_kwargs)
+        if status != "ok":
+            return None
+        n = self.n
+        return SampleOutcome(
+            objective=float(n.objective),
+            shed=n.generators_t.p.reindex(columns=[f"VoLL_{s}" for s in SISTEMAS], fill_value=0.0).to_numpy(np.float64),
+            price=n.buses_t.marginal_price.reindex(columns=SISTEMAS, fill_value=0.0).to_numpy(np.float64),
+            iterations=simplex_iterations(n.model),
+        )
+
+
+def simplex_iterations(model) -> int | None:
+    """Iteraciones simplex del último solve de HiGHS (None si linopy no guardó el solver)."""
+    try:
+        return int(model.solver_model.getInfo().simplex_iteration_count)
+    except Exception:
+        return None
+
+
+# ── Agregación incremental ────────────────────────────────────────────────────
+def sample_row(outcome: SampleOutcome) -> dict:
+    """Métricas escalares de una muestra (una fila de samples.csv)."""
+    shed_mwh = outcome.shed.sum(axis=0)
+    row = {
+        "Costo total ($M)": outcome.objective / 1e6,
+        "Energía no servida (MWh)": float(shed_mwh.sum()),
+        "Horas con corte": float((outcome.shed > SHED_EPS_MW).any(axis=1).sum()),
+    }
+    for j, s in enumerate(SISTEMAS):
+        row[f"ENS {s} (MWh)"] = float(shed_mwh[j])
+    for j, s in enumerate(SISTEMAS):
+        row[f"Precio med. {s} ($/MWh)"] = float(outcome.price[:, j].mean()) if len(outcome.price) else 0.0
+    return row
+
+
+def price_edges(recipe: dict, bins: int = PRICE_BINS) -> np.ndarray:
+    """Bordes del histograma de precios: lineal hasta 2 × el costo máximo y un último bin hasta VoLL."""
+    top = 2.0 * max([float(v) for v in recipe["costs"].values()] or [1.0])
+    edges = np.linspace(0.0, top, bins + 1)
+    voll = float(recipe["voll"])
+    return np.append(edges, voll * 1.001) if voll * 1.001 > top else edges
+
+
+class MonteCarloStats:
+    """
+    Estadísticas de tamaño fijo sobre las muestras: Welford por métrica,
+    histograma de precios por sistema y acumulados por hora. `merge`
+    combina las parciales de cada proceso (Chan et al.).
+    """
+
+    def __init__(self, snapshots: pd.DatetimeIndex, edges: np.ndarray) -> None:
+        self.snapshots = snapshots
+        self.edges = np.asarray(edges, dtype=np.float64)
+        self.n = 0
+        self.failed = 0
+        self.samples_with_shed = 0
+        self.columns: list[str] = []
+        self._mean = self._m2 = self._min = self._max = None
+        shape = (len(snapshots), len(SISTEMAS))
+        self._shed_hours = np.zeros(shape, dtype=np.int64)
+        self._price_sum = np.zeros(shape, dtype=np.float64)
+        self._hist = np.zeros((len(SISTEMAS), len(self.edges) - 1), dtype=np.int64)
+
+    def add(self, outcome: SampleOutcome | None) -> dict | None:
+        """Incorpora una muestra y devuelve su fila escalar (None si falló)."""
+        if outcome is None:
+            self.failed += 1
+            return None
+        row = sample_row(outcome)
+        x = np.fromiter(row.values(), dtype=np.float64)
+        if self._mean is None:
+            self.columns = list(row)
+            self._mean, self._m2 = np.zeros_like(x), np.zeros_like(x)
+            self._min, self._max = x.copy(), x.copy()
+        self.n += 1
+        delta = x - self._mean
+        self._mean += delta / self.n
+        self._m2 += delta * (x - self._mean)
+        np.minimum(self._min, x, out=self._min)
+        np.maximum(self._max, x, out=self._max)
+
+        shed = outcome.shed > SHED_EPS_MW
+        self.samples_with_shed += bool(shed.any())
+        self._shed_hours += shed
+        self._price_sum += outcome.price
+        top = np.nextafter(self.edges[-1], 0.0)
+        for j in range(len(SISTEMAS)):
+            self._hist[j] += np.histogram(np.clip(outcome.price[:, j], 0.0, top), bins=self.edges)[0]
+        return row
+
+    def merge(self, other: "MonteCarloStats") -> "MonteCarloStats":
+        """Suma las estadísticas de `other` (mismos snapshots y bordes) a estas."""
+        self.failed += other.failed
+        if other.n:
+            if not self.n:
+                self.columns = list(other.columns)
+                self._mean, self._m2 = other._mean.copy(), other._m2.copy()
+                self._min, self._max = other._min.copy(), other._max.copy()
+            else:
+                n = self.n + other.n
+                delta = other._mean - self._mean
+                self._mean = self._mean + delta * other.n / n
+                self._m2 = self._m2 + other._m2 + delta ** 2 * self.n * other.n / n
+                np.minimum(self._min, other._min, out=self._min)
+                np.maximum(self._max, other._max, out=self._max)
+            self.n += other.n
+        self.samples_with_shed += other.samples_with_shed
+        self._shed_hours += other._shed_hours
+        self._price_sum += other._price_sum
+        self._hist += other._hist
+        return self
+
+    # ── Resultados ────────────────────────────────────────────────────────────
+    def summary(self) -> pd.DataFrame:
+        """Una fila por métrica: media, desviación estándar (muestral), mínimo y máximo."""
+        if not self.n:
+            return pd.DataFrame(columns=["media", "desv", "min", "max"])
+        std = np.sqrt(self._m2 / (self.n - 1)) if self.n > 1 else np.zeros_like(self._m2)
+        return pd.DataFrame(
+            {"media": self._mean, "desv": std, "min": self._min, "max": self._max},
+            index=pd.Index(self.columns, name="métrica"),
+        )
+
+    @property
+    def loss_of_load_probability(self) -> float:
+        """Fracción de muestras con algún corte."""
+        return self.samples_with_shed / self.n if self.n else 0.0
+
+    def lolp(self) -> pd.DataFrame:
+        """Probabilidad de corte por hora (snapshot × sistema)."""
+        return pd.DataFrame(self._shed_hours / max(self.n, 1), index=self.snapshots, columns=SISTEMAS)
+
+    def mean_price(self) -> pd.DataFrame:
+        """Precio esperado por hora (snapshot × sistema)."""
+        return pd.DataFrame(self._price_sum / max(self.n, 1), index=self.snapshots, columns=SISTEMAS)
+
+    def price_quantiles(self, qs: tuple[float, ...] = (0.5, 0.9, 0.99)) -> pd.DataFrame:
+        """Cuantiles del precio horario (todas las horas de todas las muestras), interpolados en el histograma."""
+        out = {}
+        for j, s in enumerate(SISTEMAS):
+            counts = self._hist[j]
+            cum = np.cumsum(counts)
+            row = []
+            for q in qs:
+                if not cum[-1]:
+                    row.append(np.nan)
+                    continue
+                target = q * cum[-1]
+                k = int(np.searchsorted(cum, target))
+                before = cum[k - 1] if k else 0
+                frac = (target - before) / counts[k] if counts[k] else 0.0
+                row.append(self.edges[k] + frac * (self.edges[k + 1] - self.edges[k]))
+            out[s] = row
+        return pd.DataFrame.from_dict(out, orient="index", columns=[f"P{round(q * 100):g}" for q in qs])
+
+
+# ── Ejecución ─────────────────────────────────────────────────────────────────
+_WORKER_MODEL: OutageModel | None = None
+
+
+def _init_worker(
+    load_data: Callable[[], DispatchData],
+    recipe: dict,
+    model_factory: Callable[..., OutageModel],
+    solver_options: dict | None,
+) -> None:
+    global _WORKER_MODEL
+    _WORKER_MODEL = model_factory(load_data(), recipe, solver_options)
+
+
+def run_chunk(
+    model: OutageModel,
+    start: int,
+    masks: np.ndarray,
+    snapshots: pd.DatetimeIndex,
+    edges: np.ndarray,
+) -> tuple[MonteCarloStats, list[dict]]:
+    """Resuelve un bloque de muestras → (estadísticas parciales, filas escalares)."""
+    stats = MonteCarloStats(snapshots, edges)
+    rows = []
+    for i, available in enumerate(masks, start=start):
+        row = stats.add(model.solve(available))
+        rows.append({"sample": i, "ok": row is not None, "out": int((~available).sum()), **(row or {})})
+    return stats, rows
+
+
+def _chunk_in_worker(start: int, masks: np.ndarray, snapshots: pd.DatetimeIndex, edges: np.ndarray):
+    return run_chunk(_WORKER_MODEL, start, masks, snapshots, edges)
+
+
+def run_monte_carlo(
+    load_data: Callable[[], DispatchData],
+    recipe: dict,
+    n_samples: int,
+    rates: dict[str, float] | None = None,
+    seed: int | None = 0,
+    workers: int = 1,
+    chunk_size: int = CHUNK_SIZE,
+    solver_options: dict | None = None,
+    on_chunk: Callable[[list[dict], MonteCarloStats], None] | None = None,
+    model_factory: Callable[..., OutageModel] = OutageModel,
+) -> MonteCarloStats:
+    """
+    Muestrea `n_samples` estados de salida forzada y los resuelve sobre `recipe`.
+
+    - load_data: como en sweep.run_sweep; además corre una vez en este proceso
+    - rates: FOR por tecnología que reemplazan a FORCED_OUTAGE_RATE
+    - workers: procesos; con 1 todo corre en el proceso actual
+    - on_chunk(filas, acumulado): se llama al terminar cada bloque, en el
+      orden en que terminan
+    """
+    data = load_data()
+    # En serie el modelo se arma acá y ya trae la tabla; con pool se arma en cada proceso
+    model = model_factory(data, recipe, solver_options) if workers <= 1 else None
+    gens = model.gen_table if model is not None else model_factory.generators(data, recipe)
+    masks = sample_masks(outage_rates(gens["carrier"], rates), n_samples, seed)
+    snapshots = slice_demand(data.demand, recipe.get("start"), recipe.get("end")).index
+    edges = price_edges(recipe)
+    total = MonteCarloStats(snapshots, edges)
+    chunk_size = max(int(chunk_size), 1)
+    starts = range(0, len(masks), chunk_size)
+
+    def _take(part: MonteCarloStats, rows: list[dict]) -> None:
+        total.merge(part)
+        if on_chunk is not None:
+            on_chunk(rows, total)
+
+    if model is not None:
+        for s in starts:
+            _take(*run_chunk(model, s, masks[s:s + chunk_size], snapshots, edges))
+        return total
+    del data
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=_init_worker,
+        initargs=(load_data, recipe, model_factory, solver_options),
+    ) as pool:
+        futures = [pool.submit(_chunk_in_worker, s, masks[s:s + chunk_size], snapshots, edges) for s in starts]
+        for fut in as_completed(futures):
+            _take(*fut.result())
+    return total
@@ -0,0 +1,275 @@
+"""
+Barridos paramétricos de un escalar sobre un solo modelo.
+
+Estudios como "VoLL de 1 000 a 20 000" o "demanda × 0.8–1.3" antes eran un
+`build_and_solve` completo por punto. Aquí la red y el modelo linopy se
+arman una vez y cada punto de la rejilla solo cambia los coeficientes que
+el parámetro toca; cada solve parte de la base óptima del punto anterior
+(basis_fn → warmstart_fn), así que una rejilla monótona avanza con pocas
+iteraciones de simplex por punto.
+
+    curves = parametric_sweep(data, recipe, "voll", np.linspace(1_000, 20_000, 50))
+
+Parámetros (`PARAMETERS`):
+
+- voll               $/MWh de los generadores VoLL (coeficientes del objetivo)
+- co2_price          $/tCO₂ sumado al costo marginal con CO2_FACTOR (objetivo)
+- cost.<carrier>     costo marginal de una tecnología, $/MWh (objetivo)
+- demand_mult        multiplicador de la demanda de todos los sistemas, sobre
+                     la de la receta (RHS de cada balance nodal)
+- demand_mult.<BUS>  lo mismo para un solo sistema
+
+El resultado es una tabla "larga" (parámetro, valor, métrica, sistema, y):
+las métricas de extract_metrics con sistema "total", más corte y precio
+medio por sistema.
+"""
+from __future__ import annotations
+
+import tempfile
+import time
+from fnmatch import fnmatchcase
+from pathlib import Path
+from typing import Callable
+
+import numpy as np
+import pandas as pd
+
+from .dispatch_model import (
+    CARRIER_ALIAS,
+    SISTEMAS,
+    DispatchData,
+    create_model,
+    extract_metrics,
+    recipe_network,
+    slice_demand,
+    solve_model,
+)
+from .dispatch_result import DispatchResult
+from .metrics import CO2_FACTOR
+from .perf import PerfRecorder, maybe_span
+from .post_solve import derive_results
+
+PARAMETERS = ("voll", "co2_price", "cost.<carrier>", "demand_mult", "demand_mult.<BUS>")
+
+COLUMNS = ["parámetro", "valor", "métrica", "sistema", "y"]
+
+# Balances nodales del modelo. PyPSA 1.x separa los buses con más de 100
+# componentes en su propia restricción ("Bus-meshed-100-nodal_balance")
+NODAL_BALANCE = "Bus-*nodal_balance"
+
+
+def parse_parameter(name: str) -> tuple[str, str | None]:
+    """("voll" | "co2_price" | "cost" | "demand_mult", destino) o ValueError."""
+    kind, _, target = name.partition(".")
+    if kind in ("voll", "co2_price") and not target:
+        return kind, None
+    if kind == "cost" and target:
+        return kind, CARRIER_ALIAS.get(target, target)
+    if kind == "demand_mult" and (not target or target in SISTEMAS):
+        return kind, target or None
+    raise ValueError(f"Parámetro desconocido {name!r}. Opciones: {', '.join(PARAMETERS)}")
+
+
+# ── Coeficientes del modelo ───────────────────────────────────────────────────
+def objective_terms(term_vars: np.ndarray, labels: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Términos del objetivo que son despacho de generadores → (término, snapshot, generador).
+
+    - term_vars: etiqueta de variable de cada término del objetivo
+    - labels: etiquetas de Generator-p, snapshot × generador (-1 = sin variable)
+    """
+    flat = labels.ravel()
+    valid = np.flatnonzero(flat >= 0)
+    pos = pd.Index(flat[valid]).get_indexer(term_vars)
+    terms = np.flatnonzero(pos >= 0)
+    cell = valid[pos[terms]]
+    return terms, cell // labels.shape[1], cell % labels.shape[1]
+
+
+def scale_axis(values: np.ndarray, axis: int, factors: np.ndarray) -> np.ndarray:
+    """`values` multiplicado por `factors` a lo largo del eje `axis`."""
+    shape = [1] * values.ndim
+    shape[axis] = -1
+    return values * factors.reshape(shape)
+
+
+class _CostTerms:
+    """Coeficientes de p de los generadores en el objetivo: peso(snapshot) × costo(generador)."""
+
+    def __init__(self, model, weights: np.ndarray, gen_names: pd.Index) -> None:
+        self.expr = getattr(model.objective, "expression", model.objective)
+        self.base = self.expr.coeffs.values.copy()
+        labels = model.variables["Generator-p"].labels.transpose("snapshot", ...)
+        gdim = labels.dims[1]
+        gcols = gen_names.get_indexer(labels.coords[gdim].values)
+        self.terms, self.t, g = objective_terms(self.expr.vars.values.ravel(), labels.values)
+        self.g = gcols[g]
+        self.weights = weights
+
+    def apply(self, model, delta_cost: np.ndarray) -> None:
+        coeffs = self.base.ravel().copy()
+        coeffs[self.terms] += self.weights[self.t] * delta_cost[self.g]
+        data = self.expr.data.assign(coeffs=self.expr.coeffs.copy(data=coeffs.reshape(self.base.shape)))
+        model.add_objective(type(self.expr)(data, model), overwrite=True)
+
+
+class _BusRhs:
+    """RHS de un balance nodal (la demanda de cada bus), escalable por sistema."""
+
+    def __init__(self, con) -> None:
+        self.con = con
+        self.base = con.rhs.copy()
+        dim = next(d for d in self.base.dims if d != "snapshot")
+        self.axis = self.base.get_axis_num(dim)
+        self.cols = pd.Index(SISTEMAS).get_indexer(self.base.coords[dim].values)
+
+    @classmethod
+    def all(cls, model) -> list["_BusRhs"]:
+        """Uno por cada restricción NODAL_BALANCE del modelo (KeyError si no hay ninguna)."""
+        names = [name for name in model.constraints if fnmatchcase(name, NODAL_BALANCE)]
+        if not names:
+            raise KeyError(f"El modelo no tiene restricciones {NODAL_BALANCE!r}")
+        return [cls(model.constraints[name]) for name in names]
+
+    def apply(self, mult: np.ndarray) -> None:
+        factors = np.where(self.cols >= 0, mult[self.cols], 1.0)
+        self.con.update(rhs=self.base.copy(data=scale_axis(self.base.values, self.axis, factors)))
+
+
+class ParametricModel:
+    """Red y modelo linopy de una receta, armados una vez y resueltos punto a punto."""
+
+    def __init__(self, data: DispatchData, recipe: dict, solver_options: dict | None = None) -> None:
+        self.recipe = recipe
+        self.dem = slice_demand(data.demand, recipe.get("start"), recipe.get("end"))
+        self.n = recipe_network(data, recipe, self.dem)
+        create_model(self.n)
+        self.solver_options = dict(solver_options or {})
+        gens = self.n.generators
+        self.base_cost = gens["marginal_cost"].to_numpy(dtype=np.float64).copy()
+        self.is_voll = gens["carrier"].eq("shedding").to_numpy()
+        self.carriers = gens["carrier"].to_numpy(dtype=str)
+        self.co2 = gens["carrier"].map(lambda c: CO2_FACTOR.get(c, 0.0)).to_numpy(dtype=np.float64)
+        self.base_load = self.n.loads_t.p_set.copy()
+        self.load_bus = self.n.loads["bus"]
+        weights = self.n.snapshot_weightings["objective"].reindex(self.n.snapshots).to_numpy(dtype=np.float64)
+        self._costs = _CostTerms(self.n.model, weights, gens.index)
+        self._rhs = _BusRhs.all(self.n.model)
+
+    def cost_vector(self, kind: str, target: str | None, value: float) -> np.ndarray:
+        cost = self.base_cost.copy()
+        if kind == "voll":
+            cost[self.is_voll] = value
+        elif kind == "co2_price":
+            cost += value * self.co2
+        else:
+            cost[self.carriers == target] = value
+        return cost
+
+    def solve_point(self, name: str, value: float, **solve_kwargs) -> DispatchResult | None:
+        """
+        Resuelve con `name` = `value` (el resto como en la receta); None si
+        HiGHS no llega al óptimo.
+
+        - solve_kwargs: van a linopy (basis_fn / warmstart_fn)
+        """
+        kind, target = parse_parameter(name)
+        dem = self.dem
+        if kind == "demand_mult":
+            mult = np.array([value if target in (None, s) else 1.0 for s in SISTEMAS])
+            for rhs in self._rhs:
+                rhs.apply(mult)
+            by_bus = dict(zip(SISTEMAS, mult))
+            self.n.loads_t.p_set = self.base_load * self.load_bus.map(by_bus).reindex(self.base_load.columns).to_numpy()
+            dem = self.dem * [by_bus.get(c, 1.0) for c in self.dem.columns]
+        else:
+            cost = self.cost_vector(kind, target, float(value))
+            self._costs.apply(self.n.model, cost - self.base_cost)
+            self.n.generators["marginal_cost"] = cost
+
+        status, _ = solve_model(self.n, assign_all_duals=False, **self.solver_options, **solve_kwargs)
+        if status != "ok":
+            return None
+        res = DispatchResult.from_network(self.n, demand=dem, meta={"scenario": self.recipe.get("scenario"), name: value})
+        voll = float(value) if kind == "voll" else self.recipe["voll"]
+        return derive_results(res, voll=voll)
+
+
+# ── Barrido ───────────────────────────────────────────────────────────────────
+def point_rows(name: str, value: float, res: DispatchResult) -> list[dict]:
+    """Filas largas de un punto: métricas totales y corte / precio por sistema."""
+    rows = [
+        {"parámetro": name, "valor": value, "métrica": metric, "sistema": "total", "y": y}
+        for metric, y in extract_metrics(res).items()
+    ]
+    for bus, stats in res.meta["kpis"]["by_bus"].items():
+        rows.append({"parámetro": name, "valor": value, "métrica": "Shedding (MWh)", "sistema": bus,
+                     "y": stats["shedding_mwh"]})
+        if "price_mean" in stats:
+            rows.append({"parámetro": name, "valor": value, "métrica": "Precio med. ($/MWh)", "sistema": bus,
+                         "y": stats["price_mean"]})
+    return rows
+
+
+def parametric_sweep(
+    data: DispatchData,
+    recipe: dict,
+    name: str,
+    values,
+    solver_options: dict | None = None,
+    warm_start: bool = True,
+    perf: PerfRecorder | None = None,
+    progress: Callable[[int, int], None] | None = None,
+    should_stop: Callable[[], bool] | None = None,
+    model_factory: Callable[..., ParametricModel] = ParametricModel,
+) -> pd.DataFrame:
+    """
+    Recorre `values` de `name` (en el orden dado) sobre un solo modelo → curvas largas.
+
+    - warm_start: cada punto parte de la base óptima del anterior
+    - progress(hechos, total) tras cada punto; should_stop() antes de cada uno
+      (se devuelven los puntos ya resueltos)
+
+    Los puntos sin óptimo quedan fuera de las curvas y se listan en
+    `curves.attrs["failed"]`; `curves.attrs["wall_s"]` tiene el tiempo por punto.
+    """
+    parse_parameter(name)
+    values = [float(v) for v in values]
+    with maybe_span(perf, "modelo paramétrico"):
+        model = model_factory(data, recipe, solver_options)
+
+    rows: list[dict] = []
+    failed: list[float] = []
+    wall: dict[float, float] = {}
+    with tempfile.TemporaryDirectory(prefix="parametric_") as tmp:
+        previous: Path | None = None
+        for k, value in enumerate(values):
+            if should_stop is not None and should_stop():
+                break
+            kwargs = {}
+            basis = Path(tmp) / f"punto_{k % 2}.bas"
+            if warm_start:
+                kwargs["basis_fn"] = str(basis)
+                if previous is not None and previous.exists():
+                    kwargs["warmstart_fn"] = str(previous)
+            t0 = time.perf_counter()
+            with maybe_span(perf, f"{name}={value:g}"):
+                res = model.solve_point(name, value, **kwargs)
+            wall[value] = round(time.perf_counter() - t0, 3)
+            if res is None:
+                failed.append(value)
+            else:
+                rows.extend(point_rows(name, value, res))
+                previous = basis
+            if progress is not None:
+                progress(k + 1, len(values))
+
+    curves = pd.DataFrame(rows, columns=COLUMNS)
+    curves.attrs.update(failed=failed, wall_s=wall)
+    return curves
+
+
+def wide(curves: pd.DataFrame, sistema: str = "total") -> pd.DataFrame:
+    """Curvas de un sistema en formato ancho: valor × métrica."""
+    part = curves[curves["sistema"] == sistema]
+    return part.pivot(index="valor", columns="métrica", values="y")
@@ -0,0 +1,186 @@
+from __future__ import annotations
+
+import json
+import sys
+import time
+import tracemalloc
+import uuid
+from contextlib import contextmanager, nullcontext
+from dataclasses import asdict, dataclass, field
+from typing import IO, Iterator
+
+import pandas as pd
+
+try:
+    import resource
+except ImportError:  # Windows: sin getrusage ni /proc, las métricas de RSS quedan en None
+    resource = None
+
+
+def _rss_mb() -> float | None:
+    """RSS actual en MB (Linux: /proc/self/statm); None si no está disponible."""
+    if resource is None:
+        return None
+    try:
+        with open("/proc/self/statm") as fh:
+            pages = int(fh.read().split()[1])
+        return pages * resource.getpagesize() / 1024**2
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _peak_rss_mb() -> float | None:
+    """Pico de RSS del proceso (ru_maxrss: KB en Linux, bytes en macOS); None sin `resource`."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024**2 if sys.platform == "darwin" else peak / 1024
+
+
+def lp_size(model) -> dict[str, int]:
+    """
+    Tamaño del LP de linopy: filas (restricciones), columnas (variables) y
+    no-ceros de la matriz A. Los no-ceros se cuentan sobre los arreglos de
+    variables de cada restricción, sin ensamblar la matriz dispersa.
+    """
+    out = {"rows": int(model.ncons), "cols": int(model.nvars)}
+    try:
+        out["nnz"] = int(sum((c.vars.values != -1).sum() for _, c in model.constraints.items()))
+    except Exception:
+        pass
+    return out
+
+
+@dataclass
+class Span:
+    name: str
+    wall_s: float = 0.0
+    rss_mb: float | None = None        # RSS al cerrar el span
+    rss_delta_mb: float | None = None  # RSS al cerrar − RSS al abrir
+    peak_rss_mb: float | None = None   # pico del proceso (ru_maxrss) al cerrar
+    py_peak_mb: float | None = None    # pico de asignaciones Python (solo con tracemalloc)
+    depth: int = 0
+    extra: dict = field(default_factory=dict)
+
+    # Internos (no se serializan)
+    _t0: float = field(default=0.0, repr=False)
+    _rss0: float | None = field(default=None, repr=False)
+    _traced0: int = field(default=0, repr=False)
+    _traced_peak: int = field(default=0, repr=False)
+
+    def record(self, **values) -> None:
+        """Adjunta valores extra (p. ej. tamaño del LP) al span."""
+        self.extra.update(values)
+
+    def to_dict(self) -> dict:
+        d = {k: v for k, v in asdict(self).items() if not k.startswith("_")}
+        d.update(d.pop("extra"))
+        return d
+
+
+class PerfRecorder:
+    """
+    Registra spans con tiempo de pared, memoria y datos extra (tamaño del LP).
+
+        perf = PerfRecorder()
+        with perf.span("build"):
+            n = build_network(...)
+        with perf.span("model") as sp:
+            create_model(n)
+            sp.record(**lp_size(n.model))
+
+    - trace_python: activa tracemalloc para medir el pico de asignaciones de
+      cada span (más preciso que ru_maxrss, pero con costo de ~10-30 %)
+    - stream: si se da (p. ej. sys.stderr), escribe una línea JSON por span
+      cerrado; así lo usan los scripts headless
+    """
+
+    def __init__(
+        self,
+        run_id: str | None = None,
+        trace_python: bool = False,
+        stream: IO[str] | None = None,
+    ) -> None:
+        self.run_id = run_id or uuid.uuid4().hex[:8]
+        self.trace_python = trace_python
+        self.stream = stream
+        self.spans: list[Span] = []
+        self._open: list[Span] = []
+        self._started_tracing = False
+
+    # ── Spans ─────────────────────────────────────────────────────────────────
+    def start(self, name: str, **extra) -> Span:
+        if self.trace_python and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        sp = Span(name=name, depth=len(self._open), extra=dict(extra))
+        if self.trace_python:
+            cur, peak = tracemalloc.get_traced_memory()
+            # El pico se reinicia por span; los spans abiertos conservan el suyo
+            for parent in self._open:
+                parent._traced_peak = max(parent._traced_peak, peak)
+            tracemalloc.reset_peak()
+            sp._traced0 = sp._traced_peak = cur
+        sp._rss0 = _rss_mb()
+        sp._t0 = time.perf_counter()
+        self._open.append(sp)
+        return sp
+
+    def stop(self, sp: Span) -> Span:
+        sp.wall_s = round(time.perf_counter() - sp._t0, 4)
+        rss = _rss_mb()
+        sp.rss_mb = round(rss, 1) if rss is not None else None
+        if rss is not None and sp._rss0 is not None:
+            sp.rss_delta_mb = round(rss - sp._rss0, 1)
+        peak = _peak_rss_mb()
+        sp.peak_rss_mb = round(peak, 1) if peak is not None else None
+        if self.trace_python and tracemalloc.is_tracing():
+            _, peak = tracemalloc.get_traced_memory()
+            sp._traced_peak = max(sp._traced_peak, peak)
+            sp.py_peak_mb = round((sp._traced_peak - sp._traced0) / 1024**2, 1)
+            for parent in self._open:
+                if parent is not sp:
+                    parent._traced_peak = max(parent._traced_peak, sp._traced_peak)
+        if sp in self._open:
+            self._open.remove(sp)
+        self.spans.append(sp)
+        if self.stream is not None:
+            self._emit(sp)
+        if self._started_tracing and not self._open:
+            tracemalloc.stop()
+            self._started_tracing = False
+        return sp
+
+    @contextmanager
+    def span(self, name: str, **extra) -> Iterator[Span]:
+        sp = self.start(name, **extra)
+        try:
+            yield sp
+        except BaseException as exc:
+            sp.record(error=type(exc).__name__)
+            raise
+        finally:
+            self.stop(sp)
+
+    # ── Salidas ───────────────────────────────────────────────────────────────
+    def _emit(self, sp: Span) -> None:
+        line = {"event": "perf_span", "run": self.run_id, **sp.to_dict()}
+        self.stream.write(json.dumps(line, ensure_ascii=False, default=str) + "\n")
+        self.stream.flush()
+
+    def to_frame(self) -> pd.DataFrame:
+        """Spans en orden de apertura (los anidados llevan sangría en `fase`)."""
+        if not self.spans:
+            return pd.DataFrame(columns=["fase", "wall_s"])
+        rows = sorted(self.spans, key=lambda s: s._t0)
+        df = pd.DataFrame([s.to_dict() for s in rows])
+        df.insert(0, "fase", ["  " * s.depth + s.name for s in rows])
+        return df.drop(columns=["name", "depth"])
+
+    def total_s(self) -> float:
+        return round(sum(s.wall_s for s in self.spans if s.depth == 0), 4)
+
+
+def maybe_span(perf: PerfRecorder | None, name: str, **extra):
+    """`perf.span(name)` si hay registrador; contexto nulo si no."""
+    return perf.span(name, **extra) if perf is not None else nullcontext()
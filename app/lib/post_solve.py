@@ -0,0 +1,309 @@
+"""
+Índice post-solve: códigos enteros y vectores alineados a las columnas del despacho.
+
+Todas las agregaciones de resultados (por bus, por tecnología, CO₂, costo,
+curtailment) se reducen a `np.bincount` o a un producto matricial contra
+una matriz indicadora generador × tecnología, en lugar de búsquedas `.loc`
+generador por generador:
+
+    idx = PostSolveIndex.from_result(res)
+    mwh = idx.energy(res)                        # (G,) MWh por generador
+    idx.sum_by_carrier(mwh, idx.on_bus("SIN"))   # Serie por tecnología
+    cols = np.flatnonzero(idx.on_bus("SIN") & ~idx.is_voll)
+    idx.carrier_series(res.gen_p[:, cols], cols)  # (T, tecnologías)
+
+`derive_results(res)` es la etapa que corre una vez después de cada solve:
+materializa dentro del resultado las tablas y series que leen los paneles
+(energía por bus × tecnología, despacho y curtailment por tecnología, curvas
+de duración) y los KPIs escalares (`res.meta["kpis"]`). `DerivedResults`
+las expone como objetos pandas sin recalcular nada:
+
+    derive_results(res, voll=recipe["voll"])
+    view = DerivedResults(res)
+    view.kpis["shedding_mwh"], view.mix("SIN"), view.price_duration("BCA")
+"""
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+from .dispatch_result import DispatchResult
+from .metrics import CO2_FACTOR, VRE_CARRIERS, summary_metrics
+
+# Tecnologías que cuentan como generación renovable / libre de fósiles en las métricas
+RENEWABLE_CARRIERS = {"solar", "onwind", "hydro", "geothermal", "solar_thermal", "biogas", "biomass", "nuclear"}
+
+# Columnas de curtailment / despacho por debajo de esto (MWh en el horizonte) no se guardan
+MIN_SERIES_MWH = 0.1
+
+
+class PostSolveIndex:
+    """Metadatos de generadores codificados una vez por resultado."""
+
+    __slots__ = (
+        "gen_names",
+        "bus_labels", "bus_codes",          # (B,) etiquetas, (G,) int
+        "carrier_labels", "carrier_codes",  # (C,) etiquetas, (G,) int
+        "is_voll", "is_vre", "is_renewable",
+        "co2_factor",                       # (G,) tCO₂/MWh
+        "marginal_cost",                    # (G,) $/MWh
+        "p_nom",                            # (G,) MW
+    )
+
+    def __init__(self, **fields) -> None:
+        for name in self.__slots__:
+            setattr(self, name, fields[name])
+
+    @classmethod
+    def from_result(cls, res: DispatchResult) -> "PostSolveIndex":
+        bus_labels, bus_codes = np.unique(res.gen_bus, return_inverse=True)
+        carrier_labels, carrier_codes = np.unique(res.gen_carrier, return_inverse=True)
+        co2_by_carrier = np.array([CO2_FACTOR.get(c, 0.0) for c in carrier_labels])
+        return cls(
+            gen_names=res.gen_names,
+            bus_labels=bus_labels,
+            bus_codes=bus_codes.astype(np.int32),
+            carrier_labels=carrier_labels,
+            carrier_codes=carrier_codes.astype(np.int32),
+            is_voll=np.char.startswith(res.gen_names, "VoLL_"),
+            is_vre=np.isin(res.gen_carrier, list(VRE_CARRIERS)),
+            is_renewable=np.isin(res.gen_carrier, list(RENEWABLE_CARRIERS)),
+            co2_factor=co2_by_carrier[carrier_codes],
+            marginal_cost=res.gen_marginal_cost.astype(float),
+            p_nom=res.gen_p_nom.astype(float),
+        )
+
+    # ── Máscaras ──────────────────────────────────────────────────────────────
+    def on_bus(self, bus: str) -> np.ndarray:
+        """bool (G,) — generadores del bus (todos False si el bus no existe)."""
+        code = np.flatnonzero(self.bus_labels == bus)
+        return self.bus_codes == code[0] if code.size else np.zeros(len(self.gen_names), dtype=bool)
+
+    # ── Agregaciones ──────────────────────────────────────────────────────────
+    @staticmethod
+    def energy(res: DispatchResult) -> np.ndarray:
+        """MWh por generador en el horizonte (acumulado en float64)."""
+        return res.gen_p.sum(axis=0, dtype=np.float64)
+
+    def sum_by_carrier(self, values: np.ndarray, mask: np.ndarray | None = None) -> pd.Series:
+        """Suma (G,) → Serie por tecnología (solo tecnologías presentes en `mask`)."""
+        codes = self.carrier_codes if mask is None else self.carrier_codes[mask]
+        vals = values if mask is None else values[mask]
+        totals = np.bincount(codes, weights=vals, minlength=len(self.carrier_labels))
+        present = np.bincount(codes, minlength=len(self.carrier_labels)) > 0
+        return pd.Series(totals[present], index=self.carrier_labels[present].astype(object), name="carrier")
+
+    def sum_by_bus(self, values: np.ndarray, mask: np.ndarray | None = None) -> pd.Series:
+        """Suma (G,) → Serie por bus."""
+        codes = self.bus_codes if mask is None else self.bus_codes[mask]
+        vals = values if mask is None else values[mask]
+        totals = np.bincount(codes, weights=vals, minlength=len(self.bus_labels))
+        return pd.Series(totals, index=self.bus_labels.astype(object), name="bus")
+
+    def sum_by_bus_carrier(self, values: np.ndarray, mask: np.ndarray | None = None) -> pd.DataFrame:
+        """Suma (G,) → tabla bus × tecnología."""
+        keep = np.ones(len(self.gen_names), dtype=bool) if mask is None else mask
+        flat = self.bus_codes[keep] * len(self.carrier_labels) + self.carrier_codes[keep]
+        totals = np.bincount(flat, weights=values[keep], minlength=len(self.bus_labels) * len(self.carrier_labels))
+        return pd.DataFrame(
+            totals.reshape(len(self.bus_labels), len(self.carrier_labels)),
+            index=self.bus_labels.astype(object), columns=self.carrier_labels.astype(object),
+        )
+
+    def carrier_series(self, values: np.ndarray, cols: np.ndarray, index=None) -> pd.DataFrame:
+        """
+        (T, k) con las columnas de los generadores `cols` → (T, tecnologías),
+        con un producto contra la indicadora generador × tecnología.
+        """
+        used, local = np.unique(self.carrier_codes[cols], return_inverse=True)
+        onehot = np.zeros((len(cols), used.size), dtype=values.dtype)
+        onehot[np.arange(len(cols)), local] = 1.0
+        return pd.DataFrame(values @ onehot, index=index, columns=self.carrier_labels[used].astype(object))
+
+    # ── Curtailment ───────────────────────────────────────────────────────────
+    def vre_positions(self, mask: np.ndarray | None = None) -> np.ndarray:
+        """Posiciones de las renovables variables (dentro de `mask`, si se da)."""
+        return np.flatnonzero(self.is_vre if mask is None else (self.is_vre & mask))
+
+    def curtailment(self, res: DispatchResult, cols: np.ndarray) -> np.ndarray:
+        """(T, len(cols)) MW disponibles no despachados de los generadores `cols` (≥ 0)."""
+        if len(cols) == 0:
+            return np.zeros((len(res.snapshots), 0), dtype=np.float32)
+        avail = res.p_max_pu(self.gen_names[cols]).to_numpy() * res.gen_p_nom[cols]
+        return np.clip(avail - res.gen_p[:, cols], 0, None)
+
+
+# ── Resultados derivados ──────────────────────────────────────────────────────
+def _buses(res: DispatchResult, idx: PostSolveIndex) -> list[str]:
+    """Buses con precio, generadores o cargas, en el orden de `res.bus_names`."""
+    seen = dict.fromkeys(str(b) for b in res.bus_names)
+    seen.update(dict.fromkeys(str(b) for b in idx.bus_labels))
+    seen.update(dict.fromkeys(str(b) for b in res.load_buses))
+    return list(seen)
+
+
+def derive_results(res: DispatchResult, voll: float | None = None) -> DispatchResult:
+    """
+    Calcula una vez los resultados derivados y los guarda en `res`.
+
+    - voll: precio de escasez para "% horas ≥ VoLL" si el resultado no trae
+      generadores VoLL_
+
+    Llena `res.derived` (arreglos) y `res.meta["kpis"]` (escalares, JSON).
+    Devuelve el mismo `res` para encadenar tras `from_network`.
+    """
+    idx = PostSolveIndex.from_result(res)
+    gen_mwh = idx.energy(res)
+    served = ~idx.is_voll
+    T = len(res.snapshots)
+
+    derived: dict[str, np.ndarray] = {
+        "gen_mwh": gen_mwh,
+        "carriers": idx.carrier_labels.astype(str),
+        "mix_buses": idx.bus_labels.astype(str),
+        "mix": idx.sum_by_bus_carrier(gen_mwh, served).to_numpy(),
+    }
+
+    voll_cost = idx.marginal_cost[idx.is_voll]
+    voll_price = float(voll_cost.max()) if voll_cost.size else voll
+    load_by_bus = pd.DataFrame(res.load, columns=res.load_buses).T.groupby(level=0).sum().T
+    by_bus: dict[str, dict] = {}
+    curt_total = 0.0
+    for bus in _buses(res, idx):
+        on_bus = idx.on_bus(bus)
+
+        # Despacho por tecnología (+ shedding) para el área apilada
+        cols = np.flatnonzero(on_bus & served)
+        disp = idx.carrier_series(res.gen_p[:, cols], cols)
+        shed_cols = np.flatnonzero(on_bus & idx.is_voll)
+        shed = res.gen_p[:, shed_cols].sum(axis=1)
+        shed_mwh = float(gen_mwh[shed_cols].sum())
+        if shed_mwh > MIN_SERIES_MWH:
+            disp["shedding"] = shed
+        derived[f"disp/{bus}"] = disp.to_numpy(dtype=np.float32)
+        derived[f"disp_cols/{bus}"] = disp.columns.to_numpy(dtype=str)
+
+        # Curtailment de renovables variables por tecnología
+        vre = idx.vre_positions(on_bus)
+        curt = idx.curtailment(res, vre)
+        curt_mwh = curt.sum(axis=0, dtype=np.float64)
+        curt_total += float(curt_mwh.sum())
+        keep = curt_mwh > MIN_SERIES_MWH
+        curt_c = idx.carrier_series(curt[:, keep], vre[keep])
+        derived[f"curt/{bus}"] = curt_c.to_numpy(dtype=np.float32)
+        derived[f"curt_cols/{bus}"] = curt_c.columns.to_numpy(dtype=str)
+
+        stats = {
+            "shedding_mwh": shed_mwh,
+            "curtailment_mwh": float(curt_mwh.sum()),
+            "capacity_mw": float(idx.p_nom[on_bus & served].sum()),
+            "peak_load_mw": 0.0,
+        }
+        # Curvas de duración (precio y carga, de mayor a menor) y estadísticas de precio
+        price_pos = np.flatnonzero(res.bus_names == bus)
+        if price_pos.size and T:
+            sp = res.price[:, price_pos[0]]
+            derived[f"pdc/{bus}"] = np.sort(sp)[::-1].copy()
+            stats.update(
+                price_mean=float(sp.mean(dtype=np.float64)),
+                price_max=float(sp.max()),
+                price_pct_zero=float((sp == 0).mean() * 100),
+                price_pct_voll=(
+                    float((sp >= voll_price * 0.99).mean() * 100) if voll_price is not None else None
+                ),
+            )
+        if bus in load_by_bus.columns and T:
+            load = load_by_bus[bus].to_numpy(dtype=np.float32)
+            derived[f"ldc/{bus}"] = np.sort(load)[::-1].copy()
+            stats["peak_load_mw"] = float(load.max())
+        by_bus[bus] = stats
+
+    generation = float(gen_mwh[served].sum())
+    shedding = float(gen_mwh[idx.is_voll].sum())
+    co2 = float(gen_mwh[served] @ idx.co2_factor[served])
+    avg_price = float(res.price.mean(dtype=np.float64)) if res.price.size else 0.0
+    res.derived = derived
+    res.meta["kpis"] = {
+        "generation_mwh": generation,
+        "shedding_mwh": shedding,
+        "curtailment_mwh": curt_total,
+        "co2_t": co2,
+        "voll_price": voll_price,
+        "by_bus": by_bus,
+        "metrics": summary_metrics(
+            objective=res.objective,
+            generation_mwh=generation,
+            shedding_mwh=shedding,
+            co2_t=co2,
+            renewable_mwh=float(gen_mwh[served & idx.is_renewable].sum()),
+            curtailment_mwh=curt_total,
+            avg_price=avg_price,
+        ),
+    }
+    return res
+
+
+class DerivedResults:
+    """Vista pandas de los resultados derivados de un `DispatchResult` (sin recalcular)."""
+
+    __slots__ = ("res",)
+
+    def __init__(self, res: DispatchResult, voll: float | None = None) -> None:
+        if not res.derived or "kpis" not in res.meta:
+            derive_results(res, voll=voll)     # resultados guardados antes de esta etapa
+        self.res = res
+
+    @property
+    def kpis(self) -> dict:
+        return self.res.meta["kpis"]
+
+    def bus(self, bus: str) -> dict:
+        """KPIs de un bus ({} si no existe)."""
+        return self.kpis["by_bus"].get(bus, {})
+
+    def energy(self) -> pd.Series:
+        """MWh por generador (incluye VoLL_)."""
+        return pd.Series(self.res.derived["gen_mwh"], index=self.res.gen_names)
+
+    def _present(self, gens: np.ndarray) -> np.ndarray:
+        """bool (C,) — tecnologías con algún generador (no VoLL_) en la máscara `gens`."""
+        served = gens & ~np.char.startswith(self.res.gen_names, "VoLL_")
+        return np.isin(self.res.derived["carriers"], self.res.gen_carrier[served])
+
+    def mix(self, bus: str) -> pd.Series:
+        """MWh por tecnología despachados en el bus (sin VoLL; solo tecnologías presentes)."""
+        d = self.res.derived
+        row = np.flatnonzero(d["mix_buses"] == bus)
+        if not row.size:
+            return pd.Series(dtype=float)
+        keep = self._present(self.res.gen_bus == bus)
+        return pd.Series(d["mix"][row[0]][keep], index=d["carriers"][keep].astype(object))
+
+    def co2_by_carrier(self) -> pd.Series:
+        """tCO₂ por tecnología en todo el sistema, de mayor a menor."""
+        d = self.res.derived
+        co2 = d["mix"].sum(axis=0) * np.array([CO2_FACTOR.get(c, 0.0) for c in d["carriers"]])
+        present = self._present(np.ones(len(self.res.gen_names), dtype=bool))
+        return pd.Series(co2[present], index=d["carriers"][present].astype(object)).sort_values(ascending=False)
+
+    def _series(self, kind: str, bus: str) -> pd.DataFrame:
+        d = self.res.derived
+        if f"{kind}/{bus}" not in d:
+            return pd.DataFrame(index=self.res.index)
+        return pd.DataFrame(d[f"{kind}/{bus}"], index=self.res.index, columns=d[f"{kind}_cols/{bus}"].astype(object))
+
+    def dispatch_by_carrier(self, bus: str) -> pd.DataFrame:
+        """(T, tecnologías) MW despachados en el bus; columna "shedding" si hubo carga no servida."""
+        return self._series("disp", bus)
+
+    def curtailment(self, bus: str) -> pd.DataFrame:
+        """(T, tecnologías) MW renovables no despachados en el bus (vacío si no hubo)."""
+        return self._series("curt", bus)
+
+    def price_duration(self, bus: str) -> np.ndarray:
+        """Precio sombra del bus ordenado de mayor a menor (vacío si no hay precio)."""
+        return self.res.derived.get(f"pdc/{bus}", np.zeros(0, dtype=np.float32))
+
+    def load_duration(self, bus: str) -> np.ndarray:
+        """Carga total del bus ordenada de mayor a menor (vacío si no hay cargas)."""
+        return self.res.derived.get(f"ldc/{bus}", np.zeros(0, dtype=np.float32))
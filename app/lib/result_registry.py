@@ -0,0 +1,189 @@
+from __future__ import annotations
+
+import atexit
+import os
+import shutil
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+
+from .dispatch_result import DispatchResult
+
+ROOT = Path(__file__).resolve().parents[2]
+
+# Presupuesto por proceso (todas las sesiones de Streamlit comparten el proceso).
+# DESPACHO_RESULT_BUDGET_MB / DESPACHO_RESULT_SPILL_MB ajustan los límites;
+# DESPACHO_RESULT_SPILL=0 desactiva el volcado a disco (se descartan).
+BUDGET_MB = float(os.environ.get("DESPACHO_RESULT_BUDGET_MB", 1024))
+SPILL_MB = float(os.environ.get("DESPACHO_RESULT_SPILL_MB", 8192))
+SPILL_DIR = ROOT / "data_cache" / "results" / f"p{os.getpid()}"
+
+
+@dataclass
+class _Spilled:
+    path: Path
+    nbytes: int      # tamaño en disco
+    last_access: float
+
+
+class ResultRegistry:
+    """
+    Registro de resultados resueltos compartido por todas las sesiones.
+
+    Las sesiones guardan solo la clave que devuelve `put()`; los
+    `DispatchResult` viven aquí, con un presupuesto de memoria global:
+
+    - al rebasar `budget_bytes` se expulsa el resultado visto hace más tiempo
+      (LRU por `get`), nunca el recién insertado
+    - con `spill_dir`, el expulsado se escribe a disco (`to_bytes`) y `get()`
+      lo vuelve a cargar; sin él, se descarta y `get()` devuelve None, y quien
+      llama decide si re-resolver
+    - los volcados a disco tienen su propio límite (`spill_bytes`, LRU)
+    """
+
+    def __init__(
+        self,
+        budget_bytes: int,
+        spill_dir: Path | None = None,
+        spill_bytes: int | None = None,
+    ) -> None:
+        self.budget_bytes = int(budget_bytes)
+        self.spill_dir = Path(spill_dir) if spill_dir is not None else None
+        self.spill_bytes = spill_bytes
+        self._lock = threading.Lock()
+        self._mem: OrderedDict[str, DispatchResult] = OrderedDict()  # LRU → MRU
+        self._disk: dict[str, _Spilled] = {}
+        self._counts = {"hits": 0, "reloads": 0, "misses": 0, "spilled": 0, "dropped": 0}
+
+    # ── API pública ───────────────────────────────────────────────────────────
+    def put(self, res: DispatchResult, key: str | None = None) -> str:
+        """Registra `res` (reemplaza si la clave existe) y aplica el presupuesto."""
+        key = key or uuid.uuid4().hex
+        with self._lock:
+            self._forget_disk(key)
+            self._mem[key] = res
+            self._mem.move_to_end(key)
+            self._evict_locked(keep=key)
+        return key
+
+    def get(self, key: str | None) -> DispatchResult | None:
+        """Resultado de `key` (lo marca como recién visto), o None si se descartó."""
+        if key is None:
+            return None
+        with self._lock:
+            res = self._mem.get(key)
+            if res is not None:
+                self._mem.move_to_end(key)
+                self._counts["hits"] += 1
+                return res
+            spilled = self._disk.get(key)
+            if spilled is None:
+                self._counts["misses"] += 1
+                return None
+            try:
+                res = DispatchResult.from_bytes(spilled.path.read_bytes())
+            except (OSError, ValueError, KeyError):
+                self._forget_disk(key)
+                self._counts["misses"] += 1
+                return None
+            self._forget_disk(key)
+            self._mem[key] = res
+            self._counts["reloads"] += 1
+            self._evict_locked(keep=key)
+            return res
+
+    def discard(self, key: str | None) -> None:
+        if key is None:
+            return
+        with self._lock:
+            self._mem.pop(key, None)
+            self._forget_disk(key)
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            return key in self._mem or key in self._disk
+
+    def memory_bytes(self) -> int:
+        with self._lock:
+            return self._memory_locked()
+
+    def stats(self) -> dict:
+        """Ocupación y contadores (para el panel de rendimiento)."""
+        with self._lock:
+            return {
+                "in_memory": len(self._mem),
+                "memory_mb": round(self._memory_locked() / 1024**2, 1),
+                "budget_mb": round(self.budget_bytes / 1024**2, 1),
+                "on_disk": len(self._disk),
+                "disk_mb": round(sum(s.nbytes for s in self._disk.values()) / 1024**2, 1),
+                **self._counts,
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._mem.clear()
+            for key in list(self._disk):
+                self._forget_disk(key)
+
+    # ── Internos ──────────────────────────────────────────────────────────────
+    def _memory_locked(self) -> int:
+        # Un mismo resultado puede estar bajo varias claves (solves compartidos): cuenta una vez
+        return sum(r.nbytes for r in {id(r): r for r in self._mem.values()}.values())
+
+    def _forget_disk(self, key: str) -> None:
+        spilled = self._disk.pop(key, None)
+        if spilled is not None:
+            spilled.path.unlink(missing_ok=True)
+
+    def _spill(self, key: str, res: DispatchResult) -> bool:
+        try:
+            self.spill_dir.mkdir(parents=True, exist_ok=True)
+            path = self.spill_dir / f"{key}.npz"
+            tmp = path.with_suffix(".npz.tmp")
+            data = res.to_bytes()
+            tmp.write_bytes(data)
+            os.replace(tmp, path)
+        except OSError:
+            return False
+        self._disk[key] = _Spilled(path=path, nbytes=len(data), last_access=time.time())
+        if self.spill_bytes is not None:
+            total = sum(s.nbytes for s in self._disk.values())
+            for k, s in sorted(self._disk.items(), key=lambda kv: kv[1].last_access):
+                if total <= self.spill_bytes or k == key:
+                    break
+                total -= s.nbytes
+                self._forget_disk(k)
+                self._counts["dropped"] += 1
+        return True
+
+    def _evict_locked(self, keep: str) -> None:
+        total = self._memory_locked()
+        while total > self.budget_bytes and len(self._mem) > 1:
+            key, res = next(iter(self._mem.items()))
+            if key == keep:
+                self._mem.move_to_end(key)
+                continue
+            del self._mem[key]
+            total = self._memory_locked()
+            if self.spill_dir is not None and self._spill(key, res):
+                self._counts["spilled"] += 1
+            else:
+                self._counts["dropped"] += 1
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Registro del proceso (lo comparten todas las sesiones de la app)
+# ──────────────────────────────────────────────────────────────────────────────
+REGISTRY = ResultRegistry(
+    budget_bytes=int(BUDGET_MB * 1024**2),
+    spill_dir=SPILL_DIR if os.environ.get("DESPACHO_RESULT_SPILL", "1") != "0" else None,
+    spill_bytes=int(SPILL_MB * 1024**2),
+)
+
+
+@atexit.register
+def _cleanup_spill_dir() -> None:
+    shutil.rmtree(SPILL_DIR, ignore_errors=True)
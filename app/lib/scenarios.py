@@ -0,0 +1,220 @@
+"""
+Escenarios predefinidos y su traducción a parámetros del motor de despacho.
+
+`SCENARIOS[nombre]["params"]` es el esquema que leen la página, el script
+headless y los barridos:
+
+    marginal_cost_multiplier / marginal_cost_adder  (por tecnología, sobre DEFAULT_COSTS)
+    voll_value, demand_multiplier, capacity_multiplier, forced_outage,
+    battery_enable + battery_*
+
+`make_recipe(params, ...)` lo convierte en la "receta" que recibe
+`dispatch_model.run_dispatch` (costos efectivos, VoLL, multiplicadores,
+falla forzada y baterías ya resueltos).
+"""
+from __future__ import annotations
+
+from datetime import date
+
+from .dispatch_model import VOLL_DEFAULT, compute_effective_costs
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Preset scenarios  (5 lecciones pedagógicas)
+# Schema: params.marginal_cost_multiplier / adder applied ON TOP of DEFAULT_COSTS
+# Implemented: capacity_multiplier, forced_outage, battery_enable + battery_*
+# Reserved (no-op): capacity_delta_mw, vre_profile_multiplier
+# ──────────────────────────────────────────────────────────────────────────────
+BASE_SCENARIO_KEY = "🏭 Base 2026"
+
+SCENARIOS: dict[str, dict] = {
+    BASE_SCENARIO_KEY: {
+        "desc":   "Costos de referencia del SEN. Renovables e hidro despachan primero; gas CCGT cubre la demanda residual; vapor es respaldo caro.",
+        "lesson": "Gas CCGT es el unit marginal en la mayoría de horas. Solar/eólica/hidro comprimen el precio en horas de alta generación renovable.",
+        "narrative": {
+            "cambio":   "Costos variables de referencia sin modificación. Gas CCGT = 50 $/MWh, vapor = 65 $/MWh.",
+            "observa":  "En el despacho: renovables ocupan la base de la pila; gas CCGT llena la demanda residual. En el precio marginal: ~50 $/MWh en horas de valle, cae a cero en horas de alta solar.",
+            "leccion":  "El **precio marginal** lo fija el último generador despachado (gas CCGT). Las renovables no tienen costo variable, así que reducen el precio cuando hay suficiente recurso — el fenómeno de *merit order effect*.",
+        },
+        "params": {
+            "marginal_cost_multiplier": {},
+            "marginal_cost_adder":      {},
+            "voll_value":               3000,
+            "demand_multiplier":        {"SIN": 1.0, "BCA": 1.0, "BCS": 1.0},
+            # reserved
+            "capacity_multiplier":      {},
+            "capacity_delta_mw":        {},
+            "forced_outage":            {"enabled": False},
+            "vre_profile_multiplier":   {},
+            "battery_enable":           False,
+        },
+    },
+    "⛽ Fuel Price Shock": {
+        "desc":   "Encarecimiento de combustibles fósiles — gas sube más, carbón sube poco. Adders: CCGT +30, OCGT +40, CHP +10, Diésel +50, Vapor +15.",
+        "lesson": "Sube el costo total y el precio marginal nodal. Renovables e hidro se vuelven relativamente más atractivas. Si el sistema depende mucho de térmicas caras, puede aparecer shedding.",
+        "narrative": {
+            "cambio":   "Gas CCGT sube de 50 → 80 $/MWh, OCGT de 70 → 110, vapor de 65 → 80, diésel de 100 → 150. Las renovables e hidro **no cambian**.",
+            "observa":  "El precio marginal nodal sube en todos los sistemas. El mix de generación desplaza más trabajo a renovables e hidro. Compara el costo total vs. el caso base en el panel de comparación.",
+            "leccion":  "Un shock de combustible se transmite íntegramente al precio de mercado cuando las térmicas son el *unit marginal*. La penetración renovable actúa como amortiguador natural del precio.",
+        },
+        "params": {
+            "marginal_cost_multiplier": {},
+            "marginal_cost_adder": {
+                "gas_ccgt":      30,   # 50 + 30 = 80 $/MWh
+                "gas_ocgt":      40,   # 70 + 40 = 110 $/MWh
+                "chp":           10,   # 50 + 10 = 60 $/MWh
+                "diesel_engine": 50,   # 100 + 50 = 150 $/MWh
+                "steam_other":   15,   # 65 + 15 = 80 $/MWh
+            },
+            "voll_value":               3000,
+            "demand_multiplier":        {"SIN": 1.0, "BCA": 1.0, "BCS": 1.0},
+        },
+    },
+    "☀️ Renewables Boom 2026": {
+        "desc":   "Expansión renovable 2026: más capacidad solar y eólica instalada por sistema (×1.4–×1.8). Perfiles horarios iguales, pero más MW disponibles.",
+        "lesson": "Agregar MW renovables no garantiza aprovechamiento total. Aparece más curtailment en horas de alta producción cuando la demanda no absorbe toda la oferta. La flexibilidad del sistema es clave.",
+        "narrative": {
+            "cambio":   "Solar SIN ×1.6, eólica SIN ×1.4, solar BCA ×1.4, solar BCS ×1.8. Los **perfiles horarios no cambian** — solo aumenta la potencia instalada.",
+            "observa":  "El curtailment sube (tab por sistema → sección de curtailment). El precio marginal cae en horas solares. El costo total puede bajar aunque haya más capacidad sin usar.",
+            "leccion":  "Añadir MW renovables sin flexibilidad (almacenamiento, interconexión, demanda flexible) genera *curtailment* creciente. El valor marginal de cada MW adicional decrece — ley de rendimientos marginales decrecientes en VRE.",
+        },
+        "params": {
+            "marginal_cost_multiplier": {},
+            "marginal_cost_adder":      {},
+            "voll_value":               3000,
+            "demand_multiplier":        {"SIN": 1.0, "BCA": 1.0, "BCS": 1.0},
+            "capacity_multiplier": {
+                "SIN": {"solar": 1.6, "wind": 1.4},
+                "BCA": {"solar": 1.4, "wind": 1.2},
+                "BCS": {"solar": 1.8, "wind": 1.3},
+            },
+        },
+    },
+    "🔧 Forced Outage – BCS Diésel": {
+        "desc":   "Falla forzada: 35% de la capacidad diésel de BCS queda fuera de servicio. BCS depende del diésel como respaldo firme. VoLL sube a $5 000/MWh.",
+        "lesson": "La pérdida de capacidad firme puede disparar costos y afectar confiabilidad, especialmente en sistemas aislados como BCS. El precio marginal refleja directamente la falta de alternativas.",
+        "narrative": {
+            "cambio":   "BCS pierde 35% de su capacidad diésel (único respaldo firme disponible). VoLL = 5 000 $/MWh para simular política de confiabilidad estricta.",
+            "observa":  "En el tab BCS: el precio marginal sube bruscamente. Posible aparición de **carga no servida** (barra roja en el despacho) si la demanda supera la capacidad reducida.",
+            "leccion":  "Los sistemas aislados son extremadamente vulnerables a la pérdida de capacidad firme. Sin interconexión, no hay respaldo externo — el VoLL es la única válvula de escape del LP, lo que refleja el costo económico real de un blackout.",
+        },
+        "params": {
+            "marginal_cost_multiplier": {},
+            "marginal_cost_adder":      {},
+            "voll_value":               5000,
+            "demand_multiplier":        {"SIN": 1.0, "BCA": 1.0, "BCS": 1.0},
+            "forced_outage": {
+                "enabled":                True,
+                "system":                 "BCS",
+                "technology":             "diesel",
+                "capacity_loss_fraction": 0.35,
+            },
+        },
+    },
+    "🔋 Add Storage – Flexibility": {
+        "desc":   "Instala baterías en los tres sistemas: SIN 600 MW / 2 400 MWh, BCA 150 MW / 600 MWh, BCS 100 MW / 400 MWh. Eficiencia 95%, SOC cíclico.",
+        "lesson": "La batería vale más cuando hay spreads de precios, picos de demanda o excedentes renovables. Reduce curtailment, suaviza picos de precio marginal y puede evitar shedding.",
+        "narrative": {
+            "cambio":   "Se añaden baterías BESS en cada sistema: SIN 600 MW/2 400 MWh (4 h), BCA 150/600, BCS 100/400. Eficiencia ida y vuelta 90.25% (0.95²). SOC cíclico.",
+            "observa":  "En el tab de cada sistema: aparece la sección **SOC de batería**. La batería carga en horas solares (precio bajo) y descarga al atardecer/noche (precio alto). El curtailment baja; el precio marginal se aplana.",
+            "leccion":  "El almacenamiento realiza **arbitraje temporal**: compra energía barata (solar) y la vende cara (pico). El spread de precio que la batería captura es exactamente su valor de mercado — si el spread baja a cero, la batería no tiene incentivo económico para operar.",
+        },
+        "params": {
+            "marginal_cost_multiplier":      {},
+            "marginal_cost_adder":           {},
+            "voll_value":                    3000,
+            "demand_multiplier":             {"SIN": 1.0, "BCA": 1.0, "BCS": 1.0},
+            "battery_enable":                True,
+            "battery_power_mw":              {"SIN": 600, "BCA": 150, "BCS": 100},
+            "battery_energy_mwh":            {"SIN": 2400, "BCA": 600, "BCS": 400},
+            "battery_efficiency_store":      0.95,
+            "battery_efficiency_dispatch":   0.95,
+            "battery_initial_soc":           0.5,
+            "battery_cyclic_state_of_charge": True,
+        },
+    },
+    "🔴 VOLL Alto ($10 000)": {
+        "desc":   "VoLL = $10 000/MWh — política de confiabilidad estricta. El modelo prefiere usar generación carísima antes que cortar carga.",
+        "lesson": "Con VoLL alto, el shedding es el último recurso. Sube el uso de térmicas de respaldo y el costo total; la confiabilidad tiene un precio implícito muy alto.",
+        "narrative": {
+            "cambio":   "Solo cambia el VoLL: de 3 000 → 10 000 $/MWh. Todos los costos de generación permanecen iguales.",
+            "observa":  "El costo total sube porque el modelo despacha unidades más caras para evitar el shedding. El precio marginal puede alcanzar 10 000 $/MWh si hay escasez. El shedding es casi cero.",
+            "leccion":  "El VoLL es un **parámetro de política**, no técnico. Refleja cuánto está dispuesta a pagar la sociedad por evitar un blackout. Con VoLL alto, la curva de demanda es perfectamente inelástica — la electricidad se produce a cualquier costo.",
+        },
+        "params": {
+            "marginal_cost_multiplier": {},
+            "marginal_cost_adder":      {},
+            "voll_value":               10_000,
+            "demand_multiplier":        {"SIN": 1.0, "BCA": 1.0, "BCS": 1.0},
+        },
+    },
+    "🟡 VOLL Bajo ($2 000)": {
+        "desc":   "VoLL = $2 000/MWh — política de confiabilidad laxa. El modelo puede sheddear antes si producir cuesta demasiado.",
+        "lesson": "Con VoLL bajo, el shedding compite directamente con las térmicas caras. Aparece carga no servida cuando el costo marginal supera $2 000/MWh. La confiabilidad es una decisión política.",
+        "narrative": {
+            "cambio":   "VoLL baja de 3 000 → 2 000 $/MWh. Esto significa que el modelo prefiere cortar carga antes que despachar unidades con costo > 2 000 $/MWh.",
+            "observa":  "Si hay horas donde el único generador disponible cuesta más de 2 000 $/MWh, aparece **carga no servida** (barra oscura en la gráfica de despacho). Compara el shedding vs. el caso base.",
+            "leccion":  "El shedding no es un error del modelo — es una decisión de costo-beneficio. Cuando el costo de producir una unidad supera el VoLL, es \"más barato\" no servir la demanda. El VoLL implícito en el SEN real es mucho mayor (~20 000–50 000 $/MWh).",
+        },
+        "params": {
+            "marginal_cost_multiplier": {},
+            "marginal_cost_adder":      {},
+            "voll_value":               2_000,
+            "demand_multiplier":        {"SIN": 1.0, "BCA": 1.0, "BCS": 1.0},
+        },
+    },
+}
+SCENARIO_NAMES = list(SCENARIOS.keys())
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Parámetros → receta del motor
+# ──────────────────────────────────────────────────────────────────────────────
+def resolve_scenario(name: str) -> str:
+    """
+    Clave de SCENARIOS a partir de un nombre exacto o de un fragmento sin
+    emoji ("fuel price", "storage"); KeyError si no hay una única coincidencia.
+    """
+    if name in SCENARIOS:
+        return name
+    matches = [k for k in SCENARIOS if name.strip().lower() in k.lower()]
+    if len(matches) != 1:
+        raise KeyError(f"Escenario {name!r} no encontrado o ambiguo. Opciones: {SCENARIO_NAMES}")
+    return matches[0]
+
+
+def make_recipe(
+    params: dict,
+    *,
+    scenario: str | None = None,
+    start: date | None = None,
+    end: date | None = None,
+    growth: bool = False,
+    costs: dict[str, float] | None = None,
+    voll: float | None = None,
+    window_days: int | None = None,
+    time_budget_s: float | None = None,
+) -> dict:
+    """
+    Receta de un solve a partir del esquema `params`.
+
+    - start / end: rango de días de la demanda (None = todo)
+    - costs / voll: sobrescriben los derivados de `params` (sliders de la página)
+    - window_days / time_budget_s: ventanas y presupuesto de tiempo del solve
+      (ver run_dispatch); None = horizonte completo, sin límite
+    """
+    dm = params.get("demand_multiplier", {})
+    fo = params.get("forced_outage", {})
+    return {
+        "scenario":       scenario,
+        "start":          start,
+        "end":            end,
+        "costs":          dict(costs) if costs is not None else compute_effective_costs(params),
+        "growth":         bool(growth),
+        "voll":           float(voll if voll is not None else params.get("voll_value", VOLL_DEFAULT)),
+        "demand_mult":    dm if any(v != 1.0 for v in dm.values()) else None,
+        "capacity_mult":  params.get("capacity_multiplier") or None,
+        "forced_outage":  fo if fo.get("enabled", False) else None,
+        "battery_config": params if params.get("battery_enable", False) else None,
+        "window_days":    int(window_days) if window_days else None,
+        "time_budget_s":  float(time_budget_s) if time_budget_s else None,
+    }
@@ -0,0 +1,225 @@
+"""
+Rangos de costo variable en los que el despacho resuelto sigue siendo óptimo.
+
+Mover un slider de costo unos $/MWh casi nunca cambia el despacho: las
+mismas unidades quedan en sus cotas, la misma tecnología marca el precio y
+solo se desplazan el precio sombra y el objetivo. `cost_ranges(res)` da,
+por tecnología y sistema, cuánto puede bajar o subir su costo sin que el
+despacho deje de ser óptimo, y la derivada del objetivo respecto a ese
+costo (la energía despachada de la tecnología, exacta dentro del rango).
+Si un cambio de sliders queda dentro del rango, `reprice(res, costs)` arma
+el resultado nuevo sin volver a resolver.
+
+    ranges = carrier_ranges(cost_ranges(res))
+    if stable_change(ranges, recipe["costs"], new_costs):
+        res = reprice(res, new_costs, voll=recipe["voll"])
+
+linopy no expone el análisis de rangos de HiGHS, así que los rangos salen
+de las condiciones de costo reducido sobre el resultado guardado (despacho,
+precios sombra y duales de las cotas). Cada generador aparece solo en el
+balance nodal de su bus y en sus cotas; el despacho sigue siendo óptimo
+mientras, hora a hora:
+
+- las unidades en su cota superior tengan costo ≤ precio,
+- las de su cota inferior, costo ≥ precio,
+- las libres, costo = precio,
+
+con el precio de la hora desplazándose junto con la tecnología que lo marca.
+En un bus con baterías, las horas en que la tecnología marca precio dan
+rango [0, 0] (mover ese precio cambia el arbitraje de la batería, que aquí
+no se acota): el rango es conservador, nunca acepta un cambio que altere
+el despacho.
+
+Varios sliders a la vez se aceptan con la regla del 100 %: la suma de cada
+cambio como fracción de su rango en esa dirección ≤ 1. El conjunto de
+costos con el mismo despacho óptimo es convexo, así que basta.
+"""
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+from .dispatch_result import DispatchResult
+from .post_solve import derive_results
+
+# Holgura (MW) para decidir si una unidad está en una cota
+TOL_MW = 1e-3
+
+# Tecnologías sin slider de costo (VoLL)
+NO_SLIDER = {"shedding"}
+
+COST = "costo ($/MWh)"
+DOWN = "Δ mín ($/MWh)"
+UP = "Δ máx ($/MWh)"
+ENERGY = "ΔObj/Δcosto (MWh)"
+HOURS = "horas marginales"
+
+COLUMNS = ["tecnología", "sistema", COST, DOWN, UP, ENERGY, HOURS]
+
+
+# ── Estado de cada unidad ─────────────────────────────────────────────────────
+def bound_status(res: DispatchResult, tol_mw: float = TOL_MW) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    (libre, en cota superior, en cota inferior), bool (T, G).
+
+    Las unidades con p_min = p_max en una hora (renovable sin recurso) no
+    entran en ninguna: su despacho no depende del costo. "Libre" sale de los
+    duales de las cotas si el resultado los trae; si no, p estrictamente
+    entre cotas (con `tol_mw`).
+    """
+    p = res.gen_p.astype(float)
+    p_nom = res.gen_p_nom.astype(float)
+    pmin = p_nom * res.gen_p_min_pu.astype(float)
+    pmax = res.p_max_pu().to_numpy(dtype=float) * p_nom
+    fixed = pmax - pmin <= tol_mw
+    free = res.free_mask()
+    if free is None:
+        free = (p > pmin + tol_mw) & (p < pmax - tol_mw)
+    free = free & ~fixed
+    upper = ~free & ~fixed & (p >= (pmin + pmax) / 2)
+    lower = ~free & ~fixed & ~upper
+    return free, upper, lower
+
+
+def _extreme(values: np.ndarray, mask: np.ndarray, fn, empty: float) -> float:
+    picked = values[mask]
+    return float(fn(picked)) if picked.size else empty
+
+
+def _range(
+    reduced: np.ndarray,
+    status: tuple[np.ndarray, np.ndarray, np.ndarray],
+    group: np.ndarray,
+    others: np.ndarray,
+    storage: bool,
+) -> tuple[float, float, np.ndarray]:
+    """
+    (Δ mín, Δ máx, horas en que el grupo marca precio) para un cambio Δ común
+    del costo de las unidades `group` de un bus.
+
+    - reduced: costo − precio, (T, G)
+    - others: el resto de las unidades del bus (incluido VoLL)
+    """
+    free, upper, lower = status
+    sets = free[:, group].any(axis=1)
+    hold = ~sets[:, None]
+    # Horas con el precio fijo: las unidades del grupo en cota no deben cruzarlo
+    r = reduced[:, group]
+    hi = _extreme(-r, hold & upper[:, group], np.min, np.inf)
+    lo = _extreme(-r, hold & lower[:, group], np.max, -np.inf)
+    # Horas con el precio arrastrado por el grupo: las demás unidades no deben cruzarlo
+    move = sets[:, None]
+    r = reduced[:, others]
+    lo = max(lo, _extreme(r, move & upper[:, others], np.max, -np.inf))
+    hi = min(hi, _extreme(r, move & lower[:, others], np.min, np.inf))
+    if sets.any() and (storage or (move & free[:, others]).any()):
+        lo, hi = max(lo, 0.0), min(hi, 0.0)
+    # El óptimo actual cumple las condiciones; el ruido de float32 no debe excluir Δ = 0
+    return min(lo, 0.0), max(hi, 0.0), sets
+
+
+# ── Reporte ───────────────────────────────────────────────────────────────────
+def cost_ranges(res: DispatchResult, tol_mw: float = TOL_MW) -> pd.DataFrame:
+    """
+    Rango estable del costo de cada tecnología en cada sistema (COLUMNS).
+
+    Δ mín / Δ máx: cambio del costo de todas las unidades de la tecnología en
+    ese sistema con el que el despacho sigue siendo óptimo (±inf = sin
+    límite). ΔObj/Δcosto: energía despachada (MWh), la derivada del objetivo.
+    """
+    status = bound_status(res, tol_mw)
+    price = res.price.astype(float)
+    mc = res.gen_marginal_cost.astype(float)
+    energy = res.gen_p.astype(float).sum(axis=0)
+    storage = set(res.su_bus[res.su_p_nom > 0])
+
+    rows = []
+    for j, bus in enumerate(res.bus_names):
+        on_bus = res.gen_bus == bus
+        reduced = mc[None, :] - price[:, j:j + 1]
+        for carrier in sorted(set(res.gen_carrier[on_bus]) - NO_SLIDER):
+            group = on_bus & (res.gen_carrier == carrier)
+            lo, hi, sets = _range(reduced, status, group, on_bus & ~group, bus in storage)
+            rows.append({
+                "tecnología": carrier,
+                "sistema": str(bus),
+                COST: float(mc[group].max()),
+                DOWN: lo,
+                UP: hi,
+                ENERGY: float(energy[group].sum()),
+                HOURS: int(sets.sum()),
+            })
+    return pd.DataFrame(rows, columns=COLUMNS)
+
+
+def carrier_ranges(report: pd.DataFrame) -> pd.DataFrame:
+    """
+    Rango por tecnología en todos los sistemas a la vez (lo que mueve un
+    slider): la intersección de los rangos y la suma de energía y horas.
+    """
+    return report.groupby("tecnología").agg({COST: "max", DOWN: "max", UP: "min", ENERGY: "sum", HOURS: "sum"})
+
+
+def stable_change(ranges: pd.DataFrame, old_costs: dict, new_costs: dict) -> bool:
+    """
+    True si pasar de `old_costs` a `new_costs` deja óptimo el despacho según
+    `ranges` (carrier_ranges), con la regla del 100 % para cambios simultáneos.
+    Las tecnologías sin unidades en el resultado no cuentan.
+    """
+    used = 0.0
+    for carrier in ranges.index:
+        if carrier not in old_costs or carrier not in new_costs:
+            return False
+        delta = float(new_costs[carrier]) - float(old_costs[carrier])
+        if delta == 0:
+            continue
+        room = ranges.at[carrier, UP] if delta > 0 else -ranges.at[carrier, DOWN]
+        if room <= 0:
+            return False
+        used += abs(delta) / room
+    return used <= 1.0 + 1e-9
+
+
+# ── Resultado sin re-solve ────────────────────────────────────────────────────
+def reprice(
+    res: DispatchResult,
+    costs: dict[str, float],
+    voll: float | None = None,
+    tol_mw: float = TOL_MW,
+) -> DispatchResult:
+    """
+    Resultado con los costos `costs` por tecnología y el mismo despacho.
+
+    El precio de cada hora y bus sube o baja con el costo de la unidad que lo
+    marca y el objetivo cambia en Σ Δcosto × energía. Solo es el óptimo del
+    nuevo problema si el cambio pasó `stable_change`; no se revisa aquí.
+    Devuelve un resultado nuevo (con derive_results); `res` no cambia.
+    """
+    mc = res.gen_marginal_cost.astype(float)
+    new_mc = np.array([costs.get(c, m) for c, m in zip(res.gen_carrier, mc)], dtype=float)
+    delta = new_mc - mc
+
+    free, _, _ = bound_status(res, tol_mw)
+    price = res.price.astype(float)
+    for j, bus in enumerate(res.bus_names):
+        on_bus = res.gen_bus == bus
+        marks = free[:, on_bus]
+        # Dentro del rango, las unidades que marcan precio en una hora comparten Δ
+        count = marks.sum(axis=1)
+        shift = (marks * delta[on_bus]).sum(axis=1) / np.maximum(count, 1)
+        price[:, j] += shift
+
+    changed = {
+        str(c): float(costs[c]) - float(mc[res.gen_carrier == c].max())
+        for c in sorted(set(res.gen_carrier) & set(costs))
+        if float(costs[c]) != float(mc[res.gen_carrier == c].max())
+    }
+    fields = {name: getattr(res, name) for name in res.__slots__}
+    fields.update(
+        gen_marginal_cost=new_mc.astype(np.float32),
+        price=price.astype(np.float32),
+        objective=float(res.objective + delta @ res.gen_p.astype(float).sum(axis=0)),
+        derived={},
+        meta={**{k: v for k, v in res.meta.items() if k != "kpis"}, "repriced": changed},
+    )
+    return derive_results(DispatchResult(**fields), voll=voll)
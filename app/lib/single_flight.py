@@ -0,0 +1,243 @@
+"""
+Solves compartidos ("single-flight") entre sesiones del mismo proceso.
+
+En un salón o en una sala de operación muchos usuarios presionan el mismo
+escenario con el mismo rango de fechas en segundos, y el base de
+comparación se resolvía una vez por usuario. Aquí cada solve se identifica
+con un hash canónico de sus entradas (`solve_key`: receta + huella de los
+datos); mientras uno está en curso, las peticiones idénticas esperan ese
+mismo solve y comparten su `DispatchResult` (inmutable por convención). Los
+que llegan poco después de que termine lo reciben durante `keep_s`; con un
+`registry`, ese resultado retenido vive en el registro de resultados y
+cuenta en su presupuesto de memoria (si lo expulsa, se vuelve a resolver).
+
+    res, shared = SOLVES.solve(data, recipe, perf=perf, progress=..., should_stop=...)
+
+El presupuesto de tiempo (`time_budget_s`) no entra en la clave: no cambia
+el óptimo, solo puede cortarlo. Un resultado parcial no se reutiliza, y
+quien recibe el parcial de un solve ajeno resuelve el suyo.
+
+Cancelación: el solve compartido corre en su propio hilo y solo se detiene
+cuando todos los que lo esperan pidieron parar; quien cancela (también
+quien lo lanzó) deja de esperar de inmediato (SolveInterrupted) sin
+afectar a los demás.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable
+
+import numpy as np
+
+from .dispatch_model import STOP_CANCELLED, DispatchData, SolveInterrupted, run_dispatch
+from .dispatch_result import DispatchResult
+from .perf import PerfRecorder, maybe_span
+from .result_registry import REGISTRY, ResultRegistry
+
+# Segundos que un resultado terminado sigue disponible para peticiones idénticas
+KEEP_S = 30.0
+
+# Cada cuánto revisa cada participante su propio should_stop mientras espera
+POLL_S = 0.25
+
+# Campos de la receta que no cambian el resultado óptimo (fuera de la clave)
+NON_RESULT_KEYS = ("time_budget_s",)
+
+
+# ── Claves canónicas ──────────────────────────────────────────────────────────
+def _canonical(value: Any) -> Any:
+    """Números como float (80 == 80.0), dicts ordenados, fechas como ISO."""
+    if isinstance(value, dict):
+        return {str(k): _canonical(v) for k, v in sorted(value.items(), key=lambda kv: str(kv[0]))}
+    if isinstance(value, (list, tuple)):
+        return [_canonical(v) for v in value]
+    if isinstance(value, bool) or value is None or isinstance(value, str):
+        return value
+    if isinstance(value, (int, float, np.integer, np.floating)):
+        return float(value)
+    return str(value)
+
+
+def recipe_key(recipe: dict) -> str:
+    """Hash estable de una receta (el mismo para recetas equivalentes, sin NON_RESULT_KEYS)."""
+    relevant = {k: v for k, v in recipe.items() if k not in NON_RESULT_KEYS}
+    payload = json.dumps(_canonical(relevant), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+
+def data_fingerprint(data: DispatchData) -> str:
+    """Huella barata de los datos de entrada (forma, rango y totales), para no mezclar versiones."""
+    dem = data.demand
+    parts = [
+        data.centrales.shape,
+        float(data.centrales["p_nom"].sum()) if "p_nom" in data.centrales else 0.0,
+        data.p_max_pu_raw.shape,
+        dem.shape,
+        str(dem.index.min()) if len(dem) else "",
+        str(dem.index.max()) if len(dem) else "",
+        float(dem.to_numpy(dtype=np.float64).sum()) if dem.size else 0.0,
+    ]
+    return hashlib.sha1(repr(parts).encode()).hexdigest()[:16]
+
+
+def solve_key(data: DispatchData, recipe: dict) -> str:
+    return f"{data_fingerprint(data)}:{recipe_key(recipe)}"
+
+
+# ── Single-flight ─────────────────────────────────────────────────────────────
+@dataclass
+class _Call:
+    done: threading.Event = field(default_factory=threading.Event)
+    value: Any = None
+    ref: str | None = None                            # clave en el registro del valor retenido
+    error: BaseException | None = None
+    finished: float | None = None
+    stoppers: list = field(default_factory=list)      # should_stop de cada participante
+    progress: tuple[int, int] = (0, 0)
+
+    def all_stopped(self) -> bool:
+        return all(f() for f in list(self.stoppers))
+
+
+class SingleFlight:
+    """
+    Una ejecución por clave a la vez; las llamadas concurrentes con la misma
+    clave comparten el resultado.
+
+    - keep_s: segundos que un valor terminado se sigue entregando
+    - registry: si se da, el valor retenido vive ahí (cuenta en su presupuesto)
+      y aquí solo su clave; sin él, se retiene en memoria fuera de todo límite
+    """
+
+    def __init__(self, keep_s: float = KEEP_S, registry: ResultRegistry | None = None) -> None:
+        self.keep_s = keep_s
+        self.registry = registry
+        self._lock = threading.Lock()
+        self._calls: dict[str, _Call] = {}
+        self._counts = {"leaders": 0, "shared": 0}
+
+    def do(
+        self,
+        key: str,
+        fn: Callable[[Callable[[int, int], None], Callable[[], bool]], Any],
+        progress: Callable[[int, int], None] | None = None,
+        should_stop: Callable[[], bool] | None = None,
+        keep_if: Callable[[Any], bool] | None = None,
+    ) -> tuple[Any, bool]:
+        """
+        Ejecuta `fn(progress, should_stop)` en un hilo propio o se une a la
+        ejecución en curso de `key` → (valor, compartido). Los errores también
+        se comparten. Todos los participantes esperan igual: si su
+        `should_stop` se vuelve True dejan de esperar (SolveInterrupted).
+
+        - keep_if: si devuelve False, el valor no se reutiliza tras terminar
+          (solo lo reciben quienes ya esperaban)
+        """
+        while True:
+            with self._lock:
+                self._purge_locked(time.monotonic())
+                call = self._calls.get(key)
+                kept = self._kept_locked(key, call)
+                if kept is not None:
+                    self._counts["shared"] += 1
+                    return kept, True
+                leader = call is None or call.finished is not None
+                if leader:
+                    call = self._calls[key] = _Call()
+                    self._counts["leaders"] += 1
+                else:
+                    self._counts["shared"] += 1
+                call.stoppers.append(should_stop or (lambda: False))
+
+            if leader:
+                threading.Thread(
+                    target=self._run, args=(key, call, fn, keep_if), name=f"single-flight-{key[:8]}", daemon=True,
+                ).start()
+            while not call.done.wait(POLL_S):
+                if should_stop is not None and should_stop():
+                    raise SolveInterrupted(STOP_CANCELLED)
+                if progress is not None and call.progress[1]:
+                    progress(*call.progress)
+            if progress is not None and call.progress[1]:
+                progress(*call.progress)
+
+            if call.error is not None:
+                raise call.error
+            value = call.value if call.ref is None else self.registry.get(call.ref)
+            if value is not None or call.ref is None:
+                return value, not leader
+            # El registro lo expulsó antes de recogerlo: se vuelve a pedir
+
+    def _run(self, key: str, call: _Call, fn: Callable, keep_if: Callable[[Any], bool] | None) -> None:
+        """Hilo del solve compartido: corre `fn` y retiene (o suelta) el valor."""
+        try:
+            value = fn(lambda done, total: setattr(call, "progress", (done, total)), call.all_stopped)
+        except BaseException as e:
+            value, call.error = None, e
+        reusable = call.error is None and (keep_if is None or keep_if(value)) and self.keep_s > 0
+        with self._lock:
+            if reusable and self.registry is not None:
+                call.ref = self.registry.put(value)
+            else:
+                call.value = value
+            call.finished = time.monotonic()
+            if not reusable and self._calls.get(key) is call:
+                del self._calls[key]
+        call.done.set()
+
+    def _kept_locked(self, key: str, call: _Call | None) -> Any:
+        """Valor retenido de `key`, o None si no hay o el registro ya lo soltó."""
+        if call is None or call.finished is None or call.error is not None:
+            return None
+        if call.ref is None:
+            return call.value
+        value = self.registry.get(call.ref)
+        if value is None:
+            del self._calls[key]
+        return value
+
+    def _purge_locked(self, now: float) -> None:
+        old = [k for k, c in self._calls.items() if c.finished is not None and now - c.finished > self.keep_s]
+        for k in old:
+            call = self._calls.pop(k)
+            if call.ref is not None:
+                self.registry.discard(call.ref)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"in_flight": sum(c.finished is None for c in self._calls.values()), **self._counts}
+
+    def solve(
+        self,
+        data: DispatchData,
+        recipe: dict,
+        perf: PerfRecorder | None = None,
+        progress: Callable[[int, int], None] | None = None,
+        should_stop: Callable[[], bool] | None = None,
+    ) -> tuple[DispatchResult, bool]:
+        """`run_dispatch` compartido por clave canónica → (resultado, compartido)."""
+        def _run(progress_, should_stop_):
+            return run_dispatch(data, recipe, perf=perf, progress=progress_, should_stop=should_stop_)
+
+        def _complete(res: DispatchResult) -> bool:
+            # Un parcial (cancelación o presupuesto ajeno) no sirve a quien llegue después
+            return not res.meta.get("partial")
+
+        with maybe_span(perf, "solve compartido") as sp:
+            res, shared = self.do(
+                solve_key(data, recipe), _run, progress=progress, should_stop=should_stop, keep_if=_complete,
+            )
+            if shared and not _complete(res):
+                # Parcial del presupuesto o la cancelación de otro: se resuelve aparte
+                res, shared = _run(progress or (lambda done, total: None), should_stop or (lambda: False)), False
+            if sp is not None:
+                sp.record(shared=shared)
+        return res, shared
+
+
+# Instancia del proceso (la comparten todas las sesiones de la app)
+SOLVES = SingleFlight(registry=REGISTRY)
@@ -0,0 +1,117 @@
+"""
+Solves en segundo plano ligados a una sesión de Streamlit.
+
+La página ya no resuelve dentro de `st.spinner`: crea una `SolveTask`, la
+guarda en `st.session_state` y un fragmento con `run_every` muestra el
+avance y el botón de cancelar. Las interacciones con otros widgets vuelven a
+ejecutar el script, pero la tarea sigue en su hilo sin repetirse.
+
+    task = SolveTask(lambda progress, should_stop: run_dispatch(
+        data, recipe, progress=progress, should_stop=should_stop))
+    st.session_state["solve_task"] = task.start()
+
+    task.touch()        # latido desde el fragmento de la página
+    task.cancel()       # botón "Cancelar"
+
+La función recibe `progress(hechas, total, mensaje=None)` y `should_stop()`;
+`should_stop` se vuelve True al cancelar o si la página deja de latir por
+más de `abandon_after_s` (pestaña cerrada), así una sesión abandonada no
+sigue gastando CPU del servidor. run_dispatch lo consulta entre ventanas y
+antes de entrar a HiGHS: un solve de horizonte completo ya en HiGHS termina
+antes de ver la cancelación. El hilo nunca toca `st.*`: el resultado se
+recoge en la siguiente ejecución del script.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any, Callable
+
+PENDING, RUNNING, DONE, FAILED = "pending", "running", "done", "failed"
+
+# Sin latidos de la página por más que esto, la tarea se da por abandonada
+ABANDON_S = 60.0
+
+
+class SolveTask:
+    """Una función de solve corriendo en un hilo daemon, con avance y cancelación."""
+
+    def __init__(
+        self,
+        fn: Callable[[Callable[..., None], Callable[[], bool]], Any],
+        abandon_after_s: float = ABANDON_S,
+    ) -> None:
+        self._fn = fn
+        self.abandon_after_s = abandon_after_s
+        self._cancel = threading.Event()
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self._seen = time.monotonic()
+        self.state = PENDING
+        self.done_steps = 0
+        self.total_steps = 0
+        self.message = "En espera…"
+        self.result: Any = None
+        self.error: BaseException | None = None
+        self.started: float | None = None
+        self.finished_at: float | None = None
+
+    # ── Control ───────────────────────────────────────────────────────────────
+    def start(self) -> "SolveTask":
+        self.state, self.started = RUNNING, time.monotonic()
+        self._thread = threading.Thread(target=self._run, name="solve-task", daemon=True)
+        self._thread.start()
+        return self
+
+    def cancel(self) -> None:
+        self._cancel.set()
+        self.message = "Cancelando: se detiene antes de la siguiente ventana (HiGHS no se interrumpe a mitad)…"
+
+    def touch(self) -> None:
+        self._seen = time.monotonic()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    @property
+    def abandoned(self) -> bool:
+        return time.monotonic() - self._seen > self.abandon_after_s
+
+    def should_stop(self) -> bool:
+        return self.cancelled or self.abandoned
+
+    # ── Avance ────────────────────────────────────────────────────────────────
+    def report(self, done: int, total: int, message: str | None = None) -> None:
+        with self._lock:
+            self.done_steps, self.total_steps = done, total
+            if message is not None and not self.cancelled:
+                self.message = message
+
+    @property
+    def fraction(self) -> float:
+        with self._lock:
+            return min(self.done_steps / self.total_steps, 1.0) if self.total_steps else 0.0
+
+    @property
+    def finished(self) -> bool:
+        return self.state in (DONE, FAILED)
+
+    @property
+    def elapsed_s(self) -> float:
+        if self.started is None:
+            return 0.0
+        return (self.finished_at or time.monotonic()) - self.started
+
+    def _run(self) -> None:
+        try:
+            self.result = self._fn(self.report, self.should_stop)
+            self.state = DONE
+        except BaseException as e:
+            self.error, self.state = e, FAILED
+        finally:
+            self.finished_at = time.monotonic()
+
+    def join(self, timeout: float | None = None) -> None:
+        if self._thread is not None:
+            self._thread.join(timeout)
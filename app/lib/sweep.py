@@ -0,0 +1,245 @@
+"""
+Barridos de escenarios: especificación declarativa, ejecución en paralelo y
+checkpoints por trabajo.
+
+Una especificación (JSON) combina escenarios × ventanas de fechas × una
+rejilla cartesiana de parámetros con el mismo esquema `params` de
+lib/scenarios.py:
+
+    {
+      "name": "combustible_semanal",
+      "scenarios": ["base", {"name": "gas_caro", "extends": "fuel price",
+                              "params": {"voll_value": 5000}}],
+      "dates": {"start": "2026-01-05", "end": "2026-03-01", "window_days": 7},
+      "grid": {"marginal_cost_adder.gas_ccgt": [0, 20, 40]},
+      "growth": [false, true]
+    }
+
+Cada trabajo tiene un id estable (hash de sus entradas, incluido el nombre
+del escenario: dos escenarios con los mismos params son trabajos
+distintos y ambos salen en summary.csv). Al terminar se
+escribe `<out>/jobs/<id>.json` (escritura atómica); al relanzar el barrido
+los trabajos con checkpoint "ok" se saltan, así una corrida interrumpida
+sigue donde quedó. Los trabajos corren en un ProcessPoolExecutor; cada
+proceso carga los datos de entrada una sola vez.
+"""
+from __future__ import annotations
+
+import copy
+import hashlib
+import itertools
+import json
+import os
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Callable, Iterator
+
+import pandas as pd
+
+from .dispatch_model import DispatchData, extract_metrics, run_dispatch
+from .scenarios import SCENARIOS, make_recipe, resolve_scenario
+
+STATUS_OK = "ok"
+STATUS_ERROR = "error"
+
+
+@dataclass(frozen=True)
+class SweepJob:
+    """Un solve del barrido: escenario (ya con la rejilla aplicada) × ventana × crecimiento."""
+    scenario: str
+    params: dict
+    start: date | None
+    end: date | None
+    growth: bool
+    grid: dict            # valores de la rejilla de este trabajo (ruta → valor)
+
+    @property
+    def job_id(self) -> str:
+        payload = json.dumps(
+            {"scenario": self.scenario, "params": self.params, "start": self.start, "end": self.end,
+             "growth": self.growth},
+            sort_keys=True, default=str,
+        )
+        return hashlib.sha1(payload.encode()).hexdigest()[:16]
+
+    def recipe(self) -> dict:
+        return make_recipe(self.params, scenario=self.scenario, start=self.start, end=self.end, growth=self.growth)
+
+
+# ── Especificación → trabajos ─────────────────────────────────────────────────
+def load_spec(path: Path) -> dict:
+    with open(path, encoding="utf-8") as fh:
+        spec = json.load(fh)
+    spec.setdefault("name", Path(path).stem)
+    return spec
+
+
+def _deep_merge(base: dict, override: dict) -> dict:
+    out = copy.deepcopy(base)
+    for k, v in override.items():
+        out[k] = _deep_merge(out[k], v) if isinstance(v, dict) and isinstance(out.get(k), dict) else copy.deepcopy(v)
+    return out
+
+
+def _set_path(params: dict, path: str, value) -> None:
+    """Asigna `value` en la ruta con puntos ("marginal_cost_adder.gas_ccgt")."""
+    *parents, leaf = path.split(".")
+    node = params
+    for key in parents:
+        node = node.setdefault(key, {})
+    node[leaf] = value
+
+
+def _scenarios(spec: dict) -> list[tuple[str, dict]]:
+    """Entradas de "scenarios" → [(nombre, params)]; sin la clave, todos los predefinidos."""
+    out = []
+    for entry in spec.get("scenarios", list(SCENARIOS)):
+        if isinstance(entry, str):
+            key = resolve_scenario(entry)
+            out.append((key, copy.deepcopy(SCENARIOS[key]["params"])))
+            continue
+        base = SCENARIOS[resolve_scenario(entry["extends"])]["params"] if entry.get("extends") else {}
+        out.append((entry["name"], _deep_merge(base, entry.get("params", {}))))
+    return out
+
+
+def _windows(spec: dict) -> list[tuple[date | None, date | None]]:
+    """Bloque "dates" → ventanas [(inicio, fin)]; sin window_days, una sola ventana."""
+    dates = spec.get("dates")
+    if not dates:
+        return [(None, None)]
+    start = date.fromisoformat(dates["start"])
+    end = date.fromisoformat(dates["end"])
+    if not dates.get("window_days"):
+        return [(start, end)]
+    width = timedelta(days=int(dates["window_days"]))
+    step = timedelta(days=int(dates.get("step_days", dates["window_days"])))
+    out = []
+    while start <= end:
+        out.append((start, min(start + width - timedelta(days=1), end)))
+        start += step
+    return out
+
+
+def expand_jobs(spec: dict) -> list[SweepJob]:
+    """Producto cartesiano escenarios × ventanas × rejilla × crecimiento, sin duplicados (mismo nombre y entradas)."""
+    grid = spec.get("grid", {})
+    paths = list(grid)
+    combos = list(itertools.product(*(grid[p] for p in paths))) or [()]
+    growth = spec.get("growth", [False])
+    growth = growth if isinstance(growth, list) else [growth]
+
+    jobs: dict[str, SweepJob] = {}
+    for (name, base), (start, end), combo, g in itertools.product(_scenarios(spec), _windows(spec), combos, growth):
+        params = copy.deepcopy(base)
+        for path, value in zip(paths, combo):
+            _set_path(params, path, value)
+        job = SweepJob(name, params, start, end, bool(g), dict(zip(paths, combo)))
+        jobs.setdefault(job.job_id, job)
+    return list(jobs.values())
+
+
+# ── Checkpoints ───────────────────────────────────────────────────────────────
+def checkpoint_path(out_dir: Path, job: SweepJob) -> Path:
+    return Path(out_dir) / "jobs" / f"{job.job_id}.json"
+
+
+def is_done(out_dir: Path, job: SweepJob) -> bool:
+    path = checkpoint_path(out_dir, job)
+    if not path.exists():
+        return False
+    try:
+        return json.loads(path.read_text(encoding="utf-8")).get("status") == STATUS_OK
+    except (OSError, json.JSONDecodeError):
+        return False          # checkpoint a medias: se repite el trabajo
+
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + f".tmp{os.getpid()}")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+# ── Ejecución ─────────────────────────────────────────────────────────────────
+_WORKER_DATA: DispatchData | None = None
+
+
+def _init_worker(load_data: Callable[[], DispatchData]) -> None:
+    global _WORKER_DATA
+    _WORKER_DATA = load_data()
+
+
+def run_job(job: SweepJob, data: DispatchData, out_dir: Path, save_result: bool = False) -> dict:
+    """Resuelve un trabajo y escribe su checkpoint; los errores también quedan registrados."""
+    row = {
+        "job_id": job.job_id,
+        "scenario": job.scenario,
+        "start": job.start.isoformat() if job.start else None,
+        "end": job.end.isoformat() if job.end else None,
+        "growth": job.growth,
+        **{f"grid:{k}": v for k, v in job.grid.items()},
+    }
+    t0 = time.perf_counter()
+    try:
+        res = run_dispatch(data, job.recipe())
+        row.update(status=STATUS_OK, **extract_metrics(res))
+        if save_result:
+            _write_atomic(Path(out_dir) / "results" / f"{job.job_id}.npz", res.to_bytes())
+    except Exception as e:
+        row.update(status=STATUS_ERROR, error=f"{type(e).__name__}: {e}", traceback=traceback.format_exc())
+    row["wall_s"] = round(time.perf_counter() - t0, 3)
+    record = {**row, "params": job.params}
+    _write_atomic(checkpoint_path(out_dir, job), json.dumps(record, ensure_ascii=False, default=str).encode())
+    return row
+
+
+def _run_in_worker(job: SweepJob, out_dir: Path, save_result: bool) -> dict:
+    return run_job(job, _WORKER_DATA, out_dir, save_result)
+
+
+def run_sweep(
+    jobs: list[SweepJob],
+    load_data: Callable[[], DispatchData],
+    out_dir: Path,
+    workers: int = 1,
+    save_results: bool = False,
+) -> Iterator[dict]:
+    """
+    Corre los trabajos sin checkpoint "ok" y va devolviendo sus filas.
+
+    - load_data: función (importable, sin estado) que arma los datos; corre
+      una vez por proceso y no debe escribir (los archivos crudos se
+      ingieren antes, en el proceso padre: dispatch_data.sync_demand_store)
+    - workers: procesos; con 1 todo corre en el proceso actual
+    """
+    pending = [j for j in jobs if not is_done(out_dir, j)]
+    if not pending:
+        return
+    if workers <= 1:
+        data = load_data()
+        for job in pending:
+            yield run_job(job, data, out_dir, save_results)
+        return
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(load_data,)) as pool:
+        futures = [pool.submit(_run_in_worker, job, out_dir, save_results) for job in pending]
+        for fut in as_completed(futures):
+            yield fut.result()
+
+
+def collect(out_dir: Path) -> pd.DataFrame:
+    """Todas las filas con checkpoint en `out_dir` (una por trabajo), sin los params anidados."""
+    rows = []
+    for path in sorted((Path(out_dir) / "jobs").glob("*.json")):
+        try:
+            record = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError):
+            continue
+        record.pop("params", None)
+        record.pop("traceback", None)
+        rows.append(record)
+    return pd.DataFrame(rows)
@@ -0,0 +1,273 @@
+from __future__ import annotations
+
+from dataclasses import asdict, dataclass, field
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Iterator
+
+import numpy as np
+import pandas as pd
+
+from .dispatch_model import DEFAULT_COSTS, SISTEMAS
+
+# Áreas reales del balance CENACE por sistema (columna "Area" del CSV)
+AREAS_REALES: dict[str, list[str]] = {
+    "SIN": ["CEN", "NES", "NOR", "NTE", "OCC", "ORI", "PEN"],
+    "BCA": ["BCA"],
+    "BCS": ["BCS"],
+}
+
+# Demanda pico aproximada por sistema (MW) y reparto de centrales
+PICO_MW: dict[str, float] = {"SIN": 48_000.0, "BCA": 3_200.0, "BCS": 650.0}
+REPARTO_CENTRALES: dict[str, float] = {"SIN": 0.90, "BCA": 0.06, "BCS": 0.04}
+
+# Mezcla de tecnologías (fracción de centrales) y tamaño mediano (MW)
+MEZCLA: dict[str, tuple[float, float]] = {
+    "solar":         (0.28,  40.0),
+    "onwind":        (0.10,  90.0),
+    "hydro":         (0.12,  60.0),
+    "gas_ccgt":      (0.10, 450.0),
+    "gas_ocgt":      (0.06, 120.0),
+    "steam_other":   (0.05, 300.0),
+    "diesel_engine": (0.09,  20.0),
+    "chp":           (0.06,  50.0),
+    "geothermal":    (0.02,  40.0),
+    "biogas":        (0.05,   5.0),
+    "biomass":       (0.04,  15.0),
+    "solar_thermal": (0.02,  10.0),
+    "nuclear":       (0.01, 800.0),
+}
+
+EFICIENCIA: dict[str, tuple[float, float]] = {
+    "gas_ccgt":      (0.50, 0.58),
+    "gas_ocgt":      (0.30, 0.38),
+    "steam_other":   (0.32, 0.40),
+    "diesel_engine": (0.35, 0.42),
+    "chp":           (0.60, 0.80),
+}
+
+# Capacidad instalada total = margen × pico (holgura para indisponibilidad y VRE)
+MARGEN_CAPACIDAD = 1.9
+
+
+@dataclass
+class SyntheticSpec:
+    """
+    Parámetros del sistema sintético. Todo se deriva de `seed`: misma
+    especificación → mismos archivos, byte a byte.
+
+    - n_plants: centrales del catálogo
+    - sin_areas: áreas del SIN (≤ 7 usa las reales; más agrega A08, A09, …)
+    - bus_level: "system" (bus = SIN/BCA/BCS, lo que leen los loaders hoy)
+                 o "area" (bus = área, para topologías multi-bus futuras)
+    - start / days: horizonte de perfiles y demanda
+    - demand_scale: multiplica la demanda pico de referencia
+    """
+
+    n_plants: int = 5_000
+    sin_areas: int = 7
+    bus_level: str = "system"
+    start: date = date(2026, 1, 1)
+    days: int = 365
+    seed: int = 0
+    demand_scale: float = 1.0
+    areas: dict[str, list[str]] = field(init=False)
+
+    def __post_init__(self) -> None:
+        if self.bus_level not in ("system", "area"):
+            raise ValueError(f"bus_level debe ser 'system' o 'area', no {self.bus_level!r}")
+        sin = AREAS_REALES["SIN"][: self.sin_areas]
+        sin += [f"A{k:02d}" for k in range(len(sin) + 1, self.sin_areas + 1)]
+        self.areas = {"SIN": sin, "BCA": ["BCA"], "BCS": ["BCS"]}
+
+    @property
+    def snapshots(self) -> pd.DatetimeIndex:
+        return pd.date_range(pd.Timestamp(self.start), periods=self.days * 24, freq="h")
+
+    def to_dict(self) -> dict:
+        d = asdict(self)
+        d["start"] = self.start.isoformat()
+        return d
+
+
+def _rng(seed: int, *keys: int) -> np.random.Generator:
+    """Generador independiente por (seed, claves): reproducible sin importar el orden."""
+    return np.random.default_rng([seed, *keys])
+
+
+def _area_weights(spec: SyntheticSpec) -> dict[str, np.ndarray]:
+    """Peso de cada área dentro de su sistema (fijo por semilla)."""
+    rng = _rng(spec.seed, 1)
+    out = {}
+    for s in SISTEMAS:
+        w = rng.uniform(0.5, 1.5, len(spec.areas[s]))
+        out[s] = w / w.sum()
+    return out
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Catálogo: name,bus,carrier,p_nom,marginal_cost,efficiency
+# ──────────────────────────────────────────────────────────────────────────────
+def make_catalog(spec: SyntheticSpec) -> pd.DataFrame:
+    rng = _rng(spec.seed, 2)
+    carriers = list(MEZCLA)
+    shares = np.array([MEZCLA[c][0] for c in carriers])
+    weights = _area_weights(spec)
+
+    sys_counts = rng.multinomial(spec.n_plants, [REPARTO_CENTRALES[s] for s in SISTEMAS])
+    frames = []
+    for s, count in zip(SISTEMAS, sys_counts):
+        if count == 0:
+            continue
+        carrier = rng.choice(carriers, size=count, p=shares / shares.sum())
+        median = np.array([MEZCLA[c][1] for c in carrier])
+        p_nom = median * rng.lognormal(0.0, 0.6, count)
+        # Escalar para que la capacidad del sistema sea margen × pico
+        p_nom *= MARGEN_CAPACIDAD * PICO_MW[s] * spec.demand_scale / p_nom.sum()
+        area = rng.choice(spec.areas[s], size=count, p=weights[s])
+        frames.append(pd.DataFrame({
+            "system": s, "area": area, "carrier": carrier, "p_nom": p_nom,
+        }))
+    cat = pd.concat(frames, ignore_index=True)
+
+    lo_hi = np.array([EFICIENCIA.get(c, (1.0, 1.0)) for c in cat["carrier"]])
+    cat["efficiency"] = np.round(rng.uniform(lo_hi[:, 0], lo_hi[:, 1]), 3)
+    base_cost = cat["carrier"].map(DEFAULT_COSTS).astype(float)
+    cat["marginal_cost"] = np.round(base_cost * rng.uniform(0.9, 1.1, len(cat)), 2)
+    cat["p_nom"] = cat["p_nom"].round(2)
+    cat["bus"] = cat["system"] if spec.bus_level == "system" else cat["area"]
+    cat["name"] = [f"SYN_{s}_{c}_{k:05d}" for k, (s, c) in enumerate(zip(cat["system"], cat["carrier"]))]
+    return cat[["name", "bus", "carrier", "p_nom", "marginal_cost", "efficiency", "system", "area"]]
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Perfiles p_max_pu (snapshot × central), generados por bloques de días
+# ──────────────────────────────────────────────────────────────────────────────
+def _profile_block(catalog: pd.DataFrame, day0: int, n_days: int, spec: SyntheticSpec) -> np.ndarray:
+    """Matriz (n_days·24 × centrales) float32; cada día usa su propio RNG."""
+    areas = sorted(catalog["area"].unique())
+    a_idx = catalog["area"].map({a: i for i, a in enumerate(areas)}).to_numpy()
+    carrier = catalog["carrier"].to_numpy()
+    plant_rng = _rng(spec.seed, 3)
+    plant_scale = plant_rng.uniform(0.85, 1.0, len(catalog)).astype(np.float32)
+    hydro_base = plant_rng.uniform(0.3, 0.6, len(catalog)).astype(np.float32)
+
+    hours = np.arange(24)
+    out = np.empty((n_days * 24, len(catalog)), dtype=np.float32)
+    for k in range(n_days):
+        d = day0 + k
+        rng = _rng(spec.seed, 4, d)
+        doy = (spec.start + timedelta(days=d)).timetuple().tm_yday
+        season = 0.5 * (1 - np.cos(2 * np.pi * (doy - 15) / 365))       # 0 enero … 1 julio
+        daylen = 11.0 + 2.0 * season
+        sun = np.clip(np.sin(np.pi * (hours - (12 - daylen / 2)) / daylen), 0.0, None)
+        clouds = rng.uniform(0.55, 1.0, len(areas))                       # por área
+        wind_level = rng.uniform(0.15, 0.6, len(areas))
+        wind_hourly = np.clip(
+            wind_level[None, :] + 0.12 * rng.standard_normal((24, len(areas))), 0.0, 1.0
+        )
+
+        block = np.ones((24, len(catalog)), dtype=np.float32)
+        solar = carrier == "solar"
+        block[:, solar] = sun[:, None] * clouds[a_idx[solar]][None, :] * plant_scale[solar]
+        wind = carrier == "onwind"
+        block[:, wind] = wind_hourly[:, a_idx[wind]] * plant_scale[wind]
+        hydro = carrier == "hydro"
+        block[:, hydro] = (hydro_base[hydro] * (0.7 + 0.6 * season))[None, :]
+        other = ~(solar | wind | hydro)
+        block[:, other] = plant_scale[other][None, :]
+        out[k * 24:(k + 1) * 24] = np.clip(block, 0.0, 1.0)
+    return out
+
+
+def iter_profiles(catalog: pd.DataFrame, spec: SyntheticSpec, chunk_days: int = 31) -> Iterator[pd.DataFrame]:
+    """Perfiles por bloques de `chunk_days` (memoria acotada para flotas grandes)."""
+    idx = spec.snapshots
+    for day0 in range(0, spec.days, chunk_days):
+        n_days = min(chunk_days, spec.days - day0)
+        values = _profile_block(catalog, day0, n_days, spec)
+        yield pd.DataFrame(values, index=idx[day0 * 24:(day0 + n_days) * 24], columns=catalog["name"].tolist())
+
+
+def make_profiles(catalog: pd.DataFrame, spec: SyntheticSpec) -> pd.DataFrame:
+    return pd.concat(list(iter_profiles(catalog, spec)))
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Demanda horaria por sistema y área
+# ──────────────────────────────────────────────────────────────────────────────
+def make_demand(spec: SyntheticSpec) -> pd.DataFrame:
+    """(snapshot, sistema, area, demand_mw) con forma diaria, semanal y estacional."""
+    weights = _area_weights(spec)
+    cols = [(s, a, PICO_MW[s] * spec.demand_scale * w) for s in SISTEMAS for a, w in zip(spec.areas[s], weights[s])]
+    hours = np.arange(24)
+    daily = 0.78 + 0.12 * np.sin(np.pi * (hours - 6) / 12) + 0.10 * np.exp(-((hours - 20) ** 2) / 6)
+
+    days = [spec.start + timedelta(days=d) for d in range(spec.days)]
+    doy = np.array([d.timetuple().tm_yday for d in days])
+    season = 0.88 + 0.06 * (1 - np.cos(2 * np.pi * (doy - 15) / 365))
+    weekday = np.where([d.weekday() >= 5 for d in days], 0.93, 1.0)
+    # Ruido por día con su propio RNG: el día d no depende del horizonte pedido
+    noise = np.stack([1.0 + 0.02 * _rng(spec.seed, 5, d).standard_normal((24, len(cols))) for d in range(spec.days)])
+
+    shape = (season * weekday)[:, None] * daily[None, :]                  # días × 24
+    base = np.array([c[2] for c in cols])
+    mw = shape[:, :, None] * base[None, None, :] * noise                  # días × 24 × áreas
+    return pd.DataFrame({
+        "snapshot": np.repeat(spec.snapshots.to_numpy(), len(cols)),
+        "sistema": np.tile([c[0] for c in cols], spec.days * 24),
+        "area": np.tile([c[1] for c in cols], spec.days * 24),
+        "demand_mw": mw.reshape(-1).round(5),
+    })
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Escritura en los formatos del proyecto
+# ──────────────────────────────────────────────────────────────────────────────
+BALANCE_COLUMNS = [
+    "Sistema", " Area", " Hora", " Generacion (MWh)", " Importacion Total (MWh)",
+    " Exportacion Total (MWh)", " Intercambio neto entre Gerencias (MWh)",
+    " Estimacion de Demanda por Balance (MWh) ",
+]
+
+
+def write_balance_csv(day_df: pd.DataFrame, op_date: date, path: Path, seed: int = 0) -> Path:
+    """
+    CSV con el mismo layout que 'Demanda Real Balance' del portal CENACE:
+    8 líneas de encabezado (la 8ª con la fecha de operación) y las columnas
+    oficiales. Demanda = generación + importación − exportación.
+    """
+    rng = _rng(seed, 6, op_date.toordinal())
+    dem = day_df["demand_mw"].to_numpy()
+    imp = np.round(dem * rng.uniform(0.0, 0.05, len(dem)), 5)
+    exp = np.round(dem * rng.uniform(0.0, 0.03, len(dem)), 5)
+    gen = np.round(dem - imp + exp, 5)
+    pub = datetime.combine(op_date + timedelta(days=14), datetime.min.time()).replace(hour=12, minute=25, second=1)
+    meses = ["ene", "feb", "mar", "abr", "may", "jun", "jul", "ago", "sep", "oct", "nov", "dic"]
+    pub_s = f"{pub.day:02d}/{meses[pub.month - 1]}/{pub.year}"
+    header = [
+        "Centro Nacional de Control de Energia",
+        "Estimacion de la Demanda Real del Sistema -Por Balance",
+        "Sistema Electrico Nacional",
+        "Reporte Diario",
+        f"Fecha de Publicacion: {pub_s}",
+        f"Archivo descargado desde el Sistema de Informacion del Mercado (Area Publica) "
+        f"creado el {pub_s} {pub:%H:%M:%S} hrs.",
+        "Nota 1: Los acentos de este reporte se omiten intencionalmente por sistema.",
+        f"LIQUIDACION 0 (Dia de Operacion: {op_date:%d/%m/%Y})",
+    ]
+    lines = [f'"{h}"' for h in header]
+    lines.append(",".join(f'"{c}"' for c in BALANCE_COLUMNS))
+    hora = day_df["snapshot"].dt.hour.to_numpy() + 1
+    for k, (s, a) in enumerate(zip(day_df["sistema"], day_df["area"])):
+        lines.append(
+            f'"{s}","{a}","{hora[k]}","{gen[k]:.5f}","{imp[k]:.5f}","{exp[k]:.5f}",'
+            f'"               ---","{dem[k]:.5f}"'
+        )
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(("\n".join(lines) + "\n").encode("latin-1"))
+    return path
+
+
+def balance_filename(op_date: date) -> str:
+    return f"Demanda Real Balance_0_v3 Dia Operacion {op_date:%Y-%m-%d} synthetic.csv"
@@ -6,7 +6,7 @@ import plotly.graph_objects as go
 from datetime import datetime, timedelta
 from zoneinfo import ZoneInfo
 from pathlib import Path
-from lib.cenace_client import fetch_demand, fetch_demand_batch, CACHE_DIR
+from lib.cenace_client import fetch_demand, fetch_demand_batch, api_health, load_cached_demand, CACHE, CACHE_DIR
 
 SERIES_LABELS = {
     "demanda_mw":    "Demanda",
@@ -75,7 +75,12 @@ def render_system_panel(df: pd.DataFrame, sys_label: str, res=None) -> None:
         col_cache, = st.columns(1)
         badge = "💾 Cache" if res.from_cache else "🌐 En vivo"
         st.caption(f"{badge} | Batches: {res.batches}")
-        if res.from_cache:
+        if getattr(res, "is_mock", False):
+            st.error(
+                "CENACE no respondió tras varios reintentos — se muestran **ceros de relleno** "
+                f"(no se guardan en cache ni en el histórico). Detalle: {res.error}"
+            )
+        elif res.from_cache:
             st.info("Datos cargados desde cache local.")
         else:
             st.success("Datos descargados en vivo desde CENACE.")
@@ -322,7 +327,8 @@ if st.button("Descargar"):
         res = fetch_demand(system=system, use_cache=use_cache)
 
     df = to_clean_df(res.df)
-    save_to_history(df, system)
+    if not res.is_mock:
+        save_to_history(df, system)
 
     st.session_state["demand_df"]     = df
     st.session_state["demand_df_raw"] = res.df
@@ -354,7 +360,7 @@ if "demand_df" in st.session_state:
 st.divider()
 st.subheader("Descarga en lote (batching)")
 st.caption(
-    "Descarga los 3 sistemas en secuencia. Cada resultado se **cachea** "
+    "Descarga los 3 sistemas en paralelo sobre una sola conexión keep-alive. Cada resultado se **cachea** "
     "por separado en disco (`data_cache/`) con clave `{sistema}|{fecha}`."
 )
 
@@ -372,14 +378,13 @@ if st.button("Descargar todos los sistemas seleccionados", type="primary"):
     if not batch_systems:
         st.warning("Selecciona al menos un sistema.")
     else:
-        prog = st.progress(0.0, text="Iniciando descarga por lotes…")
+        prog = st.progress(0.0, text=f"Descargando {', '.join(batch_systems)} en paralelo…")
         batch_results: dict[str, tuple] = {}
-        n_sys = len(batch_systems)
-        for i, s in enumerate(batch_systems):
-            prog.progress(i / n_sys, text=f"Descargando {s}… ({i+1}/{n_sys})")
-            res_s = fetch_demand(system=s, use_cache=batch_use_cache)
+        fetched = fetch_demand_batch(systems=batch_systems, use_cache=batch_use_cache)
+        for s, res_s in fetched.items():
             df_s = to_clean_df(res_s.df)
-            save_to_history(df_s, s)
+            if not res_s.is_mock:
+                save_to_history(df_s, s)
             batch_results[s] = (df_s, res_s)
         prog.progress(1.0, text="¡Descarga completada!")
         st.session_state["batch_results"] = batch_results
@@ -450,3 +455,46 @@ if "batch_results" in st.session_state:
             st.dataframe(pd.DataFrame(rows).set_index("Sistema"), use_container_width=True)
         else:
             st.info("No hay datos de demanda suficientes para la comparativa.")
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Sección 3: Salud de la API (latencias, reintentos, circuit breaker)
+# ─────────────────────────────────────────────────────────────────────────────
+st.divider()
+with st.expander("🩺 Salud de la API CENACE", expanded=False):
+    health = api_health()
+    if not any(v.get("n_latencias") for v in health.values()):
+        st.caption("Aún no hay peticiones registradas en este proceso.")
+    for endpoint, row in health.items():
+        h1, h2, h3, h4 = st.columns(4)
+        h1.metric("Breaker", row.get("breaker", "—"),
+                  help=f"Reintentar en {row.get('reintentar_en_s', 0):.0f} s" if row.get("breaker") == "open" else None)
+        h2.metric("OK / errores", f"{row.get('ok', 0)} / {row.get('error', 0) + row.get('retryable_error', 0)}")
+        h3.metric("Latencia p50", f"{row['p50_s']:.2f} s" if "p50_s" in row else "—")
+        h4.metric("Latencia p95", f"{row['p95_s']:.2f} s" if "p95_s" in row else "—")
+        st.caption(
+            f"`{endpoint}` — fallos rápidos por breaker abierto: {row.get('short_circuit', 0)}. "
+            f"Historial por petición en `{CACHE_DIR.name}/fetch_metrics.jsonl`."
+        )
+
+
+with st.expander("💾 Cache de la API (índice)", expanded=False):
+    cache_idx = CACHE.entries()
+    st.caption(
+        f"{len(cache_idx)} entradas · {CACHE.total_bytes() / 1e6:,.2f} MB de "
+        f"{CACHE.max_bytes / 1e6:,.0f} MB · TTL {CACHE.ttl_days:.0f} días (expulsión LRU)."
+    )
+    if cache_idx.empty:
+        st.info("El cache está vacío.")
+    else:
+        st.dataframe(cache_idx.drop(columns=["file"]), use_container_width=True, height=220)
+        cc1, cc2 = st.columns(2)
+        with cc1:
+            cache_sys = st.selectbox("Sistema", sorted(cache_idx["system"].unique()), key="cache_sys")
+        with cc2:
+            cache_days = sorted(cache_idx.loc[cache_idx["system"] == cache_sys, "date"].unique(), reverse=True)
+            cache_day = st.selectbox("Día", cache_days, key="cache_day")
+        cached_df = load_cached_demand(cache_sys, datetime.strptime(cache_day, "%Y-%m-%d").date())
+        if cached_df is None:
+            st.warning("La entrada expiró o fue expulsada del cache.")
+        else:
+            render_system_panel(to_clean_df(cached_df), f"cache_{cache_sys}")
@@ -1,32 +1,63 @@
 # app/pages/2_Despacho_PyPSA.py
 from __future__ import annotations
 
-import re
+import threading
+import time
+import uuid
+from functools import partial
 from pathlib import Path
 
 import pandas as pd
-import pypsa
 import streamlit as st
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 
+from lib import demand_store, dispatch_data
+from lib.chart_lod import MAX_POINTS, downsample, downsample_curve, use_webgl, window
+from lib.dispatch_model import (
+    DEFAULT_COSTS,
+    GROWTH_2026,
+    GROWTH_TOTAL_MW,
+    SISTEMAS,
+    STOP_BUDGET,
+    STOP_CANCELLED,
+    VOLL_DEFAULT,
+    DispatchData,
+    SolveInterrupted,
+    compute_effective_costs,
+    extract_metrics,
+)
+from lib.dispatch_result import DispatchResult
+from lib.exports import FORMATS, deferred_export, discard_exports, file_name, mime_type
+from lib.job_service import (
+    PRIORITY_BATCH,
+    PRIORITY_COMPARISON,
+    PRIORITY_INTERACTIVE,
+    SERVICE_URL,
+    JobClient,
+    QueueFullError,
+)
+from lib.marginal_unit import identify_marginal_generator
+from lib.metrics import CO2_FACTOR
+from lib.perf import PerfRecorder
+from lib.post_solve import DerivedResults, PostSolveIndex
+from lib.result_registry import REGISTRY
+from lib.scenarios import BASE_SCENARIO_KEY, SCENARIO_NAMES, SCENARIOS, make_recipe
+from lib.sensitivity import DOWN, ENERGY, UP, carrier_ranges, cost_ranges, reprice, stable_change
+from lib.single_flight import SOLVES
+from lib.solve_task import SolveTask
+
 # ──────────────────────────────────────────────────────────────────────────────
 # Paths
 # ──────────────────────────────────────────────────────────────────────────────
 ROOT          = Path(__file__).resolve().parents[2]
-DATA_CLEAN    = ROOT / "data_clean"
-CENTRALES_CSV = DATA_CLEAN / "generators" / "Centrales_gen_mx.csv"
-PERFIL_CSV    = DATA_CLEAN / "generators" / "Perfil_Generaciom.csv"
-DEMAND_RAW_DIR  = ROOT / "data_raw" / "demand" / "balance_2026"
-DEMAND_API_DIR  = ROOT / "data_raw" / "demand" / "daily_api"
+CENTRALES_CSV = dispatch_data.CENTRALES_CSV
+PERFIL_CSV    = dispatch_data.PERFIL_CSV
+DEMAND_RAW_DIR  = demand_store.BALANCE_DIR
 
 # ──────────────────────────────────────────────────────────────────────────────
 # Constants
 # ──────────────────────────────────────────────────────────────────────────────
-SISTEMAS = ["SIN", "BCA", "BCS"]
-
-VOLL_DEFAULT = 3_000  # $/MWh — Value of Lost Load (carga no servida)
-
 # Ordered for charts (cheaper first = bottom of stack)
 CARRIERS = [
     "hydro", "nuclear", "solar", "onwind", "solar_thermal",
@@ -70,354 +101,37 @@ CARRIER_COLORS = {
 }
 
 
-
-
-# Default marginal costs ($/MWh) — based on CFE/CENACE reference
-DEFAULT_COSTS: dict[str, float] = {
-    "hydro":         8,
-    "nuclear":       5,
-    "solar":         0,
-    "onwind":        0,
-    "solar_thermal": 3,
-    "geothermal":    10,
-    "biogas":        15,
-    "biomass":       20,
-    "chp":           50,
-    "gas_ccgt":      50,
-    "gas_ocgt":      70,
-    "steam_other":   65,
-    "diesel_engine": 100,
-}
-
-
-def compute_effective_costs(params: dict) -> dict[str, float]:
-    """Apply marginal_cost_multiplier and marginal_cost_adder on top of DEFAULT_COSTS."""
-    costs = {c: float(v) for c, v in DEFAULT_COSTS.items()}
-    for carrier, mult in params.get("marginal_cost_multiplier", {}).items():
-        if carrier in costs:
-            costs[carrier] = round(costs[carrier] * float(mult), 4)
-    for carrier, add in params.get("marginal_cost_adder", {}).items():
-        if carrier in costs:
-            costs[carrier] = round(costs[carrier] + float(add), 4)
-    return costs
-
-# ──────────────────────────────────────────────────────────────────────────────
-# Preset scenarios  (5 lecciones pedagógicas)
-# Schema: params.marginal_cost_multiplier / adder applied ON TOP of DEFAULT_COSTS
-# Implemented: capacity_multiplier, forced_outage, battery_enable + battery_*
-# Reserved (no-op): capacity_delta_mw, vre_profile_multiplier
-# ──────────────────────────────────────────────────────────────────────────────
-BASE_SCENARIO_KEY = "🏭 Base 2026"
-
-SCENARIOS: dict[str, dict] = {
-    BASE_SCENARIO_KEY: {
-        "desc":   "Costos de referencia del SEN. Renovables e hidro despachan primero; gas CCGT cubre la demanda residual; vapor es respaldo caro.",
-        "lesson": "Gas CCGT es el unit marginal en la mayoría de horas. Solar/eólica/hidro comprimen el precio en horas de alta generación renovable.",
-        "narrative": {
-            "cambio":   "Costos variables de referencia sin modificación. Gas CCGT = 50 $/MWh, vapor = 65 $/MWh.",
-            "observa":  "En el despacho: renovables ocupan la base de la pila; gas CCGT llena la demanda residual. En el precio marginal: ~50 $/MWh en horas de valle, cae a cero en horas de alta solar.",
-            "leccion":  "El **precio marginal** lo fija el último generador despachado (gas CCGT). Las renovables no tienen costo variable, así que reducen el precio cuando hay suficiente recurso — el fenómeno de *merit order effect*.",
-        },
-        "params": {
-            "marginal_cost_multiplier": {},
-            "marginal_cost_adder":      {},
-            "voll_value":               3000,
-            "demand_multiplier":        {"SIN": 1.0, "BCA": 1.0, "BCS": 1.0},
-            # reserved
-            "capacity_multiplier":      {},
-            "capacity_delta_mw":        {},
-            "forced_outage":            {"enabled": False},
-            "vre_profile_multiplier":   {},
-            "battery_enable":           False,
-        },
-    },
-    "⛽ Fuel Price Shock": {
-        "desc":   "Encarecimiento de combustibles fósiles — gas sube más, carbón sube poco. Adders: CCGT +30, OCGT +40, CHP +10, Diésel +50, Vapor +15.",
-        "lesson": "Sube el costo total y el precio marginal nodal. Renovables e hidro se vuelven relativamente más atractivas. Si el sistema depende mucho de térmicas caras, puede aparecer shedding.",
-        "narrative": {
-            "cambio":   "Gas CCGT sube de 50 → 80 $/MWh, OCGT de 70 → 110, vapor de 65 → 80, diésel de 100 → 150. Las renovables e hidro **no cambian**.",
-            "observa":  "El precio marginal nodal sube en todos los sistemas. El mix de generación desplaza más trabajo a renovables e hidro. Compara el costo total vs. el caso base en el panel de comparación.",
-            "leccion":  "Un shock de combustible se transmite íntegramente al precio de mercado cuando las térmicas son el *unit marginal*. La penetración renovable actúa como amortiguador natural del precio.",
-        },
-        "params": {
-            "marginal_cost_multiplier": {},
-            "marginal_cost_adder": {
-                "gas_ccgt":      30,   # 50 + 30 = 80 $/MWh
-                "gas_ocgt":      40,   # 70 + 40 = 110 $/MWh
-                "chp":           10,   # 50 + 10 = 60 $/MWh
-                "diesel_engine": 50,   # 100 + 50 = 150 $/MWh
-                "steam_other":   15,   # 65 + 15 = 80 $/MWh
-            },
-            "voll_value":               3000,
-            "demand_multiplier":        {"SIN": 1.0, "BCA": 1.0, "BCS": 1.0},
-        },
-    },
-    "☀️ Renewables Boom 2026": {
-        "desc":   "Expansión renovable 2026: más capacidad solar y eólica instalada por sistema (×1.4–×1.8). Perfiles horarios iguales, pero más MW disponibles.",
-        "lesson": "Agregar MW renovables no garantiza aprovechamiento total. Aparece más curtailment en horas de alta producción cuando la demanda no absorbe toda la oferta. La flexibilidad del sistema es clave.",
-        "narrative": {
-            "cambio":   "Solar SIN ×1.6, eólica SIN ×1.4, solar BCA ×1.4, solar BCS ×1.8. Los **perfiles horarios no cambian** — solo aumenta la potencia instalada.",
-            "observa":  "El curtailment sube (tab por sistema → sección de curtailment). El precio marginal cae en horas solares. El costo total puede bajar aunque haya más capacidad sin usar.",
-            "leccion":  "Añadir MW renovables sin flexibilidad (almacenamiento, interconexión, demanda flexible) genera *curtailment* creciente. El valor marginal de cada MW adicional decrece — ley de rendimientos marginales decrecientes en VRE.",
-        },
-        "params": {
-            "marginal_cost_multiplier": {},
-            "marginal_cost_adder":      {},
-            "voll_value":               3000,
-            "demand_multiplier":        {"SIN": 1.0, "BCA": 1.0, "BCS": 1.0},
-            "capacity_multiplier": {
-                "SIN": {"solar": 1.6, "wind": 1.4},
-                "BCA": {"solar": 1.4, "wind": 1.2},
-                "BCS": {"solar": 1.8, "wind": 1.3},
-            },
-        },
-    },
-    "🔧 Forced Outage – BCS Diésel": {
-        "desc":   "Falla forzada: 35% de la capacidad diésel de BCS queda fuera de servicio. BCS depende del diésel como respaldo firme. VoLL sube a $5 000/MWh.",
-        "lesson": "La pérdida de capacidad firme puede disparar costos y afectar confiabilidad, especialmente en sistemas aislados como BCS. El precio marginal refleja directamente la falta de alternativas.",
-        "narrative": {
-            "cambio":   "BCS pierde 35% de su capacidad diésel (único respaldo firme disponible). VoLL = 5 000 $/MWh para simular política de confiabilidad estricta.",
-            "observa":  "En el tab BCS: el precio marginal sube bruscamente. Posible aparición de **carga no servida** (barra roja en el despacho) si la demanda supera la capacidad reducida.",
-            "leccion":  "Los sistemas aislados son extremadamente vulnerables a la pérdida de capacidad firme. Sin interconexión, no hay respaldo externo — el VoLL es la única válvula de escape del LP, lo que refleja el costo económico real de un blackout.",
-        },
-        "params": {
-            "marginal_cost_multiplier": {},
-            "marginal_cost_adder":      {},
-            "voll_value":               5000,
-            "demand_multiplier":        {"SIN": 1.0, "BCA": 1.0, "BCS": 1.0},
-            "forced_outage": {
-                "enabled":                True,
-                "system":                 "BCS",
-                "technology":             "diesel",
-                "capacity_loss_fraction": 0.35,
-            },
-        },
-    },
-    "🔋 Add Storage – Flexibility": {
-        "desc":   "Instala baterías en los tres sistemas: SIN 600 MW / 2 400 MWh, BCA 150 MW / 600 MWh, BCS 100 MW / 400 MWh. Eficiencia 95%, SOC cíclico.",
-        "lesson": "La batería vale más cuando hay spreads de precios, picos de demanda o excedentes renovables. Reduce curtailment, suaviza picos de precio marginal y puede evitar shedding.",
-        "narrative": {
-            "cambio":   "Se añaden baterías BESS en cada sistema: SIN 600 MW/2 400 MWh (4 h), BCA 150/600, BCS 100/400. Eficiencia ida y vuelta 90.25% (0.95²). SOC cíclico.",
-            "observa":  "En el tab de cada sistema: aparece la sección **SOC de batería**. La batería carga en horas solares (precio bajo) y descarga al atardecer/noche (precio alto). El curtailment baja; el precio marginal se aplana.",
-            "leccion":  "El almacenamiento realiza **arbitraje temporal**: compra energía barata (solar) y la vende cara (pico). El spread de precio que la batería captura es exactamente su valor de mercado — si el spread baja a cero, la batería no tiene incentivo económico para operar.",
-        },
-        "params": {
-            "marginal_cost_multiplier":      {},
-            "marginal_cost_adder":           {},
-            "voll_value":                    3000,
-            "demand_multiplier":             {"SIN": 1.0, "BCA": 1.0, "BCS": 1.0},
-            "battery_enable":                True,
-            "battery_power_mw":              {"SIN": 600, "BCA": 150, "BCS": 100},
-            "battery_energy_mwh":            {"SIN": 2400, "BCA": 600, "BCS": 400},
-            "battery_efficiency_store":      0.95,
-            "battery_efficiency_dispatch":   0.95,
-            "battery_initial_soc":           0.5,
-            "battery_cyclic_state_of_charge": True,
-        },
-    },
-    "🔴 VOLL Alto ($10 000)": {
-        "desc":   "VoLL = $10 000/MWh — política de confiabilidad estricta. El modelo prefiere usar generación carísima antes que cortar carga.",
-        "lesson": "Con VoLL alto, el shedding es el último recurso. Sube el uso de térmicas de respaldo y el costo total; la confiabilidad tiene un precio implícito muy alto.",
-        "narrative": {
-            "cambio":   "Solo cambia el VoLL: de 3 000 → 10 000 $/MWh. Todos los costos de generación permanecen iguales.",
-            "observa":  "El costo total sube porque el modelo despacha unidades más caras para evitar el shedding. El precio marginal puede alcanzar 10 000 $/MWh si hay escasez. El shedding es casi cero.",
-            "leccion":  "El VoLL es un **parámetro de política**, no técnico. Refleja cuánto está dispuesta a pagar la sociedad por evitar un blackout. Con VoLL alto, la curva de demanda es perfectamente inelástica — la electricidad se produce a cualquier costo.",
-        },
-        "params": {
-            "marginal_cost_multiplier": {},
-            "marginal_cost_adder":      {},
-            "voll_value":               10_000,
-            "demand_multiplier":        {"SIN": 1.0, "BCA": 1.0, "BCS": 1.0},
-        },
-    },
-    "🟡 VOLL Bajo ($2 000)": {
-        "desc":   "VoLL = $2 000/MWh — política de confiabilidad laxa. El modelo puede sheddear antes si producir cuesta demasiado.",
-        "lesson": "Con VoLL bajo, el shedding compite directamente con las térmicas caras. Aparece carga no servida cuando el costo marginal supera $2 000/MWh. La confiabilidad es una decisión política.",
-        "narrative": {
-            "cambio":   "VoLL baja de 3 000 → 2 000 $/MWh. Esto significa que el modelo prefiere cortar carga antes que despachar unidades con costo > 2 000 $/MWh.",
-            "observa":  "Si hay horas donde el único generador disponible cuesta más de 2 000 $/MWh, aparece **carga no servida** (barra oscura en la gráfica de despacho). Compara el shedding vs. el caso base.",
-            "leccion":  "El shedding no es un error del modelo — es una decisión de costo-beneficio. Cuando el costo de producir una unidad supera el VoLL, es \"más barato\" no servir la demanda. El VoLL implícito en el SEN real es mucho mayor (~20 000–50 000 $/MWh).",
-        },
-        "params": {
-            "marginal_cost_multiplier": {},
-            "marginal_cost_adder":      {},
-            "voll_value":               2_000,
-            "demand_multiplier":        {"SIN": 1.0, "BCA": 1.0, "BCS": 1.0},
-        },
-    },
-}
-SCENARIO_NAMES = list(SCENARIOS.keys())
-
-# ──────────────────────────────────────────────────────────────────────────────
-# 2026 expected capacity growth
-# Fuente: PRODESEN 2026-2030 / CFE Plan de Expansión (valores representativos)
-# ──────────────────────────────────────────────────────────────────────────────
-GROWTH_2026: list[tuple[str, str, str, float]] = [
-    # (name,               bus,   carrier,      p_nom MW)
-    # SIN — proyectos adjudicados en subastas 2025/2026
-    ("new_solar_SIN_1",    "SIN", "solar",       1_500.0),
-    ("new_solar_SIN_2",    "SIN", "solar",         500.0),
-    ("new_onwind_SIN",     "SIN", "onwind",        500.0),
-    ("new_gas_ccgt_SIN",   "SIN", "gas_ccgt",      500.0),
-    # BCA — Mexicali y norte de Baja California
-    ("new_solar_BCA",      "BCA", "solar",          300.0),
-    ("new_onwind_BCA",     "BCA", "onwind",         200.0),
-    # BCS — La Paz y Los Cabos
-    ("new_solar_BCS",      "BCS", "solar",          200.0),
-    ("new_gas_ocgt_BCS",   "BCS", "gas_ocgt",       100.0),
-]
-GROWTH_TOTAL_MW = sum(r[3] for r in GROWTH_2026)
-
-VRE_CARRIERS = {"solar", "onwind"}  # Variable renewable energy: curtailment-eligible only
 SYSTEM_COLORS = {"SIN": "#2563EB", "BCA": "#16A34A", "BCS": "#EA580C"}
 
-# CO₂ emission factors (tCO₂/MWh electrical output, IPCC AR6 median)
-CO2_FACTOR: dict[str, float] = {
-    "gas_ccgt":      0.37,
-    "gas_ocgt":      0.55,
-    "steam_other":   0.85,
-    "diesel_engine": 0.70,
-    "chp":           0.45,
-    "nuclear":       0.012,
-    "hydro":         0.024,
-    "solar":         0.0,
-    "onwind":        0.0,
-    "solar_thermal": 0.0,
-    "geothermal":    0.038,
-    "biogas":        0.0,
-    "biomass":       0.0,
-    "battery":       0.0,
-}
-
-# p_min_pu for inflexible technologies (cannot ramp down freely)
-INFLEXIBLE_PMIN: dict[str, float] = {
-    "nuclear":    0.85,
-    "geothermal": 0.80,
-    "chp":        0.40,
-}
-
-# Dispatch category — determines p_max_pu default when no profile is available
-#   vre        → profile mandatory; 0.0 if missing (no sun/wind = no generation)
-#   hydro      → availability factor P_MAX_AVAIL["hydro"] (partial reservoir constraint)
-#   inflexible → rated availability factor P_MAX_AVAIL[carrier] (forced baseload)
-#   thermal    → 1.0 (fully dispatchable on demand)
-DISPATCH_CATEGORY: dict[str, str] = {
-    "solar":         "vre",
-    "onwind":        "vre",
-    "hydro":         "hydro",
-    "nuclear":       "inflexible",
-    "geothermal":    "inflexible",
-    "chp":           "inflexible",
-    "gas_ccgt":      "thermal",
-    "gas_ocgt":      "thermal",
-    "diesel_engine": "thermal",
-    "steam_other":   "thermal",
-    "solar_thermal": "thermal",
-    "biogas":        "thermal",
-    "biomass":       "thermal",
-    "battery":       "thermal",
-}
-
-# Default p_max_pu for categories / carriers without a real-time profile
-P_MAX_AVAIL: dict[str, float] = {
-    "hydro":      0.55,   # seasonal reservoir + run-of-river constraint
-    "nuclear":    0.90,   # planned outage factor
-    "geothermal": 0.90,   # high capacity factor but not 100%
-    "chp":        0.85,   # heat-demand coupling limits full output
-}
-
-# Carrier alias map: scenario-facing names → internal carrier keys
-CARRIER_ALIAS: dict[str, str] = {
-    "wind":   "onwind",
-    "diesel": "diesel_engine",
-}
-
 # ──────────────────────────────────────────────────────────────────────────────
 # Cached data loaders
 # ──────────────────────────────────────────────────────────────────────────────
 @st.cache_data(show_spinner=False)
 def load_generators() -> pd.DataFrame:
-    df = pd.read_csv(CENTRALES_CSV)
-    df["bus"] = (
-        df["bus"].astype(str).str.strip().str.upper()
-        .replace({"BSA": "BCA", "MUGELE": "BCS", "MUG": "BCS"})
-    )
-    return df[df["bus"].isin(SISTEMAS)].reset_index(drop=True)
+    return dispatch_data.load_generators(CENTRALES_CSV)
 
 
 @st.cache_data(show_spinner=False)
 def load_profiles() -> pd.DataFrame:
-    perfil = pd.read_csv(PERFIL_CSV)
-    perfil["snapshot"] = pd.to_datetime(perfil["snapshot"])
-    return perfil.set_index("snapshot").sort_index()
+    return dispatch_data.load_profiles(PERFIL_CSV)
 
 
-@st.cache_data(show_spinner=False)
-def load_demand_raw() -> pd.DataFrame:
-    all_dfs = []
-
-    # ── 1. CSVs oficiales de balance CENACE ───────────────────────────────────
-    for f in sorted(DEMAND_RAW_DIR.glob("*.csv")):
-        with open(f, encoding="latin-1") as fh:
-            header_lines = [fh.readline() for _ in range(8)]
-        m = re.search(r"(\d{2}/\d{2}/\d{4})", header_lines[7].strip().strip('"'))
-        if not m:
-            continue
-        op_date = pd.to_datetime(m.group(1), format="%d/%m/%Y")
-        df = pd.read_csv(f, skiprows=8, header=0, encoding="latin-1")
-        df.columns = [c.strip().strip('"').strip() for c in df.columns]
-        col_s, col_h, col_d = "Sistema", "Hora", "Estimacion de Demanda por Balance (MWh)"
-        if not {col_s, col_h, col_d}.issubset(df.columns):
-            continue
-        df = df[[col_s, col_h, col_d]].copy()
-        df.columns = ["zona", "hora", "demand_mw"]
-        df["zona"]      = df["zona"].astype(str).str.strip().str.strip('"').str.upper()
-        df["hora"]      = pd.to_numeric(df["hora"], errors="coerce")
-        df["demand_mw"] = pd.to_numeric(
-            df["demand_mw"].astype(str).str.strip().str.replace(",", ""), errors="coerce"
-        )
-        df = df.dropna(subset=["hora", "demand_mw"])
-        df["snapshot"] = op_date + pd.to_timedelta(df["hora"].astype(int) - 1, unit="h")
-        # SIN is split into 7 areas in the CSV — sum areas to get system total
-        df = df.groupby(["snapshot", "zona"], as_index=False)["demand_mw"].sum()
-        all_dfs.append(df[["snapshot", "zona", "demand_mw"]])
-
-    # ── 2. CSVs de la API diaria (fetch_daily_demand.py / GitHub Action) ──────
-    if DEMAND_API_DIR.exists():
-        for f in sorted(DEMAND_API_DIR.glob("demand_*.csv")):
-            try:
-                df = pd.read_csv(f, parse_dates=["snapshot"])
-                df["zona"]      = df["zona"].astype(str).str.upper()
-                df["demand_mw"] = pd.to_numeric(df["demand_mw"], errors="coerce")
-                df = df.dropna(subset=["snapshot", "zona", "demand_mw"])
-                all_dfs.append(df[["snapshot", "zona", "demand_mw"]])
-            except Exception:
-                continue
-
-    if not all_dfs:
-        raise ValueError(f"No se encontraron archivos de demanda en {DEMAND_RAW_DIR}")
-
-    dem = pd.concat(all_dfs, ignore_index=True)
-    dem["zona"] = dem["zona"].replace({"BSA": "BCA"})
-
-    # Deduplicar: si un día tiene datos en balance oficial Y en daily_api,
-    # el balance oficial tiene prioridad (viene primero por orden de concatenación)
-    dem = (
-        dem.drop_duplicates(subset=["snapshot", "zona"], keep="first")
-        .sort_values("snapshot")
-        .reset_index(drop=True)
-    )
+@st.cache_resource
+def _store_lock() -> threading.Lock:
+    return threading.Lock()
+
+
+def sync_demand_store() -> str:
+    """Ingresa archivos crudos nuevos (fuera de la caché) y devuelve la versión del store."""
+    with _store_lock():
+        dispatch_data.sync_demand_store()
+    return demand_store.version()
 
-    # Descartar días con datos incompletos (< 20 horas en al menos un sistema)
-    # Evita que archivos parciales de la API causen errores en la optimización
-    dem["_date"] = dem["snapshot"].dt.date
-    hours_per_day_zona = dem.groupby(["_date", "zona"])["snapshot"].nunique()
-    bad_dates = hours_per_day_zona[hours_per_day_zona < 20].index.get_level_values("_date").unique()
-    if len(bad_dates) > 0:
-        dem = dem[~dem["_date"].isin(bad_dates)]
-    dem = dem.drop(columns=["_date"]).reset_index(drop=True)
 
-    return dem
+@st.cache_data(show_spinner=False)
+def load_demand_raw(store_version: str) -> pd.DataFrame:
+    # store_version solo forma parte de la clave: un store nuevo invalida la caché
+    return dispatch_data.load_demand_raw()
 
 # ──────────────────────────────────────────────────────────────────────────────
 # Page config
@@ -433,7 +147,7 @@ st.caption(
 # Load data (check files first)
 # ──────────────────────────────────────────────────────────────────────────────
 missing = [p for p in [CENTRALES_CSV, PERFIL_CSV] if not p.exists()]
-if not DEMAND_RAW_DIR.exists() or not any(DEMAND_RAW_DIR.glob("*.csv")):
+if not any(DEMAND_RAW_DIR.glob("*.csv")) and not any(demand_store.STORE_DIR.glob("*/*.parquet")):
     missing.append(DEMAND_RAW_DIR)
 if missing:
     st.error("Faltan archivos de datos:")
@@ -441,25 +155,22 @@ if missing:
         st.write("-", str(p))
     st.stop()
 
+# Spans de esta ejecución del script (carga y paneles); los del solve se
+# guardan en session_state junto con la clave del resultado.
+perf_page = PerfRecorder()
+
 try:
-    with st.spinner("Cargando datos…"):
+    with st.spinner("Cargando datos…"), perf_page.span("carga de datos"):
         centrales_base = load_generators()
         p_max_pu_raw   = load_profiles()
-        dem_raw        = load_demand_raw()
+        dem_raw        = load_demand_raw(sync_demand_store())
 except Exception as e:
     st.exception(e)
     st.stop()
 
 # Pivot demand → (snapshot × sistema)
-dem_z_full = (
-    dem_raw[dem_raw["zona"].isin(SISTEMAS)]
-    .pivot_table(index="snapshot", columns="zona", values="demand_mw", aggfunc="sum")
-    .sort_index()
-)
-for s in SISTEMAS:
-    if s not in dem_z_full.columns:
-        dem_z_full[s] = 0.0
-dem_z_full = dem_z_full[SISTEMAS]
+dem_z_full = dispatch_data.demand_by_system(dem_raw)
+data = DispatchData(centrales=centrales_base, p_max_pu_raw=p_max_pu_raw, demand=dem_z_full)
 # ── Validar integridad de demanda ─────────────────────────────────────────────
 for s in SISTEMAS:
     if dem_z_full[s].sum() == 0:
@@ -620,12 +331,43 @@ with st.expander("📋 Capacidad instalada por tecnología y sistema", expanded=
         st.dataframe(growth_agg.style.format("{:,.0f}"), width='stretch')
 
 # ── Sliders de costos variables ───────────────────────────────────────────────
+def cost_sensitivity() -> pd.DataFrame | None:
+    """
+    Rango estable por tecnología del último resultado (lib/sensitivity.py),
+    calculado una vez por resultado; None si no hay uno completo en memoria.
+    """
+    key = st.session_state.get("res_key")
+    res_prev = REGISTRY.get(key)
+    if res_prev is None or res_prev.meta.get("partial"):
+        return None
+    cached = st.session_state.get("cost_ranges")
+    if cached is None or cached[0] != key:
+        with perf_page.span("rangos de costo"):
+            cached = (key, carrier_ranges(cost_ranges(res_prev)))
+        st.session_state["cost_ranges"] = cached
+    return cached[1]
+
+
+def _range_caption(carrier: str, ranges: pd.DataFrame) -> str | None:
+    if carrier not in ranges.index:
+        return None
+    cost = st.session_state["recipe_solved"]["costs"].get(carrier)
+    if cost is None:
+        return None
+    lo, hi = cost + ranges.at[carrier, DOWN], cost + ranges.at[carrier, UP]
+    lo_txt = "0" if lo <= 0 else f"{lo:,.0f}"
+    hi_txt = "∞" if hi == float("inf") else f"{hi:,.0f}"
+    # Dentro del rango, ΔCosto total = Δ$/MWh × energía de la tecnología
+    return f"Estable: {lo_txt}–{hi_txt} $/MWh · {ranges.at[carrier, ENERGY] / 1e3:,.0f} k$ por $/MWh"
+
+
 with st.expander("③ 🎚️ Costos variables por tecnología ($/MWh)", expanded=True):
     st.caption(
         "Ajusta manualmente o usa un escenario predefinido. "
         "Los sliders afectan el orden de mérito y, por tanto, el despacho y el precio sombra. "
         "🔵 = costo sube vs. base  •  🔴 = costo baja vs. base"
     )
+    _ranges = cost_sensitivity()
     sl_cols = st.columns(4)
     costs: dict[str, float] = {}
     for i, carrier in enumerate(carriers_present):
@@ -657,357 +399,338 @@ with st.expander("③ 🎚️ Costos variables por tecnología ($/MWh)", expande
                 max_value=700,
                 key=f"cost_{carrier}",
             )
+            _caption = _range_caption(carrier, _ranges) if _ranges is not None else None
+            if _caption:
+                st.caption(_caption)
+
+    if _ranges is not None:
+        # Rango en el que el último despacho sigue siendo óptimo (costos reducidos del LP)
+        if stable_change(_ranges, st.session_state["recipe_solved"]["costs"], costs):
+            st.caption(
+                "✓ Los costos están dentro del rango estable del último despacho: "
+                "**▶ Correr despacho** actualiza precios y costo sin re-resolver."
+            )
+        else:
+            st.caption("↻ Fuera del rango estable del último despacho: hay que re-resolver.")
+
+# ── Ejecución: ventanas y presupuesto de tiempo ──────────────────────────────
+_ex1, _ex2 = st.columns(2)
+window_days: int | None = _ex1.selectbox(
+    "Ventanas de solve",
+    options=[None, 1, 7, 14, 30],
+    format_func=lambda d: "Horizonte completo" if d is None else f"{d} días",
+    key="window_days",
+    help="Resolver por ventanas consecutivas muestra el avance y permite cancelar entre ventanas. "
+         "El SOC de las baterías cierra en cada ventana. Con «Horizonte completo» hay una sola "
+         "ventana: una vez que HiGHS empieza, cancelar (o cerrar la pestaña) no lo detiene.",
+)
+time_budget_s: int = _ex2.number_input(
+    "Presupuesto de tiempo (s, 0 = sin límite)",
+    min_value=0, max_value=3600, value=0, step=30,
+    key="time_budget_s",
+    help="Cuenta desde que empieza el solve (incluye armar el modelo). Al agotarse se detiene y "
+         "se muestran las ventanas ya resueltas (resultado parcial).",
+)
 
-run_btn = st.button("▶ Correr despacho", type="primary")
+_task: SolveTask | None = st.session_state.get("solve_task")
+_solving = _task is not None and not _task.finished
+run_btn = st.button("▶ Correr despacho", type="primary", disabled=_solving)
 st.divider()
 
 # ──────────────────────────────────────────────────────────────────────────────
-# Metrics extractor (reused for comparison table)
+# Build & solve  (motor en lib/dispatch_model.py)
+#
+# Los resultados viven en REGISTRY (lib/result_registry.py), compartido por todas
+# las sesiones con un presupuesto de memoria; la sesión guarda solo la clave y
+# la "receta" del solve, para re-resolver si el resultado fue descartado.
+# Los solves locales pasan por SOLVES (lib/single_flight.py): peticiones idénticas
+# concurrentes de varias sesiones esperan un mismo solve y comparten el resultado.
+#
+# Con DESPACHO_JOB_SERVICE definido (scripts/job_service.py) los solves no
+# corren en el hilo de la sesión: se encolan en el servicio y se sondean.
 # ──────────────────────────────────────────────────────────────────────────────
-def extract_metrics(n: pypsa.Network) -> dict:
-    """Return a flat dict of summary metrics for one solved network."""
-    gi = n.generators[["bus", "carrier", "p_nom", "marginal_cost"]].copy()
-    disp = n.generators_t.p.copy()
-    voll_g = [g for g in disp.columns if g.startswith("VoLL_")]
-    non_voll = [g for g in disp.columns if not g.startswith("VoLL_")]
-
-    gen_mwh = disp[non_voll].sum()
-    total_mwh = gen_mwh.sum()
-    shedding = disp[voll_g].sum().sum() if voll_g else 0.0
-
-    # CO₂
-    co2_total = sum(
-        gen_mwh[g] * CO2_FACTOR.get(gi.loc[g, "carrier"], 0.0)
-        for g in non_voll if g in gi.index
-    )
-    intensity = co2_total / total_mwh * 1000 if total_mwh > 0 else 0.0  # gCO₂/kWh
+JOB_CLIENT = JobClient(SERVICE_URL) if SERVICE_URL else None
 
-    # Renewable share
-    ren_carriers = {"solar", "onwind", "hydro", "geothermal", "solar_thermal", "biogas", "biomass", "nuclear"}
-    ren_mwh = sum(
-        gen_mwh[g] for g in non_voll
-        if g in gi.index and gi.loc[g, "carrier"] in ren_carriers
-    )
-    ren_pct = ren_mwh / total_mwh * 100 if total_mwh > 0 else 0.0
 
-    # Curtailment (VRE only)
-    curt_total = 0.0
-    if not n.generators_t.p_max_pu.empty:
-        vre_g = [g for g in n.generators_t.p_max_pu.columns if g in gi.index and gi.loc[g, "carrier"] in VRE_CARRIERS]
-        if vre_g:
-            avail = n.generators_t.p_max_pu[vre_g].multiply(n.generators.loc[vre_g, "p_nom"])
-            curt_total = (avail - disp.reindex(columns=vre_g, fill_value=0.0)).clip(lower=0).sum().sum()
-
-    # Avg shadow price
-    sp = n.buses_t.marginal_price
-    avg_price = sp.values.mean() if not sp.empty else 0.0
-
-    return {
-        "Costo total ($M)":   float(n.objective) / 1e6,
-        "CO₂ (MtCO₂)":       co2_total / 1e6,
-        "Intensidad (gCO₂/kWh)": intensity,
-        "% Renovable":        ren_pct,
-        "Curtailment (GWh)":  curt_total / 1e3,
-        "Shedding (MWh)":     shedding,
-        "Precio med. ($/MWh)": avg_price,
-    }
+def _client_id() -> str:
+    """Identificador de la sesión para el límite de pendientes por cliente del servicio."""
+    return st.session_state.setdefault("job_client_id", uuid.uuid4().hex[:12])
 
 
-# ──────────────────────────────────────────────────────────────────────────────
-# Build & solve
-# ──────────────────────────────────────────────────────────────────────────────
-def build_and_solve(
-    centrales: pd.DataFrame,
-    p_max_pu_raw: pd.DataFrame,
-    dem_z: pd.DataFrame,
-    costs: dict[str, float],
-    use_growth: bool,
-    voll: float,
-    demand_mult: dict[str, float] | None = None,
-    capacity_mult: dict | None = None,
-    forced_outage: dict | None = None,
-    battery_config: dict | None = None,
-) -> pypsa.Network:
-    n = pypsa.Network()
-    snapshots = dem_z.index
-    n.set_snapshots(snapshots)
-
-    # Align profile year to demand year (perfil 2025 → demanda 2026)
-    profile_year = p_max_pu_raw.index.year[0]
-    demand_year  = snapshots.year[0]
-    if profile_year != demand_year:
-        def safe_replace_year(ts, new_year):
-            try:
-                return ts.replace(year=new_year)
-            except ValueError:
-                # Manejo de años bisiestos (29 feb -> 28 feb en año no bisiesto)
-                return ts.replace(year=new_year, day=28)
-
-        p_max_pu_aligned = p_max_pu_raw.copy()
-        # Usar map con función segura para evitar crash en 29 de febrero
-        p_max_pu_aligned.index = p_max_pu_raw.index.map(lambda ts: safe_replace_year(ts, demand_year))
-    else:
-        p_max_pu_aligned = p_max_pu_raw
-
-    # Three isolated buses (no links)
-    for s in SISTEMAS:
-        n.add("Bus", s)
-
-    # Generators from CSV — apply slider marginal costs by carrier
-    for _, row in centrales.iterrows():
-        carrier = str(row["carrier"])
-        mc      = costs.get(carrier, float(row["marginal_cost"]))
-        pmin    = INFLEXIBLE_PMIN.get(carrier, 0.0)
-        n.add(
-            "Generator",
-            name=str(row["name"]),
-            bus=str(row["bus"]),
-            carrier=carrier,
-            p_nom=float(row["p_nom"]),
-            marginal_cost=float(mc),
-            efficiency=float(row.get("efficiency", 1.0)),
-            p_min_pu=float(pmin),
-        )
+def wait_job(job_id: str, perf: PerfRecorder | None = None) -> DispatchResult:
+    """Sondea un trabajo del servicio mostrando su estado; registra cola y solve en `perf`."""
+    _slot = st.empty()
 
-    # 2026 expected growth generators
-    if use_growth:
-        for gname, gbus, gcarrier, gpnom in GROWTH_2026:
-            mc = costs.get(gcarrier, DEFAULT_COSTS.get(gcarrier, 0))
-            n.add(
-                "Generator",
-                name=gname, bus=gbus, carrier=gcarrier,
-                p_nom=float(gpnom), marginal_cost=float(mc),
-            )
+    def _show(status: dict) -> None:
+        if status["state"] == "queued":
+            _slot.caption(f"⏳ En cola del servicio de despacho (posición {status.get('position', '?')})…")
+        elif status["state"] == "running":
+            _slot.caption("⚙️ Resolviendo en el servicio de despacho…")
 
-    # VoLL shedding generators (one per bus — model load shedding)
-    for s in SISTEMAS:
-        n.add(
-            "Generator",
-            name=f"VoLL_{s}", bus=s, carrier="shedding",
-            p_nom=1e6, marginal_cost=float(voll),
-        )
+    try:
+        res, status = JOB_CLIENT.wait(job_id, on_status=_show)
+    finally:
+        _slot.empty()
+    if perf is not None:
+        with perf.span("servicio de despacho", job_id=job_id) as sp:
+            sp.record(queue_s=status.get("queue_s"), solve_s=status.get("solve_s"), **status.get("phases", {}))
+    return res
 
-    # Capacity multipliers — scale p_nom of specific carriers per bus
-    if capacity_mult:
-        for bus, carrier_mults in capacity_mult.items():
-            for carrier_alias, mult in carrier_mults.items():
-                carrier = CARRIER_ALIAS.get(carrier_alias, carrier_alias)
-                mask = (n.generators["bus"] == bus) & (n.generators["carrier"] == carrier)
-                n.generators.loc[mask, "p_nom"] *= float(mult)
-
-    # Forced outage — derate a specific technology in a specific system
-    fo = forced_outage or {}
-    if fo.get("enabled", False):
-        fo_bus     = fo.get("system", "")
-        fo_alias   = fo.get("technology", "")
-        fo_carrier = CARRIER_ALIAS.get(fo_alias, fo_alias)
-        fo_loss    = float(fo.get("capacity_loss_fraction", 0.0))
-        if fo_bus and fo_carrier and 0.0 < fo_loss <= 1.0:
-            mask = (n.generators["bus"] == fo_bus) & (n.generators["carrier"] == fo_carrier)
-            n.generators.loc[mask, "p_nom"] *= (1.0 - fo_loss)
-
-    # Battery storage units (StorageUnit per bus)
-    bc = battery_config or {}
-    if bc.get("battery_enable", False):
-        eff_store    = float(bc.get("battery_efficiency_store", 0.95))
-        eff_dispatch = float(bc.get("battery_efficiency_dispatch", 0.95))
-        init_soc_frac = float(bc.get("battery_initial_soc", 0.5))
-        cyclic_soc   = bool(bc.get("battery_cyclic_state_of_charge", True))
-        power_mw     = bc.get("battery_power_mw", {})
-        energy_mwh   = bc.get("battery_energy_mwh", {})
-        for s in SISTEMAS:
-            p_nom_bat = float(power_mw.get(s, 0))
-            e_mwh_bat = float(energy_mwh.get(s, 0))
-            if p_nom_bat > 0 and e_mwh_bat > 0:
-                max_hours = e_mwh_bat / p_nom_bat
-                n.add(
-                    "StorageUnit",
-                    name=f"battery_{s}",
-                    bus=s,
-                    carrier="battery",
-                    p_nom=p_nom_bat,
-                    max_hours=max_hours,
-                    efficiency_store=eff_store,
-                    efficiency_dispatch=eff_dispatch,
-                    state_of_charge_initial=init_soc_frac * p_nom_bat * max_hours,
-                    cyclic_state_of_charge=cyclic_soc,
-                )
 
-    # ── p_max_pu: 4-category dispatch logic ──────────────────────────────────
-    # Category    | Source             | Missing-data default
-    # ------------|--------------------|-----------------------------------------
-    # vre         | Perfil CSV (real)  | 0.0  (no resource = no generation)
-    # hydro       | Perfil CSV + cap   | P_MAX_AVAIL["hydro"] (reservoir factor)
-    # inflexible  | Perfil CSV + cap   | P_MAX_AVAIL[carrier] (rated availability)
-    # thermal     | Perfil CSV or 1.0  | 1.0  (fully dispatchable)
-    all_gens        = n.generators.index.tolist()
-    carrier_map_all = n.generators["carrier"]
-    profile_gens    = [g for g in all_gens if g in p_max_pu_aligned.columns]
-
-    if profile_gens:
-        p_raw = p_max_pu_aligned[profile_gens].reindex(index=snapshots)
-        if p_raw.isna().all().all() and not p_max_pu_aligned.empty:
-            raise ValueError(
-                "Error de alineación de tiempo: Los índices de fecha del perfil de generadores y la demanda no coinciden. "
-                "Verifica si uno tiene Timezone y el otro no."
-            )
-        # Per-column fill based on dispatch category
-        for g in profile_gens:
-            if p_raw[g].isna().any():
-                cat = DISPATCH_CATEGORY.get(carrier_map_all[g], "thermal")
-                if cat == "vre":
-                    p_raw[g] = p_raw[g].fillna(0.0)
-                elif cat in ("hydro", "inflexible"):
-                    p_raw[g] = p_raw[g].fillna(P_MAX_AVAIL.get(carrier_map_all[g], 1.0))
-                else:  # thermal
-                    p_raw[g] = p_raw[g].fillna(1.0)
-        p_raw = p_raw.clip(0.0, 1.0)
+def fetch_result(key_name: str, recipe_name: str) -> DispatchResult | None:
+    """
+    Resultado de la sesión desde el registro. Si fue expulsado, lanza una
+    SolveTask que lo re-resuelve con su receta (en segundo plano, cancelable)
+    y devuelve None mientras tanto.
+    """
+    key = st.session_state.get(key_name)
+    res = REGISTRY.get(key)
+    recipe = st.session_state.get(recipe_name)
+    if res is None and key is not None and recipe is not None and "solve_task" not in st.session_state:
+        st.session_state["solve_task"] = SolveTask(
+            partial(resolve_in_background, key_name, recipe, _client_id())
+        ).start()
+        solve_progress()
+    return res
+
+
+def resolve_in_background(key_name: str, recipe: dict, client_id: str, progress, should_stop) -> dict:
+    """Cuerpo de la SolveTask que re-resuelve un resultado expulsado del registro (sin st.*)."""
+    progress(0, 1, "El resultado se liberó de memoria; re-calculando…")
+    if JOB_CLIENT is None:
+        res = SOLVES.solve(data, recipe, should_stop=should_stop)[0]
     else:
-        p_raw = pd.DataFrame(index=snapshots)
-
-    # Expand to ALL generators — those absent from Perfil CSV get category defaults
-    p_max_pu_full = p_raw.reindex(columns=all_gens)
-    for g in all_gens:
-        if p_max_pu_full[g].isna().all():
-            cat = DISPATCH_CATEGORY.get(carrier_map_all[g], "thermal")
-            if cat == "vre":
-                p_max_pu_full[g] = 0.0
-            elif cat in ("hydro", "inflexible"):
-                p_max_pu_full[g] = P_MAX_AVAIL.get(carrier_map_all[g], 1.0)
+        job_id = JOB_CLIENT.submit(recipe, priority=PRIORITY_INTERACTIVE, client=client_id)
+
+        def _on_status(status: dict) -> None:
+            if should_stop():
+                JOB_CLIENT.cancel(job_id)
+                raise SolveInterrupted(STOP_CANCELLED)
+
+        res, _ = JOB_CLIENT.wait(job_id, on_status=_on_status)
+    progress(1, 1, "Listo")
+    return {key_name: REGISTRY.put(res)}
+
+
+def solve_in_background(
+    recipe: dict,
+    base_recipe: dict,
+    is_base: bool,
+    client_id: str,
+    progress,
+    should_stop,
+) -> dict:
+    """
+    Cuerpo de la SolveTask de "▶ Correr despacho" (corre en un hilo, sin st.*):
+    el escenario y, si no es el base, el base de comparación con lo que quede
+    del presupuesto. Devuelve las claves de session_state a actualizar.
+    """
+    perf = PerfRecorder()
+    steps = 1 if is_base else 2
+    t0 = time.monotonic()
+
+    def _solve(rec: dict, label: str, step: int, job_id: str | None = None) -> DispatchResult:
+        progress(step, steps, f"Optimizando {label}…")
+        if JOB_CLIENT is None:
+            def _windows(done: int, total: int) -> None:
+                progress(step * total + done, steps * total, f"{label}: {done}/{total} ventanas")
+            return SOLVES.solve(data, rec, perf=perf, progress=_windows, should_stop=should_stop)[0]
+
+        job_id = job_id or JOB_CLIENT.submit(rec, priority=PRIORITY_INTERACTIVE, client=client_id)
+
+        def _on_status(status: dict) -> None:
+            if should_stop():
+                JOB_CLIENT.cancel(job_id)
+                raise SolveInterrupted(STOP_CANCELLED)
+            if status["state"] == "queued":
+                progress(step, steps, f"{label}: en cola del servicio (posición {status.get('position', '?')})")
             else:
-                p_max_pu_full[g] = 1.0
-    n.generators_t.p_max_pu = p_max_pu_full.clip(0.0, 1.0)
-
-    # Enforce availability caps for hydro and inflexibles (even if profile exists)
-    for carrier, cap in P_MAX_AVAIL.items():
-        capped_gens = n.generators.index[n.generators["carrier"] == carrier]
-        if not capped_gens.empty:
-            n.generators_t.p_max_pu.loc[:, capped_gens] = (
-                n.generators_t.p_max_pu.loc[:, capped_gens].clip(upper=cap)
-            )
+                progress(step, steps, f"{label}: resolviendo en el servicio")
+
+        res, status = JOB_CLIENT.wait(job_id, on_status=_on_status)
+        with perf.span("servicio de despacho", job_id=job_id) as sp:
+            sp.record(queue_s=status.get("queue_s"), solve_s=status.get("solve_s"), **status.get("phases", {}))
+        return res
 
-    # Loads
-    for s in SISTEMAS:
-        if s in dem_z.columns:
-            mult = demand_mult.get(s, 1.0) if demand_mult else 1.0
-            n.add("Load", f"load_{s}", bus=s, p_set=dem_z[s] * mult)
-
-    n.optimize(solver_name="highs", include_objective_constant=False)
-    return n
-
-
-if run_btn:
-    # Extract scenario-level params
-    _demand_mult: dict[str, float] | None = None
-    _capacity_mult: dict | None = None
-    _forced_outage: dict | None = None
-    _battery_config: dict | None = None
-    if active_scenario and active_scenario in SCENARIOS:
-        _sc_params = SCENARIOS[active_scenario]["params"]
-        _dm = _sc_params.get("demand_multiplier", {})
-        if any(v != 1.0 for v in _dm.values()):
-            _demand_mult = _dm
-        _cm = _sc_params.get("capacity_multiplier", {})
-        if _cm:
-            _capacity_mult = _cm
-        _fo = _sc_params.get("forced_outage", {})
-        if _fo.get("enabled", False):
-            _forced_outage = _fo
-        if _sc_params.get("battery_enable", False):
-            _battery_config = _sc_params
-
-    with st.spinner("Optimizando con HiGHS… puede tardar ~30 s para períodos largos."):
+    # Con el servicio, el base se encola junto al escenario y corre en paralelo
+    base_job = None
+    if JOB_CLIENT is not None and not is_base:
+        base_job = JOB_CLIENT.submit(base_recipe, priority=PRIORITY_COMPARISON, client=client_id)
+    try:
+        with perf.span("escenario"):
+            res_key = REGISTRY.put(_solve(recipe, "escenario", 0))
+    except BaseException:
+        if base_job is not None:
+            JOB_CLIENT.cancel(base_job)
+        raise
+
+    # Auto-run base scenario for comparison whenever not running base
+    res_base_key: str | None = res_key
+    if not is_base:
+        budget = recipe.get("time_budget_s")
+        if budget:
+            base_recipe = {**base_recipe, "time_budget_s": budget - (time.monotonic() - t0)}
         try:
-            n_solved = build_and_solve(
-                centrales_base.copy(),
-                p_max_pu_raw,
-                dem_z,
-                costs,
-                growth_2026,
-                float(voll_input),
-                demand_mult=_demand_mult,
-                capacity_mult=_capacity_mult,
-                forced_outage=_forced_outage,
-                battery_config=_battery_config,
-            )
-        except Exception as e:
-            st.exception(e)
-            st.stop()
+            if budget and base_recipe["time_budget_s"] <= 0:
+                raise SolveInterrupted(STOP_BUDGET)
+            with perf.span("base (comparación)"):
+                res_base_key = REGISTRY.put(_solve(base_recipe, "base (comparación)", 1, base_job))
+        except Exception:
+            if base_job is not None:
+                JOB_CLIENT.cancel(base_job)
+            res_base_key = None
+    progress(steps, steps, "Listo")
+
+    return {
+        "res_key":         res_key,
+        "recipe_solved":   recipe,
+        "res_base_key":    res_base_key,
+        "recipe_base":     base_recipe if res_base_key is not None else None,
+        "scenario_solved": recipe["scenario"],
+        "perf_solve":      perf,
+    }
 
-        # Auto-run base scenario for comparison whenever not running base
-        _is_base = (active_scenario == BASE_SCENARIO_KEY)
-        if not _is_base:
-            try:
-                _base_costs = compute_effective_costs(SCENARIOS[BASE_SCENARIO_KEY]["params"])
-                n_base_solved = build_and_solve(
-                    centrales_base.copy(),
-                    p_max_pu_raw,
-                    dem_z,
-                    _base_costs,
-                    growth_2026,
-                    float(VOLL_DEFAULT),
-                    demand_mult=None,
-                    capacity_mult=None,
-                )
-                st.session_state["n_base_solved"] = n_base_solved
-            except Exception:
-                st.session_state.pop("n_base_solved", None)
-        else:
-            st.session_state["n_base_solved"] = n_solved
 
-    st.session_state["n_solved"]        = n_solved
-    st.session_state["dem_z_solved"]    = dem_z.copy()
-    st.session_state["scenario_solved"] = active_scenario
-    st.success("Optimización completada.")
+@st.fragment(run_every=1.0)
+def solve_progress() -> None:
+    """Avance de la SolveTask de la sesión; al terminar, vuelve a ejecutar la página para recogerla."""
+    task: SolveTask | None = st.session_state.get("solve_task")
+    if task is None:
+        return
+    task.touch()
+    if task.finished:
+        st.rerun()
+    st.progress(task.fraction, text=f"{task.message} · {task.elapsed_s:,.0f} s")
+    if st.button(
+        "⏹ Cancelar", key="cancel_solve", disabled=task.cancelled,
+        help="Se aplica entre ventanas: una ventana que HiGHS ya está resolviendo termina primero.",
+    ):
+        task.cancel()
+
+
+if run_btn and not _solving:
+    # Parámetros del escenario activo; costos y VoLL salen de los controles de la página
+    _params = SCENARIOS[active_scenario]["params"] if active_scenario in SCENARIOS else {}
+    _recipe = make_recipe(
+        _params,
+        scenario=active_scenario,
+        start=start_date,
+        end=end_date,
+        growth=growth_2026,
+        costs=costs,
+        voll=voll_input,
+        window_days=window_days,
+        time_budget_s=time_budget_s,
+    )
+    _is_base = (active_scenario == BASE_SCENARIO_KEY)
+    _base_recipe = _recipe if _is_base else make_recipe(
+        SCENARIOS[BASE_SCENARIO_KEY]["params"],
+        scenario=BASE_SCENARIO_KEY,
+        start=start_date,
+        end=end_date,
+        growth=growth_2026,
+        voll=VOLL_DEFAULT,
+        window_days=window_days,
+        time_budget_s=time_budget_s,
+    )
+    # Solo cambiaron costos y dentro del rango estable: mismo despacho, sin solve
+    _solved = st.session_state.get("recipe_solved")
+    _res_prev = REGISTRY.get(st.session_state.get("res_key"))
+    _stable = (
+        _ranges is not None and _solved is not None and _res_prev is not None
+        and {**_solved, "costs": None} == {**_recipe, "costs": None}
+        and stable_change(_ranges, _solved["costs"], _recipe["costs"])
+    )
+    if _stable:
+        _old = st.session_state["res_key"]
+        with perf_page.span("reprecio (sin solve)"):
+            _new = REGISTRY.put(reprice(_res_prev, _recipe["costs"], voll=_recipe["voll"]))
+        if _is_base:
+            st.session_state.update(res_base_key=_new, recipe_base=_recipe)
+        if _old != st.session_state.get("res_base_key"):
+            REGISTRY.discard(_old)
+            discard_exports(_old)
+        st.session_state.update(res_key=_new, recipe_solved=_recipe)
+        st.success(
+            "Cambio dentro del rango estable: el despacho sigue siendo óptimo; "
+            "precios y costo actualizados sin re-resolver."
+        )
+    else:
+        # El solve corre en su hilo; las interacciones con otros widgets no lo repiten
+        _task = SolveTask(partial(solve_in_background, _recipe, _base_recipe, _is_base, _client_id())).start()
+        st.session_state["solve_task"] = _task
+
+_task = st.session_state.get("solve_task")
+if _task is not None and _task.finished:
+    del st.session_state["solve_task"]
+    if _task.error is None:
+        # Los resultados que la tarea reemplaza ya no se van a mostrar (un re-solve
+        # por expulsión reemplaza solo uno de los dos)
+        _new = {k: v for k, v in _task.result.items() if k in ("res_key", "res_base_key")}
+        _kept = set(_new.values()) | {st.session_state.get(k) for k in ("res_key", "res_base_key") if k not in _new}
+        for _old in {st.session_state.get(k) for k in _new} - _kept:
+            REGISTRY.discard(_old)
+            discard_exports(_old)
+        st.session_state.update(_task.result)
+        st.success(f"Optimización completada en {_task.elapsed_s:,.1f} s.")
+    elif isinstance(_task.error, SolveInterrupted):
+        st.warning(
+            f"Solve detenido ({_task.error.reason}); se conservan los resultados anteriores."
+        )
+    elif isinstance(_task.error, QueueFullError):
+        st.warning(f"El servicio de despacho está saturado; intenta de nuevo en unos segundos. ({_task.error})")
+    else:
+        st.exception(_task.error)
+elif _task is not None:
+    solve_progress()
 
 # ──────────────────────────────────────────────────────────────────────────────
 # Results
 # ──────────────────────────────────────────────────────────────────────────────
-if "n_solved" not in st.session_state:
+if "res_key" not in st.session_state:
     st.info("Ajusta los parámetros y presiona **▶ Correr despacho** para ver resultados.")
     st.stop()
 
-n: pypsa.Network         = st.session_state["n_solved"]
-dem_solved: pd.DataFrame = st.session_state["dem_z_solved"]
+try:
+    with perf_page.span("resultado (registro)"):
+        res: DispatchResult | None = fetch_result("res_key", "recipe_solved")
+except Exception as e:
+    st.exception(e)
+    st.stop()
+if res is None:
+    if "solve_task" in st.session_state:
+        st.info("El resultado se liberó de memoria; se está re-calculando en segundo plano.")
+    else:
+        st.info("El resultado anterior ya no está disponible. Presiona **▶ Correr despacho** de nuevo.")
+    st.stop()
+
+_partial = res.meta.get("partial")
+if _partial:
+    st.warning(
+        f"Resultado parcial ({_partial['reason']}): {_partial['windows_done']} de "
+        f"{_partial['windows_total']} ventanas resueltas, hasta {_partial['solved_until']}. "
+        "Los KPIs y gráficas cubren solo ese tramo."
+    )
+
+_sp_kpis = perf_page.start("paneles: KPIs y comparación")
+
+dem_solved: pd.DataFrame = res.demand_frame()
 scen_label: str | None   = st.session_state.get("scenario_solved")
 
-dispatch  = n.generators_t.p.copy()
-gen_info  = n.generators[["bus", "carrier", "p_nom", "marginal_cost"]].copy()
-
-# Shadow prices (nodal prices, $/MWh)
-shadow_prices: pd.DataFrame = n.buses_t.marginal_price
-
-# Curtailment: only for RENEWABLE generators with time-varying p_max_pu profiles
-# (gas/coal/diesel operating below profile limit is NOT curtailment)
-curtailment_by_bus: dict[str, pd.DataFrame] = {}
-if not n.generators_t.p_max_pu.empty:
-    profile_gens_solved = n.generators_t.p_max_pu.columns.tolist()
-    # Filter to VRE carriers only (solar/wind): curtailment is only meaningful for variable renewables
-    vre_profile_gens = [
-        g for g in profile_gens_solved
-        if g in gen_info.index and gen_info.loc[g, "carrier"] in VRE_CARRIERS
-    ]
-    if vre_profile_gens:
-        p_avail = n.generators_t.p_max_pu[vre_profile_gens].multiply(
-            n.generators.loc[vre_profile_gens, "p_nom"]
-        )
-        p_disp_ren = n.generators_t.p.reindex(columns=vre_profile_gens, fill_value=0.0)
-        curt_df = (p_avail - p_disp_ren).clip(lower=0)
-        curt_df = curt_df.loc[:, curt_df.sum() > 0.1]
-        for s in SISTEMAS:
-            bus_curt_gens = [
-                g for g in curt_df.columns
-                if g in gen_info.index and gen_info.loc[g, "bus"] == s
-            ]
-            if bus_curt_gens:
-                curtailment_by_bus[s] = curt_df[bus_curt_gens]
-
-# Shedding (VoLL dispatches)
-voll_gens = [g for g in dispatch.columns if g.startswith("VoLL_")]
-shedding_total = dispatch[voll_gens].sum().sum() if voll_gens else 0.0
-curtailment_total = sum(
-    df.sum().sum() for df in curtailment_by_bus.values()
-)
+gen_info  = res.generators()[["bus", "carrier", "p_nom", "marginal_cost"]]
+snapshots = res.index
+
+# Resultados derivados (calculados una vez tras el solve): KPIs, mix, curtailment, curvas
+derived  = DerivedResults(res, voll=st.session_state["recipe_solved"]["voll"])
+kpis     = derived.kpis
+post_idx = PostSolveIndex.from_result(res)
+gen_mwh  = derived.energy()
+
+# Curtailment: solo renovables variables (solar/eólica); una térmica por debajo
+# de su perfil NO es curtailment
+shedding_total    = kpis["shedding_mwh"]
+generation_total  = kpis["generation_mwh"]
+curtailment_total = kpis["curtailment_mwh"]
 
 # ── Global KPIs ───────────────────────────────────────────────────────────────
 st.subheader("④ Resultados")
@@ -1015,9 +738,8 @@ if scen_label:
     st.caption(f"Escenario: **{scen_label}**")
 
 k1, k2, k3, k4 = st.columns(4)
-k1.metric("Costo total ($)",            f"{float(n.objective):,.0f}")
-k2.metric("Generación total (MWh)",
-          f"{dispatch.drop(columns=voll_gens, errors='ignore').sum().sum():,.0f}")
+k1.metric("Costo total ($)",            f"{res.objective:,.0f}")
+k2.metric("Generación total (MWh)",      f"{generation_total:,.0f}")
 k3.metric("Carga no servida (MWh)",
           f"{shedding_total:,.0f}",
           delta=f"{'⚠️ hay shedding' if shedding_total > 0.1 else ''}",
@@ -1025,38 +747,26 @@ k3.metric("Carga no servida (MWh)",
 k4.metric("Curtailment renovables (MWh)", f"{curtailment_total:,.0f}")
 
 # ── Comparison vs. Base scenario ──────────────────────────────────────────────
-_n_base: pypsa.Network | None = st.session_state.get("n_base_solved")
+try:
+    _res_base: DispatchResult | None = fetch_result("res_base_key", "recipe_base")
+except Exception:
+    _res_base = None
 _show_comparison = (
-    _n_base is not None
+    _res_base is not None
     and scen_label != BASE_SCENARIO_KEY
 )
 if _show_comparison:
     with st.expander("⚖️ Comparación vs. Caso Base", expanded=True):
-        _b_dispatch  = _n_base.generators_t.p.copy()
-        _b_voll_gens = [g for g in _b_dispatch.columns if g.startswith("VoLL_")]
-        _b_shadow    = _n_base.buses_t.marginal_price
-
-        _b_cost    = float(_n_base.objective)
-        _b_gen     = _b_dispatch.drop(columns=_b_voll_gens, errors="ignore").sum().sum()
-        _b_shed    = _b_dispatch[_b_voll_gens].sum().sum() if _b_voll_gens else 0.0
-
-        # Base curtailment total
-        _b_curt_total = 0.0
-        if not _n_base.generators_t.p_max_pu.empty:
-            _b_gen_info = _n_base.generators[["bus", "carrier"]].copy()
-            _b_ren_gens = [
-                g for g in _n_base.generators_t.p_max_pu.columns
-                if g in _b_gen_info.index and _b_gen_info.loc[g, "carrier"] in VRE_CARRIERS
-            ]
-            if _b_ren_gens:
-                _b_avail = _n_base.generators_t.p_max_pu[_b_ren_gens].multiply(
-                    _n_base.generators.loc[_b_ren_gens, "p_nom"]
-                )
-                _b_disp  = _n_base.generators_t.p.reindex(columns=_b_ren_gens, fill_value=0.0)
-                _b_curt_total = (_b_avail - _b_disp).clip(lower=0).sum().sum()
+        _b_derived = DerivedResults(_res_base, voll=st.session_state["recipe_base"]["voll"])
+        _b_kpis    = _b_derived.kpis
 
-        _s_gen   = dispatch.drop(columns=voll_gens, errors="ignore").sum().sum()
-        delta_cost  = float(n.objective) - _b_cost
+        _b_cost    = _res_base.objective
+        _b_gen     = _b_kpis["generation_mwh"]
+        _b_shed    = _b_kpis["shedding_mwh"]
+        _b_curt_total = _b_kpis["curtailment_mwh"]
+
+        _s_gen   = generation_total
+        delta_cost  = res.objective - _b_cost
         delta_gen   = _s_gen - _b_gen
         delta_shed  = shedding_total - _b_shed
         delta_curt  = curtailment_total - _b_curt_total
@@ -1071,7 +781,7 @@ if _show_comparison:
         c1, c2, c3, c4 = st.columns(4)
         c1.metric(
             "Δ Costo total ($)",
-            f"{float(n.objective):,.0f}",
+            f"{res.objective:,.0f}",
             delta=_fmt_delta(delta_cost, invert=True),
             delta_color="inverse",
             help=f"Base: ${_b_cost:,.0f}",
@@ -1102,9 +812,9 @@ if _show_comparison:
         st.markdown("**Precio marginal nodal promedio ($/MWh)**")
         sp_cmp_cols = st.columns(len(SISTEMAS))
         for idx_s, s in enumerate(SISTEMAS):
-            if s in shadow_prices.columns and s in _b_shadow.columns:
-                sc_avg  = shadow_prices[s].mean()
-                bc_avg  = _b_shadow[s].mean()
+            if "price_mean" in derived.bus(s) and "price_mean" in _b_derived.bus(s):
+                sc_avg  = derived.bus(s)["price_mean"]
+                bc_avg  = _b_derived.bus(s)["price_mean"]
                 d_avg   = sc_avg - bc_avg
                 sp_cmp_cols[idx_s].metric(
                     s,
@@ -1116,135 +826,58 @@ if _show_comparison:
 
 st.divider()
 
-# ── Helper: identifica unidad marginal plausible por hora y bus ───────────────
-def identify_marginal_generator(
-    n: pypsa.Network,
-    bus: str,
-    tol_mw: float = 1.0,
-    tol_price: float = 1.0,
-) -> pd.DataFrame:
-    """
-    Identifica una unidad marginal plausible por hora en un bus.
-    Criterio:
-    1) unidad despachada
-    2) no pegada al mínimo ni al máximo
-    3) costo variable ~ precio sombra
-    Fallback: unidad despachada más cara.
-    """
-    gens = n.generators.index[
-        (n.generators["bus"] == bus) & (~n.generators.index.str.startswith("VoLL_"))
-    ].tolist()
+# ── Nivel de detalle de las gráficas ──────────────────────────────────────────
+# Las series se recortan a la ventana elegida y se reducen a ~MAX_POINTS
+# puntos por traza; con una ventana corta (o "Resolución completa") se ve cada hora.
+_lod_days = sorted(set(snapshots.date))
+_lod_c1, _lod_c2 = st.columns([4, 1])
+if len(_lod_days) > 1:
+    _lod_from, _lod_to = _lod_c1.select_slider(
+        "Ventana de las gráficas",
+        options=_lod_days,
+        value=(_lod_days[0], _lod_days[-1]),
+        format_func=lambda d: d.strftime("%d-%b-%Y"),
+    )
+else:
+    _lod_from = _lod_to = _lod_days[0]
+_lod_full = _lod_c2.toggle(
+    "Resolución completa", value=False,
+    help=f"Sin reducción: manda todas las horas de la ventana (por defecto ~{MAX_POINTS:,} puntos por traza).",
+)
+lod_start = pd.Timestamp(_lod_from)
+lod_end   = pd.Timestamp(_lod_to) + pd.Timedelta(days=1) - pd.Timedelta(seconds=1)
+lod_points: int | None = None if _lod_full else MAX_POINTS
 
-    if not gens or bus not in n.buses_t.marginal_price.columns:
-        return pd.DataFrame()
 
-    dispatch = n.generators_t.p[gens].copy()
-    mc = n.generators.loc[gens, "marginal_cost"].copy()
-    p_nom = n.generators.loc[gens, "p_nom"].copy()
-    p_min_pu = n.generators.loc[gens, "p_min_pu"].fillna(0.0).copy()
+def lod(data: pd.DataFrame | pd.Series, method: str = "lttb") -> pd.DataFrame | pd.Series:
+    """Ventana visible + reducción de puntos (minmax para áreas apiladas y barras)."""
+    return downsample(window(data, lod_start, lod_end), lod_points, method)
 
-    if n.generators_t.p_max_pu.empty:
-        p_max_pu = pd.DataFrame(1.0, index=n.snapshots, columns=gens)
-    else:
-        p_max_pu = n.generators_t.p_max_pu.reindex(index=n.snapshots, columns=gens, fill_value=1.0)
-
-    rows = []
-
-    for t in n.snapshots:
-        sp = float(n.buses_t.marginal_price.loc[t, bus])
-
-        p_t = dispatch.loc[t]
-        pmax_t = p_nom * p_max_pu.loc[t]
-        pmin_t = p_nom * p_min_pu
-
-        active = p_t[p_t > tol_mw].index.tolist()
-
-        if not active:
-            rows.append({
-                "snapshot": t,
-                "shadow_price": sp,
-                "marginal_generator": None,
-                "carrier": None,
-                "CV ($/MWh)": None,
-                "status": "sin generación",
-            })
-            continue
-
-        interior = []
-        for g in active:
-            at_min = p_t[g] <= (pmin_t[g] + tol_mw)
-            at_max = p_t[g] >= (pmax_t[g] - tol_mw)
-            if (not at_min) and (not at_max):
-                interior.append(g)
-
-        # 1) Interior con costo cercano al precio
-        close_to_price = [g for g in interior if abs(float(mc[g]) - sp) <= tol_price]
-        if close_to_price:
-            chosen = max(close_to_price, key=lambda g: mc[g])
-            status = "interior ~ precio"
-        # 2) Interior aunque no empate exacto
-        elif interior:
-            chosen = min(interior, key=lambda g: abs(float(mc[g]) - sp))
-            status = "interior cercano"
-        # 3) Fallback: despachado más caro
-        else:
-            chosen = max(active, key=lambda g: mc[g])
-            status = "fallback más caro despachado"
-
-        chosen_at_min = p_t[chosen] <= (pmin_t[chosen] + tol_mw)
-        chosen_at_max = p_t[chosen] >= (pmax_t[chosen] - tol_mw)
-        rows.append({
-            "snapshot": t,
-            "shadow_price": sp,
-            "marginal_generator": chosen,
-            "carrier": n.generators.loc[chosen, "carrier"],
-            "CV ($/MWh)": float(mc[chosen]),
-            "dispatch_MW": float(p_t[chosen]),
-            "pmin_MW": float(pmin_t[chosen]),
-            "pmax_MW": float(pmax_t[chosen]),
-            "at_min": bool(chosen_at_min),
-            "at_max": bool(chosen_at_max),
-            "status": status,
-        })
 
-    return pd.DataFrame(rows).set_index("snapshot")
+def line_trace(**kwargs) -> go.Scatter | go.Scattergl:
+    """Traza de línea; WebGL si lleva muchos puntos (no sirve para stackgroup)."""
+    return (go.Scattergl if use_webgl(len(kwargs["x"])) else go.Scatter)(**kwargs)
 
 
 # ── Helper: dispatch stacked-area chart ───────────────────────────────────────
 def dispatch_chart(bus: str, title: str) -> None:
-    bus_gens = gen_info[
-        (gen_info["bus"] == bus) & (~gen_info.index.str.startswith("VoLL_"))
-    ].index.tolist()
-    bus_gens = [g for g in bus_gens if g in dispatch.columns]
-
-    disp_carrier: pd.DataFrame
-    if bus_gens:
-        carrier_map  = gen_info.loc[bus_gens, "carrier"]
-        disp_carrier = dispatch[bus_gens].T.groupby(carrier_map).sum().T
-    else:
-        disp_carrier = pd.DataFrame(index=n.snapshots)
+    disp_carrier = derived.dispatch_by_carrier(bus)   # incluye "shedding" si hubo
 
     # Battery net dispatch handled separately (positive=discharge, negative=charge)
     bat_col = f"battery_{bus}"
     _bat_series = None
-    if not n.storage_units.empty and bat_col in n.storage_units.index:
-        if bat_col in n.storage_units_t.p.columns:
-            _bat_series = n.storage_units_t.p[bat_col]
-
-    # Append shedding if any
-    voll_col = f"VoLL_{bus}"
-    if voll_col in dispatch.columns and dispatch[voll_col].sum() > 0.1:
-        disp_carrier["shedding"] = dispatch[voll_col]
+    if bat_col in res.su_names:
+        _bat_series = res.storage_t("p")[bat_col]
 
     # Exclude battery from stack carriers (handled as separate line below)
     stack_carriers = [c for c in CARRIERS if c != "battery"] + ["shedding"]
     carrier_order = [c for c in stack_carriers if c in disp_carrier.columns]
     disp_carrier = disp_carrier.reindex(columns=carrier_order, fill_value=0.0)
+    carrier_order = [c for c in carrier_order if disp_carrier[c].abs().sum() >= 0.1]
+    disp_carrier = lod(disp_carrier[carrier_order], "minmax")
 
     fig = go.Figure()
     for carrier in carrier_order:
-        if disp_carrier[carrier].abs().sum() < 0.1:
-            continue
         color = CARRIER_COLORS.get(carrier, "#888")
         label = CARRIER_LABELS.get(carrier, carrier)
         fig.add_trace(go.Scatter(
@@ -1260,7 +893,8 @@ def dispatch_chart(bus: str, title: str) -> None:
 
     # Battery as separate dashed line (avoids negative values breaking stacked area)
     if _bat_series is not None and _bat_series.abs().sum() > 0.1:
-        fig.add_trace(go.Scatter(
+        _bat_series = lod(_bat_series)
+        fig.add_trace(line_trace(
             x=_bat_series.index,
             y=_bat_series.values,
             mode="lines",
@@ -1271,9 +905,10 @@ def dispatch_chart(bus: str, title: str) -> None:
 
     # Demand overlay
     if bus in dem_solved.columns:
-        fig.add_trace(go.Scatter(
-            x=dem_solved.index,
-            y=dem_solved[bus],
+        _dem_bus = lod(dem_solved[bus])
+        fig.add_trace(line_trace(
+            x=_dem_bus.index,
+            y=_dem_bus.values,
             mode="lines",
             name="Demanda real",
             line=dict(color="black", width=2, dash="dot"),
@@ -1290,15 +925,15 @@ def dispatch_chart(bus: str, title: str) -> None:
 
 # ── Helper: shadow-price chart ────────────────────────────────────────────────
 def shadow_price_chart(bus: str) -> None:
-    if bus not in shadow_prices.columns:
+    if bus not in res.bus_names:
         st.caption("Precio sombra no disponible para este bus.")
         return
-    sp  = shadow_prices[bus]
-    avg = sp.mean()
-    mx  = sp.max()
+    sp  = lod(res.price_series(bus))
+    avg = derived.bus(bus)["price_mean"]
+    mx  = derived.bus(bus)["price_max"]
 
     fig = go.Figure()
-    fig.add_trace(go.Scatter(
+    fig.add_trace(line_trace(
         x=sp.index, y=sp.values,
         mode="lines",
         line=dict(color=CARRIER_COLORS["gas_ccgt"], width=1.5),
@@ -1325,21 +960,17 @@ def shadow_price_chart(bus: str) -> None:
 
 # ── Helper: curtailment chart ─────────────────────────────────────────────────
 def curtailment_chart(bus: str) -> None:
-    curt = curtailment_by_bus.get(bus)
-    if curt is None or curt.empty:
+    curt_c = derived.curtailment(bus)
+    if curt_c.empty:
         st.caption("Sin curtailment en este sistema.")
         return
 
-    total_mwh = curt.sum().sum()
+    total_mwh = derived.bus(bus)["curtailment_mwh"]
     st.caption(f"Curtailment total: **{total_mwh:,.0f} MWh**")
-
-    carrier_map = gen_info.loc[curt.columns, "carrier"]
-    curt_c = curt.T.groupby(carrier_map).sum().T
+    curt_c = lod(curt_c, "minmax")
 
     fig = go.Figure()
     for carrier in curt_c.columns:
-        if curt_c[carrier].sum() < 0.1:
-            continue
         fig.add_trace(go.Scatter(
             x=curt_c.index, y=curt_c[carrier],
             mode="lines", stackgroup="one",
@@ -1358,27 +989,22 @@ def curtailment_chart(bus: str) -> None:
 # ── Helper: battery SOC chart ─────────────────────────────────────────────────
 def battery_soc_chart(bus: str) -> None:
     bat_col = f"battery_{bus}"
-    if n.storage_units.empty or bat_col not in n.storage_units.index:
+    if bat_col not in res.su_names:
         return  # no battery in this system — silently skip
 
-    soc = n.storage_units_t.state_of_charge.get(bat_col)
-    if soc is None or soc.empty:
+    soc = res.storage_t("state_of_charge")[bat_col]
+    if soc.empty:
         st.caption("SOC no disponible para esta batería.")
         return
 
-    e_max_mwh = float(n.storage_units.loc[bat_col, "p_nom"]) * float(
-        n.storage_units.loc[bat_col, "max_hours"]
+    storage_units = res.storage_units()
+    e_max_mwh = float(storage_units.loc[bat_col, "p_nom"]) * float(
+        storage_units.loc[bat_col, "max_hours"]
     )
 
-    # Charge / discharge power
-    p_net = n.storage_units_t.p.get(bat_col, pd.Series(0.0, index=soc.index))
-    try:
-        p_dispatch = n.storage_units_t.p_dispatch[bat_col].reindex(soc.index, fill_value=0.0)
-        p_store    = n.storage_units_t.p_store[bat_col].reindex(soc.index, fill_value=0.0)
-    except (KeyError, AttributeError):
-        # Fallback: derive from net power
-        p_dispatch = p_net.clip(lower=0)
-        p_store    = (-p_net).clip(lower=0)
+    # Charge / discharge power (DispatchResult derives them from net power if PyPSA did not report them)
+    p_dispatch = res.storage_t("p_dispatch")[bat_col]
+    p_store    = res.storage_t("p_store")[bat_col]
 
     soc_pct = soc / e_max_mwh * 100  # 0–100 %
 
@@ -1391,13 +1017,18 @@ def battery_soc_chart(bus: str) -> None:
     st.markdown("**🔋 Batería — Estado de Carga (SOC)**")
     m1, m2, m3, m4 = st.columns(4)
     m1.metric("Capacidad", f"{e_max_mwh:,.0f} MWh",
-              help=f"Potencia: {n.storage_units.loc[bat_col, 'p_nom']:,.0f} MW")
+              help=f"Potencia: {storage_units.loc[bat_col, 'p_nom']:,.0f} MW")
     m2.metric("Energía arbitrada", f"{energy_dispatched:,.0f} MWh")
     m3.metric("Ciclos equivalentes", f"{equiv_cycles:.1f}",
               help="Total descargado / capacidad nominal")
     m4.metric("SOC promedio", f"{soc_avg_pct:.1f} %",
               delta=f"Final: {soc_final_pct:.1f} %")
 
+    # Puntos visibles: SOC con LTTB; barras con mín/máx de la potencia neta
+    soc = lod(soc)
+    _bars = lod(pd.DataFrame({"dispatch": p_dispatch, "store": -p_store}), "minmax")
+    p_dispatch, p_store = _bars["dispatch"], -_bars["store"]
+
     # ── Figure: 2 subplots ─────────────────────────────────────────────────────
     fig = make_subplots(
         rows=2, cols=1,
@@ -1410,7 +1041,7 @@ def battery_soc_chart(bus: str) -> None:
     # ── Row 1: SOC area ────────────────────────────────────────────────────────
     # Gradient-like effect: color by SOC level using a filled area
     fig.add_trace(
-        go.Scatter(
+        line_trace(
             x=soc.index, y=soc.values,
             mode="lines",
             name="SOC (MWh)",
@@ -1472,6 +1103,9 @@ def battery_soc_chart(bus: str) -> None:
 
 
 # ── Tabs per system + global ──────────────────────────────────────────────────
+perf_page.stop(_sp_kpis)
+_sp_tabs = perf_page.start("paneles: pestañas por sistema")
+
 tabs = st.tabs([f"🗺 {s}" for s in SISTEMAS] + ["📊 Global"])
 
 for idx, s in enumerate(SISTEMAS):
@@ -1479,19 +1113,17 @@ for idx, s in enumerate(SISTEMAS):
         st.markdown(f"### Sistema {s}")
 
         # Shadow price KPIs
-        if s in shadow_prices.columns:
-            sp_avg = shadow_prices[s].mean()
-            sp_max = shadow_prices[s].max()
+        if "price_mean" in derived.bus(s):
+            sp_avg = derived.bus(s)["price_mean"]
+            sp_max = derived.bus(s)["price_max"]
             sc1, sc2 = st.columns(2)
             sc1.metric(f"Precio marginal promedio", f"{sp_avg:,.1f} $/MWh")
             sc2.metric(f"Precio marginal máximo",   f"{sp_max:,.1f} $/MWh")
 
         # Shedding alert
-        voll_col = f"VoLL_{s}"
-        if voll_col in dispatch.columns:
-            shed = dispatch[voll_col].sum()
-            if shed > 0.1:
-                st.error(f"⚠️ Carga no servida en {s}: **{shed:,.0f} MWh**  — el sistema no puede atender la demanda con la capacidad disponible.")
+        shed = derived.bus(s).get("shedding_mwh", 0.0)
+        if shed > 0.1:
+            st.error(f"⚠️ Carga no servida en {s}: **{shed:,.0f} MWh**  — el sistema no puede atender la demanda con la capacidad disponible.")
 
         dispatch_chart(s, f"Despacho por tecnología — {s}")
         shadow_price_chart(s)
@@ -1508,15 +1140,9 @@ with tabs[-1]:
     # Generation-mix pie charts (one per system)
     pie_cols = st.columns(3)
     for idx, s in enumerate(SISTEMAS):
-        bus_gens_s = gen_info[
-            (gen_info["bus"] == s) & (~gen_info.index.str.startswith("VoLL_"))
-        ].index.tolist()
-        bus_gens_s = [g for g in bus_gens_s if g in dispatch.columns]
-
-        if bus_gens_s:
-            gen_mwh      = dispatch[bus_gens_s].sum()
-            carrier_s    = gen_info.loc[bus_gens_s, "carrier"]
-            gen_by_car   = gen_mwh.groupby(carrier_s).sum()
+        gen_by_car = derived.mix(s)
+
+        if not gen_by_car.empty:
             gen_by_car   = gen_by_car[gen_by_car > 1]
 
             colors = [CARRIER_COLORS.get(c, "#888") for c in gen_by_car.index]
@@ -1536,14 +1162,15 @@ with tabs[-1]:
             pie_cols[idx].plotly_chart(fig_pie, width='stretch')
 
     # Shadow-price comparison
-    if not shadow_prices.empty:
-        sp_cols_avail = [s for s in SISTEMAS if s in shadow_prices.columns]
+    if res.price.size:
+        sp_cols_avail = [s for s in SISTEMAS if s in res.bus_names]
         if sp_cols_avail:
             fig_sp = go.Figure()
             for s in sp_cols_avail:
-                fig_sp.add_trace(go.Scatter(
-                    x=shadow_prices.index,
-                    y=shadow_prices[s],
+                _sp_lod = lod(res.price_series(s))
+                fig_sp.add_trace(line_trace(
+                    x=_sp_lod.index,
+                    y=_sp_lod.values,
                     mode="lines",
                     name=s,
                     line=dict(color=SYSTEM_COLORS.get(s), width=1.5),
@@ -1563,25 +1190,33 @@ with tabs[-1]:
     if _cmp_btn:
         _cmp_rows: dict[str, dict] = {}
         _cmp_prog = st.progress(0, text="Iniciando…")
-        for _si, (_skey, _sval) in enumerate(SCENARIOS.items()):
+        _s_recipes = {
+            _skey: make_recipe(
+                _sval["params"],
+                scenario=_skey,
+                start=start_date,
+                end=end_date,
+                growth=growth_2026,
+                voll=_sval["params"].get("voll_value", voll_input),
+            )
+            for _skey, _sval in SCENARIOS.items()
+        }
+        # Con el servicio se encolan todos (prioridad baja) y se recogen en orden
+        _s_jobs: dict[str, str | Exception] = {}
+        if JOB_CLIENT is not None:
+            for _skey, _s_recipe in _s_recipes.items():
+                try:
+                    _s_jobs[_skey] = JOB_CLIENT.submit(_s_recipe, priority=PRIORITY_BATCH, client=_client_id())
+                except Exception as _ex:
+                    _s_jobs[_skey] = _ex
+        for _si, (_skey, _s_recipe) in enumerate(_s_recipes.items()):
             _cmp_prog.progress((_si) / len(SCENARIOS), text=f"Optimizando: {_skey}…")
             try:
-                _sp = _sval["params"]
-                _sc = compute_effective_costs(_sp)
-                _sdm = _sp.get("demand_multiplier", {})
-                _sdm = {k: v for k, v in _sdm.items() if v != 1.0} or None
-                _scm = _sp.get("capacity_multiplier", {}) or None
-                _sfo = _sp.get("forced_outage", {})
-                _sfo = _sfo if _sfo.get("enabled", False) else None
-                _sbat = _sp if _sp.get("battery_enable", False) else None
-                _s_voll = float(_sp.get("voll_value", voll_input))
-                _sn = build_and_solve(
-                    centrales_base.copy(), p_max_pu_raw, dem_z,
-                    _sc, growth_2026, _s_voll,
-                    demand_mult=_sdm, capacity_mult=_scm,
-                    forced_outage=_sfo, battery_config=_sbat,
-                )
-                _cmp_rows[_skey] = extract_metrics(_sn)
+                _s_job = _s_jobs.get(_skey)
+                if isinstance(_s_job, Exception):
+                    raise _s_job
+                _s_res = wait_job(_s_job) if _s_job is not None else SOLVES.solve(data, _s_recipe)[0]
+                _cmp_rows[_skey] = extract_metrics(_s_res)
             except Exception as _ex:
                 _cmp_rows[_skey] = {"error": str(_ex)}
         _cmp_prog.progress(1.0, text="Listo.")
@@ -1655,13 +1290,8 @@ with tabs[-1]:
     st.subheader("Margen de reserva por sistema")
     _rm_cols = st.columns(len(SISTEMAS))
     for _i, _s in enumerate(SISTEMAS):
-        _bus_gens_s = gen_info[
-            (gen_info["bus"] == _s) & (~gen_info.index.str.startswith("VoLL_"))
-        ].index.tolist()
-        _cap_mw = gen_info.loc[_bus_gens_s, "p_nom"].sum() if _bus_gens_s else 0.0
-        _load_col_rm = f"load_{_s}"
-        _load_s = n.loads_t.p_set[[_load_col_rm]] if _load_col_rm in n.loads_t.p_set.columns else pd.DataFrame()
-        _peak_mw = _load_s.sum(axis=1).max() if not _load_s.empty else 0.0
+        _cap_mw = derived.bus(_s).get("capacity_mw", 0.0)
+        _peak_mw = derived.bus(_s).get("peak_load_mw", 0.0)
         _rm = ((_cap_mw - _peak_mw) / _peak_mw * 100) if _peak_mw > 0 else float("nan")
         _color = "normal" if _rm >= 20 else ("off" if _rm < 10 else "inverse")
         _rm_cols[_i].metric(
@@ -1674,18 +1304,9 @@ with tabs[-1]:
 
     # ── CO₂ emissions ─────────────────────────────────────────────────────────
     st.subheader("Emisiones de CO₂ estimadas")
-    _non_voll = [g for g in dispatch.columns if not g.startswith("VoLL_")]
-    _gen_mwh_co2 = dispatch[_non_voll].sum()
-    _co2_by_gen = pd.Series({
-        g: _gen_mwh_co2[g] * CO2_FACTOR.get(gen_info.loc[g, "carrier"], 0.0)
-        for g in _non_voll if g in gen_info.index
-    })
-    _co2_by_carrier = _co2_by_gen.groupby(
-        gen_info.loc[_co2_by_gen.index, "carrier"]
-    ).sum().sort_values(ascending=False)
-    _total_co2 = _co2_by_carrier.sum()
-    _total_mwh = _gen_mwh_co2.sum()
-    _intensity  = _total_co2 / _total_mwh * 1000 if _total_mwh > 0 else 0  # gCO₂/kWh
+    _co2_by_carrier = derived.co2_by_carrier()
+    _total_co2 = kpis["co2_t"]
+    _intensity  = kpis["metrics"]["Intensidad (gCO₂/kWh)"]
 
     _co2m1, _co2m2, _co2m3 = st.columns(3)
     _co2m1.metric("Total CO₂", f"{_total_co2/1e6:.3f} MtCO₂")
@@ -1710,13 +1331,8 @@ with tabs[-1]:
     _pdc_tabs = st.tabs([f"PDC / LDC — {s}" for s in SISTEMAS])
     for _ti, _s in enumerate(SISTEMAS):
         with _pdc_tabs[_ti]:
-            _sp_s = shadow_prices[_s] if (not shadow_prices.empty and _s in shadow_prices.columns) else pd.Series(dtype=float)
-            _load_col_ldc = f"load_{_s}"
-            _load_s = (
-                n.loads_t.p_set[[_load_col_ldc]].sum(axis=1)
-                if _load_col_ldc in n.loads_t.p_set.columns
-                else pd.Series(dtype=float)
-            )
+            _pdc_sorted = derived.price_duration(_s)
+            _ldc_sorted = derived.load_duration(_s)
 
             _fig_dur = make_subplots(
                 rows=1, cols=2,
@@ -1724,12 +1340,12 @@ with tabs[-1]:
                 horizontal_spacing=0.10,
             )
 
-            if not _sp_s.empty:
-                _pdc_sorted = _sp_s.sort_values(ascending=False).values
+            if _pdc_sorted.size:
+                _pdc_x, _pdc_y = downsample_curve(_pdc_sorted, lod_points)
                 _fig_dur.add_trace(
-                    go.Scatter(
-                        x=list(range(1, len(_pdc_sorted) + 1)),
-                        y=_pdc_sorted,
+                    line_trace(
+                        x=_pdc_x,
+                        y=_pdc_y,
                         mode="lines",
                         name="Precio marginal",
                         fill="tozeroy",
@@ -1741,12 +1357,12 @@ with tabs[-1]:
                 _fig_dur.update_xaxes(title_text="Horas (ordenadas)", row=1, col=1)
                 _fig_dur.update_yaxes(title_text="$/MWh", row=1, col=1)
 
-            if not _load_s.empty:
-                _ldc_sorted = _load_s.sort_values(ascending=False).values
+            if _ldc_sorted.size:
+                _ldc_x, _ldc_y = downsample_curve(_ldc_sorted, lod_points)
                 _fig_dur.add_trace(
-                    go.Scatter(
-                        x=list(range(1, len(_ldc_sorted) + 1)),
-                        y=_ldc_sorted,
+                    line_trace(
+                        x=_ldc_x,
+                        y=_ldc_y,
                         mode="lines",
                         name="Demanda MW",
                         fill="tozeroy",
@@ -1764,14 +1380,9 @@ with tabs[-1]:
                 showlegend=False,
             )
             st.plotly_chart(_fig_dur, width='stretch')
-            if not _sp_s.empty:
-                _pct_zero = (_sp_s == 0).mean() * 100
-                _voll_solved = n.generators.loc[
-                    n.generators.index.str.startswith("VoLL_"), "marginal_cost"
-                ].max()
-                if pd.isna(_voll_solved):
-                    _voll_solved = float(voll_input)
-                _pct_voll = (_sp_s >= _voll_solved * 0.99).mean() * 100
+            if _pdc_sorted.size:
+                _pct_zero = derived.bus(_s)["price_pct_zero"]
+                _pct_voll = derived.bus(_s)["price_pct_voll"] or 0.0
                 st.caption(
                     f"Horas con precio = 0 $/MWh (exceso renovable): **{_pct_zero:.1f}%**  |  "
                     f"Horas con precio ≥ VoLL (escasez): **{_pct_voll:.1f}%**"
@@ -1779,15 +1390,18 @@ with tabs[-1]:
 
     # Cost breakdown table
     st.subheader("Desglose de generación y costo por central")
-    gen_mwh_all = dispatch.drop(columns=voll_gens, errors="ignore").sum()
-    used_idx    = gen_mwh_all[gen_mwh_all > 1e-6].sort_values(ascending=False).index
-    used_df     = gen_info.loc[used_idx].copy()
-    used_df["gen_MWh"]  = gen_mwh_all[used_idx].values
-    used_df["costo_$"]  = (used_df["gen_MWh"] * used_df["marginal_cost"]).round(0)
-    used_df["share_%"]  = (100 * used_df["gen_MWh"] / used_df["gen_MWh"].sum()).round(2)
+    def generation_table() -> pd.DataFrame:
+        """Centrales con generación: MWh, costo y participación (tabla y descarga)."""
+        gen_mwh_all = gen_mwh[~post_idx.is_voll]
+        used_idx    = gen_mwh_all[gen_mwh_all > 1e-6].sort_values(ascending=False).index
+        used_df     = gen_info.loc[used_idx].copy()
+        used_df["gen_MWh"]  = gen_mwh_all[used_idx].values
+        used_df["costo_$"]  = (used_df["gen_MWh"] * used_df["marginal_cost"]).round(0)
+        used_df["share_%"]  = (100 * used_df["gen_MWh"] / used_df["gen_MWh"].sum()).round(2)
+        return used_df
 
     st.dataframe(
-        used_df[["bus", "carrier", "p_nom", "marginal_cost", "gen_MWh", "costo_$", "share_%"]]
+        generation_table()[["bus", "carrier", "p_nom", "marginal_cost", "gen_MWh", "costo_$", "share_%"]]
         .rename(columns={
             "p_nom": "Cap. MW", "marginal_cost": "CV $/MWh",
             "gen_MWh": "Gen. MWh", "costo_$": "Costo $", "share_%": "Parte %",
@@ -1802,7 +1416,7 @@ with tabs[-1]:
 
     # ── Diagnóstico: generadores sin perfil ──────────────────────────────────
     with st.expander("🔍 Diagnóstico: generadores sin perfil horario", expanded=False):
-        _all_gens = [g for g in n.generators.index if not g.startswith("VoLL_")]
+        _all_gens = [g for g in gen_info.index if not g.startswith("VoLL_")]
         _explicit_profile_cols = p_max_pu_raw.columns.tolist()
         _missing_prof = [g for g in _all_gens if g not in _explicit_profile_cols]
         st.write(f"Generadores sin perfil explícito en el CSV: **{len(_missing_prof)}** de {len(_all_gens)}")
@@ -1822,9 +1436,14 @@ with tabs[-1]:
             "El precio marginal en un LP puede surgir de varias restricciones activas simultáneamente. "
             "Por ello, esta tabla identifica una unidad marginal plausible, "
             "no necesariamente una unidad marginal única exacta."
+            + (
+                " Las unidades «interiores» salen de los duales de sus cotas de despacho en el LP."
+                if res.has_bound_duals else
+                " Sin duales de cotas: «interior» se infiere con tolerancias contra p_min / p_max."
+            )
         )
         for _ps in SISTEMAS:
-            _ps_df = identify_marginal_generator(n, _ps, tol_mw=1.0, tol_price=2.0)
+            _ps_df = identify_marginal_generator(res, _ps, tol_mw=1.0, tol_price=2.0)
             if not _ps_df.empty:
                 st.markdown(f"**{_ps}** — carriers más frecuentes como marginal plausible:")
                 _most_common = _ps_df["carrier"].fillna("N/D").value_counts().head(5)
@@ -1842,30 +1461,69 @@ with tabs[-1]:
                         height=320,
                     )
 
-    # Downloads
+    # Downloads — la tabla se arma y el archivo se escribe (por bloques) solo al hacer clic
     st.subheader("Descargas")
-    out_dir = ROOT / "outputs"
-    out_dir.mkdir(exist_ok=True)
-
-    dl1, dl2, dl3, dl4 = st.columns(4)
-    dl1.download_button(
-        "📥 Despacho por central (CSV)",
-        data=dispatch.to_csv().encode("utf-8"),
-        file_name="despacho_mw.csv", mime="text/csv",
-    )
-    dl2.download_button(
-        "📥 Precio marginal por sistema (CSV)",
-        data=shadow_prices.to_csv().encode("utf-8"),
-        file_name="precio_marginal.csv", mime="text/csv",
+    _exports = {
+        "despacho_mw":          ("Despacho por central", res.dispatch),
+        "precio_marginal":      ("Precio marginal por sistema", res.marginal_price),
+        "generacion_centrales": ("Generación + costos", generation_table),
+    }
+    if len(res.su_names):
+        _exports["battery_soc"] = ("SOC baterías", lambda: res.storage_t("state_of_charge"))
+
+    dl1, dl2, dl3 = st.columns([2, 1, 1])
+    _exp_name = dl1.selectbox("Tabla", options=list(_exports), format_func=lambda k: _exports[k][0])
+    _exp_fmt  = dl2.radio(
+        "Formato", options=list(FORMATS), horizontal=True,
+        format_func={"csv": "CSV", "parquet": "Parquet"}.get,
+        help="Parquet: columnar, float32 sin pérdida y mucho más chico que CSV para corridas largas.",
     )
     dl3.download_button(
-        "📥 Generación + costos (CSV)",
-        data=used_df.to_csv().encode("utf-8"),
-        file_name="generacion_centrales.csv", mime="text/csv",
+        f"📥 {file_name(_exp_name, _exp_fmt)}",
+        data=deferred_export(_exports[_exp_name][1], _exp_name, _exp_fmt, key=st.session_state["res_key"]),
+        file_name=file_name(_exp_name, _exp_fmt),
+        mime=mime_type(_exp_fmt),
+        on_click="ignore",
+    )
+
+perf_page.stop(_sp_tabs)
+
+# ──────────────────────────────────────────────────────────────────────────────
+# ⏱ Rendimiento — dónde se fue el tiempo de la última corrida
+# ──────────────────────────────────────────────────────────────────────────────
+with st.expander("⏱ Rendimiento", expanded=False):
+    _perf_solve: PerfRecorder | None = st.session_state.get("perf_solve")
+    if _perf_solve is not None and _perf_solve.spans:
+        st.markdown(f"**Optimización** (última corrida) — total **{_perf_solve.total_s():.2f} s**")
+        st.dataframe(_perf_solve.to_frame(), hide_index=True, width='stretch')
+    _res_mb = sum(
+        r.nbytes for r in {id(r): r for r in (res, _res_base) if r is not None}.values()
+    ) / 1024**2
+    st.markdown(f"**Resultado en sesión** — {_res_mb:,.1f} MB (despacho, precios, batería y disponibilidad VRE en float32)")
+    _reg = REGISTRY.stats()
+    st.caption(
+        f"Registro del servidor: {_reg['in_memory']} resultados en memoria "
+        f"({_reg['memory_mb']:,.1f} / {_reg['budget_mb']:,.0f} MB), {_reg['on_disk']} en disco · "
+        f"recargas {_reg['reloads']} · descartados {_reg['dropped']}"
+    )
+    _sf = SOLVES.stats()
+    st.caption(
+        f"Solves compartidos: {_sf['leaders']} resueltos, {_sf['shared']} peticiones idénticas "
+        f"atendidas con un solve ya en curso o recién terminado · {_sf['in_flight']} en curso"
+    )
+    if JOB_CLIENT is not None:
+        try:
+            _svc = JOB_CLIENT.health()
+            st.caption(
+                f"Servicio de despacho ({SERVICE_URL}): {_svc['running']}/{_svc['workers']} procesos ocupados, "
+                f"{_svc['queued']} en cola · resueltos {_svc['done']} · fallidos {_svc['failed']} · "
+                f"rechazados {_svc['rejected']}"
+            )
+        except Exception as e:
+            st.caption(f"Servicio de despacho ({SERVICE_URL}) no disponible: {e}")
+    st.markdown(f"**Esta recarga de la página** — total **{perf_page.total_s():.2f} s**")
+    st.dataframe(perf_page.to_frame(), hide_index=True, width='stretch')
+    st.caption(
+        "wall_s: tiempo de pared · rss_mb / rss_delta_mb: memoria residente al cerrar la fase y su cambio · "
+        "peak_rss_mb: pico del proceso · rows / cols / nnz: restricciones, variables y no-ceros del LP."
     )
-    if not n.storage_units_t.state_of_charge.empty:
-        dl4.download_button(
-            "📥 SOC baterías (CSV)",
-            data=n.storage_units_t.state_of_charge.to_csv().encode("utf-8"),
-            file_name="battery_soc.csv", mime="text/csv",
-        )
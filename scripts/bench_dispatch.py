@@ -0,0 +1,310 @@
+"""
+bench_dispatch.py
+-----------------
+Benchmark del pipeline de despacho por etapas, variando horizonte y tamaño
+de flota:
+
+    slice  → recorte de demanda + alineación de perfiles (align_profiles)
+    build  → red PyPSA (build_network)
+    model  → LP de linopy (create_model)
+    solve  → HiGHS (solve_model)
+    metrics→ extract_metrics
+
+Cada caso corre en un subproceso aparte para que el pico de memoria (RSS)
+sea el del caso y no el acumulado; las etapas se miden con lib/perf.py. Resultados en JSON (un objeto con
+`meta` y `cases`) para comparar entre máquinas o versiones.
+
+Flotas mayores al catálogo real (499 centrales) se generan remuestreando
+el catálogo con semilla fija; la capacidad de cada copia se escala para
+conservar la capacidad total por sistema. Si falta Perfil_Generaciom.csv
+se usan perfiles sintéticos (campana solar, eólica ruidosa). Si el store
+de demanda no cubre el horizonte se repite el historial disponible.
+
+Uso:
+    python scripts/bench_dispatch.py                                # matriz por defecto
+    python scripts/bench_dispatch.py --horizons 24,168 --fleets 499
+    python scripts/bench_dispatch.py --horizons 8760 --fleets 10000 --timeout 3600
+    python scripts/bench_dispatch.py --out bench.json
+    python scripts/bench_dispatch.py --horizons 168 --fleets 499 --log_json   # JSON por etapa en stderr
+    python scripts/bench_dispatch.py --synthetic --fleets 10000             # catálogo de lib/synthetic.py
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "app"))
+
+CENTRALES_CSV = ROOT / "data_clean" / "generators" / "Centrales_gen_mx.csv"
+PERFIL_CSV    = ROOT / "data_clean" / "generators" / "Perfil_Generaciom.csv"
+OUT_DIR       = ROOT / "data_cache" / "bench"
+
+DEFAULT_HORIZONS = [24, 168, 720, 2_160, 8_760]
+DEFAULT_FLEETS   = [499, 2_000, 5_000, 10_000]
+START            = pd.Timestamp("2026-01-01")
+
+
+# ── Datos de entrada ──────────────────────────────────────────────────────────
+
+def load_catalog() -> pd.DataFrame:
+    from lib.dispatch_data import load_generators
+
+    return load_generators(CENTRALES_CSV)
+
+
+def synthetic_fleet(size: int, seed: int = 0) -> pd.DataFrame:
+    """Catálogo sintético de lib/synthetic.py (mismo esquema que Centrales_gen_mx.csv)."""
+    from lib.synthetic import SyntheticSpec, make_catalog
+
+    return make_catalog(SyntheticSpec(n_plants=size, seed=seed))
+
+
+def scale_fleet(catalog: pd.DataFrame, size: int, seed: int = 0) -> pd.DataFrame:
+    """
+    Catálogo de `size` centrales. Con size <= len(catalog) se toma una muestra;
+    si es mayor se agregan copias remuestreadas (con reemplazo) y se escala
+    p_nom por sistema para conservar la capacidad instalada total.
+    """
+    if size == len(catalog):
+        return catalog.copy()
+    if size < len(catalog):
+        return catalog.sample(n=size, random_state=seed).reset_index(drop=True)
+    rng = np.random.default_rng(seed)
+    extra = catalog.iloc[rng.integers(0, len(catalog), size - len(catalog))].copy()
+    extra["source_name"] = extra["name"]
+    extra["name"] = [f"{n}__s{k}" for k, n in enumerate(extra["name"])]
+    fleet = pd.concat([catalog.assign(source_name=catalog["name"]), extra], ignore_index=True)
+
+    base_cap = catalog.groupby("bus")["p_nom"].sum()
+    new_cap = fleet.groupby("bus")["p_nom"].sum()
+    fleet["p_nom"] = fleet["p_nom"] * fleet["bus"].map(base_cap / new_cap)
+    return fleet
+
+
+def synthetic_profiles(fleet: pd.DataFrame, index: pd.DatetimeIndex, seed: int = 0) -> pd.DataFrame:
+    """Perfiles p_max_pu sintéticos de lib/synthetic.py (área = bus de cada central)."""
+    from lib.synthetic import SyntheticSpec, make_profiles
+
+    spec = SyntheticSpec(start=index[0].date(), days=int(np.ceil(len(index) / 24)), seed=seed)
+    fleet = fleet if "area" in fleet.columns else fleet.assign(area=fleet["bus"])
+    return make_profiles(fleet, spec).reindex(index)
+
+
+def load_profiles(
+    fleet: pd.DataFrame, index: pd.DatetimeIndex, seed: int = 0, synthetic: bool = False,
+) -> tuple[pd.DataFrame, str]:
+    """Perfil real (copiando columnas para las centrales remuestreadas) o sintético."""
+    if synthetic or not PERFIL_CSV.exists():
+        return synthetic_profiles(fleet, index, seed), "synthetic"
+    perfil = pd.read_csv(PERFIL_CSV)
+    perfil["snapshot"] = pd.to_datetime(perfil["snapshot"])
+    perfil = perfil.set_index("snapshot").sort_index()
+    src = fleet.get("source_name", fleet["name"])
+    keep = [(n, s) for n, s in zip(fleet["name"], src) if s in perfil.columns]
+    out = perfil[[s for _, s in keep]].copy()
+    out.columns = [n for n, _ in keep]
+    return out, "perfil_csv"
+
+
+def load_demand(hours: int) -> tuple[pd.DataFrame, str]:
+    """Demanda (snapshot × sistema) de `hours` horas desde START."""
+    from lib import demand_store
+    from lib.dispatch_model import SISTEMAS
+
+    index = pd.date_range(START, periods=hours, freq="h")
+    dem = demand_store.load()
+    if not dem.empty:
+        wide = (
+            dem[dem["zona"].isin(SISTEMAS)]
+            .pivot_table(index="snapshot", columns="zona", values="demand_mw", aggfunc="sum")
+            .reindex(columns=SISTEMAS)
+            .dropna()
+        )
+        if len(wide) >= 24:
+            # Repetir el historial si no alcanza para el horizonte pedido
+            reps = int(np.ceil(hours / len(wide)))
+            values = np.tile(wide.to_numpy(), (reps, 1))[:hours]
+            source = "store" if len(wide) >= hours else "store_tiled"
+            return pd.DataFrame(values, index=index, columns=SISTEMAS), source
+
+    hour = index.hour.to_numpy()
+    shape = 1.0 + 0.15 * np.sin((hour - 8) / 24 * 2 * np.pi)
+    base = {"SIN": 42_000.0, "BCA": 2_600.0, "BCS": 500.0}
+    return pd.DataFrame({s: base[s] * shape for s in SISTEMAS}, index=index), "synthetic"
+
+
+# ── Un caso (se ejecuta en subproceso) ────────────────────────────────────────
+
+def run_case(horizon: int, fleet_size: int, seed: int, log_json: bool = False, synthetic: bool = False) -> dict:
+    from lib.dispatch_model import (
+        DEFAULT_COSTS,
+        VOLL_DEFAULT,
+        align_profiles,
+        build_network,
+        create_model,
+        extract_metrics,
+        solve_model,
+    )
+    from lib.perf import PerfRecorder, lp_size
+
+    perf = PerfRecorder(stream=sys.stderr if log_json else None)
+
+    if synthetic:
+        fleet = synthetic_fleet(fleet_size, seed)
+    else:
+        fleet = scale_fleet(load_catalog(), fleet_size, seed)
+
+    with perf.span("slice"):
+        dem_z, demand_source = load_demand(horizon)
+        profiles, profile_source = load_profiles(fleet, dem_z.index, seed, synthetic=synthetic)
+        p_aligned = align_profiles(profiles, dem_z.index)
+
+    with perf.span("build"):
+        n = build_network(fleet, p_aligned, dem_z, dict(DEFAULT_COSTS), False, float(VOLL_DEFAULT))
+
+    with perf.span("model") as model_span:
+        create_model(n)
+        model_span.record(**lp_size(n.model))
+
+    with perf.span("solve"):
+        status, condition = solve_model(n)
+
+    with perf.span("metrics"):
+        metrics = extract_metrics(n) if status == "ok" else {}
+
+    stages = {
+        sp.name: {"wall_s": sp.wall_s, "rss_peak_mb": sp.peak_rss_mb, "rss_delta_mb": sp.rss_delta_mb}
+        for sp in perf.spans
+    }
+    return {
+        "horizon_h": horizon,
+        "fleet": len(fleet),
+        "status": status,
+        "condition": condition,
+        "demand_source": demand_source,
+        "profile_source": profile_source,
+        "lp": dict(model_span.extra),
+        "stages": stages,
+        "wall_total_s": perf.total_s(),
+        "rss_peak_mb": max((sp.peak_rss_mb for sp in perf.spans if sp.peak_rss_mb is not None), default=None),
+        "objective": metrics.get("Costo total ($M)"),
+    }
+
+
+def spawn_case(
+    horizon: int, fleet_size: int, seed: int, timeout: float,
+    log_json: bool = False, synthetic: bool = False,
+) -> dict:
+    cmd = [sys.executable, __file__, "--_case", str(horizon), str(fleet_size), "--seed", str(seed)]
+    if log_json:
+        cmd.append("--log_json")
+    if synthetic:
+        cmd.append("--synthetic")
+    t0 = time.perf_counter()
+    try:
+        # stderr pasa directo: con --log_json ahí van las líneas JSON de cada etapa
+        proc = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=None if log_json else subprocess.PIPE,
+                              text=True, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        return {"horizon_h": horizon, "fleet": fleet_size, "status": "timeout", "wall_total_s": timeout}
+    if proc.returncode != 0:
+        err = (proc.stderr or "").strip()
+        return {
+            "horizon_h": horizon, "fleet": fleet_size, "status": "error",
+            "wall_total_s": round(time.perf_counter() - t0, 4),
+            "error": err.splitlines()[-1] if err else f"exit {proc.returncode}",
+        }
+    # La última línea del stdout es el JSON del caso (HiGHS también escribe en stdout)
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def _meta() -> dict:
+    try:
+        rev = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True,
+        ).stdout.strip()
+    except Exception:
+        rev = ""
+    versions = {}
+    for mod in ["pypsa", "linopy", "highspy", "pandas", "numpy"]:
+        try:
+            versions[mod] = __import__(mod).__version__
+        except Exception:
+            versions[mod] = None
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "git_rev": rev,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "versions": versions,
+    }
+
+
+# ── Main ──────────────────────────────────────────────────────────────────────
+
+def _int_list(text: str) -> list[int]:
+    return [int(x.replace("_", "")) for x in text.split(",") if x.strip()]
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description="Benchmark del pipeline de despacho PyPSA")
+    p.add_argument("--horizons", type=_int_list, default=DEFAULT_HORIZONS,
+                   help="Horizontes en horas, separados por coma (default: 24,168,720,2160,8760)")
+    p.add_argument("--fleets", type=_int_list, default=DEFAULT_FLEETS,
+                   help="Tamaños de flota, separados por coma (default: 499,2000,5000,10000)")
+    p.add_argument("--seed", type=int, default=0, help="Semilla para flotas y perfiles sintéticos")
+    p.add_argument("--timeout", type=float, default=1_800, help="Límite por caso en segundos")
+    p.add_argument("--out", default=None, help="Archivo JSON de salida (default: data_cache/bench/)")
+    p.add_argument("--synthetic", action="store_true",
+                   help="Usar catálogo y perfiles de lib/synthetic.py en lugar de remuestrear el real")
+    p.add_argument("--log_json", action="store_true",
+                   help="Emitir una línea JSON por etapa en stderr (formato de lib/perf.py)")
+    p.add_argument("--_case", nargs=2, type=int, metavar=("HORIZON", "FLEET"), help=argparse.SUPPRESS)
+    args = p.parse_args()
+
+    if args._case:
+        print(json.dumps(run_case(
+            args._case[0], args._case[1], args.seed, log_json=args.log_json, synthetic=args.synthetic,
+        )))
+        return
+
+    out = Path(args.out) if args.out else OUT_DIR / f"dispatch_{datetime.now():%Y%m%d_%H%M%S}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    result = {"meta": _meta(), "cases": []}
+
+    for fleet in args.fleets:
+        for horizon in args.horizons:
+            print(f"  {horizon:>5} h × {fleet:>6} centrales … ", end="", flush=True)
+            case = spawn_case(
+                horizon, fleet, args.seed, args.timeout, log_json=args.log_json, synthetic=args.synthetic,
+            )
+            result["cases"].append(case)
+            if case["status"] == "ok":
+                st = case["stages"]
+                print(
+                    f"{case['wall_total_s']:8.2f} s  RSS {case['rss_peak_mb'] or float('nan'):8.1f} MB  "
+                    f"(build {st['build']['wall_s']:.2f} / model {st['model']['wall_s']:.2f} / "
+                    f"solve {st['solve']['wall_s']:.2f})"
+                )
+            else:
+                print(f"{case['status']}  {case.get('error', '')}")
+            # Guardar después de cada caso: un caso que revienta no borra los anteriores
+            out.write_text(json.dumps(result, indent=1), encoding="utf-8")
+
+    print(f"\nResultados en {out}")
+
+
+if __name__ == "__main__":
+    main()
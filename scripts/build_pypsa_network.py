@@ -1,144 +1,99 @@
+"""
+build_pypsa_network.py
+----------------------
+Despacho headless con el mismo motor que la página 2_Despacho_PyPSA.py
+(lib/dispatch_model.run_dispatch): catálogo real de centrales, perfiles
+p_max_pu, demanda por sistema y los escenarios de lib/scenarios.py. No
+importa Streamlit ni Plotly.
+
+Imprime las métricas resumen y el mix por sistema; con --out guarda el
+`DispatchResult` compacto (.npz, `DispatchResult.from_bytes` lo lee). Una
+línea JSON por fase (event=perf_span) va a stderr.
+
+Uso:
+    python scripts/build_pypsa_network.py --start 2026-01-05 --end 2026-01-11
+    python scripts/build_pypsa_network.py --scenario "fuel price" --growth
+    python scripts/build_pypsa_network.py --scenario storage --out data_cache/runs/storage.npz
+    python scripts/build_pypsa_network.py --demand_parquet data_clean/demand/historical_demand.parquet
+"""
 from __future__ import annotations
 
 import argparse
 import sys
+from datetime import date
 from pathlib import Path
-import pandas as pd
-import pypsa
 
-sys.path.insert(0, str(Path(__file__).resolve().parent))
+import pandas as pd
 
 ROOT = Path(__file__).resolve().parents[1]
-CLEAN_DEMAND = ROOT / "data_clean" / "demand"
-
-
-def build_network(demand: pd.DataFrame) -> pypsa.Network:
-    n = pypsa.Network()
-    n.set_snapshots(demand.index)
-
-    zones = list(demand.columns)
-
-    # Buses
-    for z in zones:
-        n.add("Bus", z)
-
-    # Loads (time series)
-    for z in zones:
-        n.add("Load", f"load_{z}", bus=z)
-    n.loads_t.p_set = demand.copy()
-
-    # Generadores "dummy" por zona (ajústalos a tu caso)
-    # Costos marginales ejemplo: gas caro, solar/wind barato
-    # p_nom = capacidad instalada (MW) - ejemplo: 1.5x pico de demanda por zona para factibilidad
-    peak = demand.max()
-    for z in zones:
-        cap = float(1.5 * peak[z]) if pd.notna(peak[z]) else 1000.0
-
-        # Gas (dispatchable)
-        n.add(
-            "Generator",
-            f"gas_{z}",
-            bus=z,
-            p_nom=cap,
-            marginal_cost=1200.0,  # MXN/MWh (ejemplo)
-            efficiency=0.5,
-        )
-
-        # Solar (limitado por perfil)
-        n.add(
-            "Generator",
-            f"solar_{z}",
-            bus=z,
-            p_nom=0.6 * cap,
-            marginal_cost=50.0,
-        )
-
-        # Wind
-        n.add(
-            "Generator",
-            f"wind_{z}",
-            bus=z,
-            p_nom=0.4 * cap,
-            marginal_cost=30.0,
-        )
-
-    # Perfiles de disponibilidad (p_max_pu) super simples (luego los reemplazas por datos reales)
-    # solar: campana diurna; wind: constante suave
-    idx = demand.index
-    hour = idx.tz_convert("America/Mexico_City").hour if idx.tz is not None else idx.hour
-
-    solar_profile = pd.Series(0.0, index=idx)
-    solar_profile[(hour >= 7) & (hour <= 18)] = 1.0
-    solar_profile[(hour == 7) | (hour == 18)] = 0.5
-
-    wind_profile = pd.Series(0.6, index=idx)  # constante por ahora
-
-    for z in zones:
-        n.generators_t.p_max_pu[f"solar_{z}"] = solar_profile.values
-        n.generators_t.p_max_pu[f"wind_{z}"] = wind_profile.values
-        n.generators_t.p_max_pu[f"gas_{z}"] = 1.0
-
-    # Líneas entre zonas (opcional): conecta en cadena con capacidad grande
-    # Ajusta topología real después (SIN/BCA/BCS)
-    if len(zones) >= 2:
-        for a, b in zip(zones[:-1], zones[1:]):
-            n.add(
-                "Line",
-                f"line_{a}_{b}",
-                bus0=a,
-                bus1=b,
-                x=0.0001,     # reactancia dummy
-                r=0.00001,
-                s_nom=5000.0,  # MW capacidad (dummy)
-            )
-
-    return n
-
-
-def main():
-    p = argparse.ArgumentParser()
-    p.add_argument("--demand_parquet", type=str, required=True)
-    p.add_argument("--out_nc", type=str, default=str(ROOT / "data_clean" / "pypsa_network.nc"))
+sys.path.insert(0, str(ROOT / "app"))
+
+from lib.dispatch_data import (  # noqa: E402
+    CENTRALES_CSV,
+    PERFIL_CSV,
+    load_dispatch_data,
+    read_demand_parquet,
+    sync_demand_store,
+)
+from lib.dispatch_model import SISTEMAS, extract_metrics, run_dispatch  # noqa: E402
+from lib.perf import PerfRecorder  # noqa: E402
+from lib.post_solve import DerivedResults  # noqa: E402
+from lib.scenarios import BASE_SCENARIO_KEY, SCENARIOS, make_recipe, resolve_scenario  # noqa: E402
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description="Despacho headless (mismo motor que la página)")
+    p.add_argument("--scenario", default=BASE_SCENARIO_KEY,
+                   help="Nombre de lib/scenarios.py o un fragmento sin emoji (p. ej. 'storage')")
+    p.add_argument("--start", type=date.fromisoformat, default=None, help="Primer día (YYYY-MM-DD)")
+    p.add_argument("--end", type=date.fromisoformat, default=None, help="Último día (YYYY-MM-DD)")
+    p.add_argument("--growth", action="store_true", help="Agregar la capacidad 2026 esperada")
+    p.add_argument("--voll", type=float, default=None, help="VoLL $/MWh (default: el del escenario)")
+    p.add_argument("--demand_parquet", type=Path, default=None,
+                   help="Demanda ancha snapshot × sistema (default: store de demanda)")
+    p.add_argument("--centrales_csv", type=Path, default=CENTRALES_CSV)
+    p.add_argument("--perfil_csv", type=Path, default=PERFIL_CSV)
+    p.add_argument("--out", type=Path, default=None, help="Guardar el DispatchResult (.npz)")
     args = p.parse_args()
 
-    demand = pd.read_parquet(args.demand_parquet)
-
-    if not isinstance(demand.index, pd.DatetimeIndex):
-        raise ValueError("La demanda debe venir con DatetimeIndex.")
-    # PyPSA no acepta índices con zona horaria — eliminar tz manteniendo la hora local
-    if demand.index.tz is not None:
-        demand.index = demand.index.tz_localize(None)
-    if demand.isna().all().all():
-        raise ValueError("La demanda está vacía (todo NaN).")
-
-    n = build_network(demand)
-
-    # Si hay NaN en demanda, PyPSA puede fallar: eliminar snapshots incompletos
-    if n.loads_t.p_set.isna().any().any():
-        good = ~n.loads_t.p_set.isna().any(axis=1)
-        n = n[good]
-
-    status, cond = n.optimize(solver_name="highs")
-    print("Optimize status:", status, cond)
-
-    out_path = Path(args.out_nc)
-    out_path.parent.mkdir(parents=True, exist_ok=True)
-    n.export_to_netcdf(out_path)
-    print("OK ->", out_path)
-
-    print("Costo total (objective):", float(n.objective))
-    print("Generación total por tipo (MWh):")
-    gen = n.generators_t.p.sum()
-    print(gen.groupby(gen.index.str.split("_").str[0]).sum())
-
-    # Curtailment: energía disponible pero no despachada
-    avail = (
-        n.generators.p_nom
-        * n.generators_t.p_max_pu.reindex(columns=n.generators.index, fill_value=1.0)
+    perf = PerfRecorder(stream=sys.stderr)
+    scenario = resolve_scenario(args.scenario)
+
+    with perf.span("carga de datos"):
+        if args.demand_parquet is None:
+            sync_demand_store()
+        demand = read_demand_parquet(args.demand_parquet) if args.demand_parquet else None
+        data = load_dispatch_data(args.centrales_csv, args.perfil_csv, demand=demand)
+
+    recipe = make_recipe(
+        SCENARIOS[scenario]["params"],
+        scenario=scenario,
+        start=args.start,
+        end=args.end,
+        growth=args.growth,
+        voll=args.voll,
     )
-    curtailment = (avail - n.generators_t.p).clip(lower=0).sum()
-    print("Curtailment por tipo (MWh):")
-    print(curtailment.groupby(curtailment.index.str.split("_").str[0]).sum())
+    res = run_dispatch(data, recipe, perf=perf)
+    print(f"Escenario: {scenario} — {res!r}")
+
+    print("\nMétricas:")
+    for name, value in extract_metrics(res).items():
+        print(f"  {name:<24} {value:>14,.2f}")
+
+    view = DerivedResults(res)
+    print("\nGeneración por tecnología y sistema (MWh):")
+    mix = pd.DataFrame({bus: view.mix(bus) for bus in SISTEMAS}).fillna(0.0)
+    print(mix.round(0).to_string())
+
+    print("\nPor sistema:")
+    by_bus = pd.DataFrame(view.kpis["by_bus"]).T.reindex(SISTEMAS)
+    print(by_bus.round(1).to_string())
+
+    if args.out is not None:
+        args.out.parent.mkdir(parents=True, exist_ok=True)
+        with perf.span("guardar resultado"):
+            args.out.write_bytes(res.to_bytes())
+        print("\nOK ->", args.out)
 
 
 if __name__ == "__main__":
@@ -6,151 +6,105 @@ desde el portal CENACE:
   https://www.cenace.gob.mx/Paginas/SIM/Reportes/EstimacionDemandaReal.aspx
 
 Los datos se publican ~2 semanas después de la fecha de operación.
-Los CSVs se guardan en data_raw/demand/balance_2026/ y automáticamente
-tienen prioridad sobre los estimados en daily_api/.
+Los CSVs se guardan en data_raw/demand/balance_2026/ y se ingieren al
+store consolidado (data_clean/demand/store/) con source="balance", que
+tiene prioridad sobre los datos de la API y los estimados.
 
 Uso:
     python scripts/fetch_balance_portal.py                      # últimos 30 días
     python scripts/fetch_balance_portal.py --start 2026-02-26  # desde esa fecha
     python scripts/fetch_balance_portal.py --days 60           # últimos N días
+    python scripts/fetch_balance_portal.py --days 365 --workers 4 --rate 3   # backfill
+
+El backfill reutiliza el ViewState de ASP.NET entre fechas (un GET por
+sesión en lugar de uno por fecha), corre varias sesiones en paralelo con un
+limitador de tasa global (lib/balance_portal.py) y guarda el estado en
+data_cache/balance_portal/coverage.json para reanudar. Ese archivo queda fuera
+de data_raw/ (el workflow nocturno versiona ese directorio) y separa las
+fechas sin datos de las que fallaron por red; estas se reintentan siempre.
 """
 from __future__ import annotations
 
 import argparse
-import re
 import sys
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date, datetime, timedelta
 from pathlib import Path
 
-import requests
-from bs4 import BeautifulSoup
-
 ROOT = Path(__file__).resolve().parents[1]
-OUT_DIR = ROOT / "data_raw" / "demand" / "balance_2026"
-OUT_DIR.mkdir(parents=True, exist_ok=True)
+sys.path.insert(0, str(ROOT / "app"))
 
-BASE_URL = "https://www.cenace.gob.mx/Paginas/SIM/Reportes/EstimacionDemandaReal.aspx"
-HEADERS = {
-    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
-    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
-    "Accept-Language": "es-MX,es;q=0.9,en;q=0.8",
-    "Referer": BASE_URL,
-}
+from lib import demand_store  # noqa: E402
+from lib.balance_portal import Coverage, PortalError, PortalSession, RateLimiter, csv_date  # noqa: E402
 
+OUT_DIR = ROOT / "data_raw" / "demand" / "balance_2026"
+OUT_DIR.mkdir(parents=True, exist_ok=True)
+COVERAGE_PATH = ROOT / "data_cache" / "balance_portal" / "coverage.json"
 
-# ── Fechas ya descargadas en balance_2026/ ────────────────────────────────────
 
 def balance_dates_on_disk() -> set[date]:
     dates: set[date] = set()
     for f in OUT_DIR.glob("*.csv"):
-        try:
-            with open(f, encoding="latin-1") as fh:
-                for i, line in enumerate(fh):
-                    if i == 7:
-                        m = re.search(r"(\d{2}/\d{2}/\d{4})", line.strip().strip('"'))
-                        if m:
-                            dates.add(datetime.strptime(m.group(1), "%d/%m/%Y").date())
-                        break
-        except Exception:
-            pass
+        d = csv_date(f)
+        if d is not None:
+            dates.add(d)
     return dates
 
 
-# ── Extraer campos ASP.NET del HTML ──────────────────────────────────────────
-
-def extract_aspnet_fields(soup: BeautifulSoup) -> dict:
-    fields = {}
-    for name in ["__VIEWSTATE", "__VIEWSTATEGENERATOR", "__EVENTVALIDATION",
-                 "__VIEWSTATEENCRYPTED"]:
-        tag = soup.find("input", {"name": name})
-        if tag:
-            fields[name] = tag.get("value", "")
-    return fields
-
+# ── Backfill concurrente ──────────────────────────────────────────────────────
 
-# ── Descargar un día específico ───────────────────────────────────────────────
-
-def fetch_day(target: date, session: requests.Session, timeout: int = 30) -> bytes | None:
+def backfill(
+    dates: list[date],
+    coverage: Coverage,
+    workers: int = 3,
+    rate_per_s: float = 2.0,
+    timeout: int = 30,
+) -> tuple[int, int, int]:
     """
-    Intenta descargar el CSV de balance para `target`.
-    Devuelve los bytes del CSV, o None si no está disponible aún.
+    Descarga `dates` con `workers` sesiones concurrentes (cada hilo conserva
+    su propia PortalSession) y un limitador de tasa global. El estado de
+    cobertura se guarda tras cada fecha.
+    Devuelve (descargados, no_disponibles, con_error).
     """
-    date_str = target.strftime("%d/%m/%Y")   # formato Telerik: dd/MM/yyyy
-
-    # 1. GET inicial → obtener ViewState
-    try:
-        r = session.get(BASE_URL, headers=HEADERS, timeout=timeout)
-        r.raise_for_status()
-    except Exception as e:
-        print(f"  Error GET inicial: {e}", file=sys.stderr)
-        return None
-
-    soup = BeautifulSoup(r.text, "html.parser")
-    fields = extract_aspnet_fields(soup)
-
-    if not fields.get("__VIEWSTATE"):
-        print("  No se encontró __VIEWSTATE en la página", file=sys.stderr)
-        return None
-
-    # 2. POST para filtrar por fecha de operación
-    # Nombres de controles Telerik observados en EstimacionDemandaReal.aspx
-    post_data = {
-        **fields,
-        "__EVENTTARGET": "",
-        "__EVENTARGUMENT": "",
-        # Fecha única (sección "Por Balance")
-        "ctl00$MainContent$rdpFechaBalance$dateInput": date_str,
-        "ctl00_MainContent_rdpFechaBalance_dateInput_ClientState":
-            f'{{"enabled":true,"emptyMessage":"","validationText":"{target.strftime("%Y-%m-%d")}-00-00-00",'
-            f'"valueAsString":"{target.strftime("%Y-%m-%d")}-00-00-00",'
-            f'"minDateStr":"2016-01-27-00-00-00","maxDateStr":"2030-12-31-00-00-00"}}',
-        "ctl00$MainContent$btnConsultaBalance": "Consultar",
-    }
-
-    try:
-        r2 = session.post(BASE_URL, data=post_data, headers=HEADERS, timeout=timeout)
-        r2.raise_for_status()
-    except Exception as e:
-        print(f"  Error POST consulta: {e}", file=sys.stderr)
-        return None
-
-    soup2 = BeautifulSoup(r2.text, "html.parser")
-    fields2 = extract_aspnet_fields(soup2)
-
-    # Verificar si hay datos (buscar tabla con datos)
-    grid = soup2.find("table", {"id": re.compile(r"rgBalance", re.I)})
-    if not grid:
-        # Buscar cualquier tabla con filas de datos
-        tables = soup2.find_all("table", class_=re.compile(r"rgMasterTable", re.I))
-        if not tables:
-            return None  # sin datos para esta fecha
-
-    # 3. POST para descargar CSV (botón de exportar)
-    fields2["__EVENTTARGET"] = "ctl00$MainContent$rgBalance$ctl00$ctl02$ctl00$ExportToCsvButton"
-    fields2["__EVENTARGUMENT"] = ""
-
-    # Telerik grid export button (imagen CSV)
-    csv_post = {
-        **fields2,
-        "ctl00$MainContent$rdpFechaBalance$dateInput": date_str,
-        "ctl00_MainContent_rdpFechaBalance_dateInput_ClientState":
-            f'{{"enabled":true,"emptyMessage":"","validationText":"{target.strftime("%Y-%m-%d")}-00-00-00",'
-            f'"valueAsString":"{target.strftime("%Y-%m-%d")}-00-00-00",'
-            f'"minDateStr":"2016-01-27-00-00-00","maxDateStr":"2030-12-31-00-00-00"}}',
-    }
-
-    try:
-        r3 = session.post(BASE_URL, data=csv_post, headers=HEADERS, timeout=timeout)
-        r3.raise_for_status()
-        content_type = r3.headers.get("Content-Type", "")
-        if "text/csv" in content_type or "application/octet-stream" in content_type:
-            return r3.content
-        # Si responde HTML, el botón de descarga no funcionó con estos nombres
-        return None
-    except Exception as e:
-        print(f"  Error POST descarga CSV: {e}", file=sys.stderr)
-        return None
+    limiter = RateLimiter(rate_per_s)
+    local = threading.local()
+    sessions: list[PortalSession] = []
+    sessions_lock = threading.Lock()
+
+    def _portal() -> PortalSession:
+        if not hasattr(local, "portal"):
+            local.portal = PortalSession(limiter, timeout=timeout)
+            with sessions_lock:
+                sessions.append(local.portal)
+        return local.portal
+
+    def _work(target: date) -> str:
+        try:
+            csv_bytes = _portal().fetch_day(target)
+        except PortalError as e:
+            coverage.mark_error(target, str(e))
+            print(f"  {target}… error transitorio ({e}); se reintenta en la siguiente corrida", flush=True)
+            return "error"
+        if csv_bytes is None:
+            coverage.mark_unavailable(target)
+            print(f"  {target}… no disponible aún", flush=True)
+            return "unavailable"
+        # Guardar con nombre similar al formato existente
+        fname = f"Demanda Real Balance_0_v3 Dia Operacion {target.strftime('%Y-%m-%d')} auto.csv"
+        (OUT_DIR / fname).write_bytes(csv_bytes)
+        coverage.mark_available(target, fname)
+        print(f"  {target}… ✓ guardado → {fname}", flush=True)
+        return "ok"
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        outcomes = list(pool.map(_work, dates))
+
+    n_get = sum(p.gets for p in sessions)
+    n_post = sum(p.posts for p in sessions)
+    print(f"  Peticiones: {n_get} GET + {n_post} POST en {len(sessions)} sesión(es).")
+    return outcomes.count("ok"), outcomes.count("unavailable"), outcomes.count("error")
 
 
 # ── Main ──────────────────────────────────────────────────────────────────────
@@ -160,6 +114,11 @@ def main() -> None:
     p.add_argument("--start", default=None, help="Fecha inicial YYYY-MM-DD")
     p.add_argument("--days", type=int, default=30, help="Cuántos días hacia atrás revisar (default: 30)")
     p.add_argument("--overwrite", action="store_true", help="Re-descargar aunque ya exista")
+    p.add_argument("--workers", type=int, default=3, help="Sesiones concurrentes (default: 3)")
+    p.add_argument("--rate", type=float, default=2.0,
+                   help="Peticiones por segundo, total entre sesiones (default: 2)")
+    p.add_argument("--recheck_hours", type=float, default=12.0,
+                   help="No re-consultar fechas sin datos revisadas hace menos de N horas (default: 12)")
     args = p.parse_args()
 
     end_date = date.today() - timedelta(days=1)
@@ -168,12 +127,14 @@ def main() -> None:
     else:
         start_date = end_date - timedelta(days=args.days)
 
-    existing = balance_dates_on_disk()
+    coverage = Coverage(COVERAGE_PATH, OUT_DIR)
 
     to_fetch = []
     current = start_date
     while current <= end_date:
-        if current not in existing or args.overwrite:
+        if args.overwrite or not (
+            coverage.has(current) or coverage.checked_recently(current, args.recheck_hours)
+        ):
             to_fetch.append(current)
         current += timedelta(days=1)
 
@@ -181,29 +142,21 @@ def main() -> None:
         print("No hay fechas nuevas que descargar del portal.")
         return
 
-    print(f"Intentando descargar {len(to_fetch)} fecha(s) del portal CENACE…")
-    session = requests.Session()
-    downloaded = 0
-    not_available = 0
-
-    for target in to_fetch:
-        print(f"  {target}…", end=" ", flush=True)
-        csv_bytes = fetch_day(target, session)
-
-        if csv_bytes is None:
-            print("no disponible aún")
-            not_available += 1
-        else:
-            # Guardar con nombre similar al formato existente
-            fname = f"Demanda Real Balance_0_v3 Dia Operacion {target.strftime('%Y-%m-%d')} auto.csv"
-            out_path = OUT_DIR / fname
-            out_path.write_bytes(csv_bytes)
-            print(f"✓ guardado → {fname}")
-            downloaded += 1
-
-        time.sleep(1)  # cortesía al servidor
-
-    print(f"\nResultado: {downloaded} descargados, {not_available} aún no disponibles.")
+    print(
+        f"Intentando descargar {len(to_fetch)} fecha(s) del portal CENACE "
+        f"({args.workers} sesiones, ≤ {args.rate:g} peticiones/s)…"
+    )
+    t0 = time.monotonic()
+    downloaded, not_available, failed = backfill(
+        to_fetch, coverage, workers=args.workers, rate_per_s=args.rate,
+    )
+    print(
+        f"\nResultado: {downloaded} descargados, {not_available} aún no disponibles, "
+        f"{failed} con error transitorio ({time.monotonic() - t0:,.0f} s)."
+    )
+    if downloaded:
+        n = demand_store.ingest_dir(OUT_DIR, "*.csv", "balance", demand_store.parse_balance_csv)
+        print(f"  {n} archivo(s) ingeridos al store {demand_store.STORE_DIR}")
 
 
 if __name__ == "__main__":
@@ -2,11 +2,12 @@
 fetch_daily_demand.py
 ---------------------
 Descarga la demanda del día actual (o una fecha específica) desde la API
-de CENACE para los 3 sistemas (SIN, BCA, BCS) y guarda el resultado en
-data_raw/demand/daily_api/demand_YYYY-MM-DD.csv
+de CENACE para los 3 sistemas (SIN, BCA, BCS) y la inserta en el store
+consolidado de demanda (data_clean/demand/store/, fuente "api"). Los datos
+de balance oficial que lleguen después reemplazan estas filas.
 
-Formato de salida: snapshot (datetime), zona (SIN/BCA/BCS), demand_mw (float)
-Compatible con load_demand_raw() de 2_Despacho_PyPSA.py
+Con --audit_csv se guarda además una copia en
+data_raw/demand/audit/api_YYYY-MM-DD.csv (snapshot, zona, demand_mw).
 
 Uso:
     python scripts/fetch_daily_demand.py              # → hoy
@@ -17,6 +18,7 @@ from __future__ import annotations
 import argparse
 import json
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date, datetime, timezone, timedelta
 from pathlib import Path
 
@@ -24,32 +26,47 @@ import pandas as pd
 import requests
 
 ROOT = Path(__file__).resolve().parents[1]
-OUT_DIR = ROOT / "data_raw" / "demand" / "daily_api"
-OUT_DIR.mkdir(parents=True, exist_ok=True)
+sys.path.insert(0, str(ROOT / "app"))
+from lib import demand_store  # noqa: E402
+from lib.cenace_client import BREAKERS, ENDPOINT, METRICS, RETRY_POLICY  # noqa: E402
+from lib.fetch_resilience import call_with_retries  # noqa: E402
 
 CENACE_URL = "https://www.cenace.gob.mx/GraficaDemanda.aspx/obtieneValoresTotal"
 SISTEMA_TO_GERENCIA = {"SIN": "10", "BCA": "1", "BCS": "2"}
 SISTEMAS = ["SIN", "BCA", "BCS"]
-
-
-def fetch_sistema(sistema: str, target_date: date, timeout: int = 30) -> pd.DataFrame:
+HEADERS = {
+    "Content-Type": "application/json; charset=utf-8",
+    "Accept": "application/json, text/plain, */*",
+    "User-Agent": "Mozilla/5.0",
+    "Origin": "https://www.cenace.gob.mx",
+    "Referer": "https://www.cenace.gob.mx/GraficaDemanda.aspx",
+    "X-Requested-With": "XMLHttpRequest",
+}
+
+
+def fetch_sistema(
+    sistema: str,
+    target_date: date,
+    timeout: int = 30,
+    session: requests.Session | None = None,
+) -> pd.DataFrame:
     gerencia = SISTEMA_TO_GERENCIA[sistema]
-    headers = {
-        "Content-Type": "application/json; charset=utf-8",
-        "Accept": "application/json, text/plain, */*",
-        "User-Agent": "Mozilla/5.0",
-        "Origin": "https://www.cenace.gob.mx",
-        "Referer": "https://www.cenace.gob.mx/GraficaDemanda.aspx",
-        "X-Requested-With": "XMLHttpRequest",
-    }
-    r = requests.post(
-        CENACE_URL,
-        headers=headers,
-        data=f'{{"gerencia":"{gerencia}"}}',
-        timeout=timeout,
+    http = session if session is not None else requests
+
+    def _post():
+        r = http.post(
+            CENACE_URL,
+            headers=HEADERS,
+            data=f'{{"gerencia":"{gerencia}"}}',
+            timeout=timeout,
+        )
+        r.raise_for_status()
+        return r.json()
+
+    # Misma política que la app: reintentos con backoff, breaker y métricas
+    data = call_with_retries(
+        _post, endpoint=ENDPOINT, policy=RETRY_POLICY, breaker=BREAKERS[ENDPOINT], metrics=METRICS,
     )
-    r.raise_for_status()
-    data = r.json()
 
     if isinstance(data, dict) and "d" in data:
         inner = data["d"]
@@ -76,23 +93,28 @@ def fetch_sistema(sistema: str, target_date: date, timeout: int = 30) -> pd.Data
 
 
 def fetch_day(target_date: date) -> pd.DataFrame:
+    """Descarga los 3 sistemas en paralelo sobre una sesión keep-alive compartida."""
     frames = []
-    for s in SISTEMAS:
-        try:
-            df = fetch_sistema(s, target_date)
-            frames.append(df)
-            print(f"  ✓ {s}: {len(df)} horas descargadas")
-        except Exception as e:
-            print(f"  ✗ {s}: error — {e}", file=sys.stderr)
+    with requests.Session() as session, ThreadPoolExecutor(max_workers=len(SISTEMAS)) as pool:
+        futures = {s: pool.submit(fetch_sistema, s, target_date, session=session) for s in SISTEMAS}
+        for s, fut in futures.items():
+            try:
+                df = fut.result()
+                frames.append(df)
+                print(f"  ✓ {s}: {len(df)} horas descargadas")
+            except Exception as e:
+                print(f"  ✗ {s}: error — {e}", file=sys.stderr)
     if not frames:
         raise RuntimeError("No se pudo descargar ningún sistema.")
     return pd.concat(frames, ignore_index=True).sort_values(["zona", "snapshot"]).reset_index(drop=True)
 
 
-def save(df: pd.DataFrame, target_date: date) -> Path:
-    out_path = OUT_DIR / f"demand_{target_date.isoformat()}.csv"
-    df.to_csv(out_path, index=False)
-    return out_path
+def save(df: pd.DataFrame, target_date: date, audit_csv: bool = False) -> int:
+    n_rows = demand_store.upsert(df, source="api")
+    if audit_csv:
+        path = demand_store.write_audit_csv(df, "api", target_date)
+        print(f"Copia de auditoría en {path}")
+    return n_rows
 
 
 def main() -> None:
@@ -106,20 +128,21 @@ def main() -> None:
         default=_mexico_today.isoformat(),
         help="Fecha en formato YYYY-MM-DD (default: hoy en hora México UTC-6)",
     )
-    p.add_argument("--overwrite", action="store_true", help="Sobreescribir si ya existe")
+    p.add_argument("--overwrite", action="store_true", help="Reemplazar si ya hay datos de la API para esa fecha")
+    p.add_argument("--audit_csv", action="store_true", help="Guardar también una copia CSV de auditoría")
     args = p.parse_args()
 
     target_date = datetime.strptime(args.date, "%Y-%m-%d").date()
-    out_path = OUT_DIR / f"demand_{target_date.isoformat()}.csv"
 
-    if out_path.exists() and not args.overwrite:
-        print(f"Ya existe {out_path}. Usa --overwrite para sobreescribir.")
+    existing = demand_store.load(target_date, target_date, sources=["api", "balance"])
+    if not existing.empty and not args.overwrite:
+        print(f"Ya hay datos para {target_date} en el store. Usa --overwrite para reemplazar.")
         return
 
     print(f"Descargando demanda para {target_date}…")
     df = fetch_day(target_date)
-    path = save(df, target_date)
-    print(f"Guardado en {path} ({len(df)} filas)")
+    n_rows = save(df, target_date, audit_csv=args.audit_csv)
+    print(f"Insertado en {demand_store.STORE_DIR} ({n_rows} filas, fuente=api)")
 
 
 if __name__ == "__main__":
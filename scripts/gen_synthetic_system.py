@@ -0,0 +1,147 @@
+"""
+gen_synthetic_system.py
+-----------------------
+Genera un sistema sintético a escala con los mismos esquemas del proyecto,
+para estresar loaders y el solver con tamaños mayores al catálogo real:
+
+    <out>/Centrales_gen_mx.csv          name,bus,carrier,p_nom,marginal_cost,efficiency
+    <out>/Perfil_Generaciom.csv         snapshot + una columna p_max_pu por central
+                                        (o .parquet con --profile_format parquet)
+    <out>/balance/Demanda Real Balance_0_v3 Dia Operacion YYYY-MM-DD synthetic.csv
+                                        mismo layout que el portal CENACE (8 líneas
+                                        de encabezado, Sistema/Area/Hora/…)
+    <out>/manifest.json                 especificación + sha256 de cada archivo
+
+Todo sale de --seed: misma especificación → mismos archivos (compara los
+sha256 del manifiesto). Los perfiles se escriben por bloques de un mes, así
+que 10 000 centrales × varios años no requieren tener la matriz completa en RAM.
+
+Uso:
+    python scripts/gen_synthetic_system.py --plants 5000 --days 365
+    python scripts/gen_synthetic_system.py --plants 10000 --years 3 --sin_areas 20 --bus_level area
+    python scripts/gen_synthetic_system.py --plants 2000 --days 30 --seed 7 --out data_synthetic/small
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "app"))
+
+from lib.synthetic import (  # noqa: E402
+    SyntheticSpec,
+    balance_filename,
+    iter_profiles,
+    make_catalog,
+    make_demand,
+    write_balance_csv,
+)
+
+CATALOG_COLUMNS = ["name", "bus", "carrier", "p_nom", "marginal_cost", "efficiency"]
+
+
+def _sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for block in iter(lambda: fh.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def write_profiles(catalog, spec: SyntheticSpec, out_dir: Path, fmt: str) -> Path:
+    if fmt == "parquet":
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        path = out_dir / "Perfil_Generaciom.parquet"
+        writer = None
+        try:
+            for chunk in iter_profiles(catalog, spec):
+                table = pa.Table.from_pandas(chunk.rename_axis("snapshot").reset_index(), preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(path, table.schema)
+                writer.write_table(table)
+        finally:
+            if writer is not None:
+                writer.close()
+        return path
+
+    path = out_dir / "Perfil_Generaciom.csv"
+    with open(path, "w", encoding="utf-8", newline="") as fh:
+        for k, chunk in enumerate(iter_profiles(catalog, spec)):
+            chunk.rename_axis("snapshot").to_csv(
+                fh, header=(k == 0), float_format="%.4f", date_format="%Y-%m-%d %H:%M:%S",
+            )
+    return path
+
+
+def write_balance(spec: SyntheticSpec, out_dir: Path) -> list[Path]:
+    demand = make_demand(spec)
+    paths = []
+    for op_date, day_df in demand.groupby(demand["snapshot"].dt.date, sort=True):
+        paths.append(write_balance_csv(day_df, op_date, out_dir / "balance" / balance_filename(op_date), spec.seed))
+    return paths
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description="Genera catálogo, perfiles y demanda sintéticos reproducibles")
+    p.add_argument("--plants", type=int, default=5_000, help="Número de centrales (default: 5000)")
+    p.add_argument("--sin_areas", type=int, default=7,
+                   help="Áreas del SIN (default: 7 reales; más agrega A08, A09, …)")
+    p.add_argument("--bus_level", choices=["system", "area"], default="system",
+                   help="Bus de cada central: sistema (SIN/BCA/BCS) o área (default: system)")
+    p.add_argument("--start", default="2026-01-01", help="Primer día (YYYY-MM-DD)")
+    g = p.add_mutually_exclusive_group()
+    g.add_argument("--days", type=int, default=None, help="Horizonte en días (default: 365)")
+    g.add_argument("--years", type=int, default=None, help="Horizonte en años de 365 días")
+    p.add_argument("--demand_scale", type=float, default=1.0, help="Multiplicador de la demanda pico")
+    p.add_argument("--seed", type=int, default=0, help="Semilla (default: 0)")
+    p.add_argument("--profile_format", choices=["csv", "parquet"], default="csv")
+    p.add_argument("--no_balance", action="store_true", help="No escribir los CSVs diarios de demanda")
+    p.add_argument("--out", default=None, help="Carpeta de salida (default: data_synthetic/<plants>p_<days>d_s<seed>)")
+    args = p.parse_args()
+
+    days = args.days or (args.years * 365 if args.years else 365)
+    spec = SyntheticSpec(
+        n_plants=args.plants,
+        sin_areas=args.sin_areas,
+        bus_level=args.bus_level,
+        start=datetime.strptime(args.start, "%Y-%m-%d").date(),
+        days=days,
+        seed=args.seed,
+        demand_scale=args.demand_scale,
+    )
+    out_dir = Path(args.out) if args.out else ROOT / "data_synthetic" / f"{spec.n_plants}p_{days}d_s{spec.seed}"
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    t0 = time.perf_counter()
+    catalog = make_catalog(spec)
+    cat_path = out_dir / "Centrales_gen_mx.csv"
+    catalog[CATALOG_COLUMNS].to_csv(cat_path, index=False)
+    print(f"  ✓ catálogo: {len(catalog):,} centrales, {catalog['bus'].nunique()} buses → {cat_path.name}")
+
+    prof_path = write_profiles(catalog, spec, out_dir, args.profile_format)
+    print(f"  ✓ perfiles: {days * 24:,} h × {len(catalog):,} centrales → {prof_path.name}")
+
+    files = [cat_path, prof_path]
+    if not args.no_balance:
+        balance = write_balance(spec, out_dir)
+        files += balance
+        print(f"  ✓ demanda: {len(balance):,} CSVs diarios estilo balance → balance/")
+
+    manifest = {
+        "spec": spec.to_dict(),
+        "files": {str(f.relative_to(out_dir)): _sha256(f) for f in files},
+    }
+    (out_dir / "manifest.json").write_text(json.dumps(manifest, indent=1, ensure_ascii=False), encoding="utf-8")
+    print(f"\nListo en {time.perf_counter() - t0:,.1f} s → {out_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+job_service.py
+--------------
+Servicio local de despacho (lib/job_service.py): una cola con prioridad y
+un pool acotado de procesos precalentados que atienden los solves de todas
+las sesiones de la página. Escucha solo en localhost.
+
+La página lo usa si se define DESPACHO_JOB_SERVICE con la URL del servicio;
+sin la variable sigue resolviendo en su propio proceso.
+
+Uso:
+    python scripts/job_service.py                               # 127.0.0.1:8765, 2 procesos
+    python scripts/job_service.py --workers 4 --max_queue 64 --max_per_client 4
+    python scripts/job_service.py --demand_parquet data_clean/demand/historical_demand.parquet
+    DESPACHO_JOB_SERVICE=http://127.0.0.1:8765 streamlit run app/Home.py
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+from functools import partial
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "app"))
+
+from lib import demand_store  # noqa: E402
+from lib.dispatch_data import CENTRALES_CSV, PERFIL_CSV, load_dispatch_data, sync_demand_store  # noqa: E402
+from lib.job_service import DEFAULT_HOST, DEFAULT_PORT, KEEP_S, JobServer, JobService  # noqa: E402
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description="Servicio local de despacho (cola + pool de procesos)")
+    p.add_argument("--host", default=DEFAULT_HOST)
+    p.add_argument("--port", type=int, default=DEFAULT_PORT)
+    p.add_argument("--workers", type=int, default=2,
+                   help="Procesos de solve en paralelo (HiGHS ya usa varios hilos por solve)")
+    p.add_argument("--max_queue", type=int, default=32, help="Trabajos en espera antes de rechazar (HTTP 429)")
+    p.add_argument("--max_per_client", type=int, default=8, help="Pendientes por sesión antes de rechazar")
+    p.add_argument("--keep_s", type=float, default=KEEP_S, help="Segundos que se guarda un resultado sin recoger")
+    p.add_argument("--demand_parquet", type=Path, default=None,
+                   help="Demanda ancha snapshot × sistema (default: store de demanda)")
+    p.add_argument("--centrales_csv", type=Path, default=CENTRALES_CSV)
+    p.add_argument("--perfil_csv", type=Path, default=PERFIL_CSV)
+    p.add_argument("--verbose", action="store_true", help="Registrar cada petición HTTP")
+    args = p.parse_args()
+
+    # Ingesta una sola vez aquí: los procesos del pool solo leen el store
+    if args.demand_parquet is None:
+        sync_demand_store()
+    load_data = partial(load_dispatch_data, args.centrales_csv, args.perfil_csv, args.demand_parquet)
+    service = JobService(
+        load_data,
+        # Los procesos recargan la demanda cuando el store cambia (p. ej. el fetch nocturno)
+        data_version=demand_store.version if args.demand_parquet is None else None,
+        workers=args.workers,
+        max_queue=args.max_queue,
+        max_per_client=args.max_per_client,
+        keep_s=args.keep_s,
+    )
+    print(f"Arrancando {args.workers} procesos (carga de datos)…", flush=True)
+    service.start()
+    server = JobServer(service, args.host, args.port, verbose=args.verbose)
+    print(f"Servicio de despacho en http://{args.host}:{args.port}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+outage_montecarlo.py
+--------------------
+Monte Carlo de salidas forzadas (lib/outage_mc.py): muestrea estados de
+disponibilidad por central a partir de tasas de salida forzada y despacha
+cada uno sobre el mismo horizonte, en un pool de procesos que arma el modelo
+una sola vez y solo cambia cotas entre muestras.
+
+Escribe en <out>/:
+    samples.csv          una fila por muestra (se va escribiendo por bloques)
+    summary.csv          media / desv. / mín / máx por métrica
+    price_quantiles.csv  P50 / P90 / P99 del precio horario por sistema
+    hourly.csv           probabilidad de corte y precio esperado por hora
+
+Uso:
+    python scripts/outage_montecarlo.py --start 2026-01-05 --end 2026-01-11 --samples 200
+    python scripts/outage_montecarlo.py --start 2026-01-05 --end 2026-01-11 --samples 500 --workers 4
+    python scripts/outage_montecarlo.py --scenario "forced outage" --rate diesel_engine=0.2 --seed 7
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import time
+from datetime import date
+from functools import partial
+from pathlib import Path
+
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "app"))
+
+from lib.dispatch_data import CENTRALES_CSV, PERFIL_CSV, load_dispatch_data, sync_demand_store  # noqa: E402
+from lib.outage_mc import CHUNK_SIZE, run_monte_carlo  # noqa: E402
+from lib.scenarios import BASE_SCENARIO_KEY, SCENARIOS, make_recipe, resolve_scenario  # noqa: E402
+
+MC_DIR = ROOT / "data_cache" / "montecarlo"
+
+
+def _rate(text: str) -> tuple[str, float]:
+    carrier, _, value = text.partition("=")
+    if not value:
+        raise argparse.ArgumentTypeError(f"Se esperaba carrier=tasa, no {text!r}")
+    return carrier.strip(), float(value)
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description="Monte Carlo de salidas forzadas")
+    p.add_argument("--scenario", default=BASE_SCENARIO_KEY,
+                   help="Nombre de lib/scenarios.py o un fragmento sin emoji (p. ej. 'storage')")
+    p.add_argument("--start", type=date.fromisoformat, default=None, help="Primer día (YYYY-MM-DD)")
+    p.add_argument("--end", type=date.fromisoformat, default=None, help="Último día (YYYY-MM-DD)")
+    p.add_argument("--growth", action="store_true", help="Agregar la capacidad 2026 esperada")
+    p.add_argument("--samples", type=int, default=200, help="Número de muestras")
+    p.add_argument("--seed", type=int, default=0, help="Semilla del muestreo")
+    p.add_argument("--rate", type=_rate, action="append", default=[],
+                   help="Tasa de salida forzada por tecnología, p. ej. gas_ccgt=0.08 (repetible)")
+    p.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) // 2),
+                   help="Procesos en paralelo (HiGHS ya usa varios hilos por solve)")
+    p.add_argument("--chunk", type=int, default=CHUNK_SIZE, help="Muestras por tarea del pool")
+    p.add_argument("--out", type=Path, default=None,
+                   help="Directorio de salida (default: data_cache/montecarlo/<escenario>_<seed>)")
+    p.add_argument("--demand_parquet", type=Path, default=None,
+                   help="Demanda ancha snapshot × sistema (default: store de demanda)")
+    p.add_argument("--centrales_csv", type=Path, default=CENTRALES_CSV)
+    p.add_argument("--perfil_csv", type=Path, default=PERFIL_CSV)
+    args = p.parse_args()
+
+    scenario = resolve_scenario(args.scenario)
+    recipe = make_recipe(
+        SCENARIOS[scenario]["params"], scenario=scenario,
+        start=args.start, end=args.end, growth=args.growth,
+    )
+    slug = "".join(ch if ch.isalnum() else "_" for ch in scenario.lower()).strip("_")
+    out_dir = args.out or MC_DIR / f"{slug}_{args.seed}"
+    out_dir.mkdir(parents=True, exist_ok=True)
+    samples_csv = out_dir / "samples.csv"
+    samples_csv.unlink(missing_ok=True)
+    print(f"Monte Carlo '{scenario}': {args.samples} muestras, {args.workers} procesos → {out_dir}")
+
+    t0 = time.perf_counter()
+
+    def on_chunk(rows: list[dict], stats) -> None:
+        pd.DataFrame(rows).to_csv(samples_csv, mode="a", header=not samples_csv.exists(), index=False)
+        done = stats.n + stats.failed
+        print(f"  [{done}/{args.samples}] LOLP={stats.loss_of_load_probability:.3f} "
+              f"({time.perf_counter() - t0:.0f} s)")
+
+    # Ingesta una sola vez aquí: los procesos del pool solo leen el store
+    if args.demand_parquet is None:
+        sync_demand_store()
+    load_data = partial(load_dispatch_data, args.centrales_csv, args.perfil_csv, args.demand_parquet)
+    stats = run_monte_carlo(
+        load_data, recipe, args.samples, rates=dict(args.rate), seed=args.seed,
+        workers=args.workers, chunk_size=args.chunk, on_chunk=on_chunk,
+    )
+
+    summary = stats.summary()
+    summary.to_csv(out_dir / "summary.csv")
+    quantiles = stats.price_quantiles()
+    quantiles.to_csv(out_dir / "price_quantiles.csv", index_label="sistema")
+    hourly = pd.concat({"lolp": stats.lolp(), "precio_esperado": stats.mean_price()}, axis=1)
+    hourly.to_csv(out_dir / "hourly.csv", index_label="snapshot")
+
+    print(f"\n{stats.n} muestras resueltas, {stats.failed} fallidas; "
+          f"probabilidad de corte = {stats.loss_of_load_probability:.3f}")
+    print(summary.round(2).to_string())
+    print("\nPrecio horario ($/MWh):")
+    print(quantiles.round(1).to_string())
+    print(f"\nOK -> {out_dir}")
+    if stats.failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+parametric_sweep.py
+-------------------
+Barrido paramétrico de un escalar (lib/parametric.py): arma el modelo una
+vez, recorre la rejilla cambiando solo los coeficientes del parámetro y
+parte cada solve de la base del punto anterior.
+
+Guarda las curvas en formato largo (parámetro, valor, métrica, sistema, y)
+en CSV (default: data_cache/parametric/<parámetro>.csv).
+
+Parámetros: voll, co2_price, cost.<carrier>, demand_mult, demand_mult.<BUS>.
+Valores: lista separada por comas o inicio:fin:puntos (equiespaciados).
+
+Uso:
+    python scripts/parametric_sweep.py voll 1000:20000:50 --start 2026-01-05 --end 2026-01-11
+    python scripts/parametric_sweep.py demand_mult 0.8:1.3:26 --start 2026-01-05 --end 2026-01-11
+    python scripts/parametric_sweep.py co2_price 0,25,50,75,100 --scenario "fuel price"
+    python scripts/parametric_sweep.py cost.gas_ccgt 30:120:10 --cold
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from datetime import date
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "app"))
+
+from lib.dispatch_data import CENTRALES_CSV, PERFIL_CSV, load_dispatch_data, sync_demand_store  # noqa: E402
+from lib.parametric import PARAMETERS, parametric_sweep, parse_parameter, wide  # noqa: E402
+from lib.perf import PerfRecorder  # noqa: E402
+from lib.scenarios import BASE_SCENARIO_KEY, SCENARIOS, make_recipe, resolve_scenario  # noqa: E402
+
+PARAMETRIC_DIR = ROOT / "data_cache" / "parametric"
+
+
+def _grid(text: str) -> list[float]:
+    if ":" in text:
+        start, stop, num = text.split(":")
+        return np.linspace(float(start), float(stop), int(num)).tolist()
+    return [float(v) for v in text.split(",") if v.strip()]
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description="Barrido paramétrico de un escalar")
+    p.add_argument("param", help=f"Parámetro: {', '.join(PARAMETERS)}")
+    p.add_argument("values", type=_grid, help="v1,v2,... o inicio:fin:puntos")
+    p.add_argument("--scenario", default=BASE_SCENARIO_KEY,
+                   help="Nombre de lib/scenarios.py o un fragmento sin emoji (p. ej. 'storage')")
+    p.add_argument("--start", type=date.fromisoformat, default=None, help="Primer día (YYYY-MM-DD)")
+    p.add_argument("--end", type=date.fromisoformat, default=None, help="Último día (YYYY-MM-DD)")
+    p.add_argument("--growth", action="store_true", help="Agregar la capacidad 2026 esperada")
+    p.add_argument("--cold", action="store_true", help="Resolver cada punto desde cero (sin encadenar bases)")
+    p.add_argument("--out", type=Path, default=None, help="CSV de las curvas")
+    p.add_argument("--demand_parquet", type=Path, default=None,
+                   help="Demanda ancha snapshot × sistema (default: store de demanda)")
+    p.add_argument("--centrales_csv", type=Path, default=CENTRALES_CSV)
+    p.add_argument("--perfil_csv", type=Path, default=PERFIL_CSV)
+    args = p.parse_args()
+
+    try:
+        parse_parameter(args.param)
+    except ValueError as e:
+        p.error(str(e))
+
+    perf = PerfRecorder(stream=sys.stderr)
+    scenario = resolve_scenario(args.scenario)
+    with perf.span("carga de datos"):
+        if args.demand_parquet is None:
+            sync_demand_store()
+        data = load_dispatch_data(args.centrales_csv, args.perfil_csv, args.demand_parquet)
+    recipe = make_recipe(
+        SCENARIOS[scenario]["params"], scenario=scenario,
+        start=args.start, end=args.end, growth=args.growth,
+    )
+    print(f"Barrido de {args.param} ({len(args.values)} puntos) sobre '{scenario}'")
+
+    t0 = time.perf_counter()
+    curves = parametric_sweep(
+        data, recipe, args.param, args.values, warm_start=not args.cold, perf=perf,
+        progress=lambda done, total: print(f"  [{done}/{total}] {time.perf_counter() - t0:.1f} s"),
+    )
+    wall = curves.attrs["wall_s"]
+    if wall:
+        first, rest = list(wall.values())[0], list(wall.values())[1:]
+        print(f"\nPrimer punto {first:.2f} s; resto {np.mean(rest) if rest else 0.0:.2f} s por punto "
+              f"(total {sum(wall.values()):.1f} s)")
+
+    print(wide(curves).round(2).to_string())
+
+    out = args.out or PARAMETRIC_DIR / f"{args.param}.csv"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    curves.to_csv(out, index=False)
+    print(f"\nOK -> {out}")
+    if curves.attrs["failed"]:
+        print(f"Sin óptimo en: {curves.attrs['failed']}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
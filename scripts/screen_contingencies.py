@@ -0,0 +1,135 @@
+"""
+screen_contingencies.py
+-----------------------
+Cribado N-1 (lib/contingency.py): saca una a una las K unidades más grandes
+de cada sistema, vuelve a despachar el horizonte partiendo de la base del
+caso base y ordena las contingencias por corte adicional e impacto en el
+precio del sistema.
+
+Guarda el ranking en CSV (default: data_cache/contingencies/n1_<start>_<end>.csv).
+Con --bench corre el cribado partiendo de la base del caso base y en frío
+(--cold) y guarda tiempos e iteraciones simplex de ambos en
+data_cache/bench/n1_start_<fecha>.json.
+
+Uso:
+    python scripts/screen_contingencies.py --start 2026-01-05 --end 2026-01-11
+    python scripts/screen_contingencies.py --start 2026-01-05 --end 2026-01-11 --systems BCA BCS --k 8
+    python scripts/screen_contingencies.py --scenario storage --workers 4 --cold
+    python scripts/screen_contingencies.py --start 2026-01-05 --end 2026-01-11 --workers 1 --bench
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import date, datetime
+from functools import partial
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "app"))
+
+from lib.contingency import TOP_K, screen_contingencies  # noqa: E402
+from lib.dispatch_data import CENTRALES_CSV, PERFIL_CSV, load_dispatch_data, sync_demand_store  # noqa: E402
+from lib.dispatch_model import SISTEMAS  # noqa: E402
+from lib.scenarios import BASE_SCENARIO_KEY, SCENARIOS, make_recipe, resolve_scenario  # noqa: E402
+
+N1_DIR = ROOT / "data_cache" / "contingencies"
+BENCH_DIR = ROOT / "data_cache" / "bench"
+
+
+def _start_summary(base: dict, ranking, wall_s: float) -> dict:
+    """Tiempo total e iteraciones simplex de un cribado (caso base + contingencias)."""
+    iters = [int(v) for v in ranking.get("iteraciones", []) if v == v and v is not None]
+    return {
+        "wall_total_s": round(wall_s, 3),
+        "wall_base_s": base["wall_s"],
+        "wall_cases_s": round(float(sum(ranking.get("wall_s", []))), 3),
+        "iterations_base": base.get("iteraciones"),
+        "iterations_cases": sum(iters) if iters else None,
+        "iterations_per_case": iters,
+        "objective_base_musd": base["Costo total ($M)"],
+    }
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description="Cribado de contingencias N-1")
+    p.add_argument("--scenario", default=BASE_SCENARIO_KEY,
+                   help="Nombre de lib/scenarios.py o un fragmento sin emoji (p. ej. 'storage')")
+    p.add_argument("--start", type=date.fromisoformat, default=None, help="Primer día (YYYY-MM-DD)")
+    p.add_argument("--end", type=date.fromisoformat, default=None, help="Último día (YYYY-MM-DD)")
+    p.add_argument("--growth", action="store_true", help="Agregar la capacidad 2026 esperada")
+    p.add_argument("--k", type=int, default=TOP_K, help="Unidades más grandes por sistema")
+    p.add_argument("--systems", nargs="+", choices=SISTEMAS, default=SISTEMAS, help="Sistemas a cribar")
+    p.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) // 2),
+                   help="Procesos en paralelo (HiGHS ya usa varios hilos por solve)")
+    p.add_argument("--cold", action="store_true", help="Resolver cada caso desde cero (sin la base del caso base)")
+    p.add_argument("--bench", action="store_true",
+                   help="Correr con la base del caso base y con --cold y guardar tiempos e iteraciones de ambos")
+    p.add_argument("--out", type=Path, default=None, help="CSV del ranking")
+    p.add_argument("--demand_parquet", type=Path, default=None,
+                   help="Demanda ancha snapshot × sistema (default: store de demanda)")
+    p.add_argument("--centrales_csv", type=Path, default=CENTRALES_CSV)
+    p.add_argument("--perfil_csv", type=Path, default=PERFIL_CSV)
+    args = p.parse_args()
+
+    scenario = resolve_scenario(args.scenario)
+    recipe = make_recipe(
+        SCENARIOS[scenario]["params"], scenario=scenario,
+        start=args.start, end=args.end, growth=args.growth,
+    )
+    out = args.out or N1_DIR / f"n1_{args.start or 'inicio'}_{args.end or 'fin'}.csv"
+    print(f"N-1 '{scenario}': {args.k} unidades por sistema en {', '.join(args.systems)}")
+
+    def on_case(row: dict) -> None:
+        if row["ok"]:
+            print(f"  {row['unidad']:<28} {row['sistema']}  ΔENS={row['Δ ENS (MWh)']:>10,.1f} MWh  "
+                  f"Δprecio={row['Δ precio sistema ($/MWh)']:>8,.1f}  ({row['wall_s']:.1f} s)")
+        else:
+            print(f"  {row['unidad']:<28} {row['sistema']}  sin óptimo")
+
+    # Ingesta una sola vez aquí: los procesos del pool solo leen el store
+    if args.demand_parquet is None:
+        sync_demand_store()
+    load_data = partial(load_dispatch_data, args.centrales_csv, args.perfil_csv, args.demand_parquet)
+    runs, bench = {}, {}
+    for warm in ([True, False] if args.bench else [not args.cold]):
+        if args.bench:
+            print(f"\n── {'warm start' if warm else 'en frío'} ──")
+        t0 = time.perf_counter()
+        runs[warm] = screen_contingencies(
+            load_data, recipe, k=args.k, systems=args.systems, workers=args.workers,
+            warm_start=warm, on_case=on_case,
+        )
+        bench["warm" if warm else "cold"] = _start_summary(*runs[warm], time.perf_counter() - t0)
+    # Con --bench se guarda el ranking del modo pedido (default: warm start)
+    base, ranking = runs[not args.cold]
+
+    if args.bench:
+        BENCH_DIR.mkdir(parents=True, exist_ok=True)
+        bench_out = BENCH_DIR / f"n1_start_{datetime.now():%Y%m%d_%H%M%S}.json"
+        meta = {"scenario": scenario, "start": args.start, "end": args.end, "k": args.k,
+                "systems": list(args.systems), "workers": args.workers}
+        bench_out.write_text(json.dumps({"meta": meta, **bench}, indent=1, default=str), encoding="utf-8")
+        print("\nArranque      total (s)   casos (s)   iteraciones casos")
+        for mode, row in bench.items():
+            print(f"  {mode:<10} {row['wall_total_s']:>10,.1f} {row['wall_cases_s']:>11,.1f} "
+                  f"{row['iterations_cases'] if row['iterations_cases'] is not None else '—':>19}")
+        print(f"Benchmark -> {bench_out}")
+
+    print(f"\nCaso base: ENS={base['Energía no servida (MWh)']:,.1f} MWh, "
+          f"costo={base['Costo total ($M)']:,.2f} $M ({base['wall_s']:.1f} s)")
+    print("\nRanking:")
+    print(ranking.drop(columns=["ok"]).round(2).head(20).to_string())
+
+    out.parent.mkdir(parents=True, exist_ok=True)
+    ranking.to_csv(out, index=False)
+    print(f"\nOK -> {out}")
+    if not ranking.empty and not ranking["ok"].all():
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
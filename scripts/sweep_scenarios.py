@@ -0,0 +1,89 @@
+"""
+sweep_scenarios.py
+------------------
+Barrido declarativo de escenarios de despacho (lib/sweep.py): lee una
+especificación JSON (escenarios con el esquema `params`, ventanas de fechas
+y una rejilla cartesiana), resuelve cada trabajo con run_dispatch en un pool
+de procesos y guarda un checkpoint por trabajo. Relanzar el mismo comando
+retoma el barrido: solo se resuelven los trabajos sin checkpoint "ok".
+
+Al final escribe <out>/summary.csv con una fila por trabajo (métricas de
+extract_metrics + valores de la rejilla).
+
+Uso:
+    python scripts/sweep_scenarios.py sweeps/ejemplo_combustible.json
+    python scripts/sweep_scenarios.py sweeps/ejemplo_combustible.json --workers 4
+    python scripts/sweep_scenarios.py sweeps/ejemplo_combustible.json --dry_run
+    python scripts/sweep_scenarios.py spec.json --out data_cache/sweeps/prueba --save_results
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+from functools import partial
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "app"))
+
+from lib.dispatch_data import CENTRALES_CSV, PERFIL_CSV, load_dispatch_data, sync_demand_store  # noqa: E402
+from lib.sweep import STATUS_OK, collect, expand_jobs, is_done, load_spec, run_sweep  # noqa: E402
+
+SWEEP_DIR = ROOT / "data_cache" / "sweeps"
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description="Barrido de escenarios con checkpoints")
+    p.add_argument("spec", type=Path, help="Especificación JSON del barrido")
+    p.add_argument("--out", type=Path, default=None,
+                   help="Directorio de salida (default: data_cache/sweeps/<name>)")
+    p.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) // 2),
+                   help="Procesos en paralelo (HiGHS ya usa varios hilos por solve)")
+    p.add_argument("--dry_run", action="store_true", help="Listar los trabajos sin resolver")
+    p.add_argument("--save_results", action="store_true",
+                   help="Guardar además cada DispatchResult (.npz) en <out>/results/")
+    p.add_argument("--demand_parquet", type=Path, default=None,
+                   help="Demanda ancha snapshot × sistema (default: store de demanda)")
+    p.add_argument("--centrales_csv", type=Path, default=CENTRALES_CSV)
+    p.add_argument("--perfil_csv", type=Path, default=PERFIL_CSV)
+    args = p.parse_args()
+
+    spec = load_spec(args.spec)
+    out_dir = args.out or SWEEP_DIR / spec["name"]
+    jobs = expand_jobs(spec)
+    done = sum(is_done(out_dir, j) for j in jobs)
+    print(f"Barrido '{spec['name']}': {len(jobs)} trabajos, {done} ya resueltos → {out_dir}")
+
+    if args.dry_run:
+        for job in jobs:
+            mark = "✓" if is_done(out_dir, job) else "·"
+            grid = ", ".join(f"{k}={v}" for k, v in job.grid.items())
+            print(f"  {mark} {job.job_id}  {job.scenario:<28} {job.start} → {job.end}"
+                  f"  growth={job.growth}  {grid}")
+        return
+
+    # Ingesta una sola vez aquí: los procesos del pool solo leen el store
+    if args.demand_parquet is None:
+        sync_demand_store()
+    load_data = partial(load_dispatch_data, args.centrales_csv, args.perfil_csv, args.demand_parquet)
+    failed = 0
+    for i, row in enumerate(run_sweep(jobs, load_data, out_dir, workers=args.workers,
+                                      save_results=args.save_results), start=done + 1):
+        if row["status"] == STATUS_OK:
+            print(f"  [{i}/{len(jobs)}] {row['job_id']} {row['scenario']} "
+                  f"costo={row['Costo total ($M)']:,.2f} $M ({row['wall_s']:.1f} s)")
+        else:
+            failed += 1
+            print(f"  [{i}/{len(jobs)}] {row['job_id']} {row['scenario']} ERROR: {row['error']}")
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    summary = collect(out_dir)
+    summary.to_csv(out_dir / "summary.csv", index=False)
+    print(f"\nOK -> {out_dir / 'summary.csv'} ({len(summary)} filas, {failed} con error en esta corrida)")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Tests for the indexed, self-evicting CENACE API cache.
+
+Run with:  pytest tests/test_api_cache.py -v
+"""
+from __future__ import annotations
+
+import hashlib
+import time
+from datetime import date
+
+import pandas as pd
+
+from app.lib.api_cache import DemandCache
+
+
+def _frame(day: str, n: int = 24) -> pd.DataFrame:
+    return pd.DataFrame({
+        "hora": range(1, n + 1),
+        "demanda_mw": [1_000.0] * n,
+        "fecha": [day] * n,
+    })
+
+
+class TestLookup:
+
+    def test_past_days_stay_queryable(self, tmp_path):
+        cache = DemandCache(tmp_path)
+        cache.put("SIN", date(2026, 3, 1), _frame("2026-03-01"))
+        cache.put("SIN", date(2026, 3, 2), _frame("2026-03-02"))
+
+        reopened = DemandCache(tmp_path)
+        df = reopened.get("SIN", date(2026, 3, 1))
+        assert df is not None and len(df) == 24
+        assert reopened.get("BCA", date(2026, 3, 1)) is None
+
+    def test_legacy_hashed_files_are_adopted(self, tmp_path):
+        key = hashlib.md5(b"BCS|2026-02-20").hexdigest()
+        _frame("2026-02-20").to_parquet(tmp_path / f"demanda_BCS_{key}.parquet", index=False)
+
+        cache = DemandCache(tmp_path)
+        assert cache.get("BCS", "2026-02-20") is not None
+
+    def test_opening_and_reading_write_nothing(self, tmp_path):
+        key = hashlib.md5(b"BCS|2026-02-20").hexdigest()
+        legacy = tmp_path / f"demanda_BCS_{key}.parquet"
+        _frame("2026-02-20").to_parquet(legacy, index=False)
+        unreadable = tmp_path / f"demanda_SIN_{'0' * 32}.parquet"
+        unreadable.write_bytes(b"no es parquet")
+
+        cache = DemandCache(tmp_path)
+        cache.get("BCS", "2026-02-20")
+        # Ni el índice ni borrados: los archivos legacy están versionados
+        assert sorted(p.name for p in tmp_path.iterdir()) == sorted([legacy.name, unreadable.name])
+
+    def test_legacy_files_survive_eviction(self, tmp_path):
+        key = hashlib.md5(b"BCS|2026-02-20").hexdigest()
+        legacy = tmp_path / f"demanda_BCS_{key}.parquet"
+        _frame("2026-02-20").to_parquet(legacy, index=False)
+        cache = DemandCache(tmp_path, ttl_days=1, max_bytes=1)
+        cache._entries["BCS|2026-02-20"].fetched_at = time.time() - 2 * 86_400
+        cache.put("SIN", "2026-03-01", _frame("2026-03-01"))
+        assert legacy.exists() and cache.get("BCS", "2026-02-20") is None
+
+
+class TestEviction:
+
+    def test_ttl_expires_entries(self, tmp_path):
+        cache = DemandCache(tmp_path, ttl_days=1)
+        cache.put("SIN", "2026-03-01", _frame("2026-03-01"))
+        cache._entries["SIN|2026-03-01"].fetched_at = time.time() - 2 * 86_400
+        assert cache.get("SIN", "2026-03-01") is None
+        assert not list(tmp_path.glob("demanda_SIN_*.parquet"))
+
+    def test_size_limit_evicts_least_recently_used(self, tmp_path):
+        cache = DemandCache(tmp_path)
+        cache.put("SIN", "2026-03-01", _frame("2026-03-01"))
+        one_size = cache.total_bytes()
+        cache.max_bytes = int(2.5 * one_size)
+
+        cache.put("SIN", "2026-03-02", _frame("2026-03-02"))
+        cache._entries["SIN|2026-03-01"].last_access = time.time() + 10  # most recently viewed
+        cache.put("SIN", "2026-03-03", _frame("2026-03-03"))
+
+        assert cache.total_bytes() <= cache.max_bytes
+        assert cache.get("SIN", "2026-03-01") is not None
+        assert cache.get("SIN", "2026-03-02") is None
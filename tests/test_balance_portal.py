@@ -0,0 +1,135 @@
+"""
+Tests for the CENACE balance-portal client (lib/balance_portal.py): the
+shared rate limiter, the resumable coverage state and ViewState reuse in
+PortalSession. No network access: the HTTP session is a local fake.
+
+Run with:  pytest tests/test_balance_portal.py -v
+"""
+from __future__ import annotations
+
+from datetime import date
+
+import pytest
+import requests
+
+from app.lib.balance_portal import Coverage, PortalError, PortalSession, RateLimiter
+
+EXPORT = "ctl00$MainContent$rgBalance$ctl00$ctl02$ctl00$ExportToCsvButton"
+DATE_FIELD = "ctl00$MainContent$rdpFechaBalance$dateInput"
+
+
+class _Resp:
+    def __init__(self, text: str = "", content_type: str = "text/html") -> None:
+        self.text = text
+        self.content = text.encode()
+        self.headers = {"Content-Type": content_type}
+
+    def raise_for_status(self) -> None:
+        pass
+
+
+class _FakeHttp:
+    """Portal con datos solo para `days` (dd/mm/yyyy); cada respuesta trae un ViewState nuevo."""
+
+    def __init__(self, days: set[str], fail: bool = False, export_html: bool = False) -> None:
+        self.days = days
+        self.fail = fail
+        self.export_html = export_html
+        self.n = 0
+
+    def _page(self, grid: bool = False) -> _Resp:
+        self.n += 1
+        table = '<table id="ctl00_MainContent_rgBalance"></table>' if grid else ""
+        return _Resp(f'<input name="__VIEWSTATE" value="vs{self.n}"/>{table}')
+
+    def get(self, url, timeout=None):
+        return self._page()
+
+    def post(self, url, data=None, timeout=None):
+        if self.fail:
+            raise requests.ConnectionError("sin red")
+        if data.get("__VIEWSTATE") == "caducado":
+            return _Resp("<html>error</html>")
+        if data["__EVENTTARGET"] == EXPORT:
+            return self._page() if self.export_html else _Resp("csv", "text/csv")
+        return self._page(grid=data[DATE_FIELD] in self.days)
+
+
+def _portal(http: _FakeHttp) -> PortalSession:
+    portal = PortalSession(RateLimiter(0))
+    portal.http = http
+    return portal
+
+
+def _csv(path, day: date) -> None:
+    header = ["encabezado"] * 7 + [f'"Fecha de operación: {day.strftime("%d/%m/%Y")}"']
+    path.write_text("\n".join(header + ["1,100"]), encoding="latin-1")
+
+
+class TestRateLimiter:
+
+    def test_requests_are_spaced(self):
+        sleeps: list[float] = []
+        limiter = RateLimiter(2.0, clock=lambda: 0.0, sleep=sleeps.append)
+        for _ in range(3):
+            limiter.wait()
+        assert sleeps == [0.5, 1.0]
+
+    def test_no_limit(self):
+        sleeps: list[float] = []
+        limiter = RateLimiter(0, clock=lambda: 0.0, sleep=sleeps.append)
+        for _ in range(3):
+            limiter.wait()
+        assert sleeps == []
+
+
+class TestCoverage:
+
+    def test_sync_with_csvs_on_disk(self, tmp_path):
+        csv_dir = tmp_path / "balance"
+        csv_dir.mkdir()
+        _csv(csv_dir / "a.csv", date(2026, 3, 1))
+        path = tmp_path / "cache" / "coverage.json"
+        assert Coverage(path, csv_dir).has(date(2026, 3, 1))
+        (csv_dir / "a.csv").unlink()
+        assert not Coverage(path, csv_dir).has(date(2026, 3, 1))
+
+    def test_errors_are_not_no_data(self, tmp_path):
+        path = tmp_path / "coverage.json"
+        cov = Coverage(path, tmp_path)
+        cov.mark_unavailable(date(2026, 3, 1))
+        cov.mark_error(date(2026, 3, 2), "timeout")
+
+        cov = Coverage(path, tmp_path)
+        assert cov.checked_recently(date(2026, 3, 1), recheck_hours=12)
+        # Un fallo de red no dice nada de la fecha: se vuelve a consultar
+        assert not cov.checked_recently(date(2026, 3, 2), recheck_hours=12)
+        assert cov.errors["2026-03-02"]["error"] == "timeout"
+        cov.mark_available(date(2026, 3, 2), "b.csv")
+        assert "2026-03-02" not in cov.errors
+
+
+class TestPortalSession:
+
+    def test_viewstate_is_reused_across_days(self):
+        portal = _portal(_FakeHttp({"01/03/2026", "03/03/2026"}))
+        got = [portal.fetch_day(date(2026, 3, d)) for d in (1, 2, 3)]
+        assert got == [b"csv", None, b"csv"]
+        # Un solo GET; un POST de consulta por día más uno de exportación por día con datos
+        assert portal.gets == 1 and portal.posts == 5
+
+    def test_rejected_viewstate_is_refreshed_once(self):
+        portal = _portal(_FakeHttp({"01/03/2026"}))
+        portal.fields = {"__VIEWSTATE": "caducado"}
+        assert portal.fetch_day(date(2026, 3, 1)) == b"csv"
+        assert portal.gets == 1
+
+    def test_network_error_is_not_no_data(self):
+        with pytest.raises(PortalError):
+            _portal(_FakeHttp({"01/03/2026"}, fail=True)).fetch_day(date(2026, 3, 1))
+
+    def test_export_without_csv_is_an_error(self):
+        portal = _portal(_FakeHttp({"01/03/2026"}, export_html=True))
+        with pytest.raises(PortalError):
+            portal.fetch_day(date(2026, 3, 1))
+        assert portal.fields.get("__VIEWSTATE")   # listo para la siguiente consulta
@@ -0,0 +1,80 @@
+"""
+Tests for the chart level-of-detail helpers (lib/chart_lod.py).
+
+Run with:  pytest tests/test_chart_lod.py -v
+"""
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.lib.chart_lod import (
+    downsample,
+    downsample_curve,
+    lttb_indices,
+    minmax_indices,
+    use_webgl,
+    window,
+)
+
+
+def _year(seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    idx = pd.date_range("2025-01-01", periods=8760, freq="h")
+    base = 500 + 200 * np.sin(np.linspace(0, 730 * np.pi, 8760))
+    return pd.DataFrame(
+        {"solar": np.clip(base - 400, 0, None), "gas": base + rng.normal(0, 20, 8760)},
+        index=idx,
+    )
+
+
+class TestIndices:
+
+    def test_lttb_keeps_endpoints_and_spikes(self):
+        y = np.sin(np.linspace(0, 60, 8760))
+        y[4321] = 25.0
+        rows = lttb_indices(y, 2000)
+        assert len(rows) == 2000
+        assert rows[0] == 0 and rows[-1] == 8759
+        assert (np.diff(rows) > 0).all()
+        assert 4321 in rows
+
+    def test_minmax_keeps_global_extremes(self):
+        y = np.random.default_rng(1).normal(size=8760)
+        rows = minmax_indices(y, 1000)
+        assert len(rows) <= 1000
+        assert y[rows].max() == y.max() and y[rows].min() == y.min()
+
+    def test_short_series_untouched(self):
+        y = np.arange(50.0)
+        np.testing.assert_array_equal(lttb_indices(y, 2000), np.arange(50))
+        np.testing.assert_array_equal(minmax_indices(y, 2000), np.arange(50))
+
+
+class TestFrames:
+
+    def test_stacked_rows_are_shared(self):
+        df = _year()
+        out = downsample(df, 1000, "minmax")
+        assert len(out) <= 1000
+        assert out.index.isin(df.index).all()
+        assert out.sum(axis=1).max() == pytest.approx(df.sum(axis=1).max())
+
+    def test_window_then_full_resolution(self):
+        df = _year()
+        week = window(df, pd.Timestamp("2025-03-01"), pd.Timestamp("2025-03-07 23:00"))
+        assert len(week) == 168
+        pd.testing.assert_frame_equal(downsample(week, 2000), week)
+        assert downsample(df, None) is df
+
+    def test_curve_and_unknown_method(self):
+        curve = np.sort(_year()["gas"].to_numpy())[::-1]
+        hours, values = downsample_curve(curve, 500)
+        assert hours[0] == 1 and hours[-1] == 8760 and len(values) == 500
+        with pytest.raises(ValueError):
+            downsample(_year(), 100, "mean")
+
+    def test_webgl_threshold(self):
+        assert not use_webgl(2000)
+        assert use_webgl(8760)
@@ -0,0 +1,115 @@
+"""
+Tests for N-1 contingency screening (lib/contingency.py): unit selection,
+warm start from the base basis, ranking and the process pool.
+
+Run with:  pytest tests/test_contingency.py -v
+"""
+from __future__ import annotations
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from app.lib.contingency import major_units, screen_contingencies
+from app.lib.dispatch_model import DispatchData
+from app.lib.outage_mc import SampleOutcome
+
+IDX = pd.date_range("2026-01-05", periods=24, freq="h")
+RECIPE = {"scenario": "base", "costs": {"gas_ccgt": 50.0}, "growth": False, "voll": 3000.0}
+GENS = pd.DataFrame(
+    {"bus": ["SIN", "SIN", "BCS", "BCS", "BCS", "BCA", "BCS"],
+     "carrier": ["gas_ccgt", "gas_ccgt", "diesel_engine", "gas_ocgt", "solar", "gas_ccgt", "shedding"],
+     "p_nom": [300.0, 300.0, 60.0, 40.0, 30.0, 500.0, 1e6]},
+    index=["ccgt_1", "ccgt_2", "diesel_1", "ocgt_1", "pv_1", "ccgt_bca", "VoLL_BCS"],
+)
+DEMAND = {"SIN": 400.0, "BCA": 200.0, "BCS": 60.0}
+PRICE = {"gas_ccgt": 50.0, "diesel_engine": 100.0, "gas_ocgt": 70.0, "solar": 0.0}
+
+
+def _load_data() -> DispatchData:
+    demand = pd.DataFrame(DEMAND, index=IDX)
+    return DispatchData(centrales=pd.DataFrame(), p_max_pu_raw=pd.DataFrame(), demand=demand)
+
+
+class _FakeModel:
+    """Mérito por sistema: precio = costo de la unidad más cara despachada; lo que falta va a VoLL."""
+
+    solves: list = []
+
+    gen_table = GENS
+    gen_names = GENS.index
+
+    def __init__(self, data: DispatchData, recipe: dict, solver_options: dict | None = None) -> None:
+        pass
+
+    @staticmethod
+    def generators(data: DispatchData, recipe: dict) -> pd.DataFrame:
+        return GENS
+
+    def solve(self, available: np.ndarray, basis_fn=None, warmstart_fn=None) -> SampleOutcome:
+        type(self).solves.append(warmstart_fn)
+        if basis_fn:
+            Path(basis_fn).write_text("base")
+        if warmstart_fn:
+            assert Path(warmstart_fn).read_text() == "base"
+        shed, price, cost = [], [], 0.0
+        for bus in ("SIN", "BCA", "BCS"):
+            units = GENS[(GENS["bus"] == bus) & (GENS["carrier"] != "shedding") & available]
+            left, marginal = DEMAND[bus], 0.0
+            for name in sorted(units.index, key=lambda g: PRICE[GENS.at[g, "carrier"]]):
+                take = min(left, GENS.at[name, "p_nom"])
+                if take > 0:
+                    marginal = PRICE[GENS.at[name, "carrier"]]
+                    cost += take * marginal * len(IDX)
+                left -= take
+            shed.append(left)
+            price.append(RECIPE["voll"] if left > 0 else marginal)
+            cost += left * RECIPE["voll"] * len(IDX)
+        return SampleOutcome(
+            objective=cost,
+            shed=np.tile(shed, (len(IDX), 1)),
+            price=np.tile(price, (len(IDX), 1)),
+            iterations=int(available.sum()),
+        )
+
+
+class TestSelection:
+
+    def test_largest_units_per_system(self):
+        units = major_units(GENS, k=2, systems=("BCA", "BCS"))
+        assert list(units.index) == ["ccgt_bca", "diesel_1", "ocgt_1"]
+        assert "VoLL_BCS" not in major_units(GENS, k=10).index
+
+
+class TestScreening:
+
+    def test_ranking_and_warm_start(self):
+        _FakeModel.solves = []
+        seen = []
+        base, ranking = screen_contingencies(
+            _load_data, RECIPE, k=2, systems=("BCA", "BCS"), on_case=seen.append, model_factory=_FakeModel,
+        )
+        assert base["Energía no servida (MWh)"] == 0.0 and base["iteraciones"] == len(GENS)
+        # Base sin warm start, luego un caso por unidad partiendo de la base guardada
+        assert _FakeModel.solves[0] is None and all(w for w in _FakeModel.solves[1:])
+        assert len(seen) == 3 and ranking["ok"].all() and (ranking["iteraciones"] == len(GENS) - 1).all()
+        # BCA pierde su única unidad (200 MW × 24 h de corte); sin la OCGT, BCS marca con diésel
+        assert list(ranking["unidad"]) == ["ccgt_bca", "ocgt_1", "diesel_1"]
+        assert ranking.loc[0, "Δ ENS (MWh)"] == 200.0 * 24
+        assert ranking.loc[0, "Precio máx. sistema ($/MWh)"] == RECIPE["voll"]
+        ocgt, diesel = ranking.loc[1], ranking.loc[2]
+        assert ocgt["Δ ENS (MWh)"] == 0.0 and ocgt["Δ precio sistema ($/MWh)"] == 30.0
+        assert diesel["Δ precio sistema ($/MWh)"] == 0.0 and diesel["Δ costo ($M)"] == 0.0
+
+    def test_cold_start(self):
+        _FakeModel.solves = []
+        screen_contingencies(_load_data, RECIPE, k=1, warm_start=False, model_factory=_FakeModel)
+        assert _FakeModel.solves == [None] * 4
+
+    def test_pool_matches_serial(self):
+        kwargs = dict(k=2, model_factory=_FakeModel)
+        _, serial = screen_contingencies(_load_data, RECIPE, **kwargs)
+        _, pooled = screen_contingencies(_load_data, RECIPE, workers=2, **kwargs)
+        cols = ["unidad", "Δ ENS (MWh)", "Δ precio sistema ($/MWh)", "Δ costo ($M)"]
+        pd.testing.assert_frame_equal(pooled[cols], serial[cols])
@@ -0,0 +1,63 @@
+"""
+Tests for missing-day demand estimates (lib/demand_estimate.py): the
+weekday profile, the trailing history window and the fallback for
+weekdays the window does not cover.
+
+Run with:  pytest tests/test_demand_estimate.py -v
+"""
+from __future__ import annotations
+
+from datetime import date
+
+import pandas as pd
+import pytest
+
+from app.lib.demand_estimate import build_profile, estimate_day, estimate_days
+
+
+def _history() -> pd.DataFrame:
+    """Dos semanas de SIN (lunes 2026-03-02 a domingo 2026-03-15): 100 MW la primera, 200 MW la segunda."""
+    idx = pd.date_range("2026-03-02", "2026-03-15 23:00", freq="h")
+    return pd.DataFrame({
+        "snapshot": idx,
+        "zona": "SIN",
+        "demand_mw": [100.0 if ts < pd.Timestamp("2026-03-09") else 200.0 for ts in idx],
+    })
+
+
+class TestWindow:
+
+    def test_whole_history_by_default(self):
+        profile = build_profile(_history())
+        assert len(profile) == 7 * 24
+        assert profile["demand_mw"].tolist() == pytest.approx([150.0] * len(profile))
+        assert (build_profile(_history(), window_days=0)["demand_mw"] == 150.0).all()
+
+    def test_window_keeps_the_last_days(self):
+        profile = build_profile(_history(), window_days=7)
+        assert (profile["demand_mw"] == 200.0).all()
+        # 8 días: el domingo 8 (primera semana) entra, el resto no
+        profile = build_profile(_history(), window_days=8).set_index(["weekday", "hora"])["demand_mw"]
+        assert profile.loc[(6, 0)] == pytest.approx(150.0) and profile.loc[(0, 0)] == pytest.approx(200.0)
+
+    def test_weekdays_outside_window_fall_back_to_window_mean(self):
+        history = _history()
+        history.loc[history["snapshot"] >= "2026-03-14", "demand_mw"] = 300.0   # fin de semana
+        profile = build_profile(history, window_days=3).set_index(["weekday", "hora"])["demand_mw"]
+        # Viernes, sábado y domingo en la ventana; lunes a jueves toman su promedio
+        assert profile.loc[(4, 12)] == pytest.approx(200.0)
+        assert profile.loc[(5, 12)] == pytest.approx(300.0)
+        assert profile.loc[(0, 12)] == pytest.approx((200.0 + 300.0 + 300.0) / 3)
+
+
+class TestEstimates:
+
+    def test_days_share_the_profile(self):
+        out = estimate_days([date(2026, 3, 16), date(2026, 3, 17)], _history(), window_days=7)
+        assert len(out) == 48 and (out["demand_mw"] == 200.0).all()
+        assert out["snapshot"].min() == pd.Timestamp("2026-03-16")
+        assert out["snapshot"].max() == pd.Timestamp("2026-03-17 23:00")
+
+    def test_single_day_and_empty(self):
+        assert len(estimate_day(date(2026, 3, 16), _history())) == 24
+        assert estimate_days([], _history()).empty
@@ -0,0 +1,118 @@
+"""
+Tests for the partitioned, source-tagged demand store.
+
+Run with:  pytest tests/test_demand_store.py -v
+"""
+from __future__ import annotations
+
+import os
+
+import pandas as pd
+import pytest
+
+from app.lib import demand_store, dispatch_data
+
+
+@pytest.fixture(autouse=True)
+def _tmp_store(tmp_path, monkeypatch):
+    monkeypatch.setattr(demand_store, "STORE_DIR", tmp_path / "store")
+    monkeypatch.setattr(demand_store, "MANIFEST_PATH", tmp_path / "store" / "_ingested.json")
+    monkeypatch.setattr(demand_store, "DAILY_API_DIR", tmp_path / "daily_api")
+    monkeypatch.setattr(demand_store, "BALANCE_DIR", tmp_path / "balance_2026")
+
+
+def _day(day: str, mw: float, zona: str = "SIN") -> pd.DataFrame:
+    snaps = pd.date_range(day, periods=24, freq="h")
+    return pd.DataFrame({"snapshot": snaps, "zona": zona, "demand_mw": mw})
+
+
+class TestUpsert:
+
+    def test_higher_priority_source_wins(self):
+        demand_store.upsert(_day("2026-03-01", 100.0), "balance")
+        demand_store.upsert(_day("2026-03-01", 50.0), "estimate")
+        df = demand_store.load()
+        assert len(df) == 24
+        assert (df["source"] == "balance").all()
+        assert (df["demand_mw"] == 100.0).all()
+
+    def test_estimate_is_replaced_by_api(self):
+        demand_store.upsert(_day("2026-03-02", 50.0), "estimate")
+        demand_store.upsert(_day("2026-03-02", 80.0), "api")
+        df = demand_store.load(sources=["api"])
+        assert len(df) == 24 and (df["demand_mw"] == 80.0).all()
+
+    def test_unknown_source_rejected(self):
+        with pytest.raises(ValueError):
+            demand_store.upsert(_day("2026-03-01", 1.0), "foo")
+
+
+class TestPartitions:
+
+    def test_temporaries_are_per_process(self):
+        path = demand_store.STORE_DIR / "2026" / "2026-03.parquet"
+        assert demand_store._tmp_path(path).name == f"2026-03.parquet.{os.getpid()}.tmp"
+        demand_store.upsert(_day("2026-03-01", 1.0), "api")
+        demand_store.ingest_raw_dirs()
+        assert not list(demand_store.STORE_DIR.rglob("*.tmp"))
+
+    def test_monthly_partitions_and_range_load(self):
+        demand_store.upsert(pd.concat([_day("2026-02-28", 1.0), _day("2026-03-01", 2.0)]), "api")
+        files = sorted(p.name for p in demand_store.STORE_DIR.glob("*/*.parquet"))
+        assert files == ["2026-02.parquet", "2026-03.parquet"]
+
+        march = demand_store.load(start=pd.Timestamp("2026-03-01").date())
+        assert march["snapshot"].min() == pd.Timestamp("2026-03-01")
+        assert len(march) == 24
+
+    def test_coverage_reports_best_source(self):
+        demand_store.upsert(_day("2026-03-01", 1.0, "SIN"), "estimate")
+        demand_store.upsert(_day("2026-03-01", 1.0, "BCA"), "balance")
+        cov = demand_store.coverage()
+        row = cov.loc[pd.Timestamp("2026-03-01").date()]
+        assert row["horas_min"] == 24
+        assert row["source"] == "balance"
+
+
+def _legacy_csv(day: str, mw: float) -> None:
+    demand_store.DAILY_API_DIR.mkdir(exist_ok=True)
+    _day(day, mw).to_csv(demand_store.DAILY_API_DIR / f"demand_{day}.csv", index=False)
+
+
+class TestLegacyDailyApi:
+
+    def test_estimates_and_api_snapshots(self):
+        _legacy_csv("2026-03-01", 1234.56)   # promedio del fill anterior
+        _legacy_csv("2026-03-02", 1500.0)    # snapshot de la API (MW enteros)
+        assert demand_store.ingest_raw_dirs() == 2
+        src = demand_store.load().groupby(lambda i: i // 24)["source"].first().tolist()
+        assert src == ["estimate", "api"]
+        assert demand_store.ingest_raw_dirs() == 0
+
+    def test_old_api_tag_is_migrated(self):
+        # Ingesta anterior: todo daily_api/ como "api" bajo las claves viejas
+        _legacy_csv("2026-03-01", 1234.56)
+        demand_store.ingest_dir(demand_store.DAILY_API_DIR, "demand_*.csv", "api", demand_store.parse_daily_csv)
+        demand_store.upsert(_day("2026-03-02", 900.0), "api")
+        demand_store.ingest_raw_dirs()
+        df = demand_store.load()
+        assert (df.loc[df["snapshot"] < "2026-03-02", "source"] == "estimate").all()
+        assert (df.loc[df["snapshot"] >= "2026-03-02", "source"] == "api").all()
+        # Un estimado nuevo (fill_missing_demand --overwrite) ya lo reemplaza
+        demand_store.upsert(_day("2026-03-01", 1300.0), "estimate")
+        assert (demand_store.load(end=pd.Timestamp("2026-03-01").date())["demand_mw"] == 1300.0).all()
+
+
+class TestReadOnlyLoad:
+
+    def test_load_does_not_ingest(self):
+        demand_store.upsert(_day("2026-03-02", 900.0).assign(zona="SIN"), "api")
+        _legacy_csv("2026-03-01", 1234.56)
+        before = demand_store.version()
+        dem = dispatch_data.load_demand_raw()
+        assert dem["snapshot"].min() == pd.Timestamp("2026-03-02")
+        assert demand_store.version() == before and not demand_store.MANIFEST_PATH.exists()
+
+        dispatch_data.sync_demand_store()
+        assert demand_store.version() != before
+        assert dispatch_data.load_demand_raw()["snapshot"].min() == pd.Timestamp("2026-03-01")
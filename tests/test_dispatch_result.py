@@ -0,0 +1,201 @@
+"""
+Tests for the compact solved-result container (lib/dispatch_result.py).
+
+Run with:  pytest tests/test_dispatch_result.py -v
+"""
+from __future__ import annotations
+
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.lib.dispatch_model import extract_metrics
+from app.lib.dispatch_result import DispatchResult
+
+IDX = pd.date_range("2026-03-01", periods=24, freq="h")
+
+
+def _fake_network(with_battery: bool = True, with_store_split: bool = True) -> SimpleNamespace:
+    """Red resuelta mínima con los atributos que lee DispatchResult.from_network."""
+    gens = pd.DataFrame(
+        {
+            "bus": ["SIN", "SIN", "SIN", "BCA", "BCA"],
+            "carrier": ["solar", "gas_ccgt", "hydro", "onwind", "diesel_engine"],
+            "p_nom": [100.0, 200.0, 50.0, 80.0, 40.0],
+            "marginal_cost": [0.0, 50.0, 8.0, 0.0, 100.0],
+            "p_min_pu": [0.0, 0.3, np.nan, 0.0, 0.0],
+            "p_max_pu": [1.0, 1.0, 1.0, 1.0, 1.0],
+        },
+        index=["solar_1", "ccgt_1", "hydro_1", "wind_1", "VoLL_BCA"],
+    )
+    solar = np.clip(np.sin(np.linspace(0, np.pi, 24)), 0, None)
+    p_max_pu = pd.DataFrame(
+        {
+            "solar_1": solar,
+            "ccgt_1": 1.0,
+            "hydro_1": 0.6,            # constante: se guarda como escalar
+            "wind_1": np.linspace(0.2, 0.8, 24),
+            "VoLL_BCA": 1.0,
+        },
+        index=IDX,
+    )
+    rng = np.random.default_rng(0)
+    p = pd.DataFrame(rng.uniform(0, 40, size=(24, 5)), index=IDX, columns=gens.index)
+    p["solar_1"] = 100 * solar * 0.9
+    price = pd.DataFrame({"SIN": rng.uniform(0, 60, 24), "BCA": 3000.0}, index=IDX)
+
+    su = pd.DataFrame(
+        {"bus": ["SIN"], "p_nom": [30.0], "max_hours": [4.0]},
+        index=["battery_SIN"],
+    ) if with_battery else pd.DataFrame(columns=["bus", "p_nom", "max_hours"])
+    su_p = pd.DataFrame({"battery_SIN": np.tile([10.0, -10.0], 12)}, index=IDX) if with_battery else pd.DataFrame()
+    storage_t = SimpleNamespace(
+        p=su_p,
+        state_of_charge=su_p.cumsum().abs() if with_battery else pd.DataFrame(),
+    )
+    if with_store_split and with_battery:
+        storage_t.p_dispatch = su_p.clip(lower=0)
+        storage_t.p_store = (-su_p).clip(lower=0)
+
+    loads = pd.DataFrame({"bus": ["SIN", "BCA"]}, index=["load_SIN", "load_BCA"])
+    p_set = pd.DataFrame({"load_SIN": 300.0, "load_BCA": 90.0}, index=IDX)
+
+    return SimpleNamespace(
+        snapshots=IDX,
+        generators=gens,
+        generators_t=SimpleNamespace(p=p, p_max_pu=p_max_pu),
+        buses_t=SimpleNamespace(marginal_price=price),
+        storage_units=su,
+        storage_units_t=storage_t,
+        loads=loads,
+        loads_t=SimpleNamespace(p_set=p_set),
+        objective=123_456.0,
+    )
+
+
+class TestFromNetwork:
+
+    def test_panels_read_the_same_values(self):
+        n = _fake_network()
+        res = DispatchResult.from_network(n)
+        np.testing.assert_allclose(res.dispatch().to_numpy(), n.generators_t.p.to_numpy(), rtol=1e-6)
+        np.testing.assert_allclose(
+            res.marginal_price().to_numpy(), n.buses_t.marginal_price.to_numpy(), rtol=1e-6,
+        )
+        for bus in res.bus_names:
+            pd.testing.assert_series_equal(res.price_series(bus), res.marginal_price()[bus])
+        assert np.shares_memory(res.price_series(res.bus_names[0]).to_numpy(), res.price)
+        assert list(res.index) == list(IDX)
+        assert res.objective == 123_456.0
+        gi = res.generators()
+        assert gi.loc["hydro_1", "p_min_pu"] == 0.0  # NaN → 0
+        assert gi.loc["VoLL_BCA", "marginal_cost"] == 100.0
+
+    def test_only_time_varying_availability_is_stored(self):
+        n = _fake_network()
+        res = DispatchResult.from_network(n)
+        assert set(res.gen_names[res.avail_idx]) == {"solar_1", "wind_1"}
+        assert res.avail.shape == (24, 2)
+        # Reconstrucción completa y por subconjunto
+        np.testing.assert_allclose(res.p_max_pu().to_numpy(), n.generators_t.p_max_pu.to_numpy(), rtol=1e-6)
+        sub = res.p_max_pu(["hydro_1", "wind_1"])
+        assert list(sub.columns) == ["hydro_1", "wind_1"]
+        assert (sub["hydro_1"] == np.float32(0.6)).all()
+        with pytest.raises(KeyError):
+            res.p_max_pu(["no_existe"])
+
+    def test_storage_and_loads(self):
+        res = DispatchResult.from_network(_fake_network())
+        assert res.storage_units().loc["battery_SIN", "max_hours"] == 4.0
+        assert res.storage_t("p_dispatch")["battery_SIN"].sum() == pytest.approx(120.0)
+        assert list(res.loads().columns) == ["SIN", "BCA"]
+        # Sin `demand` explícita, la demanda es el p_set de las cargas
+        pd.testing.assert_frame_equal(res.demand_frame(), res.loads())
+
+    def test_charge_split_derived_when_missing(self):
+        res = DispatchResult.from_network(_fake_network(with_store_split=False))
+        assert res.storage_t("p_dispatch")["battery_SIN"].sum() == pytest.approx(120.0)
+        assert res.storage_t("p_store")["battery_SIN"].sum() == pytest.approx(120.0)
+
+    def test_without_battery(self):
+        res = DispatchResult.from_network(_fake_network(with_battery=False))
+        assert len(res.su_names) == 0
+        assert res.storage_t("state_of_charge").empty
+
+    def test_explicit_demand_is_kept_separately(self):
+        n = _fake_network()
+        dem = pd.DataFrame({"SIN": 250.0, "BCA": 75.0, "BCS": 10.0}, index=IDX)
+        res = DispatchResult.from_network(n, demand=dem)
+        assert res.demand_frame()["SIN"].iloc[0] == 250.0
+        assert res.loads()["SIN"].iloc[0] == 300.0
+
+
+class TestCompactness:
+
+    def test_slots_and_float32(self):
+        res = DispatchResult.from_network(_fake_network())
+        assert not hasattr(res, "__dict__")
+        assert res.gen_p.dtype == np.float32 and res.price.dtype == np.float32
+
+    def test_bytes_round_trip(self):
+        res = DispatchResult.from_network(_fake_network(), meta={"scenario": "base"})
+        back = DispatchResult.from_bytes(res.to_bytes())
+        assert back.meta == {"scenario": "base"}
+        assert back.objective == res.objective
+        pd.testing.assert_frame_equal(back.dispatch(), res.dispatch())
+        pd.testing.assert_frame_equal(back.p_max_pu(), res.p_max_pu())
+        assert back.nbytes == res.nbytes
+
+    def test_metrics_match_for_network_and_result(self):
+        n = _fake_network()
+        m_net = extract_metrics(n)
+        m_res = extract_metrics(DispatchResult.from_network(n))
+        assert m_net == pytest.approx(m_res)
+        # VoLL no cuenta como generación; su energía es shedding
+        assert m_res["Shedding (MWh)"] == pytest.approx(n.generators_t.p["VoLL_BCA"].sum(), rel=1e-5)
+
+
+def _window(n: SimpleNamespace, rows: slice) -> SimpleNamespace:
+    """Copia de la red falsa con solo las horas `rows` (una ventana del horizonte)."""
+    def cut(frame):
+        return frame.iloc[rows] if isinstance(frame, pd.DataFrame) and not frame.empty else frame
+    return SimpleNamespace(
+        snapshots=n.snapshots[rows],
+        generators=n.generators,
+        generators_t=SimpleNamespace(p=cut(n.generators_t.p), p_max_pu=cut(n.generators_t.p_max_pu)),
+        buses_t=SimpleNamespace(marginal_price=cut(n.buses_t.marginal_price)),
+        storage_units=n.storage_units,
+        storage_units_t=SimpleNamespace(**{k: cut(v) for k, v in vars(n.storage_units_t).items()}),
+        loads=n.loads,
+        loads_t=SimpleNamespace(p_set=cut(n.loads_t.p_set)),
+        objective=n.objective / 2,
+    )
+
+
+class TestConcat:
+
+    def test_windows_join_into_the_full_horizon(self):
+        n = _fake_network()
+        # ccgt_1 es constante dentro de cada ventana pero con otro valor en la segunda
+        n.generators_t.p_max_pu.loc[IDX[12:], "ccgt_1"] = 0.5
+        full = DispatchResult.from_network(n, meta={"scenario": "base"})
+        parts = [DispatchResult.from_network(_window(n, s), meta={"scenario": "base"})
+                 for s in (slice(0, 12), slice(12, 24))]
+        assert parts[0].avail_idx.size < full.avail_idx.size
+
+        joined = DispatchResult.concat(parts)
+        pd.testing.assert_frame_equal(joined.dispatch(), full.dispatch())
+        pd.testing.assert_frame_equal(joined.p_max_pu(), full.p_max_pu())
+        pd.testing.assert_frame_equal(joined.marginal_price(), full.marginal_price())
+        pd.testing.assert_frame_equal(joined.storage_t("state_of_charge"), full.storage_t("state_of_charge"))
+        pd.testing.assert_frame_equal(joined.loads(), full.loads())
+        assert joined.objective == pytest.approx(full.objective)
+        assert joined.meta == {"scenario": "base"} and joined.derived == {}
+
+    def test_mismatched_windows_are_rejected(self):
+        a = DispatchResult.from_network(_fake_network(with_battery=True))
+        b = DispatchResult.from_network(_fake_network(with_battery=False))
+        with pytest.raises(ValueError, match="su_names"):
+            DispatchResult.concat([a, b])
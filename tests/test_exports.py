@@ -0,0 +1,78 @@
+"""
+Tests for the on-demand chunked exports (lib/exports.py).
+
+Run with:  pytest tests/test_exports.py -v
+"""
+from __future__ import annotations
+
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.lib.exports import deferred_export, discard_exports, export_frame, file_name, write_frame
+
+
+def _frame(hours: int = 5000) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    return pd.DataFrame(
+        rng.random((hours, 3), dtype=np.float32),
+        index=pd.date_range("2025-01-01", periods=hours, freq="h", name="snapshot"),
+        columns=["solar_1", "gas_2", "VoLL_SIN"],
+    )
+
+
+class TestWriteFrame:
+
+    def test_parquet_roundtrip_in_chunks(self):
+        df = _frame()
+        buf = io.BytesIO()
+        write_frame(df, buf, "parquet", chunk_rows=700)
+        buf.seek(0)
+        pd.testing.assert_frame_equal(pd.read_parquet(buf), df, check_freq=False)
+
+    def test_csv_has_single_header(self):
+        df = _frame(1000)
+        buf = io.BytesIO()
+        write_frame(df, buf, "csv", chunk_rows=300)
+        text = buf.getvalue().decode("utf-8")
+        assert text.count("solar_1") == 1
+        back = pd.read_csv(io.StringIO(text), index_col=0, parse_dates=True)
+        assert back.shape == df.shape
+        np.testing.assert_allclose(back.to_numpy(), df.to_numpy(), rtol=1e-6)
+
+    def test_empty_frame_and_unknown_format(self):
+        buf = io.BytesIO()
+        write_frame(_frame(0), buf, "csv")
+        assert buf.getvalue().decode("utf-8").startswith("snapshot,solar_1")
+        with pytest.raises(ValueError):
+            write_frame(_frame(10), io.BytesIO(), "xlsx")
+
+
+class TestExportFrame:
+
+    def test_written_once_per_key_and_discarded(self, tmp_path):
+        df = _frame(100)
+        path = export_frame(df, "despacho_mw", "parquet", key="abc", export_dir=tmp_path)
+        assert path.name == file_name("despacho_mw", "parquet") == "despacho_mw.parquet"
+        mtime = path.stat().st_mtime_ns
+        assert export_frame(df.iloc[:1], "despacho_mw", "parquet", key="abc", export_dir=tmp_path) == path
+        assert path.stat().st_mtime_ns == mtime
+        assert not list(tmp_path.rglob("*.tmp"))
+
+        discard_exports("abc", export_dir=tmp_path)
+        assert not path.exists()
+
+    def test_deferred_export_builds_only_when_called(self, tmp_path):
+        calls = []
+
+        def build() -> pd.DataFrame:
+            calls.append(1)
+            return _frame(100)
+
+        data = deferred_export(build, "despacho_mw", "csv", key="abc", export_dir=tmp_path)
+        assert calls == [] and not list(tmp_path.rglob("*"))
+        body = data()
+        assert calls == [1] and body.startswith(b"snapshot,solar_1")
+        assert body == (tmp_path / "abc" / "despacho_mw.csv").read_bytes()
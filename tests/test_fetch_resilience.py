@@ -0,0 +1,135 @@
+"""
+Tests for the resilient CENACE fetch layer (retries, circuit breaker, metrics).
+
+No network access: the wrapped call is a local function that fails on demand.
+
+Run with:  pytest tests/test_fetch_resilience.py -v
+"""
+from __future__ import annotations
+
+import pytest
+import requests
+
+from app.lib.fetch_resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    FetchMetrics,
+    RetryPolicy,
+    call_with_retries,
+)
+
+
+class _FakeClock:
+    def __init__(self) -> None:
+        self.t = 0.0
+
+    def __call__(self) -> float:
+        return self.t
+
+
+def _flaky(n_failures: int, exc: Exception):
+    calls = {"n": 0}
+
+    def fn():
+        calls["n"] += 1
+        if calls["n"] <= n_failures:
+            raise exc
+        return "ok"
+
+    return fn, calls
+
+
+class TestRetries:
+
+    def test_transient_error_is_retried(self):
+        fn, calls = _flaky(2, requests.Timeout("lento"))
+        out = call_with_retries(fn, "ep", RetryPolicy(max_attempts=3), sleep=lambda s: None)
+        assert out == "ok"
+        assert calls["n"] == 3
+
+    def test_attempts_are_bounded(self):
+        fn, calls = _flaky(10, requests.ConnectionError("caído"))
+        with pytest.raises(requests.ConnectionError):
+            call_with_retries(fn, "ep", RetryPolicy(max_attempts=3), sleep=lambda s: None)
+        assert calls["n"] == 3
+
+    def test_non_retryable_error_fails_immediately(self):
+        fn, calls = _flaky(10, ValueError("schema"))
+        with pytest.raises(ValueError):
+            call_with_retries(fn, "ep", RetryPolicy(max_attempts=3), sleep=lambda s: None)
+        assert calls["n"] == 1
+
+    def test_backoff_delay_is_capped(self):
+        policy = RetryPolicy(base_delay_s=1.0, max_delay_s=4.0)
+        assert all(0.0 <= policy.delay(k) <= 4.0 for k in range(10))
+
+
+class TestCircuitBreaker:
+
+    def test_opens_after_threshold_and_fails_fast(self):
+        clock = _FakeClock()
+        breaker = CircuitBreaker(failure_threshold=2, cooldown_s=30.0, clock=clock)
+        fn, calls = _flaky(100, requests.Timeout("lento"))
+        policy = RetryPolicy(max_attempts=1)
+
+        for _ in range(2):
+            with pytest.raises(requests.Timeout):
+                call_with_retries(fn, "ep", policy, breaker=breaker)
+        assert breaker.state == CircuitBreaker.OPEN
+
+        with pytest.raises(CircuitOpenError):
+            call_with_retries(fn, "ep", policy, breaker=breaker)
+        assert calls["n"] == 2  # the open circuit never touched fn
+
+    def test_one_failure_per_call(self):
+        breaker = CircuitBreaker(failure_threshold=3, cooldown_s=30.0, clock=_FakeClock())
+        fn, calls = _flaky(100, requests.Timeout("lento"))
+        policy = RetryPolicy(max_attempts=3)
+        for _ in range(2):
+            with pytest.raises(requests.Timeout):
+                call_with_retries(fn, "ep", policy, breaker=breaker, sleep=lambda s: None)
+        # 6 intentos fallidos, pero solo 2 llamadas: el circuito sigue cerrado
+        assert calls["n"] == 6 and breaker.state == CircuitBreaker.CLOSED
+
+    def test_non_retryable_errors_do_not_open(self):
+        breaker = CircuitBreaker(failure_threshold=1, cooldown_s=30.0, clock=_FakeClock())
+        fn, _ = _flaky(100, ValueError("schema"))
+        for _ in range(3):
+            with pytest.raises(ValueError):
+                call_with_retries(fn, "ep", RetryPolicy(max_attempts=3), breaker=breaker, sleep=lambda s: None)
+        assert breaker.state == CircuitBreaker.CLOSED
+
+    def test_half_open_trial_keeps_its_retries(self):
+        clock = _FakeClock()
+        breaker = CircuitBreaker(failure_threshold=1, cooldown_s=10.0, clock=clock)
+        breaker.record_failure()
+        clock.t = 11.0
+        fn, calls = _flaky(1, requests.Timeout("lento"))
+        assert call_with_retries(fn, "ep", RetryPolicy(max_attempts=2), breaker=breaker, sleep=lambda s: None) == "ok"
+        assert calls["n"] == 2 and breaker.state == CircuitBreaker.CLOSED
+
+    def test_half_open_trial_closes_on_success(self):
+        clock = _FakeClock()
+        breaker = CircuitBreaker(failure_threshold=1, cooldown_s=10.0, clock=clock)
+        breaker.record_failure()
+        assert breaker.state == CircuitBreaker.OPEN
+
+        clock.t = 11.0
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+        assert breaker.allow()
+        assert not breaker.allow()  # only one trial at a time
+        breaker.record_success()
+        assert breaker.state == CircuitBreaker.CLOSED
+
+
+class TestMetrics:
+
+    def test_counts_and_latency_percentiles(self):
+        metrics = FetchMetrics()
+        fn, _ = _flaky(1, requests.Timeout("lento"))
+        call_with_retries(fn, "ep", RetryPolicy(max_attempts=2), metrics=metrics, sleep=lambda s: None)
+        row = metrics.summary()["ep"]
+        assert row["ok"] == 1
+        assert row["retryable_error"] == 1
+        assert row["n_latencias"] == 2
+        assert row["p95_s"] >= row["p50_s"] >= 0.0
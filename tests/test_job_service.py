@@ -0,0 +1,263 @@
+"""
+Tests for the local dispatch job service (lib/job_service.py): priority
+queue, admission control, HTTP endpoints and the worker pool.
+
+Run with:  pytest tests/test_job_service.py -v
+"""
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from concurrent.futures.process import BrokenProcessPool
+from datetime import date
+
+import pytest
+
+from app.lib import job_service
+from app.lib.job_service import (
+    CANCELLED,
+    DONE,
+    ERROR,
+    QUEUED,
+    JobClient,
+    JobServer,
+    JobService,
+    QueueFullError,
+    recipe_from_json,
+    recipe_to_json,
+)
+
+
+# ── Helpers (a nivel de módulo: los procesos del pool los importan) ───────────
+def _no_data():
+    return None
+
+
+def _echo_solve(recipe: dict, stop_path: str) -> tuple[bytes, dict]:
+    if recipe.get("fail"):
+        raise ValueError("receta inválida")
+    time.sleep(recipe.get("sleep", 0.0))
+    return json.dumps(recipe, default=str).encode(), {"solve": 0.0}
+
+
+def _stoppable_solve(recipe: dict, stop_path: str) -> tuple[bytes, dict]:
+    """Ventanas de 50 ms hasta 20 s; revisa la bandera de parada entre ventanas, como run_dispatch."""
+    for _ in range(400):
+        if os.path.exists(stop_path):
+            raise RuntimeError("cancelado")
+        time.sleep(0.05)
+    return b"completo", {}
+
+
+def _file_version() -> str:
+    with open(os.environ["JOB_TEST_DATA"]) as fh:
+        return fh.read()
+
+
+def _data_solve(recipe: dict, stop_path: str) -> tuple[bytes, dict]:
+    return job_service._worker_data().encode(), {}
+
+
+class _BrokenPool:
+    def submit(self, *args, **kwargs):
+        raise BrokenProcessPool("un proceso terminó abruptamente")
+
+    def shutdown(self, **kwargs) -> None:
+        pass
+
+
+def _wait_state(service: JobService, job_id: str, states: tuple[str, ...], timeout: float = 20.0) -> dict:
+    t0 = time.monotonic()
+    while time.monotonic() - t0 < timeout:
+        status = service.status(job_id)
+        if status["state"] in states:
+            return status
+        time.sleep(0.02)
+    raise AssertionError(f"{job_id} sigue en {service.status(job_id)['state']}")
+
+
+@pytest.fixture
+def server():
+    """Servicio sin arrancar (la cola no avanza) detrás de un servidor HTTP real."""
+    service = JobService(_no_data, workers=1, max_queue=3, max_per_client=2)
+    srv = JobServer(service, port=0)
+    thread = threading.Thread(target=srv.serve_forever, daemon=True)
+    thread.start()
+    yield service, JobClient(f"http://127.0.0.1:{srv.server_address[1]}")
+    srv.shutdown()
+    srv.server_close()
+
+
+class TestQueue:
+
+    def test_priority_then_arrival_order(self):
+        service = JobService(_no_data)
+        low = service.submit({"n": 1}, priority=0)
+        high = service.submit({"n": 2}, priority=10)
+        high2 = service.submit({"n": 3}, priority=10)
+        assert service.status(high)["position"] == 1
+        assert service.status(high2)["position"] == 2
+        assert service.status(low)["position"] == 3
+        assert [service._next_locked().job_id for _ in range(3)] == [high, high2, low]
+
+    def test_admission_control(self):
+        service = JobService(_no_data, max_queue=3, max_per_client=2)
+        service.submit({"n": 1}, client="a")
+        service.submit({"n": 2}, client="a")
+        with pytest.raises(QueueFullError):
+            service.submit({"n": 3}, client="a")
+        service.submit({"n": 4}, client="b")
+        with pytest.raises(QueueFullError):
+            service.submit({"n": 5}, client="c")
+        assert service.stats()["rejected"] == 2 and service.stats()["queued"] == 3
+
+    def test_cancelled_jobs_are_skipped(self):
+        service = JobService(_no_data)
+        first = service.submit({"n": 1}, priority=5)
+        second = service.submit({"n": 2})
+        assert service.cancel(first) and not service.cancel(first)
+        assert service.status(first)["state"] == CANCELLED
+        assert service._next_locked().job_id == second
+        assert service._next_locked() is None
+
+    def test_identical_recipes_share_a_job(self):
+        service = JobService(_no_data, max_queue=1)
+        first = service.submit({"cost": 80, "growth": False}, priority=0, client="a")
+        # Misma receta canónica (80 == 80.0, otro orden): no ocupa otro lugar en la cola
+        same = service.submit({"growth": False, "cost": 80.0}, priority=10, client="b")
+        assert same == first
+        status = service.status(first)
+        assert status["refs"] == 2 and status["priority"] == 10
+        assert service.stats()["coalesced"] == 1
+        # Se cancela solo cuando lo retira el último que lo pidió
+        assert service.cancel(first) and service.status(first)["state"] == QUEUED
+        assert service.cancel(first) and service.status(first)["state"] == CANCELLED
+
+    def test_budget_is_shared_only_when_not_shorter(self):
+        service = JobService(_no_data)
+        long = service.submit({"n": 1, "time_budget_s": 60.0})
+        assert service.submit({"n": 1, "time_budget_s": 30.0}) == long
+        assert service.submit({"n": 1}) != long
+        unbounded = service.submit({"n": 2})
+        assert service.submit({"n": 2, "time_budget_s": 10.0}) == unbounded
+        # Uno terminado con presupuesto pudo quedar parcial: no se reutiliza
+        service._jobs[long].state = DONE
+        assert service.submit({"n": 1, "time_budget_s": 30.0}) != long
+
+    def test_done_jobs_are_reused_only_on_the_same_data(self):
+        version = ["v1"]
+        service = JobService(_no_data, data_version=lambda: version[0])
+        first = service.submit({"n": 1})
+        service._jobs[first].state = DONE
+        assert service.submit({"n": 1}) == first
+        version[0] = "v2"
+        assert service.submit({"n": 1}) != first
+
+    def test_recipe_json_round_trip(self):
+        recipe = {"start": date(2026, 1, 5), "end": None, "costs": {"gas_ccgt": 80.0}}
+        wire = json.loads(json.dumps(recipe_to_json(recipe)))
+        assert recipe_from_json(wire) == recipe
+
+
+class TestHTTP:
+
+    def test_submit_poll_cancel(self, server):
+        service, client = server
+        job_id = client.submit({"start": date(2026, 1, 5)}, priority=3, client="s1")
+        status = client.status(job_id)
+        assert status["state"] == QUEUED and status["position"] == 1 and status["priority"] == 3
+        assert service._jobs[job_id].recipe["start"] == date(2026, 1, 5)
+        assert client.cancel(job_id) and client.status(job_id)["state"] == CANCELLED
+
+    def test_queue_full_is_429(self, server):
+        _, client = server
+        client.submit({"n": 1}, client="s1")
+        client.submit({"n": 2}, client="s1")
+        with pytest.raises(QueueFullError):
+            client.submit({"n": 3}, client="s1")
+        assert client.health()["rejected"] == 1
+
+    def test_result_before_done_is_409(self, server):
+        _, client = server
+        job_id = client.submit({})
+        with pytest.raises(Exception, match="409"):
+            client.result(job_id)
+        with pytest.raises(Exception, match="404"):
+            client.status("no-existe")
+
+
+class TestWorkers:
+
+    def test_jobs_run_in_pool(self):
+        service = JobService(_no_data, workers=2, solve=_echo_solve).start()
+        try:
+            ok = service.submit({"x": 1})
+            bad = service.submit({"fail": True})
+            assert _wait_state(service, ok, (DONE, ERROR))["state"] == DONE
+            assert json.loads(service.result(ok)) == {"x": 1}
+            status = _wait_state(service, bad, (DONE, ERROR))
+            assert status["state"] == ERROR and "receta inválida" in status["error"]
+            assert service.result(bad) is None
+            assert service.stats()["done"] == 1 and service.stats()["failed"] == 1
+        finally:
+            service.shutdown()
+
+    def test_busy_workers_leave_jobs_queued(self):
+        service = JobService(_no_data, workers=1, solve=_echo_solve).start()
+        try:
+            slow = service.submit({"sleep": 0.5})
+            _wait_state(service, slow, ("running",))
+            waiting = service.submit({})
+            assert service.status(waiting)["state"] == QUEUED
+            assert _wait_state(service, waiting, (DONE,))["queue_s"] > 0
+        finally:
+            service.shutdown()
+
+    def test_broken_pool_on_submit_fails_the_job_and_recovers(self):
+        service = JobService(_no_data, workers=1, solve=_echo_solve).start()
+        real, service._pool = service._pool, _BrokenPool()
+        try:
+            lost = service.submit({"n": 1})
+            status = _wait_state(service, lost, (DONE, ERROR))
+            assert status["state"] == ERROR and "BrokenProcessPool" in status["error"]
+            # El siguiente trabajo corre en un pool nuevo
+            ok = service.submit({"n": 2})
+            assert _wait_state(service, ok, (DONE, ERROR))["state"] == DONE
+            assert service.stats()["running"] == 0 and service.stats()["failed"] == 1
+        finally:
+            real.shutdown()
+            service.shutdown()
+
+    def test_workers_reload_when_data_version_changes(self, tmp_path, monkeypatch):
+        path = tmp_path / "datos.txt"
+        path.write_text("v1")
+        monkeypatch.setenv("JOB_TEST_DATA", str(path))
+        service = JobService(_file_version, data_version=_file_version, workers=1, solve=_data_solve).start()
+        try:
+            first = service.submit({"n": 1})
+            _wait_state(service, first, (DONE,))
+            assert service.result(first) == b"v1"
+            path.write_text("v2")
+            second = service.submit({"n": 2})
+            _wait_state(service, second, (DONE,))
+            assert service.result(second) == b"v2"
+        finally:
+            service.shutdown()
+
+    def test_cancel_stops_a_running_job(self):
+        service = JobService(_no_data, workers=1, solve=_stoppable_solve).start()
+        try:
+            long = service.submit({"n": 1})
+            _wait_state(service, long, ("running",))
+            t0 = time.monotonic()
+            assert service.cancel(long) and service.status(long)["state"] == CANCELLED
+            # El proceso queda libre en la siguiente ventana, no al terminar el solve
+            nxt = service.submit({"n": 2})
+            assert _wait_state(service, nxt, ("running", DONE))
+            assert time.monotonic() - t0 < 5.0
+            assert service.status(long)["state"] == CANCELLED and service.result(long) is None
+            assert service.stats()["failed"] == 0
+        finally:
+            service.shutdown()
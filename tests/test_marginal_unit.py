@@ -0,0 +1,157 @@
+"""
+Tests for the vectorized marginal-unit identification (lib/marginal_unit.py).
+
+Run with:  pytest tests/test_marginal_unit.py -v
+"""
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+from app.lib.dispatch_result import STORAGE_SERIES, DispatchResult
+from app.lib.marginal_unit import STATUS_CLOSE, STATUS_FALLBACK, STATUS_NONE, identify_marginal_generator
+
+
+def _result(seed: int = 0, hours: int = 96, free: np.ndarray | None = None) -> DispatchResult:
+    """Bus SIN con 6 unidades + VoLL; precios tomados del CV de alguna unidad."""
+    rng = np.random.default_rng(seed)
+    names = np.asarray(["solar", "hydro", "ccgt_a", "ccgt_b", "ocgt", "diesel", "VoLL_SIN"])
+    mc = np.asarray([0, 8, 50, 50, 70, 100, 3000], dtype=np.float32)
+    p_nom = np.asarray([100, 80, 200, 150, 60, 40, 1e4], dtype=np.float32)
+    p_min_pu = np.asarray([0, 0, 0.3, 0.3, 0, 0, 0], dtype=np.float32)
+    solar = np.clip(np.sin(np.linspace(0, 8 * np.pi, hours)), 0, None).astype(np.float32)
+    avail = np.stack([solar], axis=1)
+
+    pmax = np.tile(p_nom, (hours, 1))
+    pmax[:, 0] *= solar
+    p = (rng.random((hours, 7)) * pmax).astype(np.float32)
+    # Algunas unidades pegadas a sus cotas y algunas horas sin generación
+    p[rng.random((hours, 7)) < 0.25] = 0.0
+    at_max = rng.random((hours, 7)) < 0.2
+    p[at_max] = pmax[at_max]
+    p[:, 6] = 0.0
+    p[::17, :] = 0.0
+    price = mc[rng.integers(0, 6, hours)] + rng.choice([0.0, 0.5, 5.0], hours).astype(np.float32)
+
+    g = len(names)
+    return DispatchResult(
+        snapshots=pd.date_range("2026-01-01", periods=hours, freq="h").values.astype("datetime64[ns]"),
+        gen_names=names,
+        gen_bus=np.full(g, "SIN"),
+        gen_carrier=np.asarray(["solar", "hydro", "gas_ccgt", "gas_ccgt", "gas_ocgt", "diesel_engine", "VoLL"]),
+        gen_p_nom=p_nom,
+        gen_marginal_cost=mc,
+        gen_p_min_pu=p_min_pu,
+        gen_p_max_pu=np.ones(g, dtype=np.float32),
+        gen_p=p,
+        avail_idx=np.asarray([0], dtype=np.int32),
+        avail=avail,
+        gen_free=np.packbits(free, axis=1) if free is not None else np.zeros((0, 0), dtype=np.uint8),
+        bus_names=np.asarray(["SIN"]),
+        price=price[:, None],
+        su_names=np.zeros(0, dtype=str),
+        su_bus=np.zeros(0, dtype=str),
+        su_p_nom=np.zeros(0, dtype=np.float32),
+        su_max_hours=np.zeros(0, dtype=np.float32),
+        su_series=np.zeros((len(STORAGE_SERIES), hours, 0), dtype=np.float32),
+        load_buses=np.asarray(["SIN"]),
+        load=np.ones((hours, 1), dtype=np.float32),
+        demand=np.ones((hours, 1), dtype=np.float32),
+        objective=0.0,
+        meta={},
+    )
+
+
+def _reference(res: DispatchResult, bus: str, tol_mw: float, tol_price: float) -> pd.DataFrame:
+    """Versión hora por hora que tenía la página (heurística por tolerancias)."""
+    gi = res.generators()
+    gens = gi.index[(gi["bus"] == bus) & (~gi.index.str.startswith("VoLL_"))].tolist()
+    dispatch = res.dispatch()[gens]
+    mc, p_nom, p_min_pu = gi.loc[gens, "marginal_cost"], gi.loc[gens, "p_nom"], gi.loc[gens, "p_min_pu"]
+    p_max_pu = res.p_max_pu(gens)
+    prices = res.marginal_price()
+    rows = []
+    for t in res.index:
+        sp = float(prices.loc[t, bus])
+        p_t = dispatch.loc[t]
+        pmax_t = p_nom * p_max_pu.loc[t]
+        pmin_t = p_nom * p_min_pu
+        active = p_t[p_t > tol_mw].index.tolist()
+        if not active:
+            rows.append({"snapshot": t, "shadow_price": sp, "marginal_generator": None,
+                         "carrier": None, "CV ($/MWh)": None, "status": "sin generación"})
+            continue
+        interior = [g for g in active
+                    if not p_t[g] <= pmin_t[g] + tol_mw and not p_t[g] >= pmax_t[g] - tol_mw]
+        close = [g for g in interior if abs(float(mc[g]) - sp) <= tol_price]
+        if close:
+            chosen, status = max(close, key=lambda g: mc[g]), "interior ~ precio"
+        elif interior:
+            chosen, status = min(interior, key=lambda g: abs(float(mc[g]) - sp)), "interior cercano"
+        else:
+            chosen, status = max(active, key=lambda g: mc[g]), "fallback más caro despachado"
+        rows.append({
+            "snapshot": t, "shadow_price": sp, "marginal_generator": chosen,
+            "carrier": gi.loc[chosen, "carrier"], "CV ($/MWh)": float(mc[chosen]),
+            "dispatch_MW": float(p_t[chosen]), "pmin_MW": float(pmin_t[chosen]),
+            "pmax_MW": float(pmax_t[chosen]),
+            "at_min": bool(p_t[chosen] <= pmin_t[chosen] + tol_mw),
+            "at_max": bool(p_t[chosen] >= pmax_t[chosen] - tol_mw),
+            "status": status,
+        })
+    return pd.DataFrame(rows).set_index("snapshot")
+
+
+class TestHeuristicParity:
+
+    def test_same_output_as_hourly_loop(self):
+        for seed in range(5):
+            res = _result(seed)
+            fast = identify_marginal_generator(res, "SIN", tol_mw=1.0, tol_price=2.0)
+            ref = _reference(res, "SIN", tol_mw=1.0, tol_price=2.0)
+            assert (fast.index == ref.index).all()
+            for col in ["marginal_generator", "carrier", "status"]:
+                assert fast[col].tolist() == ref[col].tolist(), (seed, col)
+            for col in ["shadow_price", "CV ($/MWh)", "dispatch_MW", "pmin_MW", "pmax_MW"]:
+                np.testing.assert_allclose(
+                    fast[col].astype(float), ref[col].astype(float), rtol=1e-6, equal_nan=True,
+                )
+            active = ref["status"] != "sin generación"
+            assert fast.loc[active, "at_max"].tolist() == ref.loc[active, "at_max"].tolist()
+
+    def test_idle_hours_and_unknown_bus(self):
+        res = _result(1)
+        out = identify_marginal_generator(res, "SIN")
+        idle = out.iloc[::17]
+        assert (idle["status"] == STATUS_NONE).all()
+        assert idle["marginal_generator"].isna().all() and idle["CV ($/MWh)"].isna().all()
+        assert identify_marginal_generator(res, "BCS").empty
+
+    def test_voll_is_never_marginal(self):
+        out = identify_marginal_generator(_result(2), "SIN")
+        assert "VoLL_SIN" not in set(out["marginal_generator"].dropna())
+
+
+class TestDuals:
+
+    def test_bound_duals_override_tolerances(self):
+        base = _result(3)
+        # Todas las unidades con una cota activa según el LP → nada es interior
+        pinned = _result(3, free=np.zeros(base.gen_p.shape, dtype=bool))
+        out = identify_marginal_generator(pinned, "SIN", tol_price=2.0)
+        assert set(out["status"]) <= {STATUS_FALLBACK, STATUS_NONE}
+        # Sin usar duales vuelve a la heurística
+        heur = identify_marginal_generator(pinned, "SIN", tol_price=2.0, use_duals=False)
+        pd.testing.assert_frame_equal(heur, identify_marginal_generator(base, "SIN", tol_price=2.0))
+
+    def test_free_unit_at_price_is_chosen(self):
+        hours = 96
+        free = np.zeros((hours, 7), dtype=bool)
+        free[:, 3] = True                                     # solo ccgt_b queda libre
+        res = _result(4, hours=hours, free=free)
+        res.gen_p[:, 3] = 100.0                               # despachada, lejos de sus cotas
+        res.price[:, 0] = 50.0
+        out = identify_marginal_generator(res, "SIN", tol_price=0.5)
+        busy = out["status"] != STATUS_NONE
+        assert (out.loc[busy, "marginal_generator"] == "ccgt_b").all()
+        assert (out.loc[busy, "status"] == STATUS_CLOSE).all()
@@ -0,0 +1,165 @@
+"""
+Tests for the forced-outage Monte Carlo engine (lib/outage_mc.py): mask
+sampling, bound masking and the streaming statistics.
+
+Run with:  pytest tests/test_outage_mc.py -v
+"""
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.lib.dispatch_model import SISTEMAS, DispatchData, recipe_generators, recipe_network
+from app.lib.outage_mc import (
+    MonteCarloStats,
+    SampleOutcome,
+    mask_bound,
+    outage_rates,
+    price_edges,
+    run_monte_carlo,
+    sample_masks,
+)
+from app.lib.scenarios import SCENARIOS, make_recipe
+from app.lib.synthetic import SyntheticSpec, make_catalog, make_demand, make_profiles
+
+IDX = pd.date_range("2026-01-05", periods=24, freq="h")
+RECIPE = {"scenario": "base", "costs": {"gas_ccgt": 50.0, "diesel_engine": 100.0}, "growth": False, "voll": 3000.0}
+GENS = pd.DataFrame(
+    {"bus": ["SIN", "SIN", "BCS", "SIN"], "carrier": ["gas_ccgt", "gas_ccgt", "diesel_engine", "shedding"],
+     "p_nom": [300.0, 300.0, 100.0, 1e6]},
+    index=["ccgt_1", "ccgt_2", "diesel_1", "VoLL_SIN"],
+)
+
+
+def _load_data() -> DispatchData:
+    demand = pd.DataFrame({"SIN": 400.0, "BCA": 0.0, "BCS": 50.0}, index=IDX)
+    return DispatchData(centrales=pd.DataFrame(), p_max_pu_raw=pd.DataFrame(), demand=demand)
+
+
+class _FakeModel:
+    """Despacho de mérito de juguete: lo que falta en el SIN se corta a VoLL."""
+
+    gen_table = GENS
+    gen_names = GENS.index
+
+    def __init__(self, data: DispatchData, recipe: dict, solver_options: dict | None = None) -> None:
+        self.demand = data.demand.to_numpy()
+
+    @staticmethod
+    def generators(data: DispatchData, recipe: dict) -> pd.DataFrame:
+        return GENS
+
+    def solve(self, available: np.ndarray) -> SampleOutcome:
+        cap = GENS["p_nom"].to_numpy()[:3] * available[:3]
+        sin_short = np.maximum(self.demand[:, 0] - cap[:2].sum(), 0.0)
+        bcs_short = np.maximum(self.demand[:, 2] - cap[2], 0.0)
+        shed = np.column_stack([sin_short, np.zeros(len(IDX)), bcs_short])
+        price = np.where(shed > 0, RECIPE["voll"], 50.0)
+        served = self.demand - shed
+        return SampleOutcome(objective=float((served * 50.0 + shed * RECIPE["voll"]).sum()), shed=shed, price=price)
+
+
+def _outcome(seed: int) -> SampleOutcome:
+    rng = np.random.default_rng(seed)
+    shed = np.where(rng.random((len(IDX), 3)) < 0.1, rng.random((len(IDX), 3)) * 10, 0.0)
+    return SampleOutcome(objective=float(rng.random() * 1e6), shed=shed, price=rng.random((len(IDX), 3)) * 150)
+
+
+class TestSampling:
+
+    def test_rates_by_carrier(self):
+        rates = outage_rates(GENS["carrier"], {"diesel_engine": 0.5})
+        assert rates[0] == 0.05 and rates[2] == 0.5 and rates[3] == 0.0
+        with pytest.raises(ValueError):
+            outage_rates(GENS["carrier"], {"gas_ccgt": 1.5})
+
+    def test_masks_follow_rates_and_seed(self):
+        rates = np.array([0.0, 0.2, 1.0])
+        masks = sample_masks(rates, 20_000, seed=3)
+        assert masks.shape == (20_000, 3)
+        assert masks[:, 0].all() and not masks[:, 2].any()
+        assert 1 - masks[:, 1].mean() == pytest.approx(0.2, abs=0.01)
+        assert (sample_masks(rates, 50, seed=3) == masks[:50]).all()
+
+    def test_mask_bound_zeroes_outaged_columns(self):
+        values = np.arange(12, dtype=float).reshape(4, 3)        # snapshot × generador
+        out = mask_bound(values, 1, np.array([True, False, True]))
+        assert (out[:, 1] == 0).all() and (out[:, [0, 2]] == values[:, [0, 2]]).all()
+        out_t = mask_bound(values.T, 0, np.array([True, False, True]))
+        assert (out_t == out.T).all()
+
+
+class TestStats:
+
+    def test_welford_matches_numpy(self):
+        stats = MonteCarloStats(IDX, price_edges(RECIPE))
+        rows = [stats.add(_outcome(i)) for i in range(30)]
+        frame = pd.DataFrame(rows)
+        summary = stats.summary()
+        np.testing.assert_allclose(summary["media"], frame.mean(), rtol=1e-10)
+        np.testing.assert_allclose(summary["desv"], frame.std(ddof=1), rtol=1e-8)
+        np.testing.assert_allclose(summary["max"], frame.max())
+
+    def test_merge_equals_sequential(self):
+        edges = price_edges(RECIPE)
+        whole, a, b = MonteCarloStats(IDX, edges), MonteCarloStats(IDX, edges), MonteCarloStats(IDX, edges)
+        for i in range(20):
+            whole.add(_outcome(i))
+            (a if i < 7 else b).add(_outcome(i))
+        a.add(None)
+        merged = a.merge(b)
+        assert merged.n == 20 and merged.failed == 1
+        pd.testing.assert_frame_equal(merged.summary(), whole.summary(), rtol=1e-9)
+        pd.testing.assert_frame_equal(merged.lolp(), whole.lolp())
+        pd.testing.assert_frame_equal(merged.price_quantiles(), whole.price_quantiles())
+
+    def test_price_quantiles_from_histogram(self):
+        stats = MonteCarloStats(IDX, price_edges(RECIPE))
+        for i in range(50):
+            stats.add(_outcome(i))
+        q = stats.price_quantiles((0.5, 0.9))
+        bin_w = 2 * 100.0 / 200
+        assert q.loc["SIN", "P50"] == pytest.approx(75.0, abs=5 + bin_w)
+        assert q.loc["SIN", "P90"] == pytest.approx(135.0, abs=5 + bin_w)
+
+
+class TestRun:
+
+    def test_streaming_run(self):
+        chunks = []
+        stats = run_monte_carlo(
+            _load_data, RECIPE, 40, rates={"gas_ccgt": 0.3, "diesel_engine": 0.5}, seed=1, chunk_size=16,
+            on_chunk=lambda rows, total: chunks.append((len(rows), total.n)), model_factory=_FakeModel,
+        )
+        assert chunks == [(16, 16), (16, 32), (8, 40)]
+        masks = sample_masks(outage_rates(GENS["carrier"], {"gas_ccgt": 0.3, "diesel_engine": 0.5}), 40, seed=1)
+        # Con un CCGT fuera faltan 100 MW en el SIN; sin diésel, 50 MW en BCS
+        expected_shed = ((~masks[:, :2]).sum(axis=1) * 300 - 200).clip(0) * 24 + (~masks[:, 2]) * 50 * 24
+        assert stats.summary().loc["Energía no servida (MWh)", "media"] == pytest.approx(expected_shed.mean())
+        assert stats.loss_of_load_probability == pytest.approx(np.mean(expected_shed > 0))
+        assert stats.lolp()["BCS"].iloc[0] == pytest.approx(np.mean(~masks[:, 2]))
+
+    def test_pool_matches_serial(self):
+        kwargs = dict(rates={"gas_ccgt": 0.3}, seed=5, chunk_size=4, model_factory=_FakeModel)
+        serial = run_monte_carlo(_load_data, RECIPE, 12, **kwargs)
+        pooled = run_monte_carlo(_load_data, RECIPE, 12, workers=2, **kwargs)
+        pd.testing.assert_frame_equal(pooled.summary(), serial.summary(), rtol=1e-9)
+
+
+class TestGenerators:
+
+    @pytest.mark.parametrize("key", list(SCENARIOS))
+    def test_table_matches_network(self, key):
+        spec = SyntheticSpec(n_plants=40, days=1, start=IDX[0].date())
+        catalog = make_catalog(spec)
+        demand = make_demand(spec).groupby(["snapshot", "sistema"])["demand_mw"].sum().unstack()[SISTEMAS]
+        data = DispatchData(centrales=catalog, p_max_pu_raw=make_profiles(catalog, spec), demand=demand)
+        recipe = make_recipe(SCENARIOS[key]["params"], scenario=key, growth=True)
+
+        table = recipe_generators(data, recipe)
+        network = recipe_network(data, recipe).generators[["bus", "carrier", "p_nom"]]
+        assert list(table.index) == list(network.index)
+        assert list(table["bus"]) == list(network["bus"])
+        assert list(table["carrier"]) == list(network["carrier"])
+        np.testing.assert_allclose(table["p_nom"], network["p_nom"])
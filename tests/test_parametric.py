@@ -0,0 +1,163 @@
+"""
+Tests for parametric single-parameter sweeps (lib/parametric.py): parameter
+parsing, objective-term mapping, warm-start chaining, the tidy curves and
+demand_mult parity with run_dispatch on a real LP.
+
+Run with:  pytest tests/test_parametric.py -v
+"""
+from __future__ import annotations
+
+from pathlib import Path
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.lib.dispatch_model import SISTEMAS, DispatchData, run_dispatch
+from app.lib.dispatch_result import DispatchResult
+from app.lib.parametric import (
+    COLUMNS,
+    ParametricModel,
+    objective_terms,
+    parametric_sweep,
+    parse_parameter,
+    scale_axis,
+    wide,
+)
+from app.lib.post_solve import derive_results
+from app.lib.scenarios import BASE_SCENARIO_KEY, SCENARIOS, make_recipe
+from app.lib.synthetic import SyntheticSpec, make_catalog, make_demand, make_profiles
+
+IDX = pd.date_range("2026-01-05", periods=24, freq="h")
+RECIPE = {"scenario": "base", "costs": {"gas_ccgt": 50.0}, "growth": False, "voll": 3000.0}
+
+
+def _result(demand: float, voll: float) -> DispatchResult:
+    """Un bus: 300 MW de CCGT a 50 $/MWh; lo que falta va a VoLL."""
+    served = min(demand, 300.0)
+    p = pd.DataFrame({"ccgt_1": served, "VoLL_SIN": demand - served}, index=IDX)
+    gens = pd.DataFrame(
+        {"bus": ["SIN", "SIN"], "carrier": ["gas_ccgt", "shedding"], "p_nom": [300.0, 1e6],
+         "marginal_cost": [50.0, voll], "p_min_pu": [0.0, 0.0], "p_max_pu": [1.0, 1.0]},
+        index=["ccgt_1", "VoLL_SIN"],
+    )
+    n = SimpleNamespace(
+        snapshots=IDX,
+        generators=gens,
+        generators_t=SimpleNamespace(p=p, p_max_pu=pd.DataFrame()),
+        buses_t=SimpleNamespace(marginal_price=pd.DataFrame({"SIN": voll if demand > 300 else 50.0}, index=IDX)),
+        storage_units=pd.DataFrame(columns=["bus", "p_nom", "max_hours"]),
+        storage_units_t=SimpleNamespace(p=pd.DataFrame()),
+        loads=pd.DataFrame({"bus": ["SIN"]}, index=["load_SIN"]),
+        loads_t=SimpleNamespace(p_set=pd.DataFrame({"load_SIN": demand}, index=IDX)),
+        objective=float((50.0 * served + voll * (demand - served)) * len(IDX)),
+    )
+    return derive_results(DispatchResult.from_network(n), voll=voll)
+
+
+class _FakeModel:
+    """Registra los archivos de base de cada punto; demanda de 320 MW."""
+
+    def __init__(self, data, recipe, solver_options=None) -> None:
+        self.calls: list[dict] = []
+        _FakeModel.last = self
+
+    def solve_point(self, name, value, basis_fn=None, warmstart_fn=None):
+        self.calls.append({"value": value, "basis": basis_fn, "warm": warmstart_fn})
+        if warmstart_fn:
+            assert Path(warmstart_fn).read_text() == "base"
+        if value < 0:
+            return None
+        if basis_fn:
+            Path(basis_fn).write_text("base")
+        if name == "voll":
+            return _result(320.0, value)
+        return _result(320.0 * value, RECIPE["voll"])
+
+
+class TestParameters:
+
+    def test_parse(self):
+        assert parse_parameter("voll") == ("voll", None)
+        assert parse_parameter("cost.wind") == ("cost", "onwind")
+        assert parse_parameter("demand_mult.BCS") == ("demand_mult", "BCS")
+        for bad in ("vol", "demand_mult.XYZ", "cost.", "voll.SIN"):
+            with pytest.raises(ValueError):
+                parse_parameter(bad)
+
+    def test_objective_terms_map_to_snapshot_and_generator(self):
+        labels = np.array([[10, 11, -1], [12, 13, -1]])     # 2 snapshots × 3 generadores
+        term_vars = np.array([13, 99, 10, 11])               # 99 = otra variable (batería)
+        terms, t, g = objective_terms(term_vars, labels)
+        assert terms.tolist() == [0, 2, 3]
+        assert t.tolist() == [1, 0, 0] and g.tolist() == [1, 0, 1]
+
+    def test_scale_axis(self):
+        values = np.ones((4, 3))
+        out = scale_axis(values, 1, np.array([1.0, 2.0, 0.5]))
+        assert out[:, 1].tolist() == [2.0] * 4 and out[:, 2].tolist() == [0.5] * 4
+        assert (scale_axis(values.T, 0, np.array([1.0, 2.0, 0.5])) == out.T).all()
+
+
+class TestSweep:
+
+    def test_voll_curve(self):
+        curves = parametric_sweep(None, RECIPE, "voll", [1_000, 5_000, 10_000], model_factory=_FakeModel)
+        assert list(curves.columns) == COLUMNS
+        total = wide(curves)
+        # 20 MW × 24 h de corte: el costo crece linealmente con VoLL
+        cost = total["Costo total ($M)"]
+        assert cost.loc[5_000.0] - cost.loc[1_000.0] == pytest.approx(20 * 24 * 4_000 / 1e6)
+        assert (total["Shedding (MWh)"] == 20 * 24).all()
+        sin = wide(curves, "SIN")
+        assert sin["Precio med. ($/MWh)"].tolist() == pytest.approx([1_000, 5_000, 10_000])
+
+    def test_warm_start_chain(self):
+        parametric_sweep(None, RECIPE, "demand_mult", [0.9, 1.0, 1.1], model_factory=_FakeModel)
+        calls = _FakeModel.last.calls
+        assert calls[0]["warm"] is None
+        # Cada punto parte de la base que dejó el anterior
+        assert [c["warm"] for c in calls[1:]] == [c["basis"] for c in calls[:-1]]
+
+    def test_failed_point_keeps_previous_basis(self):
+        curves = parametric_sweep(None, RECIPE, "voll", [1_000, -1, 2_000], model_factory=_FakeModel)
+        calls = _FakeModel.last.calls
+        assert curves.attrs["failed"] == [-1.0]
+        assert calls[2]["warm"] == calls[0]["basis"]
+        assert sorted(curves["valor"].unique()) == [1_000.0, 2_000.0]
+
+    def test_cold_and_stop(self):
+        seen = []
+        curves = parametric_sweep(
+            None, RECIPE, "voll", [1_000, 2_000, 3_000], warm_start=False, model_factory=_FakeModel,
+            progress=lambda d, t: seen.append(d), should_stop=lambda: len(seen) >= 2,
+        )
+        assert all(c["basis"] is None and c["warm"] is None for c in _FakeModel.last.calls)
+        assert seen == [1, 2] and sorted(curves["valor"].unique()) == [1_000.0, 2_000.0]
+
+
+@pytest.fixture(scope="module")
+def synthetic_model() -> tuple[DispatchData, dict, ParametricModel]:
+    """Un día de lib/synthetic.py: el SIN pasa de 100 componentes (su propio balance en PyPSA 1.x)."""
+    spec = SyntheticSpec(n_plants=130, days=1, start=IDX[0].date())
+    catalog = make_catalog(spec)
+    demand = make_demand(spec).groupby(["snapshot", "sistema"])["demand_mw"].sum().unstack()[SISTEMAS]
+    data = DispatchData(centrales=catalog, p_max_pu_raw=make_profiles(catalog, spec), demand=demand)
+    recipe = make_recipe(SCENARIOS[BASE_SCENARIO_KEY]["params"], scenario=BASE_SCENARIO_KEY)
+    return data, recipe, ParametricModel(data, recipe)
+
+
+class TestRealModel:
+
+    @pytest.mark.parametrize("name, scaled", [("demand_mult", SISTEMAS), ("demand_mult.SIN", ["SIN"])])
+    def test_demand_mult_matches_run_dispatch(self, synthetic_model, name, scaled):
+        data, recipe, model = synthetic_model
+        assert (model.n.generators["bus"] == "SIN").sum() > 100
+        point = model.solve_point(name, 1.2)
+
+        demand = data.demand.copy()
+        demand[scaled] *= 1.2
+        direct = run_dispatch(DispatchData(data.centrales, data.p_max_pu_raw, demand), recipe)
+        assert point.objective == pytest.approx(direct.objective, rel=1e-6)
+        assert point.objective > model.solve_point(name, 1.0).objective
@@ -0,0 +1,78 @@
+"""
+Tests for the per-phase timing / memory instrumentation (lib/perf.py).
+
+Run with:  pytest tests/test_perf.py -v
+"""
+from __future__ import annotations
+
+import io
+import json
+
+import pytest
+
+from app.lib import perf as perf_mod
+from app.lib.perf import PerfRecorder, maybe_span
+
+
+class TestSpans:
+
+    def test_nested_spans_are_recorded_with_depth(self):
+        perf = PerfRecorder()
+        with perf.span("outer"):
+            with perf.span("inner") as sp:
+                sp.record(rows=10, cols=20)
+        names = [s.name for s in perf.spans]
+        assert names == ["inner", "outer"]  # closing order
+        inner, outer = perf.spans
+        assert inner.depth == 1 and outer.depth == 0
+        assert outer.wall_s >= inner.wall_s >= 0.0
+        assert inner.extra == {"rows": 10, "cols": 20}
+        assert perf.total_s() == outer.wall_s  # only top-level spans count
+
+    def test_error_is_tagged_and_reraised(self):
+        perf = PerfRecorder()
+        with pytest.raises(ValueError):
+            with perf.span("boom"):
+                raise ValueError("x")
+        assert perf.spans[0].extra["error"] == "ValueError"
+
+    def test_tracemalloc_peak_covers_allocation(self):
+        perf = PerfRecorder(trace_python=True)
+        with perf.span("alloc"):
+            data = bytearray(8 * 1024 * 1024)
+            del data
+        assert perf.spans[0].py_peak_mb >= 7.5
+
+    def test_without_resource_module(self, monkeypatch):
+        # Windows: no hay `resource`; la memoria queda en None y el tiempo se mide igual
+        monkeypatch.setattr(perf_mod, "resource", None)
+        perf = PerfRecorder()
+        with perf.span("solve"):
+            pass
+        sp = perf.spans[0]
+        assert sp.peak_rss_mb is None and sp.rss_mb is None and sp.wall_s >= 0.0
+        assert perf.to_frame()["fase"].tolist() == ["solve"]
+
+    def test_maybe_span_without_recorder_is_noop(self):
+        with maybe_span(None, "nada") as sp:
+            assert sp is None
+
+
+class TestOutputs:
+
+    def test_json_lines_stream(self):
+        buf = io.StringIO()
+        perf = PerfRecorder(run_id="r1", stream=buf)
+        with perf.span("solve", status="ok"):
+            pass
+        line = json.loads(buf.getvalue().strip())
+        assert line["event"] == "perf_span"
+        assert line["run"] == "r1" and line["name"] == "solve" and line["status"] == "ok"
+
+    def test_frame_in_opening_order(self):
+        perf = PerfRecorder()
+        with perf.span("a"):
+            with perf.span("b"):
+                pass
+        df = perf.to_frame()
+        assert df["fase"].tolist() == ["a", "  b"]
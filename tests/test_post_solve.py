@@ -0,0 +1,166 @@
+"""
+Tests for the post-solve carrier/bus index (lib/post_solve.py).
+
+Run with:  pytest tests/test_post_solve.py -v
+"""
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.lib.metrics import CO2_FACTOR, VRE_CARRIERS
+from app.lib.dispatch_result import STORAGE_SERIES, DispatchResult
+from app.lib.post_solve import DerivedResults, PostSolveIndex, derive_results
+
+CARRIERS = ["solar", "onwind", "hydro", "gas_ccgt", "gas_ocgt", "diesel_engine"]
+
+
+def _result(seed: int = 0, hours: int = 48, gens: int = 60) -> DispatchResult:
+    rng = np.random.default_rng(seed)
+    bus = rng.choice(["SIN", "BCA", "BCS"], gens)
+    carrier = rng.choice(CARRIERS, gens)
+    names = np.asarray([f"{c}_{i}" for i, c in enumerate(carrier)] + ["VoLL_SIN", "VoLL_BCA", "VoLL_BCS"])
+    bus = np.concatenate([bus, ["SIN", "BCA", "BCS"]])
+    carrier = np.concatenate([carrier, ["VoLL"] * 3])
+    g = len(names)
+    p_nom = rng.uniform(10, 300, g).astype(np.float32)
+    vre = np.flatnonzero(np.isin(carrier, list(VRE_CARRIERS)))
+    avail = rng.random((hours, vre.size), dtype=np.float32)
+    p = (rng.random((hours, g), dtype=np.float32) * p_nom).astype(np.float32)
+    p[:, vre] = avail * p_nom[vre] * rng.uniform(0.5, 1.0, (hours, vre.size)).astype(np.float32)
+    return DispatchResult(
+        snapshots=pd.date_range("2026-05-01", periods=hours, freq="h").values.astype("datetime64[ns]"),
+        gen_names=names,
+        gen_bus=bus,
+        gen_carrier=carrier,
+        gen_p_nom=p_nom,
+        gen_marginal_cost=rng.uniform(0, 100, g).astype(np.float32),
+        gen_p_min_pu=np.zeros(g, dtype=np.float32),
+        gen_p_max_pu=np.ones(g, dtype=np.float32),
+        gen_p=p,
+        avail_idx=vre.astype(np.int32),
+        avail=avail,
+        gen_free=np.zeros((0, 0), dtype=np.uint8),
+        bus_names=np.asarray(["SIN", "BCA", "BCS"]),
+        price=rng.uniform(0, 80, (hours, 3)).astype(np.float32),
+        su_names=np.zeros(0, dtype=str),
+        su_bus=np.zeros(0, dtype=str),
+        su_p_nom=np.zeros(0, dtype=np.float32),
+        su_max_hours=np.zeros(0, dtype=np.float32),
+        su_series=np.zeros((len(STORAGE_SERIES), hours, 0), dtype=np.float32),
+        load_buses=np.asarray(["SIN", "BCA", "BCS"]),
+        load=np.ones((hours, 3), dtype=np.float32),
+        demand=np.ones((hours, 3), dtype=np.float32),
+        objective=1.0e6,
+        meta={},
+    )
+
+
+class TestAggregations:
+
+    def test_sums_match_pandas_groupby(self):
+        res = _result()
+        idx = PostSolveIndex.from_result(res)
+        gi = res.generators()
+        mwh = pd.Series(idx.energy(res), index=gi.index)
+        served = ~idx.is_voll
+
+        by_car = idx.sum_by_carrier(mwh.values, served)
+        ref = mwh[served].groupby(gi.loc[served, "carrier"]).sum()
+        pd.testing.assert_series_equal(by_car.sort_index(), ref.sort_index(), check_names=False)
+
+        by_bus = idx.sum_by_bus(gi["p_nom"].to_numpy(float), served)
+        ref_bus = gi.loc[served].groupby("bus")["p_nom"].sum()
+        np.testing.assert_allclose(by_bus[ref_bus.index], ref_bus, rtol=1e-6)
+
+        table = idx.sum_by_bus_carrier(mwh.values, served)
+        np.testing.assert_allclose(table.to_numpy().sum(), mwh[served].sum())
+
+    def test_carrier_series_matches_groupby(self):
+        res = _result(1)
+        idx = PostSolveIndex.from_result(res)
+        cols = np.flatnonzero(idx.on_bus("BCA") & ~idx.is_voll)
+        fast = idx.carrier_series(res.gen_p[:, cols], cols, index=res.index)
+        disp = res.dispatch().iloc[:, cols]
+        ref = disp.T.groupby(res.gen_carrier[cols]).sum().T
+        np.testing.assert_allclose(fast[ref.columns].to_numpy(), ref.to_numpy(), rtol=1e-5)
+
+    def test_masks_and_factors(self):
+        idx = PostSolveIndex.from_result(_result())
+        assert idx.is_voll.sum() == 3
+        assert not (idx.is_vre & idx.is_voll).any()
+        carriers = idx.carrier_labels[idx.carrier_codes]
+        np.testing.assert_allclose(idx.co2_factor, [CO2_FACTOR.get(c, 0.0) for c in carriers])
+        assert not idx.on_bus("XYZ").any()
+
+
+class TestCurtailment:
+
+    def test_curtailment_is_available_minus_dispatch(self):
+        res = _result(2)
+        idx = PostSolveIndex.from_result(res)
+        cols = idx.vre_positions(idx.on_bus("SIN"))
+        curt = idx.curtailment(res, cols)
+        avail = res.p_max_pu(res.gen_names[cols]).to_numpy() * res.gen_p_nom[cols]
+        np.testing.assert_allclose(curt, np.clip(avail - res.gen_p[:, cols], 0, None))
+        assert (curt >= 0).all()
+        assert idx.curtailment(res, np.zeros(0, dtype=int)).shape == (48, 0)
+
+    def test_extract_metrics_uses_the_index(self):
+        from app.lib.dispatch_model import extract_metrics
+
+        res = _result(3)
+        m = extract_metrics(res)
+        mwh = res.gen_p.sum(axis=0, dtype=np.float64)
+        voll = np.char.startswith(res.gen_names, "VoLL_")
+        assert m["Shedding (MWh)"] == pytest.approx(mwh[voll].sum())
+        assert m["Costo total ($M)"] == pytest.approx(1.0)
+        assert 0.0 <= m["% Renovable"] <= 100.0
+
+
+class TestDerivedResults:
+
+    def test_kpis_match_extract_metrics(self):
+        from app.lib.dispatch_model import extract_metrics
+
+        res = _result(4)
+        before = extract_metrics(res)
+        derive_results(res)
+        assert res.meta["kpis"]["metrics"] == pytest.approx(before)
+        assert extract_metrics(res) == res.meta["kpis"]["metrics"]
+
+    def test_panels_match_direct_computation(self):
+        res = derive_results(_result(5))
+        view = DerivedResults(res)
+        idx = PostSolveIndex.from_result(res)
+        mwh = idx.energy(res)
+
+        mix = view.mix("SIN")
+        ref = idx.sum_by_carrier(mwh, idx.on_bus("SIN") & ~idx.is_voll)
+        pd.testing.assert_series_equal(mix.sort_index(), ref.sort_index(), check_names=False)
+
+        disp = view.dispatch_by_carrier("BCS")
+        assert disp["shedding"].to_numpy() == pytest.approx(res.dispatch()["VoLL_BCS"].to_numpy())
+        assert disp.drop(columns="shedding").to_numpy().sum() == pytest.approx(view.mix("BCS").sum(), rel=1e-5)
+
+        sp = res.marginal_price()["BCA"]
+        np.testing.assert_allclose(view.price_duration("BCA"), sp.sort_values(ascending=False).to_numpy())
+        assert view.bus("BCA")["price_mean"] == pytest.approx(sp.mean())
+        assert view.kpis["curtailment_mwh"] == pytest.approx(
+            idx.curtailment(res, idx.vre_positions()).sum(dtype=float)
+        )
+
+    def test_derived_survives_serialization(self):
+        res = derive_results(_result(6))
+        back = DispatchResult.from_bytes(res.to_bytes())
+        assert sorted(back.derived) == sorted(res.derived)
+        np.testing.assert_array_equal(back.derived["curt/SIN"], res.derived["curt/SIN"])
+        assert back.meta["kpis"] == res.meta["kpis"]
+        assert res.nbytes > _result(6).nbytes
+
+    def test_view_derives_missing_results(self):
+        res = _result(7)
+        assert not res.derived
+        view = DerivedResults(res, voll=3000.0)
+        assert res.derived and view.kpis["voll_price"] == pytest.approx(float(res.gen_marginal_cost[-3:].max()))
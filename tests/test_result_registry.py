@@ -0,0 +1,112 @@
+"""
+Tests for the process-wide, memory-budgeted result registry (lib/result_registry.py).
+
+Run with:  pytest tests/test_result_registry.py -v
+"""
+from __future__ import annotations
+
+import numpy as np
+
+from app.lib.dispatch_result import STORAGE_SERIES, DispatchResult
+from app.lib.result_registry import ResultRegistry
+
+MB = 1024**2
+
+
+def _result(hours: int = 1000, gens: int = 250, seed: int = 0) -> DispatchResult:
+    """Resultado de ~1 MB (hours × gens float32) sin pasar por PyPSA."""
+    rng = np.random.default_rng(seed)
+    names = np.asarray([f"g{i}" for i in range(gens)])
+    return DispatchResult(
+        snapshots=np.arange(hours).astype("datetime64[h]").astype("datetime64[ns]"),
+        gen_names=names,
+        gen_bus=np.full(gens, "SIN"),
+        gen_carrier=np.full(gens, "gas_ccgt"),
+        gen_p_nom=np.full(gens, 100, dtype=np.float32),
+        gen_marginal_cost=np.full(gens, 50, dtype=np.float32),
+        gen_p_min_pu=np.zeros(gens, dtype=np.float32),
+        gen_p_max_pu=np.ones(gens, dtype=np.float32),
+        gen_p=rng.random((hours, gens), dtype=np.float32),
+        avail_idx=np.zeros(0, dtype=np.int32),
+        avail=np.zeros((hours, 0), dtype=np.float32),
+        gen_free=np.zeros((0, 0), dtype=np.uint8),
+        bus_names=np.asarray(["SIN"]),
+        price=np.zeros((hours, 1), dtype=np.float32),
+        su_names=np.zeros(0, dtype=str),
+        su_bus=np.zeros(0, dtype=str),
+        su_p_nom=np.zeros(0, dtype=np.float32),
+        su_max_hours=np.zeros(0, dtype=np.float32),
+        su_series=np.zeros((len(STORAGE_SERIES), hours, 0), dtype=np.float32),
+        load_buses=np.asarray(["SIN"]),
+        load=np.ones((hours, 1), dtype=np.float32),
+        demand=np.ones((hours, 1), dtype=np.float32),
+        objective=float(seed),
+        meta={"seed": seed},
+    )
+
+
+class TestBudget:
+
+    def test_least_recently_viewed_is_evicted(self):
+        reg = ResultRegistry(budget_bytes=int(2.5 * MB))
+        a, b = reg.put(_result(seed=1)), reg.put(_result(seed=2))
+        assert reg.get(a) is not None          # a pasa a ser el más reciente
+        c = reg.put(_result(seed=3))
+        assert reg.get(b) is None              # b era el menos visto → descartado
+        assert reg.get(a).meta == {"seed": 1}
+        assert reg.get(c) is not None
+        assert reg.memory_bytes() <= reg.budget_bytes
+        assert reg.stats()["dropped"] == 1
+
+    def test_new_result_kept_even_if_over_budget(self):
+        reg = ResultRegistry(budget_bytes=MB // 2)
+        key = reg.put(_result())
+        assert reg.get(key) is not None
+        assert reg.stats()["in_memory"] == 1
+
+    def test_put_with_existing_key_replaces(self):
+        reg = ResultRegistry(budget_bytes=10 * MB)
+        key = reg.put(_result(seed=1))
+        reg.put(_result(seed=2), key=key)
+        assert reg.get(key).objective == 2.0
+        assert reg.stats()["in_memory"] == 1
+
+    def test_shared_result_counted_once(self):
+        # Un solve compartido queda bajo la clave de cada sesión
+        reg = ResultRegistry(budget_bytes=int(1.5 * MB))
+        res = _result()
+        a, b = reg.put(res), reg.put(res)
+        assert reg.memory_bytes() == res.nbytes
+        assert reg.get(a) is reg.get(b) and reg.stats()["dropped"] == 0
+
+
+class TestSpill:
+
+    def test_evicted_result_reloads_from_disk(self, tmp_path):
+        reg = ResultRegistry(budget_bytes=int(1.5 * MB), spill_dir=tmp_path)
+        first = _result(seed=1)
+        a = reg.put(first)
+        reg.put(_result(seed=2))
+        assert reg.stats()["on_disk"] == 1 and len(list(tmp_path.glob("*.npz"))) == 1
+
+        back = reg.get(a)
+        np.testing.assert_array_equal(back.gen_p, first.gen_p)
+        assert back.meta == {"seed": 1}
+        stats = reg.stats()
+        assert stats["reloads"] == 1 and stats["spilled"] == 2  # recargar a expulsa al otro
+
+    def test_spill_budget_drops_oldest_file(self, tmp_path):
+        reg = ResultRegistry(budget_bytes=MB // 2, spill_dir=tmp_path, spill_bytes=int(1.5 * MB))
+        keys = [reg.put(_result(seed=s)) for s in range(4)]
+        assert reg.stats()["on_disk"] == 1     # solo cabe un volcado
+        assert reg.get(keys[0]) is None
+        assert reg.get(keys[2]) is not None
+
+    def test_discard_removes_spilled_file(self, tmp_path):
+        reg = ResultRegistry(budget_bytes=MB // 2, spill_dir=tmp_path)
+        a = reg.put(_result(seed=1))
+        reg.put(_result(seed=2))
+        assert a in reg
+        reg.discard(a)
+        assert a not in reg
+        assert not list(tmp_path.glob("*.npz"))
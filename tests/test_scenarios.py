@@ -0,0 +1,74 @@
+"""
+Tests for the scenario presets, recipes and input loaders
+(lib/scenarios.py, lib/dispatch_data.py).
+
+Run with:  pytest tests/test_scenarios.py -v
+"""
+from __future__ import annotations
+
+from datetime import date
+
+import pandas as pd
+import pytest
+
+from app.lib.dispatch_data import demand_by_system, load_generators
+from app.lib.dispatch_model import DEFAULT_COSTS, VOLL_DEFAULT, compute_effective_costs
+from app.lib.scenarios import BASE_SCENARIO_KEY, SCENARIOS, make_recipe, resolve_scenario
+
+
+class TestRecipes:
+
+    def test_base_recipe_has_no_modifiers(self):
+        r = make_recipe(SCENARIOS[BASE_SCENARIO_KEY]["params"], scenario=BASE_SCENARIO_KEY)
+        assert r["costs"] == {c: float(v) for c, v in DEFAULT_COSTS.items()}
+        assert r["voll"] == VOLL_DEFAULT
+        assert r["demand_mult"] is None and r["capacity_mult"] is None
+        assert r["forced_outage"] is None and r["battery_config"] is None
+
+    def test_scenario_params_are_resolved(self):
+        fuel = make_recipe(SCENARIOS[resolve_scenario("fuel price")]["params"])
+        assert fuel["costs"]["gas_ccgt"] == DEFAULT_COSTS["gas_ccgt"] + 30
+        outage = make_recipe(SCENARIOS[resolve_scenario("forced outage")]["params"])
+        assert outage["forced_outage"]["system"] == "BCS" and outage["voll"] == 5000
+        storage = SCENARIOS[resolve_scenario("storage")]["params"]
+        assert make_recipe(storage)["battery_config"] is storage
+
+    def test_page_overrides_win(self):
+        params = SCENARIOS[resolve_scenario("fuel price")]["params"]
+        r = make_recipe(params, costs={"gas_ccgt": 1.0}, voll=1234, start=date(2026, 1, 1), growth=True)
+        assert r["costs"] == {"gas_ccgt": 1.0} and r["voll"] == 1234.0
+        assert r["start"] == date(2026, 1, 1) and r["end"] is None and r["growth"] is True
+        assert compute_effective_costs(params)["gas_ccgt"] != 1.0
+
+    def test_resolve_scenario(self):
+        assert resolve_scenario(BASE_SCENARIO_KEY) == BASE_SCENARIO_KEY
+        assert resolve_scenario("VOLL ALTO") in SCENARIOS
+        with pytest.raises(KeyError):
+            resolve_scenario("voll")           # ambiguo: alto y bajo
+        with pytest.raises(KeyError):
+            resolve_scenario("no existe")
+
+
+class TestLoaders:
+
+    def test_generators_bus_aliases(self, tmp_path):
+        path = tmp_path / "centrales.csv"
+        pd.DataFrame({
+            "name": ["a", "b", "c", "d"],
+            "bus": [" sin", "BSA", "Mugele", "XYZ"],
+            "carrier": ["solar"] * 4,
+            "p_nom": [1.0, 2.0, 3.0, 4.0],
+        }).to_csv(path, index=False)
+        gens = load_generators(path)
+        assert gens["bus"].tolist() == ["SIN", "BCA", "BCS"]
+
+    def test_demand_by_system_fills_missing(self):
+        snaps = pd.date_range("2026-01-01", periods=3, freq="h")
+        raw = pd.DataFrame({
+            "snapshot": list(snaps) * 2,
+            "zona": ["SIN"] * 3 + ["BCA"] * 3,
+            "demand_mw": [1.0, 2.0, 3.0, 4.0, 5.0, 6.0],
+        })
+        wide = demand_by_system(raw)
+        assert wide.columns.tolist() == ["SIN", "BCA", "BCS"]
+        assert (wide["BCS"] == 0.0).all() and wide["BCA"].tolist() == [4.0, 5.0, 6.0]
@@ -0,0 +1,171 @@
+"""
+Tests for cost-sensitivity ranging (lib/sensitivity.py): bound statuses,
+stable ranges per carrier, the 100 % rule and re-pricing without a solve
+(also against a real re-solve of lib/synthetic.py data).
+
+Run with:  pytest tests/test_sensitivity.py -v
+"""
+from __future__ import annotations
+
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.lib.dispatch_model import SISTEMAS, DispatchData, run_dispatch
+from app.lib.dispatch_result import DispatchResult
+from app.lib.scenarios import BASE_SCENARIO_KEY, SCENARIOS, make_recipe
+from app.lib.sensitivity import (
+    DOWN,
+    ENERGY,
+    HOURS,
+    UP,
+    bound_status,
+    carrier_ranges,
+    cost_ranges,
+    reprice,
+    stable_change,
+)
+from app.lib.synthetic import SyntheticSpec, make_catalog, make_demand, make_profiles
+
+IDX = pd.date_range("2026-01-05", periods=24, freq="h")
+COSTS = {"hydro": 10.0, "gas_ccgt": 50.0, "gas_ocgt": 80.0, "solar": 0.0}
+VOLL = 3000.0
+
+
+def _result(duals: bool = True, storage: bool = False) -> DispatchResult:
+    """
+    Un bus con 350 MW de demanda: hidro (100 MW) al tope, la CCGT (300 MW)
+    marca 50 $/MWh con 250 MW, la OCGT apagada; la FV solo tiene recurso de
+    día y va al tope.
+    """
+    solar_pu = np.where((IDX.hour >= 8) & (IDX.hour < 18), 0.5, 0.0)
+    p = pd.DataFrame({
+        "hydro_1": 100.0, "ccgt_1": 250.0 - 50.0 * solar_pu, "ocgt_1": 0.0,
+        "pv_1": 100.0 * solar_pu, "VoLL_SIN": 0.0,
+    }, index=IDX)
+    gens = pd.DataFrame(
+        {"bus": "SIN", "carrier": ["hydro", "gas_ccgt", "gas_ocgt", "solar", "shedding"],
+         "p_nom": [100.0, 300.0, 100.0, 100.0, 1e6],
+         "marginal_cost": [COSTS["hydro"], COSTS["gas_ccgt"], COSTS["gas_ocgt"], COSTS["solar"], VOLL],
+         "p_min_pu": 0.0, "p_max_pu": 1.0},
+        index=p.columns,
+    )
+    t = SimpleNamespace(p=p, p_max_pu=pd.DataFrame({"pv_1": solar_pu}, index=IDX))
+    if duals:
+        # Solo la CCGT queda sin cota activa
+        t.mu_upper = pd.DataFrame(0.0, index=IDX, columns=p.columns).assign(hydro_1=-40.0, pv_1=-50.0)
+        t.mu_lower = pd.DataFrame(0.0, index=IDX, columns=p.columns).assign(ocgt_1=30.0, VoLL_SIN=2950.0)
+    su = pd.DataFrame({"bus": ["SIN"], "p_nom": [50.0], "max_hours": [4.0]}, index=["bess_1"]) if storage \
+        else pd.DataFrame(columns=["bus", "p_nom", "max_hours"])
+    n = SimpleNamespace(
+        snapshots=IDX,
+        generators=gens,
+        generators_t=t,
+        buses_t=SimpleNamespace(marginal_price=pd.DataFrame({"SIN": 50.0}, index=IDX)),
+        storage_units=su,
+        storage_units_t=SimpleNamespace(p=pd.DataFrame(0.0, index=IDX, columns=su.index)),
+        loads=pd.DataFrame({"bus": ["SIN"]}, index=["load_SIN"]),
+        loads_t=SimpleNamespace(p_set=pd.DataFrame({"load_SIN": 350.0}, index=IDX)),
+        objective=float((p.to_numpy() * gens["marginal_cost"].to_numpy()).sum()),
+    )
+    return DispatchResult.from_network(n)
+
+
+def _ranges(res: DispatchResult) -> pd.DataFrame:
+    return carrier_ranges(cost_ranges(res))
+
+
+class TestRanges:
+
+    def test_status(self):
+        free, upper, lower = bound_status(_result())
+        day = (IDX.hour >= 8) & (IDX.hour < 18)
+        assert free[:, 1].all() and not free[:, [0, 2, 3]].any()
+        assert upper[:, 0].all() and lower[:, 2].all()
+        # FV sin recurso: cotas iguales, no entra en ninguna condición
+        assert not (upper[~day, 3] | lower[~day, 3]).any() and upper[day, 3].all()
+
+    @pytest.mark.parametrize("duals", [True, False])
+    def test_ranges(self, duals):
+        ranges = _ranges(_result(duals=duals))
+        # La CCGT marca precio: baja hasta la hidro (10) y sube hasta la OCGT (80)
+        assert ranges.at["gas_ccgt", DOWN] == pytest.approx(-40.0)
+        assert ranges.at["gas_ccgt", UP] == pytest.approx(30.0)
+        assert ranges.at["gas_ccgt", HOURS] == 24
+        assert ranges.at["hydro", UP] == pytest.approx(40.0) and ranges.at["hydro", DOWN] == -np.inf
+        assert ranges.at["gas_ocgt", DOWN] == pytest.approx(-30.0) and ranges.at["gas_ocgt", UP] == np.inf
+        assert ranges.at["solar", UP] == pytest.approx(50.0)
+        assert ranges.at["gas_ccgt", ENERGY] == pytest.approx(250.0 * 24 - 50.0 * 0.5 * 10)
+        assert "shedding" not in ranges.index
+
+    def test_storage_freezes_price_setter(self):
+        ranges = _ranges(_result(storage=True))
+        assert ranges.at["gas_ccgt", DOWN] == 0.0 and ranges.at["gas_ccgt", UP] == 0.0
+        assert ranges.at["hydro", UP] == pytest.approx(40.0)
+
+
+class TestStableChange:
+
+    def test_hundred_percent_rule(self):
+        ranges = _ranges(_result())
+        up = {**COSTS, "gas_ccgt": 75.0}
+        assert stable_change(ranges, COSTS, up)
+        assert not stable_change(ranges, COSTS, {**COSTS, "gas_ccgt": 85.0})
+        # 15/30 + 10/30 ≤ 1, 20/30 + 20/30 > 1
+        assert stable_change(ranges, COSTS, {**COSTS, "gas_ccgt": 65.0, "gas_ocgt": 70.0})
+        assert not stable_change(ranges, COSTS, {**COSTS, "gas_ccgt": 70.0, "gas_ocgt": 60.0})
+        # Tecnología sin unidades en el resultado: no importa
+        assert stable_change(ranges, COSTS, {**COSTS, "coal": 999.0})
+        assert not stable_change(ranges, COSTS, {"gas_ccgt": 50.0})
+
+
+class TestReprice:
+
+    def test_price_and_objective(self):
+        res = _result()
+        new = reprice(res, {**COSTS, "gas_ccgt": 60.0, "hydro": 20.0}, voll=VOLL)
+        energy = res.gen_p.astype(float).sum(axis=0)
+        assert (new.price == 60.0).all() and (res.price == 50.0).all()
+        assert new.objective == pytest.approx(res.objective + 10.0 * energy[1] + 10.0 * energy[0])
+        assert np.array_equal(new.gen_p, res.gen_p)
+        assert new.meta["repriced"] == {"gas_ccgt": 10.0, "hydro": 10.0}
+        assert new.meta["kpis"]["by_bus"]["SIN"]["price_mean"] == pytest.approx(60.0)
+
+    def test_unchanged_costs_round_trip(self):
+        res = _result(duals=False)
+        new = reprice(res, COSTS)
+        assert new.objective == pytest.approx(res.objective)
+        assert np.array_equal(new.price, res.price) and new.meta["repriced"] == {}
+
+
+@pytest.fixture(scope="module")
+def synthetic_dispatch() -> tuple[DispatchData, dict, DispatchResult]:
+    """Un día de lib/synthetic.py resuelto con la receta base."""
+    spec = SyntheticSpec(n_plants=40, days=1, start=IDX[0].date())
+    catalog = make_catalog(spec)
+    demand = make_demand(spec).groupby(["snapshot", "sistema"])["demand_mw"].sum().unstack()[SISTEMAS]
+    data = DispatchData(centrales=catalog, p_max_pu_raw=make_profiles(catalog, spec), demand=demand)
+    recipe = make_recipe(SCENARIOS[BASE_SCENARIO_KEY]["params"], scenario=BASE_SCENARIO_KEY)
+    return data, recipe, run_dispatch(data, recipe)
+
+
+class TestRealDispatch:
+
+    def test_reprice_matches_run_dispatch(self, synthetic_dispatch):
+        data, recipe, res = synthetic_dispatch
+        ranges = carrier_ranges(cost_ranges(res))
+        assert len(ranges) > 0
+        for carrier in ranges.index:
+            up, down = ranges.at[carrier, UP], ranges.at[carrier, DOWN]
+            # 90 % del rango, hacia donde haya margen
+            delta = 0.9 * up if 0 < up < np.inf else 0.9 * down
+            assert np.isfinite(delta) and delta != 0, carrier
+            costs = {**recipe["costs"], carrier: recipe["costs"][carrier] + delta}
+            assert stable_change(ranges, recipe["costs"], costs), carrier
+
+            new = reprice(res, costs, voll=recipe["voll"])
+            direct = run_dispatch(data, {**recipe, "costs": costs})
+            assert new.objective == pytest.approx(direct.objective, rel=1e-6), carrier
+            np.testing.assert_allclose(new.price, direct.price, atol=1e-3, err_msg=carrier)
@@ -0,0 +1,170 @@
+"""
+Tests for single-flight solve coalescing (lib/single_flight.py).
+
+Run with:  pytest tests/test_single_flight.py -v
+"""
+from __future__ import annotations
+
+import threading
+import time
+
+import pytest
+
+from app.lib.dispatch_model import STOP_CANCELLED, SolveInterrupted
+from app.lib.result_registry import ResultRegistry
+from app.lib.single_flight import SingleFlight, recipe_key
+
+
+def _blocking(release: threading.Event, calls: list, value="ok"):
+    """fn de solve que espera `release` y cuenta sus ejecuciones."""
+    def fn(progress, should_stop):
+        calls.append(should_stop)
+        progress(1, 2)
+        release.wait(5)
+        return value
+    return fn
+
+
+class _Sized:
+    """Valor con tamaño para el presupuesto del registro."""
+
+    def __init__(self, nbytes: int) -> None:
+        self.nbytes = nbytes
+
+
+def _in_thread(target) -> tuple[threading.Thread, dict]:
+    out: dict = {}
+
+    def run():
+        try:
+            out["value"] = target()
+        except BaseException as e:
+            out["error"] = e
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread, out
+
+
+def _wait_for(cond, timeout: float = 5.0) -> None:
+    t0 = time.monotonic()
+    while not cond():
+        if time.monotonic() - t0 > timeout:
+            raise AssertionError("la condición no se cumplió a tiempo")
+        time.sleep(0.01)
+
+
+class TestRecipeKey:
+
+    def test_equivalent_recipes_share_key(self):
+        a = {"scenario": "base", "costs": {"gas_ccgt": 80, "coal": 40.5}, "growth": False}
+        b = {"growth": False, "costs": {"coal": 40.5, "gas_ccgt": 80.0}, "scenario": "base"}
+        assert recipe_key(a) == recipe_key(b)
+
+    def test_time_budget_is_not_in_key(self):
+        assert recipe_key({"voll": 3000, "time_budget_s": 30.0}) == recipe_key({"voll": 3000, "time_budget_s": None})
+
+    def test_different_recipes_differ(self):
+        assert recipe_key({"voll": 3000}) != recipe_key({"voll": 3001})
+        assert recipe_key({"growth": True}) != recipe_key({"growth": 1})
+
+
+class TestSingleFlight:
+
+    def test_concurrent_calls_run_once(self):
+        flight, release, calls = SingleFlight(), threading.Event(), []
+        t1, out1 = _in_thread(lambda: flight.do("k", _blocking(release, calls)))
+        _wait_for(lambda: calls)
+        t2, out2 = _in_thread(lambda: flight.do("k", _blocking(release, calls)))
+        _wait_for(lambda: flight.stats()["shared"] == 1)
+        release.set()
+        t1.join(5), t2.join(5)
+        assert len(calls) == 1
+        assert out1["value"] == ("ok", False) and out2["value"] == ("ok", True)
+
+    def test_errors_are_shared(self):
+        flight, release = SingleFlight(), threading.Event()
+
+        def fail(progress, should_stop):
+            release.wait(5)
+            raise ValueError("solver caído")
+
+        t1, out1 = _in_thread(lambda: flight.do("k", fail))
+        t2, out2 = _in_thread(lambda: flight.do("k", fail))
+        _wait_for(lambda: flight.stats()["shared"] == 1)
+        release.set()
+        t1.join(5), t2.join(5)
+        assert isinstance(out1["error"], ValueError) and isinstance(out2["error"], ValueError)
+        # Un error no se reutiliza: la siguiente llamada vuelve a ejecutar
+        assert flight.do("k", lambda p, s: "otra vez") == ("otra vez", False)
+
+    def test_follower_cancel_does_not_stop_leader(self):
+        flight, release, calls = SingleFlight(), threading.Event(), []
+        t1, out1 = _in_thread(lambda: flight.do("k", _blocking(release, calls)))
+        _wait_for(lambda: calls)
+        with pytest.raises(SolveInterrupted) as err:
+            flight.do("k", _blocking(release, calls), should_stop=lambda: True)
+        assert err.value.reason == STOP_CANCELLED
+        # El líder sigue: no todos los participantes pidieron parar
+        assert not calls[0]()
+        release.set()
+        t1.join(5)
+        assert out1["value"] == ("ok", False)
+
+    def test_leader_cancel_stops_its_own_wait(self):
+        flight, release, calls = SingleFlight(), threading.Event(), []
+        stop = threading.Event()
+        t1, out1 = _in_thread(lambda: flight.do("k", _blocking(release, calls), should_stop=stop.is_set))
+        _wait_for(lambda: calls)
+        t2, out2 = _in_thread(lambda: flight.do("k", _blocking(release, calls)))
+        _wait_for(lambda: flight.stats()["shared"] == 1)
+        stop.set()
+        t1.join(5)
+        # El líder deja de esperar sin que el solve termine; el otro lo sigue recibiendo
+        assert isinstance(out1["error"], SolveInterrupted) and not release.is_set()
+        assert not calls[0]()
+        release.set()
+        t2.join(5)
+        assert out2["value"] == ("ok", True)
+
+    def test_shared_solve_stops_when_everyone_stops(self):
+        flight, release, calls = SingleFlight(), threading.Event(), []
+        stop = threading.Event()
+        t1, _ = _in_thread(lambda: flight.do("k", _blocking(release, calls), should_stop=stop.is_set))
+        _wait_for(lambda: calls)
+        assert not calls[0]()
+        stop.set()
+        assert calls[0]()
+        release.set()
+        t1.join(5)
+
+    def test_finished_result_is_kept(self):
+        flight, calls = SingleFlight(keep_s=60.0), []
+        release = threading.Event()
+        release.set()
+        assert flight.do("k", _blocking(release, calls)) == ("ok", False)
+        assert flight.do("k", _blocking(release, calls)) == ("ok", True)
+        assert len(calls) == 1
+        assert SingleFlight(keep_s=0.0).do("k", lambda p, s: 1) == (1, False)
+
+    def test_keep_if_rejects_result(self):
+        flight, calls = SingleFlight(keep_s=60.0), []
+        release = threading.Event()
+        release.set()
+        flight.do("k", _blocking(release, calls, value="parcial"), keep_if=lambda v: v != "parcial")
+        flight.do("k", _blocking(release, calls, value="parcial"), keep_if=lambda v: v != "parcial")
+        assert len(calls) == 2 and flight.stats()["in_flight"] == 0
+
+    def test_kept_value_counts_in_registry(self):
+        registry = ResultRegistry(budget_bytes=100)
+        flight, calls = SingleFlight(keep_s=60.0, registry=registry), []
+        release = threading.Event()
+        release.set()
+        value = _Sized(60)
+        assert flight.do("k", _blocking(release, calls, value=value)) == (value, False)
+        assert registry.memory_bytes() == 60
+        assert flight.do("k", _blocking(release, calls, value=value)) == (value, True)
+        # El registro lo expulsa por presupuesto: la siguiente petición vuelve a resolver
+        registry.put(_Sized(60))
+        assert flight.do("k", _blocking(release, calls, value=value)) == (value, False)
+        assert len(calls) == 2
@@ -0,0 +1,198 @@
+"""
+Tests for background solves (lib/solve_task.py) and the rolling-window /
+time-budget path of dispatch_model.run_dispatch.
+
+Run with:  pytest tests/test_solve_task.py -v
+"""
+from __future__ import annotations
+
+import threading
+import time
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.lib import dispatch_model
+from app.lib.dispatch_model import (
+    STOP_BUDGET,
+    STOP_CANCELLED,
+    DispatchData,
+    SolveInterrupted,
+    build_and_solve,
+    demand_windows,
+    run_dispatch,
+)
+from app.lib.solve_task import DONE, FAILED, SolveTask
+
+DAYS = 3
+IDX = pd.date_range("2026-01-05", periods=24 * DAYS, freq="h")
+RECIPE = {"scenario": "base", "costs": {}, "growth": False, "voll": 3000.0}
+
+
+def _data() -> DispatchData:
+    demand = pd.DataFrame({"SIN": np.linspace(100, 200, len(IDX)), "BCA": 0.0, "BCS": 0.0}, index=IDX)
+    return DispatchData(centrales=pd.DataFrame(), p_max_pu_raw=pd.DataFrame(), demand=demand)
+
+
+def _network(dem: pd.DataFrame, condition: str = "optimal") -> SimpleNamespace:
+    """Red 'resuelta' de un bus: gas cubre la demanda del SIN, VoLL en cero."""
+    idx = dem.index
+    gens = pd.DataFrame(
+        {"bus": ["SIN", "SIN"], "carrier": ["gas_ccgt", "load_shedding"], "p_nom": [500.0, 1e4],
+         "marginal_cost": [50.0, 3000.0], "p_min_pu": [0.0, 0.0], "p_max_pu": [1.0, 1.0]},
+        index=["ccgt_1", "VoLL_SIN"],
+    )
+    p = pd.DataFrame({"ccgt_1": dem["SIN"].to_numpy(), "VoLL_SIN": 0.0}, index=idx)
+    return SimpleNamespace(
+        snapshots=idx,
+        generators=gens,
+        generators_t=SimpleNamespace(p=p, p_max_pu=pd.DataFrame()),
+        buses_t=SimpleNamespace(marginal_price=pd.DataFrame({"SIN": 50.0}, index=idx)),
+        storage_units=pd.DataFrame(columns=["bus", "p_nom", "max_hours"]),
+        storage_units_t=SimpleNamespace(p=pd.DataFrame()),
+        loads=pd.DataFrame({"bus": ["SIN"]}, index=["load_SIN"]),
+        loads_t=SimpleNamespace(p_set=dem[["SIN"]].rename(columns={"SIN": "load_SIN"})),
+        objective=float(50.0 * dem["SIN"].sum()),
+        model=SimpleNamespace(status="ok" if condition == "optimal" else "warning",
+                              termination_condition=condition),
+    )
+
+
+@pytest.fixture
+def solves(monkeypatch):
+    """Sustituye build_and_solve; registra las opciones de HiGHS de cada ventana."""
+    calls: list[dict] = []
+
+    def fake(centrales, p_max_pu_raw, dem, *args, solver_options=None, **kwargs):
+        calls.append(dict(solver_options or {}))
+        return _network(dem)
+
+    monkeypatch.setattr(dispatch_model, "build_and_solve", fake)
+    return calls
+
+
+class TestWindows:
+
+    def test_demand_windows(self):
+        dem = _data().demand
+        assert len(demand_windows(dem)) == 1
+        windows = demand_windows(dem, 2)
+        assert [len(w) for w in windows] == [48, 24]
+        pd.testing.assert_frame_equal(pd.concat(windows), dem)
+
+    def test_windowed_solve_matches_horizon(self, solves):
+        seen = []
+        res = run_dispatch(_data(), {**RECIPE, "window_days": 1}, progress=lambda d, t: seen.append((d, t)))
+        assert seen == [(1, 3), (2, 3), (3, 3)]
+        assert len(solves) == 3 and len(res.snapshots) == len(IDX)
+        assert res.meta["windows"] == 3 and "partial" not in res.meta
+        assert res.objective == pytest.approx(50.0 * _data().demand["SIN"].sum())
+        assert res.meta["kpis"]["generation_mwh"] == pytest.approx(_data().demand["SIN"].sum(), rel=1e-5)
+
+    def test_cancel_returns_solved_windows(self, solves):
+        res = run_dispatch(_data(), {**RECIPE, "window_days": 1}, should_stop=lambda: len(solves) >= 2)
+        assert len(res.snapshots) == 48
+        assert res.meta["partial"]["reason"] == STOP_CANCELLED
+        assert res.meta["partial"]["windows_done"] == 2 and res.meta["partial"]["windows_total"] == 3
+        assert res.meta["partial"]["solved_until"].startswith("2026-01-06 23:00")
+
+    def test_cancel_before_first_window(self, solves):
+        with pytest.raises(SolveInterrupted) as err:
+            run_dispatch(_data(), {**RECIPE, "window_days": 1}, should_stop=lambda: True)
+        assert err.value.reason == STOP_CANCELLED and solves == []
+
+    def test_time_budget_is_passed_to_highs(self, monkeypatch):
+        calls = []
+
+        def fake(centrales, p_max_pu_raw, dem, *args, deadline=None, **kwargs):
+            calls.append(deadline)
+            # La segunda ventana se queda sin tiempo
+            return _network(dem, "time_limit" if len(calls) == 2 else "optimal")
+
+        monkeypatch.setattr(dispatch_model, "build_and_solve", fake)
+        t0 = time.perf_counter()
+        res = run_dispatch(_data(), {**RECIPE, "window_days": 1, "time_budget_s": 60})
+        assert calls[0] == calls[1] and t0 < calls[0] <= time.perf_counter() + 60
+        assert len(calls) == 2 and len(res.snapshots) == 24
+        assert res.meta["partial"]["reason"] == STOP_BUDGET
+
+    def test_stop_inside_a_window_keeps_the_solved_ones(self, monkeypatch):
+        def fake(centrales, p_max_pu_raw, dem, *args, **kwargs):
+            if dem.index[0].day == 6:
+                raise SolveInterrupted(STOP_CANCELLED)
+            return _network(dem)
+
+        monkeypatch.setattr(dispatch_model, "build_and_solve", fake)
+        res = run_dispatch(_data(), {**RECIPE, "window_days": 1})
+        assert len(res.snapshots) == 24 and res.meta["partial"]["reason"] == STOP_CANCELLED
+
+
+class TestBuildAndSolve:
+
+    @pytest.fixture
+    def stages(self, monkeypatch):
+        """Etapas falsas: armar el modelo tarda 0.2 s; registra las opciones de HiGHS."""
+        seen: list[dict] = []
+        monkeypatch.setattr(dispatch_model, "align_profiles", lambda raw, idx: raw)
+        monkeypatch.setattr(dispatch_model, "build_network", lambda *a, **k: SimpleNamespace())
+        monkeypatch.setattr(dispatch_model, "create_model", lambda n: time.sleep(0.2))
+        monkeypatch.setattr(dispatch_model, "solve_model", lambda n, **opts: seen.append(opts) or ("ok", "optimal"))
+        return seen
+
+    def _run(self, **kwargs):
+        data = _data()
+        return build_and_solve(data.centrales, data.p_max_pu_raw, data.demand, {}, False, 3000.0, **kwargs)
+
+    def test_time_limit_is_measured_after_the_model_build(self, stages):
+        self._run(deadline=time.perf_counter() + 1.0)
+        assert 0 < stages[0]["time_limit"] <= 0.8
+
+    def test_no_highs_once_the_time_is_gone(self, stages):
+        with pytest.raises(SolveInterrupted) as err:
+            self._run(deadline=time.perf_counter() + 0.1)
+        assert err.value.reason == STOP_BUDGET and stages == []
+
+    def test_cancel_during_the_build_skips_highs(self, stages):
+        with pytest.raises(SolveInterrupted) as err:
+            self._run(should_stop=lambda: True)
+        assert err.value.reason == STOP_CANCELLED and stages == []
+
+
+class TestSolveTask:
+
+    def test_result_and_progress(self):
+        def job(progress, should_stop):
+            for i in range(4):
+                progress(i + 1, 4, f"paso {i + 1}")
+            return "ok"
+
+        task = SolveTask(job).start()
+        task.join(5)
+        assert task.state == DONE and task.result == "ok"
+        assert task.fraction == 1.0 and task.message == "paso 4" and task.finished
+
+    def test_cancel_is_seen_by_the_job(self):
+        started, release = threading.Event(), threading.Event()
+
+        def job(progress, should_stop):
+            started.set()
+            release.wait(5)
+            if should_stop():
+                raise SolveInterrupted(STOP_CANCELLED)
+            return "no debería terminar"
+
+        task = SolveTask(job).start()
+        started.wait(5)
+        task.cancel()
+        release.set()
+        task.join(5)
+        assert task.state == FAILED and isinstance(task.error, SolveInterrupted)
+
+    def test_abandoned_without_heartbeat(self):
+        task = SolveTask(lambda progress, should_stop: None, abandon_after_s=0.0)
+        assert task.should_stop()
+        task = SolveTask(lambda progress, should_stop: None, abandon_after_s=60.0)
+        task.touch()
+        assert not task.should_stop()
@@ -0,0 +1,106 @@
+"""
+Tests for the declarative scenario sweep (lib/sweep.py): spec expansion,
+stable job ids and checkpoint-based resume.
+
+Run with:  pytest tests/test_sweep.py -v
+"""
+from __future__ import annotations
+
+import json
+from datetime import date
+
+from app.lib.scenarios import SCENARIOS, resolve_scenario
+from app.lib.sweep import (
+    STATUS_ERROR,
+    STATUS_OK,
+    _write_atomic,
+    checkpoint_path,
+    collect,
+    expand_jobs,
+    is_done,
+    run_sweep,
+)
+
+
+def _spec(**kw) -> dict:
+    spec = {
+        "name": "t",
+        "scenarios": ["base", {"name": "gas_voll", "extends": "fuel price", "params": {"voll_value": 5000}}],
+        "dates": {"start": "2026-01-05", "end": "2026-01-18", "window_days": 7},
+        "grid": {"marginal_cost_adder.gas_ccgt": [0, 20, 40]},
+    }
+    spec.update(kw)
+    return spec
+
+
+def _checkpoint(out_dir, job, status):
+    record = {"job_id": job.job_id, "scenario": job.scenario, "status": status, "params": job.params}
+    _write_atomic(checkpoint_path(out_dir, job), json.dumps(record).encode())
+
+
+class TestExpansion:
+
+    def test_cartesian_product(self):
+        jobs = expand_jobs(_spec(growth=[False, True]))
+        assert len(jobs) == 2 * 2 * 3 * 2            # escenarios × ventanas × rejilla × crecimiento
+        assert {(j.start, j.end) for j in jobs} == {
+            (date(2026, 1, 5), date(2026, 1, 11)),
+            (date(2026, 1, 12), date(2026, 1, 18)),
+        }
+
+    def test_grid_and_extends_are_applied(self):
+        jobs = expand_jobs(_spec())
+        gas = [j for j in jobs if j.scenario == "gas_voll" and j.grid["marginal_cost_adder.gas_ccgt"] == 20]
+        params = gas[0].params
+        assert params["voll_value"] == 5000
+        assert params["marginal_cost_adder"]["gas_ccgt"] == 20
+        # el resto de los sumandos del preset sobrevive al merge
+        assert params["marginal_cost_adder"]["diesel_engine"] == 50
+        # el preset original no se modifica
+        assert SCENARIOS[resolve_scenario("fuel price")]["params"]["marginal_cost_adder"]["gas_ccgt"] == 30
+        assert gas[0].recipe()["voll"] == 5000.0
+
+    def test_nested_grid_path_and_last_window(self):
+        spec = _spec(dates={"start": "2026-01-05", "end": "2026-01-14", "window_days": 7},
+                     grid={"capacity_multiplier.BCS.solar": [1.0, 1.5]}, scenarios=["base"])
+        jobs = expand_jobs(spec)
+        assert {j.params["capacity_multiplier"]["BCS"]["solar"] for j in jobs} == {1.0, 1.5}
+        assert max(j.end for j in jobs) == date(2026, 1, 14)      # ventana final recortada
+
+    def test_job_ids_are_stable_and_unique(self):
+        a, b = expand_jobs(_spec()), expand_jobs(_spec())
+        assert [j.job_id for j in a] == [j.job_id for j in b]
+        assert len({j.job_id for j in a}) == len(a)
+
+    def test_duplicate_jobs_are_collapsed(self):
+        jobs = expand_jobs(_spec(scenarios=["base", "base"], dates=None, grid={}))
+        assert len(jobs) == 1 and jobs[0].start is None
+
+    def test_named_scenarios_with_same_params_are_kept(self):
+        spec = _spec(scenarios=["base", {"name": "b2", "extends": "base"}], dates=None)
+        jobs = expand_jobs(spec)
+        assert len(jobs) == 2 * 3
+        assert {j.scenario for j in jobs} == {resolve_scenario("base"), "b2"}
+
+
+class TestResume:
+
+    def test_done_jobs_are_skipped(self, tmp_path):
+        jobs = expand_jobs(_spec())
+        for job in jobs:
+            _checkpoint(tmp_path, job, STATUS_OK)
+
+        def load_data():
+            raise AssertionError("no debería cargar datos si no hay trabajos pendientes")
+
+        assert list(run_sweep(jobs, load_data, tmp_path)) == []
+        assert len(collect(tmp_path)) == len(jobs)
+
+    def test_failed_or_partial_checkpoints_are_retried(self, tmp_path):
+        ok, failed, partial, missing = expand_jobs(_spec())[:4]
+        _checkpoint(tmp_path, ok, STATUS_OK)
+        _checkpoint(tmp_path, failed, STATUS_ERROR)
+        checkpoint_path(tmp_path, partial).write_text("{\"job_id\": ")
+        assert is_done(tmp_path, ok)
+        assert not any(is_done(tmp_path, j) for j in (failed, partial, missing))
+        assert "params" not in collect(tmp_path).columns
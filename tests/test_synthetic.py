@@ -0,0 +1,82 @@
+"""
+Tests for the synthetic large-system generator (lib/synthetic.py).
+
+Run with:  pytest tests/test_synthetic.py -v
+"""
+from __future__ import annotations
+
+from datetime import date
+
+import pandas as pd
+
+from app.lib.demand_store import parse_balance_csv
+from app.lib.synthetic import (
+    SyntheticSpec,
+    balance_filename,
+    iter_profiles,
+    make_catalog,
+    make_demand,
+    make_profiles,
+    write_balance_csv,
+)
+
+SPEC = SyntheticSpec(n_plants=300, sin_areas=10, days=3, seed=11)
+
+
+class TestCatalog:
+
+    def test_schema_and_size(self):
+        cat = make_catalog(SPEC)
+        assert len(cat) == 300
+        assert {"name", "bus", "carrier", "p_nom", "marginal_cost", "efficiency"} <= set(cat.columns)
+        assert cat["name"].is_unique
+        assert set(cat["bus"]) <= {"SIN", "BCA", "BCS"}
+        assert (cat["p_nom"] > 0).all()
+
+    def test_same_seed_same_catalog(self):
+        pd.testing.assert_frame_equal(make_catalog(SPEC), make_catalog(SPEC))
+        other = make_catalog(SyntheticSpec(n_plants=300, sin_areas=10, days=3, seed=12))
+        assert not other["p_nom"].equals(make_catalog(SPEC)["p_nom"])
+
+    def test_area_buses(self):
+        spec = SyntheticSpec(n_plants=300, sin_areas=10, bus_level="area", seed=1)
+        cat = make_catalog(spec)
+        all_areas = {a for areas in spec.areas.values() for a in areas}
+        assert set(cat["bus"]) <= all_areas
+        assert cat["bus"].nunique() > 3
+        assert spec.areas["SIN"][-1] == "A10"
+
+
+class TestProfiles:
+
+    def test_shape_bounds_and_chunk_independence(self):
+        cat = make_catalog(SPEC)
+        full = make_profiles(cat, SPEC)
+        assert full.shape == (72, 300)
+        assert full.min().min() >= 0.0 and full.max().max() <= 1.0
+        chunked = pd.concat(list(iter_profiles(cat, SPEC, chunk_days=1)))
+        pd.testing.assert_frame_equal(full, chunked)
+
+    def test_solar_is_zero_at_night(self):
+        cat = make_catalog(SPEC)
+        prof = make_profiles(cat, SPEC)
+        solar = cat.loc[cat["carrier"] == "solar", "name"]
+        assert (prof.loc[prof.index.hour == 2, solar] == 0).all().all()
+
+
+class TestBalanceDemand:
+
+    def test_balance_csv_round_trips_through_parser(self, tmp_path):
+        demand = make_demand(SPEC)
+        day = date(2026, 1, 2)
+        day_df = demand[demand["snapshot"].dt.date == day]
+        path = write_balance_csv(day_df, day, tmp_path / balance_filename(day), SPEC.seed)
+
+        parsed = parse_balance_csv(path)
+        assert parsed is not None
+        assert set(parsed["zona"]) == {"SIN", "BCA", "BCS"}
+        assert len(parsed) == 72
+        expected = day_df.groupby("sistema")["demand_mw"].sum()
+        got = parsed.groupby("zona")["demand_mw"].sum()
+        for s in ["SIN", "BCA", "BCS"]:
+            assert abs(got[s] - expected[s]) < 1e-3 * expected[s]